@@ -0,0 +1,23 @@
+"""Add started_at to analytics reports
+
+Revision ID: a7d3e9f1c4b6
+Revises: f2c6a9d4b8e1
+Create Date: 2025-07-25 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3e9f1c4b6'
+down_revision = 'f2c6a9d4b8e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('analytics_reports', sa.Column('started_at', sa.DateTime(), nullable=True, comment='When generation last started'))
+
+
+def downgrade() -> None:
+    op.drop_column('analytics_reports', 'started_at')
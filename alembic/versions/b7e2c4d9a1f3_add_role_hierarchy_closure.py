@@ -0,0 +1,48 @@
+"""Add role hierarchy closure table
+
+Revision ID: b7e2c4d9a1f3
+Revises: 8fccc57716ff
+Create Date: 2025-07-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.db.base import UUIDType
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2c4d9a1f3'
+down_revision = '8fccc57716ff'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('role_hierarchy_closure',
+        sa.Column('ancestor_role_id', UUIDType(length=36), nullable=False),
+        sa.Column('descendant_role_id', UUIDType(length=36), nullable=False),
+        sa.Column('path_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ancestor_role_id'], ['roles.id'], ),
+        sa.ForeignKeyConstraint(['descendant_role_id'], ['roles.id'], ),
+        sa.PrimaryKeyConstraint('ancestor_role_id', 'descendant_role_id')
+    )
+    op.create_index('idx_role_closure_descendant', 'role_hierarchy_closure', ['descendant_role_id'], unique=False)
+    
+    # Backfill from the existing (acyclic) hierarchy, counting distinct paths
+    op.execute("""
+        INSERT INTO role_hierarchy_closure (ancestor_role_id, descendant_role_id, path_count)
+        WITH RECURSIVE paths (ancestor_role_id, descendant_role_id) AS (
+            SELECT parent_role_id, child_role_id FROM role_hierarchy
+            UNION ALL
+            SELECT paths.ancestor_role_id, role_hierarchy.child_role_id
+            FROM paths
+            JOIN role_hierarchy ON role_hierarchy.parent_role_id = paths.descendant_role_id
+        )
+        SELECT ancestor_role_id, descendant_role_id, COUNT(*)
+        FROM paths
+        GROUP BY ancestor_role_id, descendant_role_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_role_closure_descendant', table_name='role_hierarchy_closure')
+    op.drop_table('role_hierarchy_closure')
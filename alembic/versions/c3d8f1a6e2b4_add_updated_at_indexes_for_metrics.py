@@ -0,0 +1,33 @@
+"""Add updated_at indexes for incremental key metrics
+
+Revision ID: c3d8f1a6e2b4
+Revises: b7e2c4d9a1f3
+Create Date: 2025-07-21 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c3d8f1a6e2b4'
+down_revision = 'b7e2c4d9a1f3'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('idx_transaction_updated_at', 'transaction_headers'),
+    ('idx_customer_updated_at', 'customers'),
+    ('idx_inventory_unit_updated_at', 'inventory_units'),
+    ('idx_rental_return_updated_at', 'rental_returns'),
+]
+
+
+def upgrade() -> None:
+    for index_name, table_name in INDEXES:
+        op.create_index(index_name, table_name, ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    for index_name, table_name in INDEXES:
+        op.drop_index(index_name, table_name=table_name)
@@ -0,0 +1,31 @@
+"""Add report job queue columns
+
+Revision ID: d4a9e7b2c5f1
+Revises: c3d8f1a6e2b4
+Create Date: 2025-07-22 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd4a9e7b2c5f1'
+down_revision = 'c3d8f1a6e2b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('analytics_reports', sa.Column('attempts', sa.Integer(), nullable=False, server_default='0', comment='Generation attempts made by report workers'))
+    op.add_column('analytics_reports', sa.Column('lease_owner', sa.String(length=100), nullable=True, comment='Worker holding the generation lease'))
+    op.add_column('analytics_reports', sa.Column('lease_expires_at', sa.DateTime(), nullable=True, comment='When the generation lease expires'))
+    op.add_column('analytics_reports', sa.Column('available_at', sa.DateTime(), nullable=True, comment='Earliest time a queued report may be claimed'))
+    op.create_index('idx_analytics_report_queue', 'analytics_reports', ['report_status', 'available_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_analytics_report_queue', table_name='analytics_reports')
+    op.drop_column('analytics_reports', 'available_at')
+    op.drop_column('analytics_reports', 'lease_expires_at')
+    op.drop_column('analytics_reports', 'lease_owner')
+    op.drop_column('analytics_reports', 'attempts')
@@ -0,0 +1,37 @@
+"""Add transaction daily summary rollup
+
+Revision ID: e5b1c8d3f7a2
+Revises: d4a9e7b2c5f1
+Create Date: 2025-07-23 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e5b1c8d3f7a2'
+down_revision = 'd4a9e7b2c5f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('transaction_daily_summary',
+        sa.Column('summary_date', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('transaction_type', sa.String(length=20), nullable=False),
+        sa.Column('payment_status', sa.String(length=20), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('transaction_count', sa.Integer(), nullable=False),
+        sa.Column('total_amount', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('paid_amount', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('summary_date', 'status', 'transaction_type', 'payment_status', 'is_active')
+    )
+    op.create_index('idx_transaction_daily_summary_refreshed', 'transaction_daily_summary', ['refreshed_at'], unique=False)
+    # The rollup is filled on first use (sync_daily_summary finds it empty and rebuilds every day)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_transaction_daily_summary_refreshed', table_name='transaction_daily_summary')
+    op.drop_table('transaction_daily_summary')
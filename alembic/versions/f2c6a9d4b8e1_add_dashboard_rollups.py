@@ -0,0 +1,64 @@
+"""Add dashboard rollup tables
+
+Revision ID: f2c6a9d4b8e1
+Revises: e5b1c8d3f7a2
+Create Date: 2025-07-24 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.base import UUIDType
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6a9d4b8e1'
+down_revision = 'e5b1c8d3f7a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('rollup_daily_location',
+        sa.Column('fact_date', sa.Date(), nullable=False),
+        sa.Column('location_id', UUIDType(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('transaction_count', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('rental_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('fact_date', 'location_id', 'status')
+    )
+    op.create_table('rollup_rental_status',
+        sa.Column('location_id', UUIDType(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('rental_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('location_id', 'status')
+    )
+    op.create_table('rollup_return_due',
+        sa.Column('location_id', UUIDType(), nullable=False),
+        sa.Column('due_date', sa.Date(), nullable=False),
+        sa.Column('return_status', sa.String(length=20), nullable=False),
+        sa.Column('return_count', sa.Integer(), nullable=False),
+        sa.Column('late_fees', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('damage_fees', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('location_id', 'due_date', 'return_status')
+    )
+    op.create_index('idx_rollup_return_due_date', 'rollup_return_due', ['due_date', 'return_status'], unique=False)
+    op.create_table('rollup_category_inventory',
+        sa.Column('category_id', UUIDType(), nullable=False),
+        sa.Column('location_id', UUIDType(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('unit_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('category_id', 'location_id', 'status')
+    )
+
+    # Backfill from the existing rows; from here on the flush listener keeps them current
+    from app.modules.analytics.rollups import rebuild_rollups
+    rebuild_rollups(op.get_bind())
+
+
+def downgrade() -> None:
+    op.drop_table('rollup_category_inventory')
+    op.drop_index('idx_rollup_return_due_date', table_name='rollup_return_due')
+    op.drop_table('rollup_return_due')
+    op.drop_table('rollup_rental_status')
+    op.drop_table('rollup_daily_location')
@@ -0,0 +1,106 @@
+"""
+Process-local caches for the per-request authentication path.
+
+``verified_tokens`` remembers access tokens whose signature has already
+been checked, keyed by their SHA-256 digest, until the token's own expiry,
+so repeat requests skip JWT verification. ``user_activity`` keeps a short
+lived is_active snapshot per user so active-user checks skip the database.
+Writes in this process invalidate a user's snapshot immediately; other
+workers pick the change up within AUTH_USER_SNAPSHOT_TTL seconds.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.snapshot_cache import MISSING, SnapshotCache
+
+
+class VerifiedTokenCache:
+    """LRU of verified tokens to their decoded data, bounded by token expiry."""
+
+    def __init__(self, max_size: int = settings.AUTH_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, Tuple[Any, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[Any]:
+        """Decoded data for a token verified earlier and not yet expired."""
+        key = self._digest(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, token: str, value: Any, expires_at: Optional[float]):
+        """Remember a verified token until expires_at (epoch seconds)."""
+        # Tokens without an expiry are never cached
+        if self.max_size <= 0 or expires_at is None or expires_at <= time.time():
+            return
+        key = self._digest(token)
+        self._entries[key] = (value, float(expires_at))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class UserActivityCache:
+    """Per-user is_active snapshot, refreshed from the database on demand."""
+
+    def __init__(self, ttl: int = settings.AUTH_USER_SNAPSHOT_TTL, max_size: int = settings.AUTH_CACHE_SIZE):
+        self._snapshots = SnapshotCache(ttl, max_size)
+
+    @staticmethod
+    def _query(user_id: UUID):
+        from app.modules.auth.models import User
+
+        users = User.__table__
+        return select(users.c.is_active).where(users.c.id == user_id)
+
+    async def is_active(self, session, user_id: UUID) -> bool:
+        """Whether the user exists and is active, from the snapshot when fresh."""
+        active = self._snapshots.get(user_id)
+        if active is not MISSING:
+            return active
+
+        generation = self._snapshots.generation
+        result = await session.execute(self._query(user_id))
+        active = bool(result.scalar())
+        self._snapshots.put(user_id, active, generation)
+        return active
+
+    def invalidate(self, user_id: Optional[UUID] = None):
+        """Drop one user's snapshot, or every snapshot when user_id is None."""
+        self._snapshots.invalidate(None if user_id is None else [user_id])
+
+    def stats(self) -> Dict[str, Any]:
+        return self._snapshots.stats()
+
+
+# Global instances
+verified_tokens = VerifiedTokenCache()
+user_activity = UserActivityCache()
@@ -4,9 +4,12 @@ Redis Cache Implementation for Rental Management System.
 This module provides Redis-based caching with async support for improved performance.
 """
 
-import json
-import pickle
-from typing import Any, Optional, Union, Dict, List
+import math
+import random
+import time
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Any, Optional, Union, Dict, List, NamedTuple, Iterable
 from datetime import datetime, timedelta
 import asyncio
 from functools import wraps
@@ -23,6 +26,7 @@ from pydantic import BaseModel
 
 from app.core.config import settings
 from app.core.errors import CacheError
+from app.core.cache_codecs import CacheCodec
 
 
 class CacheConfig:
@@ -50,14 +54,112 @@ class CacheConfig:
     INVENTORY_AVAILABILITY = f"{INVENTORY_PREFIX}:availability:{{id}}"
     ANALYTICS_DASHBOARD = f"{ANALYTICS_PREFIX}:dashboard:{{period}}"
     SYSTEM_CONFIG = f"{CONFIG_PREFIX}:system"
+    
+    # Sidecar key holding the recompute time used for probabilistic early refresh
+    EARLY_REFRESH_SUFFIX = ":__xf"
+    
+    # Tag sets track the keys registered under each invalidation tag
+    TAG_PREFIX = "tag"
+    TAG_TTL_MARGIN = 60  # Seconds a tag set outlives its longest-lived member
+    CUSTOMER_TAG = f"{CUSTOMER_PREFIX}:{{id}}"
+    INVENTORY_TAG = f"{INVENTORY_PREFIX}:{{id}}"
+    
+    # Batch size for SCAN iteration and multi-key deletes
+    SCAN_BATCH_SIZE = 500
+
+
+class LocalCacheEntry(NamedTuple):
+    """Entry held by the in-process cache tier."""
+    
+    payload: bytes
+    local_deadline: float  # When this process must stop serving the entry
+    expires_at: float      # When the entry expires in Redis
+    delta: float           # Seconds it took to compute the value (0 if unknown)
+
+
+class LocalCache:
+    """Bounded in-process LRU cache with per-entry TTL.
+    
+    Entries hold serialized payloads so callers never share mutable objects.
+    """
+    
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, LocalCacheEntry]" = OrderedDict()
+        self.evictions = 0
+    
+    def get(self, key: str) -> Optional[LocalCacheEntry]:
+        """Get a live entry and mark it as recently used."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.local_deadline <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+    
+    def set(self, key: str, payload: bytes, ttl: int, delta: float = 0.0, expires_at: Optional[float] = None):
+        """Store a payload, evicting the least recently used entries when full."""
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        now = time.time()
+        expires_at = expires_at if expires_at is not None else now + ttl
+        local_deadline = min(expires_at, now + self.ttl)
+        if local_deadline <= now:
+            return
+        
+        self._entries[key] = LocalCacheEntry(payload, local_deadline, expires_at, delta)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def delete(self, key: str) -> bool:
+        """Remove a single entry."""
+        return self._entries.pop(key, None) is not None
+    
+    def delete_matching(self, pattern: str) -> int:
+        """Remove entries whose key matches a Redis-style glob pattern."""
+        matched = [key for key in self._entries if fnmatchcase(key, pattern)]
+        for key in matched:
+            del self._entries[key]
+        return len(matched)
+    
+    def clear(self):
+        """Remove all entries."""
+        self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
 
 
 class CacheManager:
-    """Async Redis cache manager with high-level operations."""
+    """Async two-tier cache manager (in-process LRU in front of Redis)."""
     
     def __init__(self):
         self.redis: Optional[Redis] = None
         self.connected = False
+        self.local = LocalCache(
+            max_entries=settings.CACHE_LOCAL_MAX_ENTRIES if settings.CACHE_LOCAL_ENABLED else 0,
+            ttl=settings.CACHE_LOCAL_TTL
+        )
+        self.early_refresh_beta = settings.CACHE_EARLY_REFRESH_BETA
+        self.codec = CacheCodec(
+            plain_serializer=settings.CACHE_SERIALIZER,
+            compression=settings.CACHE_COMPRESSION,
+            compression_threshold=settings.CACHE_COMPRESSION_THRESHOLD
+        )
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats = {
+            "l1_hits": 0,
+            "l1_misses": 0,
+            "l2_hits": 0,
+            "l2_misses": 0,
+            "early_refreshes": 0,
+            "coalesced": 0
+        }
         
     async def connect(self):
         """Initialize Redis connection."""
@@ -70,7 +172,8 @@ class CacheManager:
                 password=settings.REDIS_PASSWORD,
                 db=settings.REDIS_DB,
                 max_connections=settings.REDIS_MAX_CONNECTIONS,
-                decode_responses=True
+                # Payloads are binary (see cache_codecs), so never decode them
+                decode_responses=False
             )
             
             # Test connection
@@ -87,41 +190,101 @@ class CacheManager:
         if self.redis:
             await self.redis.close()
             self.connected = False
+        self.local.clear()
+    
+    def _serialize(self, value: Any) -> bytes:
+        """Serialize a value for storage."""
+        return self.codec.encode(value)
+    
+    def _deserialize(self, payload: bytes) -> Any:
+        """Deserialize a stored payload."""
+        return self.codec.decode(payload)
+    
+    def _should_refresh_early(self, entry: LocalCacheEntry) -> bool:
+        """Decide whether to recompute a value before it expires (XFetch).
+        
+        The probability rises as expiry approaches and with the cost of the
+        recompute, so hot keys are refreshed by one caller ahead of time instead
+        of expiring for every worker at once.
+        """
+        if self.early_refresh_beta <= 0 or entry.delta <= 0:
+            return False
+        jitter = -math.log(1.0 - random.random())
+        return time.time() + entry.delta * self.early_refresh_beta * jitter >= entry.expires_at
     
     async def get(self, key: str, default: Any = None) -> Any:
         """Get value from cache."""
         if not self.connected:
             return default
+        
+        entry = self.local.get(key)
+        if entry is not None:
+            self._stats["l1_hits"] += 1
+            return self._deserialize(entry.payload)
+        self._stats["l1_misses"] += 1
             
         try:
             value = await self.redis.get(key)
             if value is None:
+                self._stats["l2_misses"] += 1
                 return default
-                
-            # Try to deserialize JSON first, then pickle
-            try:
-                return json.loads(value)
-            except (json.JSONDecodeError, TypeError):
-                return pickle.loads(value.encode('latin-1'))
+            
+            self._stats["l2_hits"] += 1
+            self.local.set(key, value, self.local.ttl)
+            return self._deserialize(value)
                 
         except Exception as e:
             # Log error but don't fail the application
             print(f"Cache get error for key {key}: {str(e)}")
             return default
     
-    async def set(self, key: str, value: Any, ttl: int = CacheConfig.DEFAULT_TTL) -> bool:
-        """Set value in cache with TTL."""
+    def _tag_key(self, tag: str) -> str:
+        """Build the Redis key of a tag set."""
+        return f"{CacheConfig.TAG_PREFIX}:{tag}"
+    
+    async def _write(
+        self,
+        key: str,
+        serialized: bytes,
+        ttl: int,
+        tags: Optional[Iterable[str]] = None,
+        delta: Optional[float] = None
+    ):
+        """Write a payload and register it under its tags in one round trip."""
+        tags = list(tags or ())
+        if not tags and delta is None:
+            await self.redis.setex(key, ttl, serialized)
+            return
+        
+        pipe = self.redis.pipeline(transaction=bool(tags))
+        pipe.setex(key, ttl, serialized)
+        if delta is not None:
+            pipe.setex(key + CacheConfig.EARLY_REFRESH_SUFFIX, ttl, f"{delta:.6f}")
+        tag_ttl = ttl + CacheConfig.TAG_TTL_MARGIN
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            pipe.sadd(tag_key, key)
+            # Set a fresh expiry, or only ever extend an existing one, so the
+            # set expires shortly after the longest-lived key it tracks
+            pipe.expire(tag_key, tag_ttl, nx=True)
+            pipe.expire(tag_key, tag_ttl, gt=True)
+        await pipe.execute()
+    
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: int = CacheConfig.DEFAULT_TTL,
+        tags: Optional[Iterable[str]] = None
+    ) -> bool:
+        """Set value in cache with TTL, optionally registering it under tags."""
         if not self.connected:
             return False
             
         try:
-            # Serialize value
-            if isinstance(value, (dict, list, bool, int, float, str)):
-                serialized = json.dumps(value, default=str)
-            else:
-                serialized = pickle.dumps(value).decode('latin-1')
-            
-            await self.redis.setex(key, ttl, serialized)
+            serialized = self._serialize(value)
+            await self._write(key, serialized, ttl, tags)
+            self.local.set(key, serialized, ttl)
             return True
             
         except Exception as e:
@@ -130,34 +293,107 @@ class CacheManager:
     
     async def delete(self, key: str) -> bool:
         """Delete key from cache."""
+        self.local.delete(key)
         if not self.connected:
             return False
             
         try:
-            await self.redis.delete(key)
+            await self.redis.delete(key, key + CacheConfig.EARLY_REFRESH_SUFFIX)
             return True
         except Exception as e:
             print(f"Cache delete error for key {key}: {str(e)}")
             return False
     
     async def delete_pattern(self, pattern: str) -> int:
-        """Delete keys matching pattern."""
+        """Delete keys matching pattern.
+        
+        Uses incremental SCAN in batches rather than KEYS, so Redis is never
+        blocked for a whole keyspace walk. Prefer tags (see invalidate_tags)
+        for routine invalidation, which needs no scan at all.
+        """
+        self.local.delete_matching(pattern)
         if not self.connected:
             return 0
             
         try:
-            keys = await self.redis.keys(pattern)
-            if keys:
-                return await self.redis.delete(*keys)
-            return 0
+            deleted = 0
+            batch = []
+            async for key in self.redis.scan_iter(match=pattern, count=CacheConfig.SCAN_BATCH_SIZE):
+                batch.append(key)
+                if len(batch) >= CacheConfig.SCAN_BATCH_SIZE:
+                    deleted += await self.redis.delete(*batch)
+                    batch = []
+            if batch:
+                deleted += await self.redis.delete(*batch)
+            return deleted
         except Exception as e:
             print(f"Cache delete pattern error for pattern {pattern}: {str(e)}")
             return 0
     
+    async def invalidate_tags(self, *tags: str) -> int:
+        """Delete every key registered under any of the given tags.
+        
+        The tag sets are read and removed atomically, then their members are
+        deleted in batches, so invalidation costs two round trips regardless
+        of the keyspace size.
+        """
+        if not tags or not self.connected:
+            return 0
+        
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            for tag in tags:
+                tag_key = self._tag_key(tag)
+                pipe.smembers(tag_key)
+                pipe.delete(tag_key)
+            results = await pipe.execute()
+            
+            keys = set()
+            for members in results[::2]:
+                keys.update(
+                    member.decode() if isinstance(member, bytes) else member
+                    for member in members or ()
+                )
+            if not keys:
+                return 0
+            
+            for key in keys:
+                self.local.delete(key)
+            
+            deleted = 0
+            keys = list(keys)
+            for start in range(0, len(keys), CacheConfig.SCAN_BATCH_SIZE):
+                batch = keys[start:start + CacheConfig.SCAN_BATCH_SIZE]
+                sidecars = [key + CacheConfig.EARLY_REFRESH_SUFFIX for key in batch]
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.delete(*batch)
+                pipe.delete(*sidecars)
+                deleted += (await pipe.execute())[0]
+            return deleted
+        except Exception as e:
+            print(f"Cache invalidate error for tags {tags}: {str(e)}")
+            return 0
+    
+    async def count_pattern(self, pattern: str) -> int:
+        """Count keys matching pattern using non-blocking SCAN."""
+        if not self.connected:
+            return 0
+        
+        try:
+            count = 0
+            async for _ in self.redis.scan_iter(match=pattern, count=CacheConfig.SCAN_BATCH_SIZE):
+                count += 1
+            return count
+        except Exception as e:
+            print(f"Cache count error for pattern {pattern}: {str(e)}")
+            return 0
+    
     async def exists(self, key: str) -> bool:
         """Check if key exists in cache."""
         if not self.connected:
             return False
+        if self.local.get(key) is not None:
+            return True
             
         try:
             return await self.redis.exists(key) > 0
@@ -169,6 +405,7 @@ class CacheManager:
         """Increment a counter in cache."""
         if not self.connected:
             return 0
+        self.local.delete(key)
             
         try:
             result = await self.redis.incr(key, amount)
@@ -178,20 +415,141 @@ class CacheManager:
             print(f"Cache increment error for key {key}: {str(e)}")
             return 0
     
-    async def get_or_set(self, key: str, callback, ttl: int = CacheConfig.DEFAULT_TTL) -> Any:
-        """Get value from cache or set it using callback."""
-        value = await self.get(key)
-        if value is not None:
-            return value
+    async def _get_with_metadata(self, key: str) -> Optional[LocalCacheEntry]:
+        """Fetch a value with its remaining TTL and recompute time in one round trip."""
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.pttl(key)
+            pipe.get(key + CacheConfig.EARLY_REFRESH_SUFFIX)
+            value, pttl, delta = await pipe.execute()
+        except Exception as e:
+            print(f"Cache get error for key {key}: {str(e)}")
+            return None
+        
+        if value is None:
+            return None
+        
+        now = time.time()
+        # PTTL is -1 for keys without expiry; treat them as never expiring
+        expires_at = now + pttl / 1000.0 if pttl is not None and pttl >= 0 else math.inf
+        return LocalCacheEntry(value, now, expires_at, float(delta) if delta else 0.0)
+    
+    async def _store_computed(
+        self,
+        key: str,
+        value: Any,
+        ttl: int,
+        delta: float,
+        tags: Optional[Iterable[str]] = None
+    ):
+        """Store a freshly computed value together with its recompute time."""
+        try:
+            serialized = self._serialize(value)
+            await self._write(key, serialized, ttl, tags, delta=delta)
+            self.local.set(key, serialized, ttl, delta=delta)
+        except Exception as e:
+            print(f"Cache set error for key {key}: {str(e)}")
+    
+    async def _compute_once(
+        self,
+        key: str,
+        callback,
+        ttl: int,
+        tags: Optional[Iterable[str]] = None
+    ) -> Any:
+        """Run the callback for a key at most once per process at a time.
+        
+        Concurrent callers for the same key await the in-flight computation
+        instead of issuing their own.
+        """
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._stats["coalesced"] += 1
+            return await asyncio.shield(inflight)
+        
+        future = asyncio.get_running_loop().create_future()
+        # Mark any exception as retrieved when nobody else is waiting
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            started = time.monotonic()
+            if asyncio.iscoroutinefunction(callback):
+                fresh_value = await callback()
+            else:
+                fresh_value = callback()
+            delta = time.monotonic() - started
             
-        # Call the callback to get fresh data
-        if asyncio.iscoroutinefunction(callback):
-            fresh_value = await callback()
+            if self.connected:
+                await self._store_computed(key, fresh_value, ttl, delta, tags)
+            future.set_result(fresh_value)
+            return fresh_value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+    
+    async def get_or_set(
+        self,
+        key: str,
+        callback,
+        ttl: int = CacheConfig.DEFAULT_TTL,
+        tags: Optional[Iterable[str]] = None
+    ) -> Any:
+        """Get value from cache or set it using callback.
+        
+        Misses are coalesced per process, and values close to expiry are
+        probabilistically refreshed early while other callers keep being
+        served the current value.
+        """
+        if not self.connected:
+            return await self._compute_once(key, callback, ttl, tags)
+        
+        entry = self.local.get(key)
+        if entry is not None:
+            self._stats["l1_hits"] += 1
         else:
-            fresh_value = callback()
-            
-        await self.set(key, fresh_value, ttl)
-        return fresh_value
+            self._stats["l1_misses"] += 1
+            entry = await self._get_with_metadata(key)
+            if entry is not None:
+                self._stats["l2_hits"] += 1
+                self.local.set(key, entry.payload, self.local.ttl, delta=entry.delta, expires_at=entry.expires_at)
+            else:
+                self._stats["l2_misses"] += 1
+        
+        if entry is None:
+            return await self._compute_once(key, callback, ttl, tags)
+        
+        if self._should_refresh_early(entry) and key not in self._inflight:
+            self._stats["early_refreshes"] += 1
+            return await self._compute_once(key, callback, ttl, tags)
+        
+        return self._deserialize(entry.payload)
+    
+    def get_tier_statistics(self) -> Dict[str, Any]:
+        """Get per-tier hit/miss counters for this process."""
+        stats = self._stats
+        return {
+            "l1": {
+                "hits": stats["l1_hits"],
+                "misses": stats["l1_misses"],
+                "hit_ratio": self._calculate_hit_ratio(stats["l1_hits"], stats["l1_misses"]),
+                "size": len(self.local),
+                "max_entries": self.local.max_entries,
+                "evictions": self.local.evictions
+            },
+            "l2": {
+                "hits": stats["l2_hits"],
+                "misses": stats["l2_misses"],
+                "hit_ratio": self._calculate_hit_ratio(stats["l2_hits"], stats["l2_misses"])
+            },
+            "early_refreshes": stats["early_refreshes"],
+            "coalesced": stats["coalesced"]
+        }
     
     async def get_health(self) -> Dict[str, Any]:
         """Get cache health information."""
@@ -247,9 +605,14 @@ def cache_key_builder(*parts: str) -> str:
 def cache_result(
     key_pattern: str,
     ttl: int = CacheConfig.DEFAULT_TTL,
-    skip_cache: bool = False
+    skip_cache: bool = False,
+    tag_patterns: Optional[List[str]] = None
 ):
-    """Decorator for caching function results."""
+    """Decorator for caching function results.
+    
+    Tag patterns are formatted with the call arguments like the key pattern
+    and register the result for invalidation via CacheManager.invalidate_tags.
+    """
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
@@ -261,6 +624,7 @@ def cache_result(
             # Build cache key
             try:
                 cache_key = key_pattern.format(*args, **kwargs)
+                tags = [pattern.format(*args, **kwargs) for pattern in tag_patterns or ()]
             except (KeyError, IndexError):
                 # If key formatting fails, skip cache
                 if asyncio.iscoroutinefunction(func):
@@ -278,7 +642,7 @@ def cache_result(
             else:
                 result = func(*args, **kwargs)
             
-            await cache_manager.set(cache_key, result, ttl)
+            await cache_manager.set(cache_key, result, ttl, tags=tags)
             return result
         
         return wrapper
@@ -300,12 +664,15 @@ class CacheService:
     async def set_customer(self, customer_id: str, customer_data: Dict, ttl: int = CacheConfig.MEDIUM_TTL):
         """Cache customer data."""
         key = CacheConfig.CUSTOMER_DETAIL.format(id=customer_id)
-        await self.cache.set(key, customer_data, ttl)
+        await self.cache.set(key, customer_data, ttl, tags=self._customer_tags(customer_id))
     
     async def invalidate_customer(self, customer_id: str):
         """Invalidate customer cache."""
-        pattern = f"{CacheConfig.CUSTOMER_PREFIX}:*{customer_id}*"
-        await self.cache.delete_pattern(pattern)
+        await self.cache.invalidate_tags(CacheConfig.CUSTOMER_TAG.format(id=customer_id))
+    
+    def _customer_tags(self, customer_id: str) -> List[str]:
+        """Tags for entries derived from a customer."""
+        return [CacheConfig.CUSTOMER_TAG.format(id=customer_id), CacheConfig.CUSTOMER_PREFIX]
     
     # Inventory caching
     async def get_inventory_item(self, item_id: str) -> Optional[Dict]:
@@ -316,7 +683,7 @@ class CacheService:
     async def set_inventory_item(self, item_id: str, item_data: Dict, ttl: int = CacheConfig.MEDIUM_TTL):
         """Cache inventory item data."""
         key = CacheConfig.INVENTORY_ITEM.format(id=item_id)
-        await self.cache.set(key, item_data, ttl)
+        await self.cache.set(key, item_data, ttl, tags=self._inventory_tags(item_id))
     
     async def get_item_availability(self, item_id: str) -> Optional[Dict]:
         """Get item availability from cache."""
@@ -326,12 +693,19 @@ class CacheService:
     async def set_item_availability(self, item_id: str, availability_data: Dict, ttl: int = CacheConfig.SHORT_TTL):
         """Cache item availability (short TTL for real-time data)."""
         key = CacheConfig.INVENTORY_AVAILABILITY.format(id=item_id)
-        await self.cache.set(key, availability_data, ttl)
+        await self.cache.set(key, availability_data, ttl, tags=self._inventory_tags(item_id))
     
     async def invalidate_inventory_item(self, item_id: str):
         """Invalidate inventory item cache."""
-        pattern = f"{CacheConfig.INVENTORY_PREFIX}:*{item_id}*"
-        await self.cache.delete_pattern(pattern)
+        await self.cache.invalidate_tags(CacheConfig.INVENTORY_TAG.format(id=item_id))
+    
+    async def invalidate_inventory(self):
+        """Invalidate every cached inventory entry."""
+        await self.cache.invalidate_tags(CacheConfig.INVENTORY_PREFIX)
+    
+    def _inventory_tags(self, item_id: str) -> List[str]:
+        """Tags for entries derived from an inventory item."""
+        return [CacheConfig.INVENTORY_TAG.format(id=item_id), CacheConfig.INVENTORY_PREFIX]
     
     # Analytics caching
     async def get_analytics_dashboard(self, period: str) -> Optional[Dict]:
@@ -405,11 +779,13 @@ async def get_cache_statistics() -> Dict[str, Any]:
     # Add custom metrics
     stats = {
         **health,
+        "tiers": cache_manager.get_tier_statistics(),
+        "codec": cache_manager.codec.describe(),
         "cache_prefixes": {
-            "customer": len(await cache_manager.redis.keys(f"{CacheConfig.CUSTOMER_PREFIX}:*")),
-            "inventory": len(await cache_manager.redis.keys(f"{CacheConfig.INVENTORY_PREFIX}:*")),
-            "analytics": len(await cache_manager.redis.keys(f"{CacheConfig.ANALYTICS_PREFIX}:*")),
-            "session": len(await cache_manager.redis.keys(f"{CacheConfig.SESSION_PREFIX}:*"))
+            "customer": await cache_manager.count_pattern(f"{CacheConfig.CUSTOMER_PREFIX}:*"),
+            "inventory": await cache_manager.count_pattern(f"{CacheConfig.INVENTORY_PREFIX}:*"),
+            "analytics": await cache_manager.count_pattern(f"{CacheConfig.ANALYTICS_PREFIX}:*"),
+            "session": await cache_manager.count_pattern(f"{CacheConfig.SESSION_PREFIX}:*")
         }
     }
     
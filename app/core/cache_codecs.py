@@ -0,0 +1,453 @@
+"""
+Binary serialization codecs for the cache.
+
+Every payload written by CacheManager starts with a single header byte that
+records the codec format version, the serializer and the compressor used, so
+readers never have to guess (and never try JSON first and fall back on error).
+
+Header layout (one byte)::
+
+    1 VV CC SSS
+    | |  |  +-- serializer id (see SERIALIZER_* constants)
+    | |  +----- compressor id (see COMPRESSOR_* constants)
+    | +-------- codec format version (currently 1)
+    +---------- always set, so headers never collide with ASCII JSON payloads
+
+Payloads without a recognised header are decoded with the legacy
+JSON-or-pickle scheme, so entries written before this module existed remain
+readable until they expire.
+"""
+
+import importlib
+import json
+import pickle
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+    msgpack = None
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+    lz4_frame = None
+
+from app.core.errors import CacheError, ConfigurationException
+
+
+CODEC_VERSION = 1
+_HEADER_BASE = 0x80 | (CODEC_VERSION << 5)
+_HEADER_MASK = 0xE0
+
+# Serializer ids (3 bits)
+SERIALIZER_BYTES = 0
+SERIALIZER_STR = 1
+SERIALIZER_JSON = 2
+SERIALIZER_MSGPACK = 3
+SERIALIZER_PYDANTIC = 4
+SERIALIZER_PYDANTIC_LIST = 5
+SERIALIZER_PICKLE = 6
+
+# Compressor ids (2 bits)
+COMPRESSOR_NONE = 0
+COMPRESSOR_ZLIB = 1
+COMPRESSOR_ZSTD = 2
+COMPRESSOR_LZ4 = 3
+
+PLAIN_TYPES = (dict, list, bool, int, float, type(None))
+
+
+def _model_path(model_class: Type[BaseModel]) -> bytes:
+    """Get the import path of a Pydantic model class."""
+    return f"{model_class.__module__}:{model_class.__qualname__}".encode()
+
+
+@lru_cache(maxsize=256)
+def _resolve_model(path: bytes) -> Type[BaseModel]:
+    """Resolve a model class from its import path."""
+    module_name, _, qualname = path.decode().partition(":")
+    target: Any = importlib.import_module(module_name)
+    for attr in qualname.split("."):
+        target = getattr(target, attr)
+    if not (isinstance(target, type) and issubclass(target, BaseModel)):
+        raise CacheError(f"Cached payload references non-model type {qualname}")
+    return target
+
+
+@lru_cache(maxsize=256)
+def _list_adapter(model_class: Type[BaseModel]) -> TypeAdapter:
+    """Get a cached TypeAdapter for a list of models."""
+    return TypeAdapter(List[model_class])
+
+
+def _split_model_payload(data: bytes) -> Tuple[Type[BaseModel], bytes]:
+    """Split a model payload into its class and JSON body."""
+    path_length = data[0]
+    return _resolve_model(bytes(data[1:1 + path_length])), data[1 + path_length:]
+
+
+def _join_model_payload(model_class: Type[BaseModel], body: bytes) -> bytes:
+    """Prefix a JSON body with the length-prefixed model import path."""
+    path = _model_path(model_class)
+    if len(path) > 255:
+        raise TypeError("Model import path too long for cache header")
+    return bytes((len(path),)) + path + body
+
+
+class Serializer:
+    """Base class for value serializers."""
+
+    serializer_id: int
+    name: str
+
+    def can_encode(self, value: Any) -> bool:
+        raise NotImplementedError
+
+    def encode(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class BytesSerializer(Serializer):
+    """Raw bytes, stored verbatim (e.g. encoded HTTP response bodies)."""
+
+    serializer_id = SERIALIZER_BYTES
+    name = "bytes"
+
+    def can_encode(self, value: Any) -> bool:
+        return isinstance(value, (bytes, bytearray, memoryview))
+
+    def encode(self, value: Any) -> bytes:
+        return bytes(value)
+
+    def decode(self, data: bytes) -> Any:
+        return bytes(data)
+
+
+class StrSerializer(Serializer):
+    """Text stored as UTF-8 without any JSON quoting."""
+
+    serializer_id = SERIALIZER_STR
+    name = "str"
+
+    def can_encode(self, value: Any) -> bool:
+        return isinstance(value, str)
+
+    def encode(self, value: Any) -> bytes:
+        return value.encode("utf-8")
+
+    def decode(self, data: bytes) -> Any:
+        return bytes(data).decode("utf-8")
+
+
+class JSONSerializer(Serializer):
+    """JSON for plain data, using orjson when it is installed."""
+
+    serializer_id = SERIALIZER_JSON
+    name = "orjson" if ORJSON_AVAILABLE else "json"
+
+    def can_encode(self, value: Any) -> bool:
+        return isinstance(value, PLAIN_TYPES)
+
+    def encode(self, value: Any) -> bytes:
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(value, default=str, separators=(",", ":")).encode("utf-8")
+
+    def decode(self, data: bytes) -> Any:
+        if ORJSON_AVAILABLE:
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+class MsgpackSerializer(Serializer):
+    """MessagePack for plain data."""
+
+    serializer_id = SERIALIZER_MSGPACK
+    name = "msgpack"
+
+    def can_encode(self, value: Any) -> bool:
+        return isinstance(value, PLAIN_TYPES)
+
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=str, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+class PydanticSerializer(Serializer):
+    """Pydantic models, serialized by pydantic-core and revalidated on read."""
+
+    serializer_id = SERIALIZER_PYDANTIC
+    name = "pydantic"
+
+    def can_encode(self, value: Any) -> bool:
+        return isinstance(value, BaseModel)
+
+    def encode(self, value: Any) -> bytes:
+        return _join_model_payload(type(value), value.model_dump_json().encode("utf-8"))
+
+    def decode(self, data: bytes) -> Any:
+        model_class, body = _split_model_payload(data)
+        return model_class.model_validate_json(body)
+
+
+class PydanticListSerializer(Serializer):
+    """Homogeneous non-empty lists of Pydantic models (typical list responses)."""
+
+    serializer_id = SERIALIZER_PYDANTIC_LIST
+    name = "pydantic_list"
+
+    def can_encode(self, value: Any) -> bool:
+        if not isinstance(value, list) or not value or not isinstance(value[0], BaseModel):
+            return False
+        model_class = type(value[0])
+        return all(type(item) is model_class for item in value)
+
+    def encode(self, value: Any) -> bytes:
+        model_class = type(value[0])
+        return _join_model_payload(model_class, _list_adapter(model_class).dump_json(value))
+
+    def decode(self, data: bytes) -> Any:
+        model_class, body = _split_model_payload(data)
+        return _list_adapter(model_class).validate_json(body)
+
+
+class PickleSerializer(Serializer):
+    """Fallback for arbitrary Python objects."""
+
+    serializer_id = SERIALIZER_PICKLE
+    name = "pickle"
+
+    def can_encode(self, value: Any) -> bool:
+        return True
+
+    def encode(self, value: Any) -> bytes:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def decode(self, data: bytes) -> Any:
+        return pickle.loads(data)
+
+
+class Compressor:
+    """Base class for payload compressors."""
+
+    compressor_id: int
+    name: str
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def decompress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+
+class ZlibCompressor(Compressor):
+    """Standard library zlib, always available."""
+
+    compressor_id = COMPRESSOR_ZLIB
+    name = "zlib"
+
+    def __init__(self, level: int = 1):
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class ZstdCompressor(Compressor):
+    """Zstandard, the best ratio/speed trade-off when installed."""
+
+    compressor_id = COMPRESSOR_ZSTD
+    name = "zstd"
+
+    def __init__(self, level: int = 3):
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+
+class LZ4Compressor(Compressor):
+    """LZ4 frames, the fastest option when installed."""
+
+    compressor_id = COMPRESSOR_LZ4
+    name = "lz4"
+
+    def compress(self, data: bytes) -> bytes:
+        return lz4_frame.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return lz4_frame.decompress(data)
+
+
+def available_compressors() -> Dict[str, Type[Compressor]]:
+    """Get the compressors that can be used in this environment."""
+    compressors: Dict[str, Type[Compressor]] = {"zlib": ZlibCompressor}
+    if ZSTD_AVAILABLE:
+        compressors["zstd"] = ZstdCompressor
+    if LZ4_AVAILABLE:
+        compressors["lz4"] = LZ4Compressor
+    return compressors
+
+
+class CacheCodec:
+    """
+    Pluggable payload codec with a versioned header byte.
+
+    Serializers are tried in registration order; the first whose
+    ``can_encode`` accepts the value is used, with pickle as the fallback.
+    Decoding dispatches on the header byte, so any registered serializer or
+    compressor can be read back regardless of the current write preferences.
+    Asking for a serializer or compressor whose library is not installed is
+    a configuration error rather than a silent downgrade.
+    """
+
+    def __init__(
+        self,
+        plain_serializer: str = "auto",
+        compression: str = "auto",
+        compression_threshold: int = 0
+    ):
+        if plain_serializer not in ("auto", "orjson", "msgpack"):
+            raise ConfigurationException(f"Unknown cache serializer '{plain_serializer}'")
+        if plain_serializer == "orjson" and not ORJSON_AVAILABLE:
+            raise ConfigurationException("orjson cache serializer requires the orjson package")
+        if plain_serializer == "msgpack" and not MSGPACK_AVAILABLE:
+            raise ConfigurationException("msgpack cache serializer requires the msgpack package")
+
+        plain: Serializer
+        if plain_serializer == "msgpack" or (plain_serializer == "auto" and MSGPACK_AVAILABLE and not ORJSON_AVAILABLE):
+            plain = MsgpackSerializer()
+        else:
+            plain = JSONSerializer()
+
+        self._serializers: List[Serializer] = []
+        self._decoders: Dict[int, Serializer] = {}
+        for serializer in (
+            BytesSerializer(),
+            StrSerializer(),
+            PydanticSerializer(),
+            PydanticListSerializer(),
+            plain,
+        ):
+            self.register_serializer(serializer)
+        self._fallback = PickleSerializer()
+        self._decoders[self._fallback.serializer_id] = self._fallback
+        # Payloads written with the other plain-data serializer stay readable
+        for serializer in (JSONSerializer(), MsgpackSerializer() if MSGPACK_AVAILABLE else None):
+            if serializer is not None:
+                self._decoders.setdefault(serializer.serializer_id, serializer)
+
+        self._decompressors: Dict[int, Compressor] = {
+            compressor.compressor_id: compressor()
+            for compressor in available_compressors().values()
+        }
+        self.compressor: Optional[Compressor] = None
+        self.compression_threshold = compression_threshold
+        if compression_threshold > 0 and compression != "none":
+            compressors = available_compressors()
+            if compression == "auto":
+                compression = next(name for name in ("zstd", "lz4", "zlib") if name in compressors)
+            if compression not in compressors:
+                raise ConfigurationException(f"Cache compression '{compression}' is not available")
+            self.compressor = self._decompressors[compressors[compression].compressor_id]
+
+    def register_serializer(self, serializer: Serializer, first: bool = False):
+        """Register a serializer for encoding and decoding."""
+        if first:
+            self._serializers.insert(0, serializer)
+        else:
+            self._serializers.append(serializer)
+        self._decoders[serializer.serializer_id] = serializer
+
+    def encode(self, value: Any) -> bytes:
+        """Encode a value into a headered payload."""
+        for serializer in (*self._serializers, self._fallback):
+            if not serializer.can_encode(value):
+                continue
+            try:
+                body = serializer.encode(value)
+            except (TypeError, ValueError, OverflowError):
+                # e.g. integers beyond 64 bits for orjson/msgpack
+                continue
+            compressor_id = COMPRESSOR_NONE
+            if self.compressor is not None and len(body) >= self.compression_threshold:
+                compressed = self.compressor.compress(body)
+                if len(compressed) < len(body):
+                    body = compressed
+                    compressor_id = self.compressor.compressor_id
+            header = _HEADER_BASE | (compressor_id << 3) | serializer.serializer_id
+            return bytes((header,)) + body
+        raise CacheError(f"No cache serializer for value of type {type(value).__name__}")
+
+    def decode(self, payload: Any) -> Any:
+        """Decode a payload produced by encode (or by the legacy scheme)."""
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        if not payload or (payload[0] & _HEADER_MASK) != _HEADER_BASE:
+            return self._decode_legacy(payload)
+
+        header = payload[0]
+        serializer = self._decoders.get(header & 0x07)
+        if serializer is None:
+            raise CacheError(f"Unknown cache serializer id {header & 0x07}")
+        body = memoryview(payload)[1:]
+        compressor_id = (header >> 3) & 0x03
+        if compressor_id != COMPRESSOR_NONE:
+            decompressor = self._decompressors.get(compressor_id)
+            if decompressor is None:
+                raise CacheError(f"Cache payload compressed with unavailable compressor id {compressor_id}")
+            body = decompressor.decompress(bytes(body))
+        return serializer.decode(bytes(body))
+
+    @staticmethod
+    def _decode_legacy(payload: bytes) -> Any:
+        """Decode payloads written by the previous JSON-or-pickle scheme."""
+        text = payload.decode("utf-8")
+        try:
+            return json.loads(text)
+        except (json.JSONDecodeError, TypeError):
+            return pickle.loads(text.encode("latin-1"))
+
+    def describe(self) -> Dict[str, Any]:
+        """Describe the active configuration (for statistics endpoints)."""
+        return {
+            "version": CODEC_VERSION,
+            "serializers": [serializer.name for serializer in (*self._serializers, self._fallback)],
+            "compression": self.compressor.name if self.compressor else None,
+            "compression_threshold": self.compression_threshold,
+        }
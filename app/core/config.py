@@ -1,4 +1,4 @@
-from typing import List, Optional, Any
+from typing import Dict, List, Optional, Any
 from pydantic import AnyHttpUrl, field_validator, PostgresDsn, computed_field
 from pydantic_core import MultiHostUrl
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -65,6 +65,18 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     PASSWORD_MIN_LENGTH: int = 8
+    JWT_BACKEND: str = "auto"  # "pyjwt", "jose", or "auto" (PyJWT when installed)
+    AUTH_CACHE_SIZE: int = 10000  # verified tokens / user snapshots kept per process; 0 disables
+
+    # Password Hashing Settings
+    PASSWORD_HASH_SCHEME: str = "bcrypt"  # "bcrypt" or "argon2id" (needs argon2-cffi); older hashes are upgraded on login
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # "thread" or "process"
+    PASSWORD_HASH_WORKERS: int = 4  # concurrent hashes per API process
+    PASSWORD_HASH_MAX_QUEUE: int = 32  # waiting hashes beyond the workers before returning 503
     
     # CORS Settings
     BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = []
@@ -77,6 +89,68 @@ class Settings(BaseSettings):
     REDIS_MAX_CONNECTIONS: int = 10
     REDIS_TIMEOUT: int = 5
     CACHE_TTL: int = 300  # 5 minutes default
+    CACHE_LOCAL_ENABLED: bool = True  # In-process L1 tier in front of Redis
+    CACHE_LOCAL_MAX_ENTRIES: int = 2048
+    CACHE_LOCAL_TTL: int = 10  # Upper bound on L1 staleness across workers (seconds)
+    CACHE_EARLY_REFRESH_BETA: float = 1.0  # 0 disables probabilistic early refresh
+    CACHE_SERIALIZER: str = "auto"  # auto, orjson, msgpack
+    CACHE_COMPRESSION: str = "auto"  # auto, zstd, lz4, zlib, none
+    CACHE_COMPRESSION_THRESHOLD: int = 8192  # bytes; 0 disables compression
+    # Path prefixes whose GET responses may be cached for anonymous callers
+    HTTP_CACHE_PUBLIC_PATHS: List[str] = [
+        "/api/v1/brands",
+        "/api/v1/categories",
+        "/api/v1/locations",
+    ]
+    # Path prefixes whose GET responses may be cached for authenticated callers,
+    # shared between callers with the same role and permission set
+    HTTP_CACHE_SHARED_PATHS: List[str] = [
+        "/api/v1/inventory/items",
+        "/api/v1/brands",
+        "/api/v1/categories",
+        "/api/v1/locations",
+    ]
+    # Cached API modules that read data written through another module: a
+    # successful write under the key also invalidates the listed modules
+    HTTP_CACHE_RELATED_MODULES: Dict[str, List[str]] = {
+        "/api/v1/inventory": ["/api/v1/categories"],
+        "/api/v1/transactions": ["/api/v1/inventory"],
+        "/api/v1/rentals": ["/api/v1/inventory"],
+    }
+    
+    # Process-local database snapshots (app.core.snapshot_cache). Each TTL, in
+    # seconds, bounds how long other workers may serve data older than a write.
+    AUTH_USER_SNAPSHOT_TTL: int = 30  # users' is_active flags
+    CATEGORY_INDEX_TTL: int = 60  # category tree
+    RENTAL_AVAILABILITY_TTL: int = 60  # booking calendars
+    RENTAL_AVAILABILITY_MAX_ITEMS: int = 5000  # item schedules kept per process; 0 disables
+    
+    # Rate Limiting Settings
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_ALGORITHM: str = "gcra"  # gcra (token bucket) or sliding_window
+    RATE_LIMIT_PER_MINUTE: int = 100  # Authenticated callers without a tier entry
+    # Limits per tier: "anonymous" or the token role
+    RATE_LIMIT_TIERS: Dict[str, str] = {
+        "anonymous": "100/minute",
+        "READONLY": "100/minute",
+        "CUSTOMER": "120/minute",
+        "EMPLOYEE": "300/minute",
+        "MANAGER": "300/minute",
+        "ADMIN": "600/minute",
+    }
+    # Limits per path prefix, counted in their own bucket per caller
+    RATE_LIMIT_ROUTES: Dict[str, str] = {
+        "/api/v1/auth/login": "10/minute",
+        "/api/v1/auth/register": "5/minute",
+        "/api/v1/auth/password-reset": "5/minute",
+    }
+    
+    # Request Metrics Settings
+    METRICS_FLUSH_INTERVAL: float = 10.0  # seconds between pipelined flushes to Redis
+    METRICS_SLOW_REQUEST_THRESHOLD: float = 1.0  # seconds
+    METRICS_MAX_SLOW_REQUESTS: int = 100
+    METRICS_LATENCY_WINDOW: float = 300.0  # seconds covered by each latency histogram
+    METRICS_LATENCY_WINDOWS: int = 3  # most recent windows merged into reported percentiles
     
     # Email Settings (for notifications)
     SMTP_TLS: bool = True
@@ -111,6 +185,31 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     
+    # Report Generation Settings
+    REPORTS_DIR: str = "reports"
+    REPORT_BATCH_SIZE: int = 5000  # rows fetched from the server-side cursor per batch
+    REPORT_PROGRESS_INTERVAL: float = 2.0  # seconds between progress updates on the report
+    REPORT_WORKER_CONCURRENCY: int = 2  # reports generated at once per worker process
+    REPORT_WORKER_IN_PROCESS: bool = False  # also run a worker inside the API process
+    REPORT_WORKER_POLL_INTERVAL: float = 2.0  # seconds between queue polls when idle
+    REPORT_JOB_LEASE_SECONDS: int = 120  # renewed by heartbeats; expired leases are reclaimed
+    REPORT_JOB_MAX_ATTEMPTS: int = 3
+    REPORT_JOB_RETRY_BACKOFF: float = 30.0  # seconds before the first retry, doubled per attempt
+    # Cluster-wide cap on reports of one type generating at the same time
+    REPORT_TYPE_CONCURRENCY: Dict[str, int] = {
+        "FINANCIAL": 1,
+        "SALES": 2,
+    }
+    
+    # Dashboard Rollup Settings
+    ROLLUPS_ENABLED: bool = True  # maintain the rollup_* tables on every ORM flush
+    
+    # Response Compression Settings
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # bytes
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # Low qualities keep brotli fast enough for dynamic responses
+    
     # Performance Settings
     QUERY_TIMEOUT: int = 30  # seconds
     REQUEST_TIMEOUT: int = 60  # seconds
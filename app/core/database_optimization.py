@@ -451,6 +451,9 @@ class BatchOperationManager:
     
     async def batch_update(self, session: AsyncSession, model_class, updates: List[Dict]):
         """Perform batch update operations."""
+        from app.modules.analytics.rollups import check_bulk_write
+        
+        check_bulk_write(model_class.__table__)
         
         for i in range(0, len(updates), self.batch_size):
             batch = updates[i:i + self.batch_size]
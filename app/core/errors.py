@@ -259,6 +259,18 @@ class ExternalServiceException(AppException):
         )
 
 
+class ServiceOverloadedException(AppException):
+    """Exception raised when a bounded worker pool has no room for more work."""
+
+    def __init__(self, resource: str, retry_after: int = 1):
+        super().__init__(
+            message=f"Too many concurrent {resource} requests, retry shortly",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            error_code="SERVICE_OVERLOADED",
+            details={"resource": resource, "retry_after": retry_after}
+        )
+
+
 class ConfigurationException(AppException):
     """Exception raised for configuration errors."""
     
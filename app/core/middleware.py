@@ -6,30 +6,95 @@ This module provides middleware for caching, performance monitoring, and request
 
 import time
 import uuid
-from typing import Callable, Dict, Any, Optional, List
+from typing import Callable, Dict, Any, Optional, List, Tuple
 from contextlib import asynccontextmanager
 import json
 import hashlib
+import math
+import zlib
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+    brotli = None
 
 from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core.config import settings
 from app.core.cache import cache_manager, CacheConfig
+from app.core.request_metrics import (
+    LatencyHistogram,
+    MetricsAggregator,
+    request_metrics,
+    summarize_counters,
+    summarize_routes,
+)
+from app.core.rate_limit import RateLimiter, RateLimitPolicy, RateLimitResult, rate_limiter
+from app.core.security import decode_access_token
 
 
-class CacheMiddleware(BaseHTTPMiddleware):
-    """HTTP caching middleware for GET requests."""
-    
-    def __init__(self, app: ASGIApp, cache_ttl: int = CacheConfig.DEFAULT_TTL):
-        super().__init__(app)
+class CacheMiddleware:
+    """
+    HTTP caching middleware for GET requests (pure ASGI).
+    
+    Captures the encoded response body once and stores it verbatim with its
+    headers, so hits replay the original bytes without any JSON round trip.
+    Responses carry a strong ETag and conditional requests (If-None-Match)
+    are answered with 304 Not Modified.
+    
+    Anonymous requests are cached per URL, only under ``public_path_prefixes``.
+    Authenticated requests are cached only under ``shared_path_prefixes`` and
+    are keyed by the caller's role and permission set, so callers with
+    identical permissions share entries. Successful writes (POST/PUT/PATCH/
+    DELETE) invalidate the cached responses of the whole API module they
+    belong to via cache tags, since a write to a nested resource can change
+    its parent's listings, along with the modules ``related_modules`` lists
+    as reading what that module writes.
+    
+    Per-request headers (request ID, timing, rate limit state) are not
+    stored; a hit carries the current request's ID instead.
+    
+    Bodies larger than ``max_body_size`` are streamed through untouched.
+    """
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        cache_ttl: int = CacheConfig.DEFAULT_TTL,
+        max_body_size: int = 1024 * 1024,
+        public_path_prefixes: Optional[List[str]] = None,
+        shared_path_prefixes: Optional[List[str]] = None,
+        related_modules: Optional[Dict[str, List[str]]] = None
+    ):
+        self.app = app
         self.cache_ttl = cache_ttl
+        self.max_body_size = max_body_size
         self.cacheable_methods = {"GET"}
-        self.cache_headers = {
-            "Cache-Control": f"public, max-age={cache_ttl}",
-            "X-Cache": "HIT"
+        self.invalidating_methods = {"POST", "PUT", "PATCH", "DELETE"}
+        self.public_path_prefixes = tuple(
+            public_path_prefixes if public_path_prefixes is not None
+            else settings.HTTP_CACHE_PUBLIC_PATHS
+        )
+        self.shared_path_prefixes = tuple(
+            shared_path_prefixes if shared_path_prefixes is not None
+            else settings.HTTP_CACHE_SHARED_PATHS
+        )
+        self.related_modules = (
+            related_modules if related_modules is not None
+            else settings.HTTP_CACHE_RELATED_MODULES
+        )
+        self.skip_paths = ["/health", "/metrics", "/docs", "/openapi.json", "/redoc"]
+        self.skip_params = ["nocache", "timestamp", "random"]
+        # Per-request headers that must not be replayed from the cache
+        self.excluded_headers = {
+            "date", "set-cookie", "x-cache", "x-cache-key", "x-request-id", "x-response-time",
+            "x-ratelimit-limit", "x-ratelimit-remaining", "x-ratelimit-reset", "retry-after", "server-timing"
         }
     
     def _should_cache_request(self, request: Request) -> bool:
@@ -38,220 +103,504 @@ class CacheMiddleware(BaseHTTPMiddleware):
         if request.method not in self.cacheable_methods:
             return False
         
-        # Skip caching for authenticated requests with sensitive data
-        if "authorization" in request.headers:
-            return False
-        
         # Skip caching for certain paths
-        skip_paths = ["/health", "/metrics", "/docs", "/openapi.json", "/redoc"]
-        if any(request.url.path.startswith(path) for path in skip_paths):
+        if any(request.url.path.startswith(path) for path in self.skip_paths):
             return False
         
         # Skip caching if query parameters indicate dynamic content
-        skip_params = ["nocache", "timestamp", "random"]
-        if any(param in request.query_params for param in skip_params):
+        if any(param in request.query_params for param in self.skip_params):
             return False
         
         return True
     
-    def _generate_cache_key(self, request: Request) -> str:
+    def _get_cache_scope(self, request: Request) -> Optional[str]:
+        """
+        Get the sharing scope for a request, or None if it must not be cached.
+        
+        Authenticated requests are scoped by a digest of the verified token's
+        role and permissions.
+        """
+        authorization = request.headers.get("authorization")
+        if not authorization:
+            return "public" if request.url.path.startswith(self.public_path_prefixes) else None
+        
+        if not request.url.path.startswith(self.shared_path_prefixes):
+            return None
+        
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        
+        try:
+            token_data = decode_access_token(token)
+        except Exception:
+            # Let the route reject the request
+            return None
+        
+        permissions = ",".join(sorted(set(token_data.permissions)))
+        digest = hashlib.sha256(f"{token_data.role}|{permissions}".encode()).hexdigest()
+        return f"perms:{digest[:32]}"
+    
+    def _generate_cache_key(self, request: Request, cache_scope: str) -> str:
         """Generate cache key for request."""
-        # Include method, path, and query parameters
+        # Include method, path, query parameters, sharing scope, origin (CORS
+        # headers in the stored response depend on it) and the negotiated
+        # content coding, so each compressed variant is stored separately
         key_parts = [
             request.method,
             request.url.path,
-            str(sorted(request.query_params.items()))
+            str(sorted(request.query_params.items())),
+            cache_scope,
+            request.headers.get("origin", ""),
+            negotiate_encoding(request.headers.get("accept-encoding", ""))
         ]
         
-        # Add user context if available (for user-specific caching)
-        user_id = getattr(request.state, 'user_id', None)
-        if user_id:
-            key_parts.append(f"user:{user_id}")
-        
         key_string = "|".join(key_parts)
         return f"http_cache:{hashlib.md5(key_string.encode()).hexdigest()}"
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        """Process request with caching logic."""
-        if not cache_manager.connected or not self._should_cache_request(request):
-            return await call_next(request)
-        
-        cache_key = self._generate_cache_key(request)
-        
-        # Try to get cached response
-        cached_response = await cache_manager.get(cache_key)
-        if cached_response:
-            # Return cached response
-            response = JSONResponse(
-                content=cached_response["content"],
-                status_code=cached_response["status_code"],
-                headers=cached_response["headers"]
+    @staticmethod
+    def _resource_tag(path: str) -> str:
+        """Get the invalidation tag for the API module a path belongs to."""
+        # e.g. /api/v1/inventory/items/123/units -> http:/api/v1/inventory
+        prefix = settings.API_V1_STR.rstrip("/")
+        if path.startswith(prefix + "/"):
+            return f"http:{prefix}/{path[len(prefix) + 1:].split('/', 1)[0]}"
+        return "http:/" + path.lstrip("/").split("/", 1)[0]
+    
+    def _invalidated_tags(self, path: str) -> List[str]:
+        """Get the tags a successful write to path invalidates."""
+        tag = self._resource_tag(path)
+        return [tag] + [f"http:{module}" for module in self.related_modules.get(tag[len("http:"):], ())]
+    
+    @staticmethod
+    def _compute_etag(body: bytes) -> str:
+        """Compute a strong ETag for a response body."""
+        return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    
+    @staticmethod
+    def _etag_matches(request: Request, etag: str) -> bool:
+        """Check an If-None-Match header against an ETag (weak comparison)."""
+        if_none_match = request.headers.get("if-none-match")
+        if not if_none_match:
+            return False
+        candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+        return "*" in candidates or etag in (
+            candidate[2:] if candidate.startswith("W/") else candidate
+            for candidate in candidates
+        )
+    
+    @staticmethod
+    def _pack_response(status_code: int, headers: List[List[str]], body: bytes) -> bytes:
+        """Pack a response into a single binary cache payload."""
+        meta = json.dumps({"status_code": status_code, "headers": headers}).encode()
+        return len(meta).to_bytes(4, "big") + meta + body
+    
+    @staticmethod
+    def _unpack_response(payload: bytes) -> tuple:
+        """Unpack a payload produced by _pack_response."""
+        meta_length = int.from_bytes(payload[:4], "big")
+        meta = json.loads(payload[4:4 + meta_length])
+        return meta["status_code"], meta["headers"], payload[4 + meta_length:]
+    
+    def _apply_cache_headers(self, headers: MutableHeaders, cache_scope: str, cache_status: str, cache_key: str):
+        """Add cache validation and diagnostics headers."""
+        if "cache-control" not in headers:
+            headers["Cache-Control"] = (
+                f"public, max-age={self.cache_ttl}" if cache_scope == "public"
+                else "private, no-cache"
             )
-            response.headers.update(self.cache_headers)
-            response.headers["X-Cache-Key"] = cache_key
-            return response
-        
-        # Process request
-        response = await call_next(request)
-        
-        # Cache successful responses
-        if response.status_code == 200 and hasattr(response, 'body'):
-            try:
-                # Extract response data
-                response_data = {
-                    "content": json.loads(response.body.decode()),
-                    "status_code": response.status_code,
-                    "headers": dict(response.headers)
-                }
-                
-                # Cache the response
-                await cache_manager.set(cache_key, response_data, self.cache_ttl)
-                
-                # Add cache headers
-                response.headers["X-Cache"] = "MISS"
-                response.headers["X-Cache-Key"] = cache_key
-                
-            except (json.JSONDecodeError, UnicodeDecodeError):
-                # Skip caching if response is not JSON
-                pass
-        
-        return response
+        headers.add_vary_header("Authorization")
+        headers["X-Cache"] = cache_status
+        headers["X-Cache-Key"] = cache_key
+    
+    async def _send_not_modified(self, send: Send, headers: MutableHeaders):
+        """Send a bodiless 304 response with the validator headers."""
+        not_modified = MutableHeaders()
+        for name in ("etag", "cache-control", "vary", "x-cache", "x-cache-key"):
+            if name in headers:
+                not_modified[name] = headers[name]
+        await send({"type": "http.response.start", "status": 304, "headers": not_modified.raw})
+        await send({"type": "http.response.body", "body": b""})
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """Process request with caching logic."""
+        if scope["type"] != "http" or not cache_manager.connected:
+            await self.app(scope, receive, send)
+            return
+        
+        request = Request(scope)
+        if request.method in self.invalidating_methods:
+            await self._call_and_invalidate(request, scope, receive, send)
+            return
+        
+        cache_scope = self._get_cache_scope(request) if self._should_cache_request(request) else None
+        if cache_scope is None:
+            await self.app(scope, receive, send)
+            return
+        
+        cache_key = self._generate_cache_key(request, cache_scope)
+        
+        # Try to replay a cached response
+        cached = await cache_manager.get(cache_key)
+        if isinstance(cached, bytes):
+            status_code, raw_headers, body = self._unpack_response(cached)
+            headers = MutableHeaders(raw=[(k.encode("latin-1"), v.encode("latin-1")) for k, v in raw_headers])
+            request_id = scope.get("state", {}).get("request_id")
+            if request_id:
+                headers["X-Request-ID"] = request_id
+            self._apply_cache_headers(headers, cache_scope, "HIT", cache_key)
+            if self._etag_matches(request, headers.get("etag", "")):
+                await self._send_not_modified(send, headers)
+                return
+            await send({"type": "http.response.start", "status": status_code, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": body})
+            return
+        
+        await self._call_and_store(request, scope, receive, send, cache_scope, cache_key)
+    
+    async def _call_and_store(
+        self,
+        request: Request,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        cache_scope: str,
+        cache_key: str
+    ):
+        """Run the app, buffering a cacheable response and storing it on completion."""
+        start_message: Optional[Message] = None
+        chunks: List[bytes] = []
+        buffered_size = 0
+        passthrough = False
+        to_store: Optional[bytes] = None
+        
+        async def send_wrapper(message: Message):
+            nonlocal start_message, buffered_size, passthrough, to_store
+            if passthrough:
+                await send(message)
+                return
+            
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                cache_control = headers.get("cache-control", "")
+                if (
+                    message["status"] != 200
+                    or "set-cookie" in headers
+                    or "no-store" in cache_control
+                    or (cache_scope == "public" and "private" in cache_control)
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+            
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            
+            chunks.append(message.get("body", b""))
+            buffered_size += len(chunks[-1])
+            if message.get("more_body", False):
+                if buffered_size > self.max_body_size:
+                    # Too large to cache: flush what we have and stream the rest
+                    passthrough = True
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": True})
+                return
+            
+            body = b"".join(chunks)
+            headers = MutableHeaders(raw=list(start_message["headers"]))
+            headers["ETag"] = self._compute_etag(body)
+            if buffered_size <= self.max_body_size:
+                to_store = self._pack_response(
+                    start_message["status"],
+                    [
+                        [key.decode("latin-1"), value.decode("latin-1")]
+                        for key, value in headers.raw
+                        if key.decode("latin-1").lower() not in self.excluded_headers
+                    ],
+                    body
+                )
+            self._apply_cache_headers(headers, cache_scope, "MISS", cache_key)
+            if self._etag_matches(request, headers["etag"]):
+                await self._send_not_modified(send, headers)
+                return
+            await send({"type": "http.response.start", "status": start_message["status"], "headers": headers.raw})
+            await send({"type": "http.response.body", "body": body})
+        
+        await self.app(scope, receive, send_wrapper)
+        
+        if to_store is not None:
+            await cache_manager.set(cache_key, to_store, self.cache_ttl, tags=[self._resource_tag(request.url.path)])
+    
+    async def _call_and_invalidate(self, request: Request, scope: Scope, receive: Receive, send: Send):
+        """Run a write request and invalidate cached responses of its resource on success."""
+        status_code = None
+        
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        await self.app(scope, receive, send_wrapper)
+        
+        if status_code is not None and status_code < 400:
+            await cache_manager.invalidate_tags(*self._invalidated_tags(request.url.path))
 
 
-class PerformanceMonitoringMiddleware(BaseHTTPMiddleware):
-    """Middleware for performance monitoring and request tracking."""
-    
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
-        self.slow_request_threshold = 1.0  # seconds
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+class PerformanceMonitoringMiddleware:
+    """
+    Middleware for performance monitoring and request tracking (pure ASGI).
+    
+    Metrics are recorded in the in-process aggregator (app.core.request_metrics)
+    and flushed to Redis in the background, so no I/O happens on the response
+    path.
+    """
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        slow_request_threshold: float = 1.0,
+        aggregator: Optional[MetricsAggregator] = None
+    ):
+        self.app = app
+        self.slow_request_threshold = slow_request_threshold  # seconds
+        self.aggregator = aggregator or request_metrics
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """Monitor request performance."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
         # Generate request ID
         request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
         
         # Track request start time
-        start_time = time.time()
-        
-        # Add request ID to logs context
-        request.state.start_time = start_time
-        
-        # Process request
-        response = await call_next(request)
-        
-        # Calculate request duration
-        duration = time.time() - start_time
-        
-        # Add performance headers
-        response.headers["X-Request-ID"] = request_id
-        response.headers["X-Response-Time"] = f"{duration:.3f}s"
-        
-        # Log slow requests
-        if duration > self.slow_request_threshold:
-            await self._log_slow_request(request, response, duration)
-        
-        # Update metrics
-        await self._update_metrics(request, response, duration)
-        
-        return response
-    
-    async def _log_slow_request(self, request: Request, response: Response, duration: float):
+        start_time = time.perf_counter()
+        
+        # Expose request ID and start time as request.state attributes
+        state = scope.setdefault("state", {})
+        state["request_id"] = request_id
+        state["start_time"] = time.time()
+        
+        status_code = 500
+        
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Add performance headers
+                headers = MutableHeaders(raw=list(message["headers"]))
+                headers["X-Request-ID"] = request_id
+                headers["X-Response-Time"] = f"{time.perf_counter() - start_time:.3f}s"
+                message = {**message, "headers": headers.raw}
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Calculate request duration, including the streamed body
+            duration = time.perf_counter() - start_time
+            route = self._route_template(scope)
+            self.aggregator.record(scope["method"], route, status_code, duration)
+            
+            # Log slow requests
+            if duration > self.slow_request_threshold:
+                self._log_slow_request(scope, request_id, route, status_code, duration)
+    
+    def _route_template(self, scope: Scope) -> str:
+        """Get the matched route template, keeping metric cardinality bounded."""
+        route = scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+    
+    def _log_slow_request(self, scope: Scope, request_id: str, route: str, status_code: int, duration: float):
         """Log slow request for analysis."""
-        slow_request_data = {
-            "request_id": request.state.request_id,
+        request = Request(scope)
+        self.aggregator.record_slow_request({
+            "request_id": request_id,
             "method": request.method,
             "url": str(request.url),
-            "status_code": response.status_code,
+            "route": route,
+            "status_code": status_code,
             "duration": duration,
             "user_agent": request.headers.get("user-agent"),
             "timestamp": time.time()
-        }
-        
-        # Store in cache for monitoring dashboard
-        cache_key = f"slow_requests:{request.state.request_id}"
-        await cache_manager.set(cache_key, slow_request_data, CacheConfig.DAILY_TTL)
-    
-    async def _update_metrics(self, request: Request, response: Response, duration: float):
-        """Update performance metrics."""
-        # Increment request counters
-        await cache_manager.increment("metrics:requests:total", 1)
-        await cache_manager.increment(f"metrics:requests:status:{response.status_code}", 1)
-        await cache_manager.increment(f"metrics:requests:method:{request.method}", 1)
-        
-        # Track response times
-        response_time_key = f"metrics:response_times:{int(time.time() // 60)}"  # Per minute
-        await cache_manager.set(response_time_key, duration, CacheConfig.LONG_TTL)
+        })
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Rate limiting middleware."""
-    
-    def __init__(self, app: ASGIApp, requests_per_minute: int = 100):
-        super().__init__(app)
-        self.requests_per_minute = requests_per_minute
-        self.rate_limit_window = 60  # seconds
-    
-    def _get_client_identifier(self, request: Request) -> str:
-        """Get client identifier for rate limiting."""
-        # Try to get user ID from request state
-        user_id = getattr(request.state, 'user_id', None)
-        if user_id:
-            return f"user:{user_id}"
+class RateLimitMiddleware:
+    """
+    Rate limiting middleware (pure ASGI).
+    
+    Each request costs one atomic Redis script call (see app.core.rate_limit);
+    limits come from the route and the caller's tier, and an in-memory token
+    bucket takes over when Redis is unavailable.
+    """
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        requests_per_minute: int = 100,
+        tier_limits: Optional[Dict[str, str]] = None,
+        route_limits: Optional[Dict[str, str]] = None,
+        limiter: Optional[RateLimiter] = None
+    ):
+        self.app = app
+        self.policy = RateLimitPolicy(f"{requests_per_minute}/minute", tier_limits, route_limits)
+        self.limiter = limiter or rate_limiter
+    
+    def _get_client_identity(self, request: Request) -> Tuple[str, str]:
+        """Get (client identifier, tier) for rate limiting."""
+        authorization = request.headers.get("authorization", "")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and token:
+            try:
+                token_data = decode_access_token(token)
+                if token_data.user_id:
+                    return f"user:{token_data.user_id}", token_data.role or "authenticated"
+            except Exception:
+                # Unverifiable tokens are limited like anonymous callers
+                pass
         
         # Fall back to IP address
         forwarded_for = request.headers.get("x-forwarded-for")
         if forwarded_for:
-            return f"ip:{forwarded_for.split(',')[0].strip()}"
+            return f"ip:{forwarded_for.split(',')[0].strip()}", "anonymous"
         
         client_host = request.client.host if request.client else "unknown"
-        return f"ip:{client_host}"
+        return f"ip:{client_host}", "anonymous"
+    
+    def _rate_limit_headers(self, result: RateLimitResult) -> Dict[str, str]:
+        """Build X-RateLimit-* headers for a check result."""
+        return {
+            "X-RateLimit-Limit": str(result.limit),
+            "X-RateLimit-Remaining": str(result.remaining),
+            "X-RateLimit-Reset": str(int(time.time() + math.ceil(result.reset_after)))
+        }
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """Apply rate limiting."""
-        client_id = self._get_client_identifier(request)
-        rate_limit_key = f"rate_limit:{client_id}"
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        # Check rate limit
-        current_requests = await cache_manager.increment(
-            rate_limit_key, 1, self.rate_limit_window
-        )
+        request = Request(scope)
+        client_id, tier = self._get_client_identity(request)
+        bucket_key, rule = self.policy.resolve(request.url.path, tier, client_id)
+        result = await self.limiter.hit(bucket_key, rule)
+        rate_limit_headers = self._rate_limit_headers(result)
         
-        if current_requests > self.requests_per_minute:
+        if not result.allowed:
             # Rate limit exceeded
-            return JSONResponse(
+            retry_after = max(1, math.ceil(result.retry_after))
+            response = JSONResponse(
                 status_code=429,
                 content={
                     "error": "Rate limit exceeded",
-                    "message": f"Maximum {self.requests_per_minute} requests per minute allowed",
-                    "retry_after": self.rate_limit_window
+                    "message": f"Maximum {rule.limit} requests per {rule.period} seconds allowed",
+                    "retry_after": retry_after
                 },
-                headers={
-                    "X-RateLimit-Limit": str(self.requests_per_minute),
-                    "X-RateLimit-Remaining": "0",
-                    "X-RateLimit-Reset": str(int(time.time() + self.rate_limit_window)),
-                    "Retry-After": str(self.rate_limit_window)
-                }
+                headers={**rate_limit_headers, "Retry-After": str(retry_after)}
             )
-        
-        # Process request
-        response = await call_next(request)
-        
-        # Add rate limit headers
-        remaining = max(0, self.requests_per_minute - current_requests)
-        response.headers["X-RateLimit-Limit"] = str(self.requests_per_minute)
-        response.headers["X-RateLimit-Remaining"] = str(remaining)
-        response.headers["X-RateLimit-Reset"] = str(int(time.time() + self.rate_limit_window))
-        
-        return response
+            await response(scope, receive, send)
+            return
+        
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=list(message["headers"]))
+                for name, value in rate_limit_headers.items():
+                    headers[name] = value
+                message = {**message, "headers": headers.raw}
+            await send(message)
+        
+        await self.app(scope, receive, send_wrapper)
 
 
-class CompressionMiddleware(BaseHTTPMiddleware):
-    """Response compression middleware."""
-    
-    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
-        super().__init__(app)
+def negotiate_encoding(accept_encoding: str) -> str:
+    """
+    Pick the response content coding for an Accept-Encoding header.
+    
+    Returns "br", "gzip" or "identity", honouring q-values and preferring
+    brotli over gzip on ties.
+    """
+    supported = ["br", "gzip"] if BROTLI_AVAILABLE else ["gzip"]
+    qualities: Dict[str, float] = {}
+    wildcard: Optional[float] = None
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding == "*":
+            wildcard = quality
+        else:
+            qualities[coding] = quality
+    
+    best, best_quality = "identity", 0.0
+    for coding in supported:
+        quality = qualities.get(coding, wildcard if wildcard is not None else 0.0)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class _StreamCompressor:
+    """Incremental gzip/brotli encoder for response bodies."""
+    
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31 writes a gzip container with a zero mtime, so output is deterministic
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+    
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it so the client can start decoding."""
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+    
+    def finish(self, data: bytes = b"") -> bytes:
+        """Compress the final chunk and close the stream."""
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.finish()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """
+    Response compression middleware (pure ASGI, gzip and brotli).
+    
+    Bodies are compressed chunk by chunk as they stream, so whole responses
+    are never buffered; only the first ``minimum_size`` bytes are held to
+    decide whether compression is worthwhile. Single-message responses get an
+    exact Content-Length. Compressible responses always carry
+    ``Vary: Accept-Encoding`` so shared caches (and CacheMiddleware, which
+    keys on the negotiated encoding) keep one entry per variant.
+    """
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4
+    ):
+        self.app = app
         self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
         self.compressible_types = {
             "application/json",
             "application/javascript",
@@ -261,34 +610,110 @@ class CompressionMiddleware(BaseHTTPMiddleware):
             "text/xml"
         }
     
-    def _should_compress(self, request: Request, response: Response) -> bool:
+    def _is_compressible(self, headers: Headers) -> bool:
+        """Check the content type of a response."""
+        content_type = headers.get("content-type", "")
+        return any(ct in content_type for ct in self.compressible_types)
+    
+    def _should_compress(self, status_code: int, headers: Headers) -> bool:
         """Determine if response should be compressed."""
-        # Check if client accepts compression
-        accept_encoding = request.headers.get("accept-encoding", "")
-        if "gzip" not in accept_encoding:
+        if status_code < 200 or status_code in (204, 304):
             return False
-        
-        # Check content type
-        content_type = response.headers.get("content-type", "")
-        if not any(ct in content_type for ct in self.compressible_types):
+        if "content-encoding" in headers:
+            return False
+        if not self._is_compressible(headers):
             return False
         
-        # Check content length
-        content_length = response.headers.get("content-length")
+        # Check content length when the app declared it
+        content_length = headers.get("content-length")
         if content_length and int(content_length) < self.minimum_size:
             return False
         
         return True
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """Apply compression to response."""
-        response = await call_next(request)
-        
-        # Disable compression for now to avoid content encoding issues
-        # In production, you would implement actual gzip compression here
-        # For now, we'll just pass through without compression
-        
-        return response
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start_message: Optional[Message] = None
+        compressor: Optional[_StreamCompressor] = None
+        pending: List[bytes] = []
+        pending_size = 0
+        passthrough = False
+        
+        async def send_compressed_start(body_length: Optional[int] = None):
+            headers = MutableHeaders(raw=list(start_message["headers"]))
+            headers["Content-Encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            del headers["content-length"]
+            if body_length is not None:
+                headers["Content-Length"] = str(body_length)
+            await send({**start_message, "headers": headers.raw})
+        
+        async def send_wrapper(message: Message):
+            nonlocal start_message, compressor, pending_size, passthrough
+            if passthrough:
+                await send(message)
+                return
+            
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if encoding == "identity" or not self._should_compress(message["status"], headers):
+                    passthrough = True
+                    if self._is_compressible(headers) and "content-encoding" not in headers:
+                        mutable = MutableHeaders(raw=list(message["headers"]))
+                        mutable.add_vary_header("Accept-Encoding")
+                        message = {**message, "headers": mutable.raw}
+                    await send(message)
+                    return
+                start_message = message
+                return
+            
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            
+            if compressor is not None:
+                if more_body:
+                    chunk = compressor.compress(body)
+                    if chunk:
+                        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                else:
+                    await send({"type": "http.response.body", "body": compressor.finish(body)})
+                return
+            
+            # Hold data until we know the body is worth compressing
+            pending.append(body)
+            pending_size += len(body)
+            if more_body and pending_size < self.minimum_size:
+                return
+            
+            buffered = b"".join(pending)
+            pending.clear()
+            if not more_body and pending_size < self.minimum_size:
+                headers = MutableHeaders(raw=list(start_message["headers"]))
+                headers.add_vary_header("Accept-Encoding")
+                await send({**start_message, "headers": headers.raw})
+                await send({"type": "http.response.body", "body": buffered})
+                return
+            
+            compressor = _StreamCompressor(encoding, self.gzip_level, self.brotli_quality)
+            if not more_body:
+                compressed = compressor.finish(buffered)
+                await send_compressed_start(len(compressed))
+                await send({"type": "http.response.body", "body": compressed})
+                return
+            
+            await send_compressed_start()
+            await send({"type": "http.response.body", "body": compressor.compress(buffered), "more_body": True})
+        
+        await self.app(scope, receive, send_wrapper)
 
 
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
@@ -358,67 +783,71 @@ def setup_middleware(app):
     # OpenAPI fix middleware to prevent content encoding issues
     app.add_middleware(OpenAPIFixMiddleware)
     
-    # Performance monitoring
-    app.add_middleware(PerformanceMonitoringMiddleware)
+    # Compression (pure ASGI, streaming); inside the HTTP cache so compressed variants are cached
+    if settings.COMPRESSION_ENABLED:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+            gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+            brotli_quality=settings.COMPRESSION_BROTLI_QUALITY
+        )
     
-    # Rate limiting
+    # HTTP caching (pure ASGI, replays stored bytes); inside monitoring and rate limiting
     if settings.REDIS_ENABLED:
-        app.add_middleware(RateLimitMiddleware, requests_per_minute=100)
-    
-    # Compression disabled to avoid content encoding issues
-    # app.add_middleware(CompressionMiddleware)
+        app.add_middleware(CacheMiddleware, cache_ttl=settings.CACHE_TTL)
     
-    # HTTP caching disabled to avoid content encoding issues
-    # if settings.REDIS_ENABLED:
-    #     app.add_middleware(CacheMiddleware, cache_ttl=settings.CACHE_TTL)
+    # Performance monitoring
+    app.add_middleware(
+        PerformanceMonitoringMiddleware,
+        slow_request_threshold=settings.METRICS_SLOW_REQUEST_THRESHOLD
+    )
+    
+    # Rate limiting (falls back to in-process buckets without Redis)
+    if settings.RATE_LIMIT_ENABLED:
+        app.add_middleware(
+            RateLimitMiddleware,
+            requests_per_minute=settings.RATE_LIMIT_PER_MINUTE,
+            tier_limits=settings.RATE_LIMIT_TIERS,
+            route_limits=settings.RATE_LIMIT_ROUTES
+        )
+
 
 
 # Monitoring utilities
 async def get_performance_metrics() -> Dict[str, Any]:
-    """Get performance metrics from cache."""
-    if not cache_manager.connected:
-        return {"status": "cache_disabled"}
-    
-    metrics = {}
-    
-    # Get basic counters
-    metrics["requests_total"] = await cache_manager.get("metrics:requests:total", 0)
-    
-    # Get status code distribution
-    status_codes = {}
-    for code in [200, 201, 400, 401, 403, 404, 422, 500]:
-        count = await cache_manager.get(f"metrics:requests:status:{code}", 0)
-        if count > 0:
-            status_codes[str(code)] = count
-    metrics["status_codes"] = status_codes
-    
-    # Get method distribution
-    methods = {}
-    for method in ["GET", "POST", "PUT", "DELETE", "PATCH"]:
-        count = await cache_manager.get(f"metrics:requests:method:{method}", 0)
-        if count > 0:
-            methods[method] = count
-    metrics["methods"] = methods
+    """
+    Get request metrics with latency percentiles per route template.
+    
+    Reads the cluster-wide aggregate from Redis (lagging by at most one flush
+    interval), or this process's aggregate when Redis is unavailable.
+    Percentiles cover the most recent latency windows only.
+    """
+    cluster = None
+    try:
+        cluster = await request_metrics.read_cluster()
+    except Exception as e:
+        print(f"Metrics read error: {str(e)}")
+    
+    if cluster is None:
+        counters, histograms, source = request_metrics.counters, request_metrics.histograms, "process"
+    else:
+        counters, histograms, source = cluster["counters"], cluster["histograms"], "cluster"
+    
+    metrics = summarize_counters(counters)
+    overall = histograms.get(MetricsAggregator.ALL_ROUTES)
+    metrics["latency"] = overall.summary() if overall else LatencyHistogram().summary()
+    metrics["routes"] = summarize_routes(histograms)
+    metrics["latency_window_seconds"] = request_metrics.window * request_metrics.windows
+    metrics["source"] = source
     
     return metrics
 
 
 async def get_slow_requests(limit: int = 10) -> List[Dict[str, Any]]:
-    """Get recent slow requests."""
-    if not cache_manager.connected:
-        return []
-    
-    # Get slow request keys
-    slow_request_keys = await cache_manager.redis.keys("slow_requests:*")
-    
-    # Get slow request data
-    slow_requests = []
-    for key in slow_request_keys[-limit:]:  # Get recent ones
-        request_data = await cache_manager.get(key)
-        if request_data:
-            slow_requests.append(request_data)
+    """Get recent slow requests, slowest first."""
+    slow_requests = await request_metrics.read_slow_requests(limit)
     
     # Sort by duration (slowest first)
     slow_requests.sort(key=lambda x: x.get("duration", 0), reverse=True)
     
-    return slow_requests
\ No newline at end of file
+    return slow_requests
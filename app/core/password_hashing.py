@@ -0,0 +1,242 @@
+"""
+Password hashing off the event loop.
+
+bcrypt and argon2id are deliberately slow: one hash or verify burns
+100-250ms of CPU. Called inline from an async handler, that stalls every
+other request on the worker. ``password_hasher`` runs the work on a small
+dedicated pool instead, and rejects new work with a 503 once the pool and
+its queue are full so a login storm cannot build an unbounded backlog.
+
+bcrypt releases the GIL while hashing, so the default thread pool gives
+real parallelism; ``PASSWORD_HASH_EXECUTOR = "process"`` moves hashing
+into separate processes for hashers that do not.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import bcrypt
+
+try:
+    from argon2 import PasswordHasher as Argon2Hasher
+    from argon2.exceptions import InvalidHashError, VerificationError
+    ARGON2_AVAILABLE = True
+except ImportError:
+    ARGON2_AVAILABLE = False
+
+from app.core.config import settings
+from app.core.errors import ConfigurationException, ServiceOverloadedException
+from app.core.request_metrics import LatencyHistogram
+
+
+SCHEME_BCRYPT = "bcrypt"
+SCHEME_ARGON2ID = "argon2id"
+
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+ARGON2ID_PREFIX = "$argon2id$"
+
+# bcrypt only looks at the first 72 bytes; bcrypt 5 raises instead of
+# truncating, so truncate explicitly to keep verifying older hashes
+BCRYPT_MAX_BYTES = 72
+
+
+@lru_cache(maxsize=4)
+def _argon2(time_cost: int, memory_cost: int, parallelism: int) -> "Argon2Hasher":
+    if not ARGON2_AVAILABLE:
+        raise ConfigurationException("argon2id password hashing requires the argon2-cffi package")
+    return Argon2Hasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+
+
+def _current_argon2() -> "Argon2Hasher":
+    return _argon2(settings.ARGON2_TIME_COST, settings.ARGON2_MEMORY_COST, settings.ARGON2_PARALLELISM)
+
+
+def _bcrypt_secret(password: str) -> bytes:
+    return password.encode("utf-8")[:BCRYPT_MAX_BYTES]
+
+
+def hash_password_sync(password: str) -> str:
+    """Hash a password with the configured scheme and cost (blocking)."""
+    if settings.PASSWORD_HASH_SCHEME == SCHEME_ARGON2ID:
+        return _current_argon2().hash(password)
+    if settings.PASSWORD_HASH_SCHEME != SCHEME_BCRYPT:
+        raise ConfigurationException(f"Unknown password hash scheme: {settings.PASSWORD_HASH_SCHEME}")
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(_bcrypt_secret(password), salt).decode("utf-8")
+
+
+def verify_password_sync(password: str, hashed: str) -> bool:
+    """Check a password against a bcrypt or argon2id hash (blocking)."""
+    if not password or not hashed:
+        return False
+    if hashed.startswith(ARGON2ID_PREFIX):
+        try:
+            return _current_argon2().verify(hashed, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    try:
+        return bcrypt.checkpw(_bcrypt_secret(password), hashed.encode("utf-8"))
+    except ValueError:
+        return False
+
+
+def needs_rehash(hashed: str) -> bool:
+    """Whether a stored hash uses another scheme or cost than configured."""
+    if settings.PASSWORD_HASH_SCHEME == SCHEME_ARGON2ID:
+        return not hashed.startswith(ARGON2ID_PREFIX) or _current_argon2().check_needs_rehash(hashed)
+    if not hashed.startswith(BCRYPT_PREFIXES):
+        return True
+    try:
+        return int(hashed[4:6]) != settings.BCRYPT_ROUNDS
+    except ValueError:
+        return True
+
+
+def verify_and_update_sync(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and rehash it if the stored hash is outdated (blocking).
+
+    Returns:
+        (valid, new_hash); new_hash is None unless the password is valid and
+        the hash should be replaced
+    """
+    if not verify_password_sync(password, hashed):
+        return False, None
+    if needs_rehash(hashed):
+        return True, hash_password_sync(password)
+    return True, None
+
+
+def _timed(function: Callable, *args) -> Tuple[Any, float]:
+    """Run function in a worker and report how long it ran there."""
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+class AsyncPasswordHasher:
+    """
+    Bounded pool for password hashing.
+
+    At most ``max_workers`` jobs run at once and ``max_queue`` more wait;
+    anything beyond that raises ServiceOverloadedException (HTTP 503)
+    immediately instead of queueing.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        executor: Optional[str] = None
+    ):
+        self.max_workers = max_workers or settings.PASSWORD_HASH_WORKERS
+        self.max_queue = settings.PASSWORD_HASH_MAX_QUEUE if max_queue is None else max_queue
+        self.executor_kind = executor or settings.PASSWORD_HASH_EXECUTOR
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.counters: Dict[str, int] = {
+            "submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "rehashed": 0
+        }
+        # Time spent waiting for a worker, and hashing in one
+        self.wait_time = LatencyHistogram()
+        self.run_time = LatencyHistogram()
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    def _release(self, future: Future):
+        with self._lock:
+            self.in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.counters["failed"] += 1
+            else:
+                self.counters["completed"] += 1
+
+    async def _run(self, function: Callable, *args) -> Any:
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.counters["rejected"] += 1
+                raise ServiceOverloadedException("password hashing")
+            self.in_flight += 1
+            self.counters["submitted"] += 1
+
+        started = time.perf_counter()
+        try:
+            future = self._get_executor().submit(_timed, function, *args)
+        except Exception:
+            with self._lock:
+                self.in_flight -= 1
+                self.counters["failed"] += 1
+            raise
+        # Released when the worker finishes, even if the caller was cancelled
+        future.add_done_callback(self._release)
+
+        result, run_seconds = await asyncio.wrap_future(future)
+        self.run_time.record(run_seconds)
+        self.wait_time.record(max(0.0, time.perf_counter() - started - run_seconds))
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the configured scheme and cost."""
+        return await self._run(hash_password_sync, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        """Check a password against a stored hash."""
+        return await self._run(verify_password_sync, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password, rehashing it in the same job when the stored hash
+        uses an outdated scheme or cost.
+
+        Returns:
+            (valid, new_hash); store new_hash when it is not None
+        """
+        valid, new_hash = await self._run(verify_and_update_sync, password, hashed)
+        if new_hash is not None:
+            with self._lock:
+                self.counters["rehashed"] += 1
+        return valid, new_hash
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool occupancy, counters and latency percentiles."""
+        with self._lock:
+            in_flight = self.in_flight
+            counters = dict(self.counters)
+        return {
+            "scheme": settings.PASSWORD_HASH_SCHEME,
+            "executor": self.executor_kind,
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": in_flight,
+            "queued": max(0, in_flight - self.max_workers),
+            **counters,
+            "wait": self.wait_time.summary(),
+            "run": self.run_time.summary(),
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pool; it is recreated on next use."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+# Global password hasher instance
+password_hasher = AsyncPasswordHasher()
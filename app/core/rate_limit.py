@@ -0,0 +1,235 @@
+"""
+Rate limiting engine.
+
+Limits are enforced atomically in Redis by a single Lua script per request
+(GCRA or sliding-window log), so the hot path costs exactly one round trip.
+When Redis is unavailable each process falls back to an in-memory token
+bucket instead of letting every request through.
+"""
+
+import re
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.core.cache import cache_manager
+from app.core.config import settings
+
+
+PERIODS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+
+_RATE_PATTERN = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$")
+
+# Generic cell rate algorithm: stores one "theoretical arrival time" per key.
+# Uses the Redis clock so every worker shares the same time base.
+GCRA_SCRIPT = """
+local emission = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+local new_tat = tat + emission
+if new_tat - tolerance > now then
+    return {0, 0, new_tat - tolerance - now, tat - now}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return {1, math.floor((tolerance - (new_tat - now)) / emission), 0, new_tat - now}
+"""
+
+# Sliding-window log: one sorted-set member per accepted request.
+SLIDING_WINDOW_SCRIPT = """
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count >= limit then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    local retry = tonumber(oldest[2]) + window - now
+    return {0, 0, retry, retry}
+end
+redis.call('ZADD', KEYS[1], now, ARGV[3])
+redis.call('PEXPIRE', KEYS[1], window)
+return {1, limit - count - 1, 0, window}
+"""
+
+
+class RateLimitRule(NamedTuple):
+    """A limit of ``limit`` requests per ``period`` seconds."""
+    limit: int
+    period: int
+
+    @property
+    def emission_interval_ms(self) -> float:
+        """Milliseconds between requests at the sustained rate."""
+        return self.period * 1000 / self.limit
+
+    def __str__(self) -> str:
+        return f"{self.limit}/{self.period}s"
+
+
+class RateLimitResult(NamedTuple):
+    """Outcome of a rate limit check."""
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # seconds until the next request would be allowed
+    reset_after: float  # seconds until the bucket is full again
+    backend: str
+
+
+def parse_rate_limit(value: str) -> RateLimitRule:
+    """
+    Parse a rate limit such as "100/minute", "10/second" or "1000/2hours".
+
+    Raises ValueError for malformed limits.
+    """
+    match = _RATE_PATTERN.match(value.lower())
+    if not match:
+        raise ValueError(f"Invalid rate limit: {value!r}")
+    limit, multiplier, unit = match.groups()
+    rule = RateLimitRule(int(limit), int(multiplier or 1) * PERIODS[unit])
+    if rule.limit <= 0:
+        raise ValueError(f"Invalid rate limit: {value!r}")
+    return rule
+
+
+class LocalTokenBucket:
+    """
+    Per-process token buckets used while Redis is unavailable.
+
+    Buckets are kept in an LRU map so memory stays bounded under key churn.
+    Limits are per worker, so the effective global limit is approximate.
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def hit(self, key: str, rule: RateLimitRule) -> RateLimitResult:
+        """Take one token from the bucket for key."""
+        now = time.monotonic()
+        refill_rate = rule.limit / rule.period  # tokens per second
+        tokens, updated_at = self._buckets.pop(key, (float(rule.limit), now))
+        tokens = min(float(rule.limit), tokens + (now - updated_at) * refill_rate)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        return RateLimitResult(
+            allowed=allowed,
+            limit=rule.limit,
+            remaining=int(tokens),
+            retry_after=0.0 if allowed else (1 - tokens) / refill_rate,
+            reset_after=(rule.limit - tokens) / refill_rate,
+            backend="local"
+        )
+
+    def clear(self):
+        """Drop all buckets."""
+        self._buckets.clear()
+
+
+class RateLimiter:
+    """
+    Rate limiter with a Redis backend and an in-memory fallback.
+
+    ``algorithm`` is "gcra" (token-bucket semantics: bursts up to the limit,
+    smooth refill) or "sliding_window" (exact count over the trailing period).
+    """
+
+    KEY_PREFIX = "rate_limit"
+
+    def __init__(self, algorithm: str = "gcra", local_max_keys: int = 10000):
+        if algorithm not in ("gcra", "sliding_window"):
+            raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.local = LocalTokenBucket(local_max_keys)
+        self._script = None
+        self._script_client = None
+
+    def _get_script(self, client):
+        """Register the Lua script once per Redis client (EVALSHA with load-on-miss)."""
+        if self._script is None or self._script_client is not client:
+            source = GCRA_SCRIPT if self.algorithm == "gcra" else SLIDING_WINDOW_SCRIPT
+            self._script = client.register_script(source)
+            self._script_client = client
+        return self._script
+
+    async def hit(self, key: str, rule: RateLimitRule) -> RateLimitResult:
+        """Count one request against key and report whether it is allowed."""
+        if not cache_manager.connected or cache_manager.redis is None:
+            return self.local.hit(key, rule)
+
+        redis_key = f"{self.KEY_PREFIX}:{self.algorithm}:{rule.limit}:{rule.period}:{key}"
+        if self.algorithm == "gcra":
+            args = [rule.emission_interval_ms, rule.emission_interval_ms * rule.limit]
+        else:
+            args = [rule.period * 1000, rule.limit, uuid.uuid4().hex]
+
+        try:
+            script = self._get_script(cache_manager.redis)
+            allowed, remaining, retry_after_ms, reset_after_ms = await script(keys=[redis_key], args=args)
+        except Exception as e:
+            print(f"Rate limiter error, using local fallback: {str(e)}")
+            return self.local.hit(key, rule)
+
+        return RateLimitResult(
+            allowed=bool(allowed),
+            limit=rule.limit,
+            remaining=max(0, int(remaining)),
+            retry_after=max(0.0, float(retry_after_ms) / 1000),
+            reset_after=max(0.0, float(reset_after_ms) / 1000),
+            backend="redis"
+        )
+
+
+class RateLimitPolicy:
+    """
+    Resolves the rule and bucket key for a request.
+
+    Route rules (longest matching path prefix) take precedence and get their
+    own bucket; otherwise the caller's tier decides the limit. Tiers are
+    "anonymous" for unauthenticated callers and the token role otherwise,
+    falling back to the default limit.
+    """
+
+    def __init__(
+        self,
+        default: str,
+        tiers: Optional[Dict[str, str]] = None,
+        routes: Optional[Dict[str, str]] = None
+    ):
+        self.default = parse_rate_limit(default)
+        self.tiers = {tier: parse_rate_limit(limit) for tier, limit in (tiers or {}).items()}
+        # Longest prefix first so the most specific route wins
+        self.routes: List[Tuple[str, RateLimitRule]] = sorted(
+            ((prefix, parse_rate_limit(limit)) for prefix, limit in (routes or {}).items()),
+            key=lambda item: len(item[0]),
+            reverse=True
+        )
+
+    def resolve(self, path: str, tier: str, client_id: str) -> Tuple[str, RateLimitRule]:
+        """Return (bucket key, rule) for a request."""
+        for prefix, rule in self.routes:
+            if path.startswith(prefix):
+                return f"route:{prefix}:{client_id}", rule
+        return f"tier:{tier}:{client_id}", self.tiers.get(tier, self.default)
+
+
+rate_limiter = RateLimiter(settings.RATE_LIMIT_ALGORITHM)
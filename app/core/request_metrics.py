@@ -0,0 +1,347 @@
+"""
+In-process request metrics.
+
+Requests are recorded into counters and log-linear latency histograms in
+memory (no I/O on the response path). A background task flushes the deltas
+to Redis in one pipelined write every few seconds, where histograms from all
+workers merge by summing bucket counts, so percentiles stay exact to the
+bucket resolution across the cluster.
+
+Counters are totals since the metrics were first recorded. Latency
+histograms are kept per time window instead and only the most recent
+windows are reported, so percentiles follow current traffic rather than
+everything since the process or Redis key was created.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.core.cache import CacheConfig, cache_manager
+from app.core.config import settings
+
+
+class LatencyHistogram:
+    """
+    HDR-style latency histogram with sparse log-linear buckets.
+
+    Values are recorded in microseconds. Each power of two is split into
+    ``2 ** SUB_BUCKET_BITS`` linear sub-buckets, which bounds the relative
+    error of any reported percentile to about 3%.
+    """
+
+    SUB_BUCKET_BITS = 5
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+    def __init__(self, counts: Optional[Dict[int, int]] = None):
+        self.counts: Dict[int, int] = dict(counts or {})
+        self.total = sum(self.counts.values())
+        self.max_value = max((self.bucket_upper(i) for i in self.counts), default=0)
+
+    @classmethod
+    def bucket_index(cls, value: int) -> int:
+        """Map a non-negative value to its bucket index."""
+        shift = max(0, value.bit_length() - cls.SUB_BUCKET_BITS - 1)
+        return shift * cls.SUB_BUCKETS + (value >> shift)
+
+    @classmethod
+    def bucket_bounds(cls, index: int) -> tuple:
+        """Return the (lowest, highest) value stored in a bucket."""
+        if index < 2 * cls.SUB_BUCKETS:
+            return index, index
+        shift = index // cls.SUB_BUCKETS - 1
+        top = index - shift * cls.SUB_BUCKETS
+        return top << shift, ((top + 1) << shift) - 1
+
+    @classmethod
+    def bucket_upper(cls, index: int) -> int:
+        return cls.bucket_bounds(index)[1]
+
+    def record(self, seconds: float, count: int = 1):
+        """Record a duration in seconds."""
+        value = max(0, int(seconds * 1_000_000))
+        index = self.bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+        if value > self.max_value:
+            self.max_value = value
+
+    def merge(self, other: "LatencyHistogram"):
+        """Add another histogram's counts to this one."""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.max_value = max(self.max_value, other.max_value)
+
+    def percentile(self, percent: float) -> float:
+        """Return the given percentile (0-100) in seconds."""
+        if not self.total:
+            return 0.0
+        rank = max(1, int(round(percent / 100 * self.total)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                low, high = self.bucket_bounds(index)
+                return min((low + high) / 2, self.max_value) / 1_000_000
+        return self.max_value / 1_000_000
+
+    def summary(self) -> Dict[str, Any]:
+        """Return count and the usual percentiles in milliseconds."""
+        return {
+            "count": self.total,
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p90_ms": round(self.percentile(90) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "max_ms": round(self.max_value / 1000, 3),
+        }
+
+
+class MetricsAggregator:
+    """
+    Aggregates request counters, per-route latency histograms and slow requests.
+
+    ``record`` is synchronous and allocation-light; ``flush`` moves the
+    pending deltas to Redis with a single pipeline round trip. Histograms
+    start afresh every ``window`` seconds; the last ``windows`` of them are
+    merged when read.
+    """
+
+    COUNTERS_KEY = "metrics:counters"
+    ROUTES_KEY = "metrics:latency:{window}:routes"
+    LATENCY_KEY = "metrics:latency:{window}:{route}"
+    SLOW_REQUESTS_KEY = "metrics:slow_requests"
+    ALL_ROUTES = "__all__"
+
+    def __init__(
+        self,
+        flush_interval: float = 10.0,
+        max_slow_requests: int = 100,
+        window: float = 300.0,
+        windows: int = 3
+    ):
+        self.flush_interval = flush_interval
+        self.max_slow_requests = max_slow_requests
+        self.window = window
+        self.windows = windows
+        # This process's view, used when Redis is unavailable
+        self.counters: Dict[str, int] = {}
+        self._window_histograms: Dict[int, Dict[str, LatencyHistogram]] = {}
+        self.slow_requests: Deque[Dict[str, Any]] = deque(maxlen=max_slow_requests)
+        # Deltas not yet written to Redis, by (window, route)
+        self._pending_counters: Dict[str, int] = {}
+        self._pending_histograms: Dict[Tuple[int, str], LatencyHistogram] = {}
+        self._pending_slow: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def _count(self, name: str):
+        self.counters[name] = self.counters.get(name, 0) + 1
+        self._pending_counters[name] = self._pending_counters.get(name, 0) + 1
+
+    def _current_window(self) -> int:
+        return int(time.time() // self.window)
+
+    def _recent_windows(self) -> range:
+        current = self._current_window()
+        return range(current - self.windows + 1, current + 1)
+
+    @property
+    def histograms(self) -> Dict[str, LatencyHistogram]:
+        """This process's latency histograms over the recent windows."""
+        merged: Dict[str, LatencyHistogram] = {}
+        for window in self._recent_windows():
+            for route, histogram in self._window_histograms.get(window, {}).items():
+                merged.setdefault(route, LatencyHistogram()).merge(histogram)
+        return merged
+
+    def _observe(self, window: int, route: str, duration: float):
+        targets = ((self._window_histograms[window], route), (self._pending_histograms, (window, route)))
+        for histograms, key in targets:
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = LatencyHistogram()
+            histogram.record(duration)
+
+    def record(self, method: str, route: str, status_code: int, duration: float):
+        """Record one finished request."""
+        self._count("requests:total")
+        self._count(f"requests:status:{status_code}")
+        self._count(f"requests:method:{method}")
+        window = self._current_window()
+        if window not in self._window_histograms:
+            # A new window has started; drop the ones that are no longer reported
+            self._window_histograms = {
+                recent: histograms for recent, histograms in self._window_histograms.items()
+                if recent > window - self.windows
+            }
+            self._window_histograms[window] = {}
+        self._observe(window, f"{method} {route}", duration)
+        self._observe(window, self.ALL_ROUTES, duration)
+
+    def record_slow_request(self, data: Dict[str, Any]):
+        """Keep details of a slow request for the monitoring dashboard."""
+        self.slow_requests.append(data)
+        self._pending_slow.append(data)
+        del self._pending_slow[:-self.max_slow_requests]
+
+    async def flush(self) -> bool:
+        """Write pending deltas to Redis in one pipelined round trip."""
+        if not (self._pending_counters or self._pending_histograms or self._pending_slow):
+            return True
+        if not cache_manager.connected:
+            return False
+
+        counters, histograms, slow = self._pending_counters, self._pending_histograms, self._pending_slow
+        self._pending_counters, self._pending_histograms, self._pending_slow = {}, {}, []
+
+        try:
+            pipe = cache_manager.redis.pipeline(transaction=False)
+            for name, value in counters.items():
+                pipe.hincrby(self.COUNTERS_KEY, name, value)
+            # Window keys outlive the reported windows by one, then expire
+            window_ttl = int(self.window * (self.windows + 1))
+            routes_by_window: Dict[int, List[str]] = {}
+            for window, route in histograms:
+                routes_by_window.setdefault(window, []).append(route)
+            for window, routes in routes_by_window.items():
+                routes_key = self.ROUTES_KEY.format(window=window)
+                pipe.sadd(routes_key, *routes)
+                pipe.expire(routes_key, window_ttl)
+            for (window, route), histogram in histograms.items():
+                key = self.LATENCY_KEY.format(window=window, route=route)
+                for index, count in histogram.counts.items():
+                    pipe.hincrby(key, str(index), count)
+                pipe.expire(key, window_ttl)
+            if slow:
+                pipe.lpush(self.SLOW_REQUESTS_KEY, *(json.dumps(item, default=str) for item in slow))
+                pipe.ltrim(self.SLOW_REQUESTS_KEY, 0, self.max_slow_requests - 1)
+                pipe.expire(self.SLOW_REQUESTS_KEY, CacheConfig.DAILY_TTL)
+            await pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Metrics flush error: {str(e)}")
+            self._restore(counters, histograms, slow)
+            return False
+
+    def _restore(
+        self,
+        counters: Dict[str, int],
+        histograms: Dict[Tuple[int, str], LatencyHistogram],
+        slow: List[Dict[str, Any]]
+    ):
+        """Put unflushed deltas back so the next flush retries them."""
+        for name, value in counters.items():
+            self._pending_counters[name] = self._pending_counters.get(name, 0) + value
+        oldest = self._current_window() - self.windows
+        for key, histogram in histograms.items():
+            if key[0] <= oldest:
+                # No longer reported, so not worth retrying
+                continue
+            if key in self._pending_histograms:
+                self._pending_histograms[key].merge(histogram)
+            else:
+                self._pending_histograms[key] = histogram
+        self._pending_slow = (slow + self._pending_slow)[-self.max_slow_requests:]
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        """Start the background flush task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the background task and flush what is left."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def read_cluster(self) -> Optional[Dict[str, Any]]:
+        """Read counters and recent histograms merged across all workers from Redis."""
+        if not cache_manager.connected:
+            return None
+
+        windows = list(self._recent_windows())
+        pipe = cache_manager.redis.pipeline(transaction=False)
+        pipe.hgetall(self.COUNTERS_KEY)
+        for window in windows:
+            pipe.smembers(self.ROUTES_KEY.format(window=window))
+        raw_counters, *raw_routes = await pipe.execute()
+        keys = [
+            (window, route)
+            for window, routes in zip(windows, raw_routes)
+            for route in sorted(_decode(route) for route in routes)
+        ]
+
+        histograms: Dict[str, LatencyHistogram] = {}
+        if keys:
+            pipe = cache_manager.redis.pipeline(transaction=False)
+            for window, route in keys:
+                pipe.hgetall(self.LATENCY_KEY.format(window=window, route=route))
+            for (window, route), buckets in zip(keys, await pipe.execute()):
+                if buckets:
+                    histograms.setdefault(route, LatencyHistogram()).merge(LatencyHistogram(
+                        {int(index): int(count) for index, count in buckets.items()}
+                    ))
+
+        return {
+            "counters": {_decode(name): int(value) for name, value in raw_counters.items()},
+            "histograms": histograms,
+        }
+
+    async def read_slow_requests(self, limit: int) -> List[Dict[str, Any]]:
+        """Most recent slow requests, cluster-wide when Redis is available."""
+        if cache_manager.connected:
+            try:
+                raw = await cache_manager.redis.lrange(self.SLOW_REQUESTS_KEY, 0, limit - 1)
+                return [json.loads(item) for item in raw]
+            except Exception as e:
+                print(f"Slow request read error: {str(e)}")
+        return list(self.slow_requests)[::-1][:limit]
+
+
+def _decode(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def summarize_counters(counters: Dict[str, int]) -> Dict[str, Any]:
+    """Group flat counter names into totals, status codes and methods."""
+    summary: Dict[str, Any] = {
+        "requests_total": counters.get("requests:total", 0),
+        "status_codes": {},
+        "methods": {},
+    }
+    for name, value in counters.items():
+        if name.startswith("requests:status:"):
+            summary["status_codes"][name.rsplit(":", 1)[1]] = value
+        elif name.startswith("requests:method:"):
+            summary["methods"][name.rsplit(":", 1)[1]] = value
+    return summary
+
+
+def summarize_routes(histograms: Dict[str, LatencyHistogram]) -> Dict[str, Any]:
+    """Percentile summaries per route, slowest p99 first."""
+    summaries = {
+        route: histogram.summary()
+        for route, histogram in histograms.items()
+        if route != MetricsAggregator.ALL_ROUTES
+    }
+    return dict(sorted(summaries.items(), key=lambda item: item[1]["p99_ms"], reverse=True))
+
+
+request_metrics = MetricsAggregator(
+    flush_interval=settings.METRICS_FLUSH_INTERVAL,
+    max_slow_requests=settings.METRICS_MAX_SLOW_REQUESTS,
+    window=settings.METRICS_LATENCY_WINDOW,
+    windows=settings.METRICS_LATENCY_WINDOWS
+)
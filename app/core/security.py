@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Any, Dict, Optional, Union
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel, EmailStr
@@ -9,15 +9,58 @@ import secrets
 import string
 from uuid import UUID
 
-from app.core.config import settings
+try:
+    import jwt as pyjwt
+    PYJWT_AVAILABLE = True
+except ImportError:
+    PYJWT_AVAILABLE = False
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core.auth_cache import verified_tokens
+from app.core.config import settings
+from app.core.password_hashing import hash_password_sync, verify_password_sync
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
 
+
+def _use_pyjwt() -> bool:
+    return PYJWT_AVAILABLE and settings.JWT_BACKEND in ("auto", "pyjwt")
+
+
+@lru_cache(maxsize=4)
+def _pyjwt_key(secret: str, algorithm: str) -> Any:
+    """Signing key prepared once instead of on every encode and decode."""
+    return pyjwt.get_algorithm_by_name(algorithm).prepare_key(secret)
+
+
+def _encode_jwt(payload: Dict[str, Any]) -> str:
+    """Sign a payload with the configured JWT backend."""
+    if _use_pyjwt():
+        return pyjwt.encode(payload, _pyjwt_key(settings.SECRET_KEY, settings.ALGORITHM), algorithm=settings.ALGORITHM)
+    return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def _decode_jwt(token: str) -> Dict[str, Any]:
+    """
+    Verify a token's signature and expiry with the configured JWT backend.
+    
+    Raises:
+        jwt.ExpiredSignatureError: If the token has expired
+        JWTError: If the token is otherwise invalid (python-jose types for either backend)
+    """
+    if _use_pyjwt():
+        try:
+            return pyjwt.decode(
+                token, _pyjwt_key(settings.SECRET_KEY, settings.ALGORITHM), algorithms=[settings.ALGORITHM]
+            )
+        except pyjwt.ExpiredSignatureError as e:
+            raise jwt.ExpiredSignatureError(str(e)) from e
+        except pyjwt.InvalidTokenError as e:
+            raise JWTError(str(e)) from e
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+
 class TokenData(BaseModel):
     """Token payload data model."""
     email: Optional[EmailStr] = None
@@ -25,6 +68,9 @@ class TokenData(BaseModel):
     permissions: list[str] = []
     role: Optional[str] = None
     token_type: str = "access"
+    # Compiled permission bitmask and the registry version it was compiled with
+    permission_mask: Optional[int] = None
+    permission_mask_version: Optional[str] = None
 
 
 class TokenResponse(BaseModel):
@@ -39,6 +85,9 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a plain password against a hashed password.
     
+    Blocks for the full cost of the hash; async code should await
+    ``password_hasher.verify`` instead.
+    
     Args:
         plain_password: Plain text password
         hashed_password: Hashed password to verify against
@@ -46,12 +95,15 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         bool: True if password matches, False otherwise
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return verify_password_sync(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """
-    Hash a password using bcrypt.
+    Hash a password with the configured scheme (bcrypt or argon2id).
+    
+    Blocks for the full cost of the hash; async code should await
+    ``password_hasher.hash`` instead.
     
     Args:
         password: Plain text password to hash
@@ -59,7 +111,7 @@ def get_password_hash(password: str) -> str:
     Returns:
         str: Hashed password
     """
-    return pwd_context.hash(password)
+    return hash_password_sync(password)
 
 
 def validate_password(password: str) -> bool:
@@ -158,7 +210,7 @@ def create_access_token(
     })
     
     # Encode token
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    encoded_jwt = _encode_jwt(to_encode)
     return encoded_jwt
 
 
@@ -186,7 +238,7 @@ def create_refresh_token(data: dict) -> str:
     })
     
     # Encode token
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    encoded_jwt = _encode_jwt(to_encode)
     return encoded_jwt
 
 
@@ -205,7 +257,7 @@ def verify_token(token: str, expected_type: str = "access") -> Dict[str, Any]:
         HTTPException: If token is invalid or expired
     """
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = _decode_jwt(token)
         
         # Verify token type
         token_type = payload.get("type")
@@ -236,6 +288,10 @@ def decode_access_token(token: str) -> TokenData:
     """
     Decode an access token and return token data.
     
+    Tokens verified before are served from an LRU of token digests until
+    they expire, skipping signature verification. The returned TokenData
+    may be shared between requests and must not be modified.
+    
     Args:
         token: JWT access token
         
@@ -245,6 +301,10 @@ def decode_access_token(token: str) -> TokenData:
     Raises:
         HTTPException: If token is invalid
     """
+    cached = verified_tokens.get(token)
+    if cached is not None:
+        return cached
+    
     payload = verify_token(token, expected_type="access")
     
     # Extract token data
@@ -253,6 +313,11 @@ def decode_access_token(token: str) -> TokenData:
     permissions = payload.get("permissions", [])
     role = payload.get("role")
     
+    try:
+        permission_mask = int(payload["pmask"], 16) if payload.get("pmask") else None
+    except (TypeError, ValueError):
+        permission_mask = None
+    
     if not email:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -260,13 +325,17 @@ def decode_access_token(token: str) -> TokenData:
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return TokenData(
+    token_data = TokenData(
         email=email,
         user_id=user_id,
         permissions=permissions,
         role=role,
-        token_type="access"
+        token_type="access",
+        permission_mask=permission_mask,
+        permission_mask_version=payload.get("pver") if permission_mask is not None else None
     )
+    verified_tokens.put(token, token_data, payload.get("exp"))
+    return token_data
 
 
 async def get_current_token(token: str = Depends(oauth2_scheme)) -> str:
@@ -315,8 +384,8 @@ def hash_api_key(api_key: str) -> str:
     Returns:
         str: Hashed API key
     """
-    # Use the same context as passwords but could use a different one
-    return pwd_context.hash(api_key)
+    # Use the same scheme as passwords but could use a different one
+    return hash_password_sync(api_key)
 
 
 def verify_api_key(plain_api_key: str, hashed_api_key: str) -> bool:
@@ -330,7 +399,7 @@ def verify_api_key(plain_api_key: str, hashed_api_key: str) -> bool:
     Returns:
         bool: True if API key is valid
     """
-    return pwd_context.verify(plain_api_key, hashed_api_key)
+    return verify_password_sync(plain_api_key, hashed_api_key)
 
 
 def create_password_reset_token(email: str) -> str:
@@ -355,7 +424,7 @@ def create_password_reset_token(email: str) -> str:
     expire = datetime.utcnow() + expires_delta
     to_encode.update({"exp": expire})
     
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    encoded_jwt = _encode_jwt(to_encode)
     return encoded_jwt
 
 
@@ -370,7 +439,7 @@ def verify_password_reset_token(token: str) -> Optional[str]:
         Optional[str]: Email address if token is valid, None otherwise
     """
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = _decode_jwt(token)
         token_type = payload.get("type")
         
         if token_type != "password_reset":
@@ -405,7 +474,7 @@ def create_email_verification_token(email: str) -> str:
     expire = datetime.utcnow() + expires_delta
     to_encode.update({"exp": expire})
     
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    encoded_jwt = _encode_jwt(to_encode)
     return encoded_jwt
 
 
@@ -420,7 +489,7 @@ def verify_email_verification_token(token: str) -> Optional[str]:
         Optional[str]: Email address if token is valid, None otherwise
     """
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = _decode_jwt(token)
         token_type = payload.get("type")
         
         if token_type != "email_verification":
@@ -0,0 +1,82 @@
+"""
+Process-local snapshots of database state.
+
+A ``SnapshotCache`` keeps values loaded from the database per process, in
+LRU order, for ``ttl`` seconds. Writes in this process invalidate the keys
+they touch; other workers pick a change up when their snapshot expires, so
+the TTL is the upper bound on staleness across workers.
+
+Loads run without a lock. A load that started before an invalidation still
+answers its own caller, but its result is not kept:
+
+    generation = cache.generation
+    value = await load(...)
+    cache.put(key, value, generation)
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Iterator, Optional, Tuple
+
+
+MISSING = object()
+
+
+class SnapshotCache:
+    """Bounded LRU of loaded values, each valid for ttl seconds."""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def generation(self) -> int:
+        """Token to pass to put(); it changes on every invalidation."""
+        return self._generation
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """The key's value if loaded less than ttl seconds ago, else default."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return default
+
+    def put(self, key: Hashable, value: Any, generation: int):
+        """Keep a value loaded since generation, unless a write invalidated it meanwhile."""
+        self.put_many([(key, value)], generation)
+
+    def put_many(self, items: Iterable[Tuple[Hashable, Any]], generation: int):
+        if generation != self._generation or self.max_size <= 0:
+            return
+        loaded_at = time.monotonic()
+        for key, value in items:
+            self._entries[key] = (value, loaded_at)
+            self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, keys: Optional[Iterable[Hashable]] = None):
+        """Drop the given keys, or every value when keys is None."""
+        self._generation += 1
+        if keys is None:
+            self._entries.clear()
+            return
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        """Every kept (key, value), expired or not."""
+        return ((key, entry[0]) for key, entry in list(self._entries.items()))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -6,6 +6,10 @@ from app.core.config import settings
 from app.core.errors import setup_exception_handlers
 from app.core.cache import cache_manager
 from app.core.middleware import setup_middleware
+from app.core.request_metrics import request_metrics
+from app.core.password_hashing import password_hasher
+from app.core.auth_cache import user_activity, verified_tokens
+from app.modules.rentals.availability import rental_availability
 from app.db.session import engine
 from app.db.base import Base
 
@@ -20,6 +24,7 @@ from app.modules.transactions import models as transaction_models
 from app.modules.rentals import models as rental_models
 from app.modules.analytics import models as analytics_models
 from app.modules.system import models as system_models
+from app.modules.analytics import rollups  # noqa: F401  (keeps dashboard rollups in step with writes)
 
 # Import routes
 from app.modules.auth import routes as auth_routes
@@ -52,6 +57,16 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             print(f"⚠️  Redis cache connection failed: {e}")
     
+    # Start background flush of request metrics
+    request_metrics.start()
+    
+    # Optionally generate queued reports in this process
+    report_worker = None
+    if settings.REPORT_WORKER_IN_PROCESS:
+        from app.modules.analytics.report_queue import create_report_worker
+        report_worker = create_report_worker()
+        report_worker.start()
+    
     # Initialize database optimizations
     try:
         from app.core.database_optimization import initialize_database_optimizations
@@ -63,6 +78,10 @@ async def lifespan(app: FastAPI):
     yield
     
     # Shutdown
+    if report_worker is not None:
+        await report_worker.stop()
+    await request_metrics.stop()
+    password_hasher.shutdown(wait=False)
     await engine.dispose()
     if settings.REDIS_ENABLED:
         await cache_manager.disconnect()
@@ -289,18 +308,19 @@ async def metrics():
     
     metrics_data = {"timestamp": "2024-01-01T00:00:00Z"}  # Would be actual timestamp
     
-    # Get cache and request metrics
+    # Get request metrics (aggregated in-process, cluster-wide via Redis)
+    metrics_data.update({
+        "performance": await get_performance_metrics(),
+        "slow_requests": await get_slow_requests(limit=5),
+        "password_hashing": password_hasher.stats(),
+        "auth_cache": {"tokens": verified_tokens.stats(), "user_activity": user_activity.stats()},
+        "rental_availability": rental_availability.stats()
+    })
+    
+    # Get cache metrics
     if settings.REDIS_ENABLED:
         try:
-            performance_metrics = await get_performance_metrics()
-            slow_requests = await get_slow_requests(limit=5)
-            cache_stats = await cache_manager.get_health()
-            
-            metrics_data.update({
-                "performance": performance_metrics,
-                "slow_requests": slow_requests,
-                "cache": cache_stats
-            })
+            metrics_data["cache"] = await cache_manager.get_health()
         except Exception as e:
             metrics_data["cache_error"] = str(e)
     else:
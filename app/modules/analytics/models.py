@@ -2,7 +2,7 @@ from enum import Enum
 from typing import Optional, Dict, Any, List
 from decimal import Decimal
 from datetime import datetime, date
-from sqlalchemy import Column, String, Numeric, Boolean, Text, DateTime, ForeignKey, Index, JSON
+from sqlalchemy import Column, String, Numeric, Boolean, Text, DateTime, Date, ForeignKey, Index, Integer, JSON, Table
 from sqlalchemy.orm import relationship, validates
 from sqlalchemy.ext.hybrid import hybrid_property
 
@@ -36,6 +36,8 @@ class ReportFormat(str, Enum):
     EXCEL = "EXCEL"
     CSV = "CSV"
     JSON = "JSON"
+    NDJSON = "NDJSON"
+    PARQUET = "PARQUET"
 
 
 class MetricType(str, Enum):
@@ -79,9 +81,14 @@ class AnalyticsReport(BaseModel):
         file_path: Path to the generated report file
         file_size: Size of the generated report file in bytes
         generated_by: User who generated the report
+        started_at: When generation of the report last started
         generated_at: When the report was generated
         error_message: Error message if report generation failed
         report_metadata: Additional metadata about the report
+        attempts: Generation attempts made by report workers
+        lease_owner: Worker currently holding the generation lease
+        lease_expires_at: When that worker's lease expires
+        available_at: Earliest time a queued report may be claimed (None when not queued)
     """
     
     __tablename__ = "analytics_reports"
@@ -97,9 +104,14 @@ class AnalyticsReport(BaseModel):
     file_path = Column(String(500), nullable=True, comment="Path to the generated report file")
     file_size = Column(String(20), nullable=True, comment="Size of the generated report file")
     generated_by = Column(UUIDType(), nullable=False, comment="User who generated the report")  # ForeignKey("users.id") - temporarily disabled
+    started_at = Column(DateTime, nullable=True, comment="When generation last started")
     generated_at = Column(DateTime, nullable=True, comment="When the report was generated")
     error_message = Column(Text, nullable=True, comment="Error message if generation failed")
     report_metadata = Column(JSON, nullable=True, comment="Additional metadata about the report")
+    attempts = Column(Integer, nullable=False, default=0, comment="Generation attempts made by report workers")
+    lease_owner = Column(String(100), nullable=True, comment="Worker holding the generation lease")
+    lease_expires_at = Column(DateTime, nullable=True, comment="When the generation lease expires")
+    available_at = Column(DateTime, nullable=True, comment="Earliest time a queued report may be claimed")
     
     # Relationships
     generated_by_user = relationship("User", back_populates="generated_reports", lazy="select")
@@ -111,6 +123,7 @@ class AnalyticsReport(BaseModel):
         Index('idx_analytics_report_generated_by', 'generated_by'),
         Index('idx_analytics_report_generated_at', 'generated_at'),
         Index('idx_analytics_report_date_range', 'start_date', 'end_date'),
+        Index('idx_analytics_report_queue', 'report_status', 'available_at'),
 # Removed is_active index - column is inherited from BaseModel
     )
     
@@ -150,6 +163,7 @@ class AnalyticsReport(BaseModel):
         self.filters = filters or {}
         self.parameters = parameters or {}
         self.report_status = ReportStatus.PENDING.value
+        self.attempts = 0
         self._validate()
     
     def _validate(self):
@@ -169,16 +183,32 @@ class AnalyticsReport(BaseModel):
         if self.start_date and self.end_date and self.start_date > self.end_date:
             raise ValueError("Start date cannot be after end date")
     
+    def queue_generation(self):
+        """Queue the report for a background worker."""
+        self.report_status = ReportStatus.PENDING.value
+        self.attempts = 0
+        self.lease_owner = None
+        self.lease_expires_at = None
+        self.available_at = datetime.utcnow()
+        self.error_message = None
+    
+    def is_queued(self) -> bool:
+        """Check if the report is waiting for or held by a worker."""
+        return self.available_at is not None and self.report_status in (
+            ReportStatus.PENDING.value, ReportStatus.GENERATING.value
+        )
+    
     def start_generation(self):
         """Start report generation."""
         self.report_status = ReportStatus.GENERATING.value
-        self.generated_at = datetime.utcnow()
+        self.started_at = datetime.utcnow()
     
     def complete_generation(self, file_path: str, file_size: int):
         """Complete report generation."""
         self.report_status = ReportStatus.COMPLETED.value
         self.file_path = file_path
         self.file_size = str(file_size)
+        self.generated_at = datetime.utcnow()
         self.error_message = None
     
     def fail_generation(self, error_message: str):
@@ -543,4 +573,49 @@ class SystemAlert(BaseModel):
             f"SystemAlert(id={self.id}, name='{self.alert_name}', "
             f"severity='{self.severity}', status='{self.status}', "
             f"active={self.is_active})"
-        )
\ No newline at end of file
+        )
+
+
+# Dashboard rollups, maintained on every flush by app.modules.analytics.rollups.
+# Nullable dimensions are stored as sentinels (see rollups.UNASSIGNED and
+# rollups.NO_DUE_DATE) so every key column can be part of the primary key.
+
+rollup_daily_location_table = Table(
+    'rollup_daily_location',
+    BaseModel.metadata,
+    Column('fact_date', Date, primary_key=True),
+    Column('location_id', UUIDType(), primary_key=True),
+    Column('status', String(20), primary_key=True),
+    Column('transaction_count', Integer, nullable=False, default=0),
+    Column('revenue', Numeric(15, 2), nullable=False, default=0),
+    Column('rental_count', Integer, nullable=False, default=0),
+)
+
+rollup_rental_status_table = Table(
+    'rollup_rental_status',
+    BaseModel.metadata,
+    Column('location_id', UUIDType(), primary_key=True),
+    Column('status', String(20), primary_key=True),
+    Column('rental_count', Integer, nullable=False, default=0),
+)
+
+rollup_return_due_table = Table(
+    'rollup_return_due',
+    BaseModel.metadata,
+    Column('location_id', UUIDType(), primary_key=True),
+    Column('due_date', Date, primary_key=True),
+    Column('return_status', String(20), primary_key=True),
+    Column('return_count', Integer, nullable=False, default=0),
+    Column('late_fees', Numeric(15, 2), nullable=False, default=0),
+    Column('damage_fees', Numeric(15, 2), nullable=False, default=0),
+    Index('idx_rollup_return_due_date', 'due_date', 'return_status'),
+)
+
+rollup_category_inventory_table = Table(
+    'rollup_category_inventory',
+    BaseModel.metadata,
+    Column('category_id', UUIDType(), primary_key=True),
+    Column('location_id', UUIDType(), primary_key=True),
+    Column('status', String(20), primary_key=True),
+    Column('unit_count', Integer, nullable=False, default=0),
+)
@@ -0,0 +1,449 @@
+"""
+Streaming report pipeline.
+
+Rows are read from a server-side cursor in batches, turned into plain dicts
+by a per-report-type row mapper and handed to a format writer. Each batch is
+written in a worker thread while the next one is fetched, so memory holds at
+most two batches whatever the report size and file I/O never runs on the
+event loop. Progress and row counts are written back onto the report as the
+pipeline runs.
+"""
+
+import asyncio
+import csv
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.modules.analytics.models import AnalyticsReport, BusinessMetric, ReportFormat, ReportType
+from app.modules.analytics.schemas import ReportGenerationRequest
+from app.modules.customers.models import Customer
+from app.modules.inventory.models import InventoryUnit
+from app.modules.rentals.models import RentalReturn
+from app.modules.transactions.models import TransactionHeader, TransactionType
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pyarrow = None
+    PYARROW_AVAILABLE = False
+
+
+Row = Dict[str, Any]
+
+
+class ReportSource(NamedTuple):
+    """Query and row mapper behind one report type."""
+    fields: List[str]
+    numeric_fields: FrozenSet[str]
+    query: Callable[[ReportGenerationRequest], Any]
+    mapper: Callable[[Any], Row]
+
+
+def _number(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _text(value: Any) -> Optional[str]:
+    return str(value) if value is not None else None
+
+
+def _iso(value: Any) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _date_range(column, request: ReportGenerationRequest, as_date: bool = False) -> List[Any]:
+    """Conditions restricting column to the requested date range."""
+    conditions = []
+    if request.start_date:
+        conditions.append(column >= (request.start_date.date() if as_date else request.start_date))
+    if request.end_date:
+        conditions.append(column <= (request.end_date.date() if as_date else request.end_date))
+    return conditions
+
+
+def _sales_query(request: ReportGenerationRequest):
+    t = TransactionHeader.__table__
+    return select(
+        t.c.id, t.c.transaction_date, t.c.customer_id, t.c.total_amount, t.c.status
+    ).where(
+        and_(t.c.is_active == True, t.c.transaction_type == TransactionType.SALE.value,
+             *_date_range(t.c.transaction_date, request))
+    ).order_by(t.c.transaction_date, t.c.id)
+
+
+def _sales_row(row) -> Row:
+    return {
+        'transaction_id': _text(row.id),
+        'transaction_date': _iso(row.transaction_date),
+        'customer_id': _text(row.customer_id),
+        'total_amount': _number(row.total_amount),
+        'status': row.status
+    }
+
+
+def _rentals_query(request: ReportGenerationRequest):
+    t = RentalReturn.__table__
+    return select(
+        t.c.id, t.c.return_date, t.c.return_type, t.c.return_status,
+        t.c.total_late_fee, t.c.total_damage_fee, t.c.total_refund_amount
+    ).where(
+        and_(t.c.is_active == True, *_date_range(t.c.return_date, request, as_date=True))
+    ).order_by(t.c.return_date, t.c.id)
+
+
+def _rentals_row(row) -> Row:
+    return {
+        'return_id': _text(row.id),
+        'return_date': _iso(row.return_date),
+        'return_type': row.return_type,
+        'status': row.return_status,
+        'total_late_fee': _number(row.total_late_fee),
+        'total_damage_fee': _number(row.total_damage_fee),
+        'total_refund': _number(row.total_refund_amount)
+    }
+
+
+def _inventory_query(request: ReportGenerationRequest):
+    t = InventoryUnit.__table__
+    return select(
+        t.c.id, t.c.unit_code, t.c.item_id, t.c.status, t.c.condition, t.c.location_id, t.c.purchase_price
+    ).where(t.c.is_active == True).order_by(t.c.unit_code, t.c.id)
+
+
+def _inventory_row(row) -> Row:
+    return {
+        'unit_id': _text(row.id),
+        'unit_code': row.unit_code,
+        'item_id': _text(row.item_id),
+        'status': row.status,
+        'condition': row.condition,
+        'location_id': _text(row.location_id),
+        'purchase_price': _number(row.purchase_price)
+    }
+
+
+def _customer_query(request: ReportGenerationRequest):
+    t = Customer.__table__
+    return select(
+        t.c.id, t.c.customer_code, t.c.customer_type, t.c.business_name, t.c.first_name, t.c.last_name,
+        t.c.customer_tier, t.c.blacklist_status, t.c.credit_limit, t.c.lifetime_value
+    ).where(t.c.is_active == True).order_by(t.c.customer_code, t.c.id)
+
+
+def _customer_row(row) -> Row:
+    name = row.business_name or " ".join(part for part in (row.first_name, row.last_name) if part)
+    return {
+        'customer_id': _text(row.id),
+        'customer_code': row.customer_code,
+        'customer_name': name,
+        'customer_type': row.customer_type,
+        'tier': row.customer_tier,
+        'status': row.blacklist_status,
+        'credit_limit': _number(row.credit_limit),
+        'lifetime_value': _number(row.lifetime_value)
+    }
+
+
+def _financial_query(request: ReportGenerationRequest):
+    t = TransactionHeader.__table__
+    return select(
+        t.c.id, t.c.transaction_date, t.c.transaction_type, t.c.total_amount, t.c.tax_amount, t.c.discount_amount
+    ).where(
+        and_(t.c.is_active == True, *_date_range(t.c.transaction_date, request))
+    ).order_by(t.c.transaction_date, t.c.id)
+
+
+def _financial_row(row) -> Row:
+    return {
+        'transaction_id': _text(row.id),
+        'transaction_date': _iso(row.transaction_date),
+        'transaction_type': row.transaction_type,
+        'total_amount': _number(row.total_amount),
+        'tax_amount': _number(row.tax_amount),
+        'discount_amount': _number(row.discount_amount),
+        'net_amount': _number(row.total_amount - row.tax_amount)
+    }
+
+
+def _performance_query(request: ReportGenerationRequest):
+    t = BusinessMetric.__table__
+    return select(
+        t.c.id, t.c.metric_name, t.c.metric_type, t.c.category, t.c.current_value, t.c.target_value, t.c.tracked_date
+    ).where(t.c.is_active == True).order_by(t.c.metric_name, t.c.id)
+
+
+def _performance_row(row) -> Row:
+    return {
+        'metric_id': _text(row.id),
+        'metric_name': row.metric_name,
+        'metric_type': row.metric_type,
+        'category': row.category,
+        'current_value': _number(row.current_value),
+        'target_value': _number(row.target_value),
+        'tracked_date': _iso(row.tracked_date)
+    }
+
+
+def _source(query, mapper, fields: List[str], numeric_fields: List[str]) -> ReportSource:
+    return ReportSource(fields, frozenset(numeric_fields), query, mapper)
+
+
+REPORT_SOURCES: Dict[str, ReportSource] = {
+    ReportType.SALES.value: _source(
+        _sales_query, _sales_row,
+        ['transaction_id', 'transaction_date', 'customer_id', 'total_amount', 'status'],
+        ['total_amount']
+    ),
+    ReportType.RENTALS.value: _source(
+        _rentals_query, _rentals_row,
+        ['return_id', 'return_date', 'return_type', 'status', 'total_late_fee', 'total_damage_fee', 'total_refund'],
+        ['total_late_fee', 'total_damage_fee', 'total_refund']
+    ),
+    ReportType.INVENTORY.value: _source(
+        _inventory_query, _inventory_row,
+        ['unit_id', 'unit_code', 'item_id', 'status', 'condition', 'location_id', 'purchase_price'],
+        ['purchase_price']
+    ),
+    ReportType.CUSTOMER.value: _source(
+        _customer_query, _customer_row,
+        ['customer_id', 'customer_code', 'customer_name', 'customer_type', 'tier', 'status',
+         'credit_limit', 'lifetime_value'],
+        ['credit_limit', 'lifetime_value']
+    ),
+    ReportType.FINANCIAL.value: _source(
+        _financial_query, _financial_row,
+        ['transaction_id', 'transaction_date', 'transaction_type', 'total_amount', 'tax_amount',
+         'discount_amount', 'net_amount'],
+        ['total_amount', 'tax_amount', 'discount_amount', 'net_amount']
+    ),
+    ReportType.PERFORMANCE.value: _source(
+        _performance_query, _performance_row,
+        ['metric_id', 'metric_name', 'metric_type', 'category', 'current_value', 'target_value', 'tracked_date'],
+        ['current_value', 'target_value']
+    ),
+}
+
+
+class ReportWriter:
+    """
+    Incremental report file writer.
+
+    ``open``, ``write`` and ``close`` are blocking and are called from a
+    worker thread, one at a time and in order.
+    """
+
+    def __init__(self, path: str, source: Optional[ReportSource], header: Dict[str, Any]):
+        self.path = path
+        self.fields = source.fields if source else []
+        self.numeric_fields = source.numeric_fields if source else frozenset()
+        self.header = header
+        self._file = None
+
+    def open(self):
+        self._file = open(self.path, 'w', newline='', encoding='utf-8')
+
+    def write(self, rows: List[Row]):
+        raise NotImplementedError
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def abort(self):
+        """Close and remove a partially written file."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class JSONReportWriter(ReportWriter):
+    """Single JSON document: the report header with rows streamed into ``data``."""
+
+    def open(self):
+        super().open()
+        header = json.dumps(dict(self.header, data=[]), default=str)
+        # Everything up to the empty array, so rows can be appended inside it
+        self._file.write(header[:header.rindex('[') + 1])
+        self._first = True
+
+    def write(self, rows: List[Row]):
+        for row in rows:
+            if not self._first:
+                self._file.write(',')
+            self._first = False
+            self._file.write(json.dumps(row, default=str))
+
+    def close(self):
+        if self._file is not None:
+            self._file.write(']}')
+        super().close()
+
+
+class NDJSONReportWriter(ReportWriter):
+    """One JSON object per line."""
+
+    def write(self, rows: List[Row]):
+        self._file.writelines(json.dumps(row, default=str) + '\n' for row in rows)
+
+
+class CSVReportWriter(ReportWriter):
+    """CSV with a header row taken from the report source fields."""
+
+    def open(self):
+        super().open()
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fields, extrasaction='ignore')
+        self._writer.writeheader()
+
+    def write(self, rows: List[Row]):
+        self._writer.writerows(rows)
+
+
+class ParquetReportWriter(ReportWriter):
+    """Parquet file with one row group per batch (requires pyarrow)."""
+
+    def open(self):
+        if not PYARROW_AVAILABLE:
+            raise ValueError("PARQUET reports require pyarrow to be installed")
+        self._schema = pyarrow.schema([
+            (name, pyarrow.float64() if name in self.numeric_fields else pyarrow.string())
+            for name in self.fields
+        ])
+        self._writer = pyarrow.parquet.ParquetWriter(self.path, self._schema)
+
+    def write(self, rows: List[Row]):
+        self._writer.write_table(pyarrow.Table.from_pylist(rows, schema=self._schema))
+
+    def close(self):
+        if getattr(self, '_writer', None) is not None:
+            self._writer.close()
+            self._writer = None
+
+
+REPORT_WRITERS = {
+    ReportFormat.JSON.value: (JSONReportWriter, 'json'),
+    ReportFormat.NDJSON.value: (NDJSONReportWriter, 'ndjson'),
+    ReportFormat.CSV.value: (CSVReportWriter, 'csv'),
+    ReportFormat.PARQUET.value: (ParquetReportWriter, 'parquet'),
+    # PDF and Excel renderers are not available yet; they get the JSON document
+    ReportFormat.PDF.value: (JSONReportWriter, 'pdf'),
+    ReportFormat.EXCEL.value: (JSONReportWriter, 'excel'),
+}
+
+
+class ReportPipeline:
+    """Streams a report's rows from the database into its output file."""
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        reports_dir: str = settings.REPORTS_DIR,
+        batch_size: int = settings.REPORT_BATCH_SIZE,
+        progress_interval: float = settings.REPORT_PROGRESS_INTERVAL
+    ):
+        self.session = session
+        self.reports_dir = reports_dir
+        self.batch_size = batch_size
+        self.progress_interval = progress_interval
+
+    async def count_rows(self, source: ReportSource, request: ReportGenerationRequest) -> int:
+        """Number of rows the report will contain."""
+        query = source.query(request).order_by(None).subquery()
+        return (await self.session.execute(select(func.count()).select_from(query))).scalar() or 0
+
+    async def stream_rows(self, source: ReportSource, request: ReportGenerationRequest) -> AsyncIterator[List[Row]]:
+        """
+        Yield mapped rows in batches from a server-side cursor.
+
+        The cursor lives on its own connection so the session stays free to
+        commit progress updates while rows are being read.
+        """
+        statement = source.query(request).execution_options(yield_per=self.batch_size)
+        async with self.session.bind.connect() as connection:
+            result = await connection.stream(statement)
+            async for partition in result.partitions(self.batch_size):
+                yield [source.mapper(row) for row in partition]
+
+    async def _report_progress(self, report: AnalyticsReport, rows_written: int, total_rows: int):
+        progress = round(rows_written / total_rows * 100, 1) if total_rows else 100.0
+        report.report_metadata = dict(
+            report.report_metadata or {},
+            rows_written=rows_written,
+            total_rows=total_rows,
+            progress=min(progress, 100.0)
+        )
+        await self.session.commit()
+
+    def report_header(self, report: AnalyticsReport, request: ReportGenerationRequest) -> Dict[str, Any]:
+        return {
+            'report_name': report.report_name,
+            'report_type': report.report_type,
+            'generated_at': datetime.utcnow().isoformat(),
+            'date_range': {
+                'start': request.start_date.isoformat() if request.start_date else None,
+                'end': request.end_date.isoformat() if request.end_date else None
+            },
+            'filters': request.filters or {}
+        }
+
+    async def run(self, report: AnalyticsReport, request: ReportGenerationRequest) -> Tuple[str, int]:
+        """
+        Generate the report file.
+
+        Returns:
+            (file path, file size in bytes)
+        """
+        writer_class, extension = REPORT_WRITERS[report.report_format]
+        source = REPORT_SOURCES.get(report.report_type)
+
+        os.makedirs(self.reports_dir, exist_ok=True)
+        # One file per attempt, so a worker that lost its lease never touches its successor's file
+        file_path = os.path.join(
+            self.reports_dir, f"{report.report_name}_{report.id}_{report.attempts}.{extension}"
+        )
+        writer = writer_class(file_path, source, self.report_header(report, request))
+
+        total_rows = await self.count_rows(source, request) if source else 0
+        rows_written = 0
+        await self._report_progress(report, rows_written, total_rows)
+
+        pending = None
+        try:
+            await asyncio.to_thread(writer.open)
+            if source:
+                last_progress = time.monotonic()
+                async for batch in self.stream_rows(source, request):
+                    # Fetch the next batch while this one is being written
+                    if pending is not None:
+                        await pending
+                    pending = asyncio.ensure_future(asyncio.to_thread(writer.write, batch))
+                    rows_written += len(batch)
+                    if time.monotonic() - last_progress >= self.progress_interval:
+                        await self._report_progress(report, rows_written, total_rows)
+                        last_progress = time.monotonic()
+                if pending is not None:
+                    await pending
+                    pending = None
+            await asyncio.to_thread(writer.close)
+        except BaseException:
+            if pending is not None:
+                await asyncio.gather(pending, return_exceptions=True)
+            await asyncio.to_thread(writer.abort)
+            raise
+
+        report.report_metadata = dict(
+            report.report_metadata or {},
+            rows_written=rows_written,
+            total_rows=rows_written,
+            progress=100.0
+        )
+        return file_path, os.path.getsize(file_path)
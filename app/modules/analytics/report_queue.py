@@ -0,0 +1,338 @@
+"""
+Background report generation queue.
+
+The ``analytics_reports`` table is the queue: a report is queued when it has
+``available_at`` set and is PENDING. Workers claim one report at a time with
+``SELECT ... FOR UPDATE SKIP LOCKED`` followed by a conditional UPDATE (so
+the claim is also atomic on SQLite, which has no row locks) and hold a lease
+that they renew while generating. Reports whose lease expires are reclaimed
+by another worker; failures are retried with exponential backoff up to a
+maximum number of attempts. Completion is fenced by the lease: a worker
+that lost its lease cannot mark the report COMPLETED, and its file is
+discarded. Per-type concurrency limits are enforced
+cluster-wide from the live leases at claim time; claims of a limited type
+are serialized (a transaction-scoped advisory lock per type on PostgreSQL,
+the database write lock on SQLite) so that two workers cannot both see the
+last free slot.
+"""
+
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.modules.analytics.models import AnalyticsReport, ReportStatus
+
+
+reports = AnalyticsReport.__table__
+
+
+class ReportJobQueue:
+    """Leasing operations on queued analytics reports."""
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        lease_seconds: int = settings.REPORT_JOB_LEASE_SECONDS,
+        max_attempts: int = settings.REPORT_JOB_MAX_ATTEMPTS,
+        retry_backoff: float = settings.REPORT_JOB_RETRY_BACKOFF,
+        type_limits: Optional[Dict[str, int]] = None
+    ):
+        self.session_factory = session_factory
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.type_limits = settings.REPORT_TYPE_CONCURRENCY if type_limits is None else type_limits
+
+    def _claimable(self, now: datetime):
+        """Queued reports that are due, or whose worker lost its lease."""
+        return and_(
+            reports.c.is_active == True,
+            reports.c.available_at.isnot(None),
+            or_(
+                and_(reports.c.report_status == ReportStatus.PENDING.value, reports.c.available_at <= now),
+                and_(
+                    reports.c.report_status == ReportStatus.GENERATING.value,
+                    reports.c.lease_expires_at < now,
+                    reports.c.attempts < self.max_attempts
+                )
+            )
+        )
+
+    @staticmethod
+    def _running(now: datetime):
+        """Reports whose worker still holds a live lease."""
+        return and_(
+            reports.c.report_status == ReportStatus.GENERATING.value,
+            reports.c.lease_expires_at >= now
+        )
+
+    async def _saturated_types(self, session, now: datetime) -> List[str]:
+        """Report types already at their concurrency limit."""
+        if not self.type_limits:
+            return []
+        result = await session.execute(
+            select(reports.c.report_type, func.count())
+            .where(self._running(now))
+            .group_by(reports.c.report_type)
+        )
+        return [
+            report_type for report_type, running in result
+            if report_type in self.type_limits and running >= self.type_limits[report_type]
+        ]
+
+    async def _has_free_slot(self, session: AsyncSession, report_type: str, now: datetime) -> bool:
+        """
+        Hold the claim lock of a limited report type and check it is below its limit.
+
+        The lock lasts until the claiming transaction ends, so the count
+        includes every claim committed before it. SQLite needs no extra lock:
+        the claim's first UPDATE already holds the database write lock.
+        """
+        if report_type not in self.type_limits:
+            return True
+        if (await session.connection()).dialect.name == "postgresql":
+            await session.execute(select(func.pg_advisory_xact_lock(
+                func.hashtext(f"analytics_report_type:{report_type}")
+            )))
+        running = (await session.execute(
+            select(func.count()).where(and_(self._running(now), reports.c.report_type == report_type))
+        )).scalar()
+        return running < self.type_limits[report_type]
+
+    async def _expire_abandoned(self, session, now: datetime):
+        """Fail reports whose last allowed attempt lost its lease."""
+        await session.execute(
+            update(reports)
+            .where(and_(
+                reports.c.report_status == ReportStatus.GENERATING.value,
+                reports.c.available_at.isnot(None),
+                reports.c.lease_expires_at < now,
+                reports.c.attempts >= self.max_attempts
+            ))
+            .values(
+                report_status=ReportStatus.FAILED.value,
+                error_message="Worker lease expired on the final attempt",
+                lease_owner=None,
+                lease_expires_at=None,
+                available_at=None
+            )
+        )
+
+    async def claim(self, worker_id: str) -> Optional[UUID]:
+        """Lease the next due report to worker_id, or return None if there is none."""
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            async with session.begin():
+                await self._expire_abandoned(session, now)
+                claimable = self._claimable(now)
+                saturated = await self._saturated_types(session, now)
+                if saturated:
+                    claimable = and_(claimable, reports.c.report_type.notin_(saturated))
+
+                candidate = (await session.execute(
+                    select(reports.c.id, reports.c.report_type)
+                    .where(claimable)
+                    .order_by(reports.c.available_at, reports.c.created_at)
+                    .limit(1)
+                    .with_for_update(skip_locked=True)
+                )).first()
+                if candidate is None:
+                    return None
+                report_id, report_type = candidate
+                # Another worker took the last slot after the saturation check; the
+                # next poll skips the type. Moving on to another type here would
+                # hold two type locks at once and could deadlock.
+                if not await self._has_free_slot(session, report_type, now):
+                    return None
+
+                result = await session.execute(
+                    update(reports)
+                    .where(and_(reports.c.id == report_id, claimable))
+                    .values(
+                        report_status=ReportStatus.GENERATING.value,
+                        lease_owner=worker_id,
+                        lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                        attempts=reports.c.attempts + 1,
+                        started_at=now
+                    )
+                )
+                return report_id if result.rowcount == 1 else None
+
+    async def heartbeat(self, report_id: UUID, worker_id: str) -> bool:
+        """Extend the lease; False means the worker no longer holds it."""
+        async with self.session_factory() as session:
+            async with session.begin():
+                result = await session.execute(
+                    update(reports)
+                    .where(self._held_by(report_id, worker_id))
+                    .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+                )
+                return result.rowcount == 1
+
+    async def complete(self, report_id: UUID, worker_id: str, file_path: str, file_size: int) -> bool:
+        """
+        Mark a generated report COMPLETED and drop it from the queue.
+
+        Returns False, leaving the report untouched, if worker_id no longer
+        holds the lease.
+        """
+        async with self.session_factory() as session:
+            async with session.begin():
+                result = await session.execute(
+                    update(reports)
+                    .where(self._held_by(report_id, worker_id))
+                    .values(
+                        report_status=ReportStatus.COMPLETED.value,
+                        file_path=file_path,
+                        file_size=str(file_size),
+                        generated_at=datetime.utcnow(),
+                        error_message=None,
+                        lease_owner=None,
+                        lease_expires_at=None,
+                        available_at=None
+                    )
+                )
+                return result.rowcount == 1
+
+    async def fail(self, report_id: UUID, worker_id: str, error_message: str) -> bool:
+        """
+        Record a failed attempt.
+
+        The report is queued again after a backoff while attempts remain and
+        marked FAILED otherwise. Returns True if it will be retried.
+        """
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            async with session.begin():
+                attempts = (await session.execute(
+                    select(reports.c.attempts).where(reports.c.id == report_id)
+                )).scalar() or 0
+                retry = attempts < self.max_attempts
+                values = dict(error_message=error_message, lease_owner=None, lease_expires_at=None)
+                if retry:
+                    values.update(
+                        report_status=ReportStatus.PENDING.value,
+                        available_at=now + timedelta(seconds=self.retry_backoff * 2 ** max(0, attempts - 1))
+                    )
+                else:
+                    values.update(report_status=ReportStatus.FAILED.value, available_at=None)
+                await session.execute(
+                    update(reports).where(and_(reports.c.id == report_id, reports.c.lease_owner == worker_id)).values(**values)
+                )
+                return retry
+
+    def _held_by(self, report_id: UUID, worker_id: str):
+        return and_(
+            reports.c.id == report_id,
+            reports.c.lease_owner == worker_id,
+            reports.c.report_status == ReportStatus.GENERATING.value
+        )
+
+
+class ReportWorker:
+    """
+    Runs up to ``concurrency`` report jobs at a time from a ReportJobQueue.
+
+    ``handler`` generates one report (by ID), returns its (file path, file
+    size) and raises on failure.
+    """
+
+    def __init__(
+        self,
+        queue: ReportJobQueue,
+        handler: Callable[[UUID], Awaitable[Tuple[str, int]]],
+        concurrency: int = settings.REPORT_WORKER_CONCURRENCY,
+        poll_interval: float = settings.REPORT_WORKER_POLL_INTERVAL,
+        worker_id: Optional[str] = None
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stopping = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    async def run_once(self) -> bool:
+        """Claim and process a single report. Returns False if none was due."""
+        report_id = await self.queue.claim(self.worker_id)
+        if report_id is None:
+            return False
+
+        heartbeat = asyncio.create_task(self._heartbeat(report_id))
+        try:
+            file_path, file_size = await self.handler(report_id)
+        except Exception as e:
+            print(f"Report job {report_id} failed: {str(e)}")
+            await self.queue.fail(report_id, self.worker_id, str(e))
+        else:
+            if not await self.queue.complete(report_id, self.worker_id, file_path, file_size):
+                # The lease expired and another worker owns the report now
+                print(f"Report job {report_id} lost its lease; discarding {file_path}")
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+        finally:
+            heartbeat.cancel()
+        return True
+
+    async def _heartbeat(self, report_id: UUID):
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                if not await self.queue.heartbeat(report_id, self.worker_id):
+                    return
+            except Exception as e:
+                print(f"Report job heartbeat error: {str(e)}")
+
+    async def _slot(self):
+        while not self._stopping.is_set():
+            try:
+                if await self.run_once():
+                    continue
+            except Exception as e:
+                print(f"Report worker error: {str(e)}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self):
+        """Process reports until stop() is called."""
+        self.start()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def start(self):
+        """Run the worker in the background of the current event loop."""
+        if not self._tasks or all(task.done() for task in self._tasks):
+            self._stopping.clear()
+            self._tasks = [asyncio.create_task(self._slot()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        """Stop claiming new reports and wait for running ones to finish."""
+        self._stopping.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+async def generate_report_job(report_id: UUID) -> Tuple[str, int]:
+    """Default worker handler: generate a claimed report in its own session."""
+    from app.db.session import AsyncSessionLocal
+    from app.modules.analytics.service import AnalyticsService
+
+    async with AsyncSessionLocal() as session:
+        return await AnalyticsService(session).run_report_job(report_id)
+
+
+def create_report_worker(**kwargs) -> ReportWorker:
+    """Worker bound to the application database."""
+    from app.db.session import AsyncSessionLocal
+
+    return ReportWorker(ReportJobQueue(AsyncSessionLocal), generate_report_job, **kwargs)
@@ -1,6 +1,7 @@
+import asyncio
 from typing import Optional, List, Dict, Any
 from uuid import UUID
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from decimal import Decimal
 from sqlalchemy import and_, or_, func, select, update, delete, desc, asc
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -236,6 +237,7 @@ class BusinessMetricRepository:
             unit=metric_data.unit,
             calculation_method=metric_data.calculation_method
         )
+        metric.metric_metadata = metric_data.metric_metadata
         
         self.session.add(metric)
         await self.session.commit()
@@ -402,6 +404,17 @@ class BusinessMetricRepository:
         result = await self.session.execute(query)
         return result.scalars().all()
     
+    async def count_metrics(self, with_targets: bool = False, meeting_targets: bool = False) -> int:
+        """Count active metrics, optionally only those with (met) targets."""
+        conditions = [BusinessMetric.is_active == True]
+        if with_targets or meeting_targets:
+            conditions.append(BusinessMetric.target_value.is_not(None))
+        if meeting_targets:
+            conditions.append(BusinessMetric.current_value >= BusinessMetric.target_value)
+        
+        result = await self.session.execute(select(func.count(BusinessMetric.id)).where(and_(*conditions)))
+        return result.scalar()
+    
     async def get_metric_history(self, metric_name: str, limit: int = 30) -> List[BusinessMetric]:
         """Get metric history by name."""
         query = select(BusinessMetric).where(
@@ -646,4 +659,243 @@ class SystemAlertRepository:
             'resolved_alerts': resolved_alerts,
             'alerts_by_severity': severity_counts,
             'alerts_by_status': status_counts
-        }
\ No newline at end of file
+        }
+
+class KeyMetricsRepository:
+    """
+    Pushed-down aggregates behind the key business metrics.
+    
+    Each source table is reduced to a handful of SUM/COUNT ... FILTER
+    components in a single statement over active rows. In incremental mode
+    only rows whose ``updated_at`` is past the previous watermark are read:
+    rows created since then are folded into the stored components, and if any
+    older row changed (update or soft delete) that source is recomputed in
+    full so the result stays exact. The watermark is taken at the start of
+    the run from the clock rows are stamped with (``datetime.utcnow()`` in
+    the ORM listeners), not the database clock, so skew between the two
+    cannot hide rows; a periodic full run also picks up rows from
+    transactions that were still open at that moment.
+    """
+    
+    def __init__(self, session: AsyncSession):
+        self.session = session
+    
+    @staticmethod
+    def _sources() -> Dict[str, Any]:
+        """Source tables and their aggregate components."""
+        from app.modules.transactions.models import TransactionHeader, TransactionType
+        from app.modules.customers.models import Customer
+        from app.modules.inventory.models import InventoryUnit, InventoryUnitStatus
+        from app.modules.rentals.models import RentalReturn
+        
+        transactions = TransactionHeader.__table__
+        customers = Customer.__table__
+        units = InventoryUnit.__table__
+        returns = RentalReturn.__table__
+        
+        return {
+            "transactions": (transactions, {
+                "revenue": lambda where: func.coalesce(func.sum(transactions.c.total_amount).filter(where), 0),
+                "rental_transactions": lambda where: func.count().filter(
+                    and_(where, transactions.c.transaction_type == TransactionType.RENTAL.value)
+                ),
+            }),
+            "customers": (customers, {
+                "customers": lambda where: func.count().filter(where),
+            }),
+            "inventory_units": (units, {
+                "units": lambda where: func.count().filter(where),
+                "rented_units": lambda where: func.count().filter(
+                    and_(where, units.c.status == InventoryUnitStatus.RENTED.value)
+                ),
+            }),
+            "rental_returns": (returns, {
+                "returns": lambda where: func.count().filter(where),
+            }),
+        }
+    
+    def _full_query(self, table, components: Dict[str, Any]):
+        """All components over the active rows of a table."""
+        active = table.c.is_active == True
+        return select(*[aggregate(active).label(name) for name, aggregate in components.items()])
+    
+    def _delta_query(self, table, components: Dict[str, Any], watermark: datetime):
+        """Components over rows created after the watermark, plus a count of older changed rows."""
+        new_rows = and_(table.c.is_active == True, table.c.created_at > watermark)
+        return select(
+            *[aggregate(new_rows).label(name) for name, aggregate in components.items()],
+            func.count().filter(table.c.created_at <= watermark).label("changed_existing")
+        ).where(table.c.updated_at > watermark)
+    
+    async def _execute(self, statements: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Run one-row statements, concurrently on separate connections where the driver allows."""
+        bind = self.session.bind
+        if bind is not None and bind.dialect.name == "postgresql" and len(statements) > 1:
+            async def run(statement):
+                async with bind.connect() as connection:
+                    return (await connection.execute(statement)).mappings().one()
+            
+            rows = await asyncio.gather(*(run(statement) for statement in statements.values()))
+        else:
+            rows = [(await self.session.execute(statement)).mappings().one() for statement in statements.values()]
+        
+        return {name: dict(row) for name, row in zip(statements, rows)}
+    
+    async def aggregate(self, previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Compute metric components for every source.
+        
+        Args:
+            previous: State returned by an earlier call; enables incremental mode
+            
+        Returns:
+            State dict: {source: {"watermark": iso timestamp, "values": {component: value}, "mode": ...}}
+        """
+        previous = previous or {}
+        watermark_now = datetime.utcnow()
+        sources = self._sources()
+        
+        statements = {}
+        for name, (table, components) in sources.items():
+            state = previous.get(name)
+            if state and state.get("watermark") and set(state.get("values", {})) == set(components):
+                statements[name] = self._delta_query(table, components, datetime.fromisoformat(state["watermark"]))
+            else:
+                statements[name] = self._full_query(table, components)
+        
+        results = await self._execute(statements)
+        
+        # Sources with changed historical rows cannot be folded in; recompute them
+        stale = [name for name, row in results.items() if row.get("changed_existing")]
+        if stale:
+            results.update(await self._execute({
+                name: self._full_query(*sources[name]) for name in stale
+            }))
+        
+        state = {}
+        for name, row in results.items():
+            incremental = "changed_existing" in row
+            row.pop("changed_existing", None)
+            values = {component: Decimal(str(value or 0)) for component, value in row.items()}
+            if incremental:
+                for component, value in previous[name]["values"].items():
+                    values[component] += Decimal(str(value))
+            state[name] = {
+                "watermark": watermark_now.isoformat(),
+                "values": {component: str(value) for component, value in values.items()},
+                "mode": "incremental" if incremental else "full",
+            }
+        return state
+
+
+class DashboardRollupRepository:
+    """
+    Dashboard figures read from the rollup tables (see analytics.rollups).
+    
+    The rollups are keyed by location, day, status and category, so these
+    reads touch a number of rows bounded by those dimensions rather than by
+    the number of transactions, returns or units.
+    """
+    
+    def __init__(self, session: AsyncSession):
+        self.session = session
+    
+    async def get_rental_overview(self, today: Optional[date] = None) -> Dict[str, Any]:
+        """Active rentals, return due dates and outstanding fees."""
+        from app.modules.analytics.models import rollup_rental_status_table, rollup_return_due_table
+        from app.modules.rentals.models import ReturnStatus
+        from app.modules.transactions.models import TransactionStatus
+        
+        today = today or date.today()
+        rentals = rollup_rental_status_table
+        returns = rollup_return_due_table
+        
+        active_rentals = (await self.session.execute(
+            select(func.coalesce(func.sum(rentals.c.rental_count), 0))
+            .where(rentals.c.status == TransactionStatus.IN_PROGRESS.value)
+        )).scalar()
+        
+        open_return = returns.c.return_status.notin_([ReturnStatus.COMPLETED.value, ReturnStatus.CANCELLED.value])
+        count = lambda condition: func.coalesce(func.sum(returns.c.return_count).filter(condition), 0)
+        row = (await self.session.execute(
+            select(
+                count(returns.c.due_date < today).label("overdue_returns"),
+                count(returns.c.due_date == today).label("returns_due_today"),
+                count(and_(returns.c.due_date >= today, returns.c.due_date <= today + timedelta(days=7))).label("returns_due_this_week"),
+                func.coalesce(func.sum(returns.c.late_fees + returns.c.damage_fees), 0).label("total_outstanding_fees")
+            ).where(open_return)
+        )).mappings().one()
+        
+        return {
+            'active_rentals': int(active_rentals or 0),
+            'overdue_returns': int(row['overdue_returns']),
+            'returns_due_today': int(row['returns_due_today']),
+            'returns_due_this_week': int(row['returns_due_this_week']),
+            'total_outstanding_fees': Decimal(str(row['total_outstanding_fees']))
+        }
+    
+    async def get_inventory_overview(self) -> Dict[str, Any]:
+        """Unit counts by status and fleet utilisation."""
+        from app.modules.analytics.models import rollup_category_inventory_table
+        from app.modules.inventory.models import InventoryUnitStatus
+        
+        inventory = rollup_category_inventory_table
+        result = await self.session.execute(
+            select(inventory.c.status, func.sum(inventory.c.unit_count)).group_by(inventory.c.status)
+        )
+        by_status = {status: int(count or 0) for status, count in result}
+        
+        total_units = sum(by_status.values())
+        rented_units = by_status.get(InventoryUnitStatus.RENTED.value, 0)
+        in_fleet = total_units - sum(
+            by_status.get(status.value, 0)
+            for status in (InventoryUnitStatus.SOLD, InventoryUnitStatus.RETIRED)
+        )
+        utilization = (Decimal(rented_units) / in_fleet * 100).quantize(Decimal("0.01")) if in_fleet else Decimal("0")
+        
+        return {
+            'total_units': total_units,
+            'available_units': by_status.get(InventoryUnitStatus.AVAILABLE.value, 0),
+            'rented_units': rented_units,
+            'units_by_status': by_status,
+            'utilization_rate': utilization
+        }
+    
+    async def get_category_utilization(self) -> Dict[str, Dict[str, int]]:
+        """Unit counts by status for each category (UNASSIGNED for uncategorised items)."""
+        from app.modules.analytics.models import rollup_category_inventory_table
+        
+        inventory = rollup_category_inventory_table
+        result = await self.session.execute(
+            select(inventory.c.category_id, inventory.c.status, func.sum(inventory.c.unit_count))
+            .group_by(inventory.c.category_id, inventory.c.status)
+        )
+        categories: Dict[str, Dict[str, int]] = {}
+        for category_id, status, count in result:
+            if count:
+                categories.setdefault(str(category_id), {})[status] = int(count)
+        return categories
+    
+    async def get_revenue(
+        self,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        location_id: Optional[UUID] = None
+    ) -> Decimal:
+        """Revenue of transactions that were not drafted or cancelled."""
+        from app.modules.analytics.models import rollup_daily_location_table
+        from app.modules.transactions.models import TransactionStatus
+        
+        daily = rollup_daily_location_table
+        conditions = [daily.c.status.notin_([TransactionStatus.DRAFT.value, TransactionStatus.CANCELLED.value])]
+        if date_from:
+            conditions.append(daily.c.fact_date >= date_from)
+        if date_to:
+            conditions.append(daily.c.fact_date <= date_to)
+        if location_id:
+            conditions.append(daily.c.location_id == location_id)
+        
+        revenue = (await self.session.execute(
+            select(func.coalesce(func.sum(daily.c.revenue), 0)).where(and_(*conditions))
+        )).scalar()
+        return Decimal(str(revenue))
@@ -0,0 +1,442 @@
+"""
+Materialized dashboard rollups.
+
+The rental, inventory and analytics dashboards read small fact tables
+(``rollup_*`` in analytics.models) instead of scanning raw rows. Each rollup
+maps a source row to a (key, measures) fact; a flush listener computes the
+old and new fact of every inserted, updated or deleted row and adds the
+difference to the rollup with an upsert, in the same transaction as the
+write. ``rebuild_rollups`` recomputes the tables from scratch (backfill, or
+to correct drift):
+
+    python scripts/rebuild_rollups.py
+
+Writes that bypass the ORM flush must keep the rollups current themselves;
+see ``record_changes``.
+"""
+
+from collections import defaultdict
+from itertools import chain
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import Date, and_, delete, event, func, insert, inspect, literal, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.schema import Table
+
+from app.core.config import settings
+from app.core.errors import ConfigurationException
+from app.db.base import UUIDType
+from app.modules.analytics.models import (
+    rollup_category_inventory_table, rollup_daily_location_table,
+    rollup_rental_status_table, rollup_return_due_table
+)
+from app.modules.inventory.models import InventoryUnit, Item
+from app.modules.rentals.models import RentalReturn
+from app.modules.transactions.models import TransactionHeader, TransactionType
+
+
+# Sentinels for nullable dimensions
+UNASSIGNED = UUID(int=0)
+NO_DUE_DATE = date(9999, 12, 31)
+
+transactions = TransactionHeader.__table__
+returns = RentalReturn.__table__
+units = InventoryUnit.__table__
+items = Item.__table__
+
+
+class Rollup(NamedTuple):
+    """A rollup table and how source rows map onto it."""
+    table: Table
+    model: type
+    keys: Tuple[str, ...]
+    measures: Tuple[str, ...]
+    attributes: Tuple[str, ...]  # source attributes the fact reads
+    fact: Callable[[Dict[str, Any]], Optional[Tuple[tuple, tuple]]]
+    source: Callable[[], Any]  # rebuild query selecting keys then measures
+
+
+def _day(value) -> Optional[date]:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _uuid(value) -> Optional[UUID]:
+    if value is None or isinstance(value, UUID):
+        return value
+    return UUID(str(value))
+
+
+def _amount(value) -> Decimal:
+    return Decimal(str(value)) if value is not None else Decimal("0")
+
+
+def _daily_location_fact(row):
+    if not row.get("is_active"):
+        return None
+    is_rental = row.get("transaction_type") == TransactionType.RENTAL.value
+    return (
+        (_day(row["transaction_date"]), _uuid(row["location_id"]), row["status"]),
+        (1, _amount(row.get("total_amount")), 1 if is_rental else 0)
+    )
+
+
+def _daily_location_source():
+    fact_date = func.date(transactions.c.transaction_date, type_=Date)
+    return select(
+        fact_date,
+        transactions.c.location_id,
+        transactions.c.status,
+        func.count(),
+        func.coalesce(func.sum(transactions.c.total_amount), 0),
+        func.count().filter(transactions.c.transaction_type == TransactionType.RENTAL.value)
+    ).where(transactions.c.is_active == True).group_by(
+        fact_date, transactions.c.location_id, transactions.c.status
+    )
+
+
+def _rental_status_fact(row):
+    if not row.get("is_active") or row.get("transaction_type") != TransactionType.RENTAL.value:
+        return None
+    return (_uuid(row["location_id"]), row["status"]), (1,)
+
+
+def _rental_status_source():
+    return select(
+        transactions.c.location_id, transactions.c.status, func.count()
+    ).where(and_(
+        transactions.c.is_active == True,
+        transactions.c.transaction_type == TransactionType.RENTAL.value
+    )).group_by(transactions.c.location_id, transactions.c.status)
+
+
+def _return_due_fact(row):
+    if not row.get("is_active"):
+        return None
+    return (
+        (_uuid(row.get("return_location_id")) or UNASSIGNED, row.get("expected_return_date") or NO_DUE_DATE, row["return_status"]),
+        (1, _amount(row.get("total_late_fee")), _amount(row.get("total_damage_fee")))
+    )
+
+
+def _return_due_source():
+    location = func.coalesce(returns.c.return_location_id, literal(UNASSIGNED, UUIDType()))
+    due_date = func.coalesce(returns.c.expected_return_date, literal(NO_DUE_DATE, Date()))
+    return select(
+        location,
+        due_date,
+        returns.c.return_status,
+        func.count(),
+        func.coalesce(func.sum(returns.c.total_late_fee), 0),
+        func.coalesce(func.sum(returns.c.total_damage_fee), 0)
+    ).where(returns.c.is_active == True).group_by(location, due_date, returns.c.return_status)
+
+
+def _category_inventory_fact(row):
+    if not row.get("is_active"):
+        return None
+    return (_uuid(row.get("category_id")) or UNASSIGNED, _uuid(row["location_id"]), row["status"]), (1,)
+
+
+def _category_inventory_source():
+    category = func.coalesce(items.c.category_id, literal(UNASSIGNED, UUIDType()))
+    return select(
+        category, units.c.location_id, units.c.status, func.count()
+    ).select_from(
+        units.join(items, items.c.id == units.c.item_id)
+    ).where(units.c.is_active == True).group_by(category, units.c.location_id, units.c.status)
+
+
+ROLLUPS: Dict[str, Rollup] = {
+    "daily_location": Rollup(
+        rollup_daily_location_table, TransactionHeader,
+        ("fact_date", "location_id", "status"),
+        ("transaction_count", "revenue", "rental_count"),
+        ("is_active", "transaction_date", "location_id", "status", "transaction_type", "total_amount"),
+        _daily_location_fact, _daily_location_source
+    ),
+    "rental_status": Rollup(
+        rollup_rental_status_table, TransactionHeader,
+        ("location_id", "status"),
+        ("rental_count",),
+        ("is_active", "location_id", "status", "transaction_type"),
+        _rental_status_fact, _rental_status_source
+    ),
+    "return_due": Rollup(
+        rollup_return_due_table, RentalReturn,
+        ("location_id", "due_date", "return_status"),
+        ("return_count", "late_fees", "damage_fees"),
+        ("is_active", "return_location_id", "expected_return_date", "return_status", "total_late_fee", "total_damage_fee"),
+        _return_due_fact, _return_due_source
+    ),
+    "category_inventory": Rollup(
+        rollup_category_inventory_table, InventoryUnit,
+        ("category_id", "location_id", "status"),
+        ("unit_count",),
+        ("is_active", "item_id", "location_id", "status"),
+        _category_inventory_fact, _category_inventory_source
+    ),
+}
+
+
+# Item is tracked for category changes, which move its units between categories
+TRACKED_MODELS = tuple({rollup.model for rollup in ROLLUPS.values()} | {Item})
+
+# Tables whose rows the rollups are computed from
+SOURCE_TABLES = frozenset(model.__table__ for model in TRACKED_MODELS)
+
+Deltas = Dict[str, Dict[tuple, List[Any]]]
+
+
+def add_change(deltas: Deltas, name: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+    """Accumulate the fact difference between a row's old and new state (None = absent)."""
+    rollup = ROLLUPS[name]
+    for state, sign in ((old, -1), (new, 1)):
+        fact = rollup.fact(state) if state else None
+        if fact is None:
+            continue
+        key, measures = fact
+        current = deltas[name].setdefault(key, [0] * len(measures))
+        for i, value in enumerate(measures):
+            current[i] += sign * value
+
+
+def apply_deltas(connection: Connection, deltas: Deltas):
+    """Add accumulated deltas to the rollup tables."""
+    for name, by_key in deltas.items():
+        rollup = ROLLUPS[name]
+        rows = [
+            {**dict(zip(rollup.keys, key)), **dict(zip(rollup.measures, measures))}
+            for key, measures in by_key.items()
+            if any(measures)
+        ]
+        if rows:
+            connection.execute(_increment(connection, rollup), rows)
+
+
+def _increment(connection: Connection, rollup: Rollup):
+    """INSERT ... ON CONFLICT DO UPDATE adding the inserted measures to the stored ones."""
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif connection.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise ConfigurationException(f"Rollups are not supported on {connection.dialect.name}")
+
+    statement = dialect_insert(rollup.table)
+    return statement.on_conflict_do_update(
+        index_elements=list(rollup.keys),
+        set_={column: rollup.table.c[column] + statement.excluded[column] for column in rollup.measures}
+    )
+
+
+# Writes outside the ORM flush
+#
+# The flush listener below only sees rows written through the ORM unit of
+# work. Any other statement that inserts, updates or deletes rows of a
+# SOURCE_TABLES table (Core insert/update/delete, ORM bulk statements, raw
+# SQL) must, in the same transaction, either
+#
+#   - pass the old and new state of every row it changed to
+#     record_row_changes (or record_changes), reading the old state with
+#     the statement's RETURNING or a locked SELECT, or
+#   - not be allowed at all: BaseRepository's bulk methods refuse these
+#     tables through check_bulk_write.
+#
+# Anything else leaves the rollups wrong until the next rebuild_rollups.
+
+def record_changes(connection: Connection, changes: Iterable[Tuple[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]):
+    """Apply (rollup name, old state, new state) changes in one upsert per rollup."""
+    deltas: Deltas = defaultdict(dict)
+    for name, old, new in changes:
+        add_change(deltas, name, old, new)
+    apply_deltas(connection, deltas)
+
+
+def record_row_changes(
+    connection: Connection,
+    model: type,
+    changes: Iterable[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]
+):
+    """
+    Keep the rollups current for rows of model written outside the ORM.
+    
+    Each change is the (old, new) column values of one row, None for a row
+    that did not exist before or no longer exists. The states need the
+    attributes of every rollup built from model. Item category changes move
+    whole sets of units and must go through the ORM.
+    """
+    if not settings.ROLLUPS_ENABLED:
+        return
+    if model is Item:
+        raise RuntimeError("Item changes must be flushed through the ORM to keep the rollups current")
+    
+    deltas: Deltas = defaultdict(dict)
+    changes = list(changes)
+    for name, rollup in ROLLUPS.items():
+        if rollup.model is not model:
+            continue
+        if name == "category_inventory":
+            _add_unit_changes(connection, deltas, changes)
+        else:
+            for old, new in changes:
+                add_change(deltas, name, old, new)
+    apply_deltas(connection, deltas)
+
+
+def check_bulk_write(table: Table):
+    """Refuse set-based writes that would bypass the rollups (see record_changes)."""
+    if settings.ROLLUPS_ENABLED and table in SOURCE_TABLES:
+        raise RuntimeError(
+            f"Bulk writes to {table.name} bypass the dashboard rollups; "
+            "write through the ORM or record the changes with record_row_changes"
+        )
+
+
+def rebuild_rollups(connection: Connection, names: Optional[Sequence[str]] = None):
+    """Recompute rollup tables from the source rows."""
+    for name in names or ROLLUPS:
+        rollup = ROLLUPS[name]
+        connection.execute(delete(rollup.table))
+        connection.execute(
+            insert(rollup.table).from_select(list(rollup.keys + rollup.measures), rollup.source())
+        )
+
+
+# Flush-time maintenance
+
+def _attribute_states(obj, attributes: Sequence[str], operation: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], bool]:
+    """Pre- and post-flush values of the tracked attributes, and whether any changed."""
+    state = inspect(obj)
+    if operation == "delete":
+        return {name: state.attrs[name].value for name in attributes}, None, True
+    if operation == "insert":
+        return None, {name: state.attrs[name].value for name in attributes}, True
+
+    old, new, changed = {}, {}, False
+    for name in attributes:
+        history = state.attrs[name].history
+        value = state.attrs[name].value
+        new[name] = value
+        if history.deleted:
+            old[name] = history.deleted[0]
+            changed = True
+        else:
+            old[name] = value
+            changed = changed or bool(history.added)
+    return old, new, changed
+
+
+def _item_categories(connection: Connection, item_ids) -> Dict[Any, Any]:
+    item_ids = {_uuid(item_id) for item_id in item_ids if item_id is not None}
+    if not item_ids:
+        return {}
+    result = connection.execute(select(items.c.id, items.c.category_id).where(items.c.id.in_(item_ids)))
+    return {_uuid(item_id): category_id for item_id, category_id in result}
+
+
+def _add_unit_changes(
+    connection: Connection,
+    deltas: Deltas,
+    unit_changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]],
+    moved_items: Optional[Dict[Any, Tuple[Any, Any]]] = None
+):
+    """
+    Add inventory unit changes, looking up the category of each unit's item.
+    
+    Categories are read from the database as written; the old state of a
+    unit whose item is in moved_items takes the item's old category.
+    """
+    if not unit_changes:
+        return
+    moved_items = moved_items or {}
+    categories = _item_categories(
+        connection,
+        [state["item_id"] for change in unit_changes for state in change if state]
+    )
+    for old, new in unit_changes:
+        if old:
+            item_id = _uuid(old["item_id"])
+            old["category_id"] = moved_items[item_id][0] if item_id in moved_items else categories.get(item_id)
+        if new:
+            new["category_id"] = categories.get(_uuid(new["item_id"]))
+        add_change(deltas, "category_inventory", old, new)
+
+
+def _moved_items(session: Session) -> Dict[Any, Tuple[Any, Any]]:
+    """Items whose category changes in this flush, with their (old, new) category."""
+    moved = {}
+    for obj in session.dirty:
+        if not isinstance(obj, Item):
+            continue
+        history = inspect(obj).attrs["category_id"].history
+        if history.deleted:
+            moved[_uuid(obj.id)] = (history.deleted[0], obj.category_id)
+    return moved
+
+
+def _category_moves(connection: Connection, deltas: Deltas, moved_items: Dict[Any, Tuple[Any, Any]], skip_unit_ids: Sequence[Any] = ()):
+    """
+    Move unit counts of items whose category changed.
+    
+    Units in skip_unit_ids were written in the same flush and have already
+    been booked from their old to their new state by _add_unit_changes.
+    """
+    for item_id, (old_category, new_category) in moved_items.items():
+        query = select(units.c.location_id, units.c.status, func.count()).where(
+            and_(units.c.item_id == item_id, units.c.is_active == True)
+        )
+        if skip_unit_ids:
+            query = query.where(units.c.id.notin_(skip_unit_ids))
+        result = connection.execute(query.group_by(units.c.location_id, units.c.status))
+        for location_id, status, count in result:
+            for category_id, sign in ((old_category, -1), (new_category, 1)):
+                key = (_uuid(category_id) or UNASSIGNED, _uuid(location_id), status)
+                current = deltas["category_inventory"].setdefault(key, [0])
+                current[0] += sign * count
+
+
+def collect_flush_deltas(session: Session, connection: Connection) -> Deltas:
+    """Rollup deltas for the pending inserts, updates and deletes of a session."""
+    deltas: Deltas = defaultdict(dict)
+    unit_changes = []
+    unit_ids = []
+    pending = (
+        [(obj, "insert") for obj in session.new]
+        + [(obj, "update") for obj in session.dirty]
+        + [(obj, "delete") for obj in session.deleted]
+    )
+    for obj, operation in pending:
+        for name, rollup in ROLLUPS.items():
+            if not isinstance(obj, rollup.model):
+                continue
+            old, new, changed = _attribute_states(obj, rollup.attributes, operation)
+            if not changed:
+                continue
+            if name == "category_inventory":
+                unit_changes.append((old, new))
+                unit_ids.append(_uuid(obj.id))
+            else:
+                add_change(deltas, name, old, new)
+
+    moved_items = _moved_items(session)
+    _add_unit_changes(connection, deltas, unit_changes, moved_items)
+    _category_moves(connection, deltas, moved_items, unit_ids)
+    return deltas
+
+
+@event.listens_for(Session, "after_flush")
+def maintain_rollups(session, flush_context):
+    """Apply the rollup deltas of a flush inside the flush's transaction."""
+    if not settings.ROLLUPS_ENABLED:
+        return
+    pending = chain(session.new, session.dirty, session.deleted)
+    if not any(isinstance(obj, TRACKED_MODELS) for obj in pending):
+        return
+    connection = session.connection()
+    deltas = collect_flush_deltas(session, connection)
+    if deltas:
+        apply_deltas(connection, deltas)
@@ -1,7 +1,7 @@
 from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.errors import NotFoundError, ValidationError, ConflictError
@@ -18,7 +18,7 @@ from app.modules.analytics.schemas import (
     SystemAlertUpdate, SystemAlertResponse, SystemAlertListResponse,
     AnalyticsSearch, MetricSearch, AlertSearch, AnalyticsDashboard,
     SystemHealthSummary, AlertAcknowledgeRequest, AlertResolveRequest,
-    MetricValueUpdate, ReportGenerationRequest
+    MetricValueUpdate, ReportGenerationRequest, ReportGenerationAccepted
 )
 
 
@@ -47,9 +47,12 @@ async def create_report(
 @router.get("/reports/{report_id}", response_model=AnalyticsReportResponse)
 async def get_report(
     report_id: UUID,
+    response: Response,
     service: AnalyticsService = Depends(get_analytics_service)
 ):
     """Get analytics report by ID."""
+    # Polled for generation status, which the workers change outside any request
+    response.headers["Cache-Control"] = "no-store"
     try:
         return await service.get_report(report_id)
     except NotFoundError as e:
@@ -133,19 +136,35 @@ async def delete_report(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
-@router.post("/reports/{report_id}/generate", response_model=AnalyticsReportResponse)
+@router.post(
+    "/reports/{report_id}/generate",
+    response_model=ReportGenerationAccepted,
+    status_code=status.HTTP_202_ACCEPTED
+)
 async def generate_report(
     report_id: UUID,
     generation_request: ReportGenerationRequest,
+    request: Request,
+    response: Response,
     service: AnalyticsService = Depends(get_analytics_service)
 ):
-    """Generate a report."""
+    """Queue a report for generation by the background report workers."""
     try:
-        return await service.generate_report(report_id, generation_request)
+        report = await service.queue_report_generation(report_id, generation_request)
     except NotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except ValidationError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    status_url = str(request.url_for("get_report", report_id=str(report.id)))
+    response.headers["Location"] = status_url
+    return ReportGenerationAccepted(
+        report_id=report.id,
+        report_status=report.report_status,
+        status_url=status_url
+    )
 
 
 # Business Metric endpoints
@@ -276,11 +295,12 @@ async def get_metric_history(
 
 @router.post("/metrics/calculate", response_model=List[BusinessMetricResponse])
 async def calculate_key_metrics(
+    incremental: bool = Query(False, description="Only fold in rows changed since the last calculation"),
     service: AnalyticsService = Depends(get_analytics_service)
 ):
     """Calculate and update key business metrics."""
     try:
-        return await service.calculate_key_metrics()
+        return await service.calculate_key_metrics(incremental=incremental)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
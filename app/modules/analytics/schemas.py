@@ -76,6 +76,7 @@ class AnalyticsReportResponse(BaseModel):
     file_path: Optional[str]
     file_size: Optional[str]
     generated_by: UUID
+    started_at: Optional[datetime] = None
     generated_at: Optional[datetime]
     error_message: Optional[str]
     report_metadata: Optional[Dict[str, Any]]
@@ -455,6 +456,13 @@ class ReportGenerationRequest(BaseModel):
     parameters: Optional[Dict[str, Any]] = Field(None, description="Additional parameters")
 
 
+class ReportGenerationAccepted(BaseModel):
+    """Schema returned when a report has been queued for generation."""
+    report_id: UUID
+    report_status: ReportStatus
+    status_url: str = Field(..., description="Poll this URL for status, progress and the generated file")
+
+
 # Dashboard Schemas
 class AnalyticsDashboard(BaseModel):
     """Schema for analytics dashboard."""
@@ -467,6 +475,10 @@ class AnalyticsDashboard(BaseModel):
     total_metrics: int
     metrics_with_targets: int
     metrics_meeting_targets: int
+    revenue_last_30_days: Decimal = Decimal("0")
+    active_rentals: int = 0
+    overdue_returns: int = 0
+    inventory_utilization: Decimal = Decimal("0")
     recent_reports: List[AnalyticsReportListResponse]
     critical_alerts_list: List[SystemAlertListResponse]
     key_metrics: List[BusinessMetricListResponse]
@@ -11,8 +11,10 @@ from app.modules.analytics.models import (
     AlertSeverity, AlertStatus
 )
 from app.modules.analytics.repository import (
-    AnalyticsReportRepository, BusinessMetricRepository, SystemAlertRepository
+    AnalyticsReportRepository, BusinessMetricRepository, SystemAlertRepository,
+    KeyMetricsRepository, DashboardRollupRepository
 )
+from app.modules.analytics.report_pipeline import ReportPipeline
 from app.modules.analytics.schemas import (
     AnalyticsReportCreate, AnalyticsReportUpdate, AnalyticsReportResponse,
     AnalyticsReportListResponse, BusinessMetricCreate, BusinessMetricUpdate,
@@ -36,6 +38,8 @@ class AnalyticsService:
         self.report_repository = AnalyticsReportRepository(session)
         self.metric_repository = BusinessMetricRepository(session)
         self.alert_repository = SystemAlertRepository(session)
+        self.key_metrics_repository = KeyMetricsRepository(session)
+        self.rollup_repository = DashboardRollupRepository(session)
         # Import other repositories for analytics
         self.transaction_repository = TransactionHeaderRepository(session)
         self.customer_repository = CustomerRepository(session)
@@ -118,221 +122,57 @@ class AnalyticsService:
         
         return success
     
-    async def generate_report(self, report_id: UUID, generation_request: ReportGenerationRequest) -> AnalyticsReportResponse:
-        """Generate a report."""
+    async def queue_report_generation(self, report_id: UUID, generation_request: ReportGenerationRequest) -> AnalyticsReportResponse:
+        """Queue a report for the background workers."""
         report = await self.report_repository.get_by_id(report_id)
         if not report:
             raise NotFoundError(f"Analytics report with ID {report_id} not found")
         
-        try:
-            # Start generation
-            report.start_generation()
-            await self.session.commit()
-            
-            # Generate report based on type
-            file_path, file_size = await self._generate_report_file(report, generation_request)
-            
-            # Complete generation
-            report.complete_generation(file_path, file_size)
-            await self.session.commit()
-            
-            return AnalyticsReportResponse.model_validate(report)
-            
-        except Exception as e:
-            # Fail generation
-            report.fail_generation(str(e))
-            await self.session.commit()
-            raise ValidationError(f"Failed to generate report: {str(e)}")
-    
-    async def _generate_report_file(self, report: AnalyticsReport, generation_request: ReportGenerationRequest) -> tuple[str, int]:
-        """Generate report file based on type."""
-        # This would contain the actual report generation logic
-        # For now, we'll simulate file generation
-        import json
-        import os
-        
-        # Create reports directory if it doesn't exist
-        reports_dir = "reports"
-        os.makedirs(reports_dir, exist_ok=True)
-        
-        # Generate report data based on type
-        report_data = await self._generate_report_data(report, generation_request)
-        
-        # Generate file based on format
-        file_name = f"{report.report_name}_{report.id}.{report.report_format.lower()}"
-        file_path = os.path.join(reports_dir, file_name)
-        
-        if report.report_format == ReportFormat.JSON.value:
-            with open(file_path, 'w') as f:
-                json.dump(report_data, f, indent=2, default=str)
-        elif report.report_format == ReportFormat.CSV.value:
-            import csv
-            with open(file_path, 'w', newline='') as f:
-                if report_data.get('rows'):
-                    writer = csv.DictWriter(f, fieldnames=report_data['rows'][0].keys())
-                    writer.writeheader()
-                    writer.writerows(report_data['rows'])
-        else:
-            # For PDF and Excel, we'd use appropriate libraries
-            with open(file_path, 'w') as f:
-                f.write(json.dumps(report_data, indent=2, default=str))
+        if report.is_queued():
+            raise ConflictError(f"Analytics report {report_id} is already queued for generation")
         
-        file_size = os.path.getsize(file_path)
-        return file_path, file_size
-    
-    async def _generate_report_data(self, report: AnalyticsReport, generation_request: ReportGenerationRequest) -> Dict[str, Any]:
-        """Generate report data based on type."""
-        data = {
-            'report_name': report.report_name,
-            'report_type': report.report_type,
-            'generated_at': datetime.utcnow().isoformat(),
-            'date_range': {
-                'start': generation_request.start_date.isoformat() if generation_request.start_date else None,
-                'end': generation_request.end_date.isoformat() if generation_request.end_date else None
-            },
-            'filters': generation_request.filters or {},
-            'data': []
-        }
+        # The request parameters are stored on the report for the worker
+        if generation_request.start_date is not None:
+            report.start_date = generation_request.start_date
+        if generation_request.end_date is not None:
+            report.end_date = generation_request.end_date
+        if generation_request.filters is not None:
+            report.filters = generation_request.filters
+        if generation_request.parameters is not None:
+            report.parameters = generation_request.parameters
         
-        if report.report_type == ReportType.SALES.value:
-            data['data'] = await self._generate_sales_data(generation_request)
-        elif report.report_type == ReportType.RENTALS.value:
-            data['data'] = await self._generate_rentals_data(generation_request)
-        elif report.report_type == ReportType.INVENTORY.value:
-            data['data'] = await self._generate_inventory_data(generation_request)
-        elif report.report_type == ReportType.CUSTOMER.value:
-            data['data'] = await self._generate_customer_data(generation_request)
-        elif report.report_type == ReportType.FINANCIAL.value:
-            data['data'] = await self._generate_financial_data(generation_request)
-        elif report.report_type == ReportType.PERFORMANCE.value:
-            data['data'] = await self._generate_performance_data(generation_request)
-        
-        return data
-    
-    async def _generate_sales_data(self, generation_request: ReportGenerationRequest) -> List[Dict[str, Any]]:
-        """Generate sales report data."""
-        # Get sales transactions
-        transactions = await self.transaction_repository.get_all(
-            date_from=generation_request.start_date,
-            date_to=generation_request.end_date,
-            active_only=True
-        )
+        report.queue_generation()
+        await self.session.commit()
+        await self.session.refresh(report)
         
-        sales_data = []
-        for transaction in transactions:
-            if transaction.is_sale():
-                sales_data.append({
-                    'transaction_id': str(transaction.id),
-                    'transaction_date': transaction.transaction_date.isoformat(),
-                    'customer_id': transaction.customer_id,
-                    'total_amount': float(transaction.total_amount),
-                    'status': transaction.status
-                })
-        
-        return sales_data
-    
-    async def _generate_rentals_data(self, generation_request: ReportGenerationRequest) -> List[Dict[str, Any]]:
-        """Generate rentals report data."""
-        # Get rental returns
-        returns = await self.rental_return_repository.get_all(
-            date_from=generation_request.start_date,
-            date_to=generation_request.end_date,
-            active_only=True
-        )
+        return AnalyticsReportResponse.model_validate(report)
+    
+    async def run_report_job(self, report_id: UUID) -> tuple[str, int]:
+        """
+        Generate the file of a report claimed by a worker.
         
-        rental_data = []
-        for return_item in returns:
-            rental_data.append({
-                'return_id': str(return_item.id),
-                'return_date': return_item.return_date.isoformat(),
-                'return_type': return_item.return_type,
-                'status': return_item.return_status,
-                'total_late_fee': float(return_item.total_late_fee),
-                'total_damage_fee': float(return_item.total_damage_fee),
-                'total_refund': float(return_item.total_refund_amount)
-            })
-        
-        return rental_data
-    
-    async def _generate_inventory_data(self, generation_request: ReportGenerationRequest) -> List[Dict[str, Any]]:
-        """Generate inventory report data."""
-        # Get inventory units
-        inventory_units = await self.inventory_unit_repository.get_all(active_only=True)
-        
-        inventory_data = []
-        for unit in inventory_units:
-            inventory_data.append({
-                'unit_id': str(unit.id),
-                'unit_code': unit.unit_code,
-                'item_id': unit.item_id,
-                'status': unit.status,
-                'condition': unit.condition,
-                'location_id': unit.location_id,
-                'purchase_price': float(unit.purchase_price)
-            })
-        
-        return inventory_data
-    
-    async def _generate_customer_data(self, generation_request: ReportGenerationRequest) -> List[Dict[str, Any]]:
-        """Generate customer report data."""
-        # Get customers
-        customers = await self.customer_repository.get_all(active_only=True)
-        
-        customer_data = []
-        for customer in customers:
-            customer_data.append({
-                'customer_id': str(customer.id),
-                'customer_name': customer.customer_name,
-                'customer_type': customer.customer_type,
-                'tier': customer.tier,
-                'status': customer.status,
-                'credit_limit': float(customer.credit_limit),
-                'outstanding_balance': float(customer.outstanding_balance)
-            })
-        
-        return customer_data
-    
-    async def _generate_financial_data(self, generation_request: ReportGenerationRequest) -> List[Dict[str, Any]]:
-        """Generate financial report data."""
-        # Get transactions for financial analysis
-        transactions = await self.transaction_repository.get_all(
-            date_from=generation_request.start_date,
-            date_to=generation_request.end_date,
-            active_only=True
+        Returns (file path, file size); the worker marks the report completed
+        only if it still holds the lease. Raises on failure so the job is retried.
+        """
+        report = await self.report_repository.get_by_id(report_id)
+        if not report:
+            raise NotFoundError(f"Analytics report with ID {report_id} not found")
+        
+        generation_request = ReportGenerationRequest(
+            start_date=report.start_date,
+            end_date=report.end_date,
+            filters=report.filters,
+            parameters=report.parameters
         )
+        file_path, file_size = await self._generate_report_file(report, generation_request)
         
-        financial_data = []
-        for transaction in transactions:
-            financial_data.append({
-                'transaction_id': str(transaction.id),
-                'transaction_date': transaction.transaction_date.isoformat(),
-                'transaction_type': transaction.transaction_type,
-                'total_amount': float(transaction.total_amount),
-                'tax_amount': float(transaction.tax_amount),
-                'discount_amount': float(transaction.discount_amount),
-                'net_amount': float(transaction.net_amount)
-            })
-        
-        return financial_data
-    
-    async def _generate_performance_data(self, generation_request: ReportGenerationRequest) -> List[Dict[str, Any]]:
-        """Generate performance report data."""
-        # Get metrics for performance analysis
-        metrics = await self.metric_repository.get_all(active_only=True)
-        
-        performance_data = []
-        for metric in metrics:
-            performance_data.append({
-                'metric_id': str(metric.id),
-                'metric_name': metric.metric_name,
-                'metric_type': metric.metric_type,
-                'category': metric.category,
-                'current_value': float(metric.current_value),
-                'target_value': float(metric.target_value) if metric.target_value else None,
-                'tracked_date': metric.tracked_date.isoformat()
-            })
-        
-        return performance_data
+        # Final progress only; the status is left to the queue
+        await self.session.commit()
+        return file_path, file_size
+    
+    async def _generate_report_file(self, report: AnalyticsReport, generation_request: ReportGenerationRequest) -> tuple[str, int]:
+        """Stream the report rows into a file in the report's format."""
+        return await ReportPipeline(self.session).run(report, generation_request)
     
     # Business Metric operations
     async def create_metric(self, metric_data: BusinessMetricCreate) -> BusinessMetricResponse:
@@ -542,9 +382,15 @@ class AnalyticsService:
         critical_alerts = await self.alert_repository.count_by_severity(AlertSeverity.CRITICAL)
         
         # Get metrics counts
-        all_metrics = await self.metric_repository.get_all(active_only=True)
-        metrics_with_targets = await self.metric_repository.get_metrics_with_targets()
-        metrics_meeting_targets = await self.metric_repository.get_metrics_meeting_targets()
+        total_metrics = await self.metric_repository.count_metrics()
+        metrics_with_targets = await self.metric_repository.count_metrics(with_targets=True)
+        metrics_meeting_targets = await self.metric_repository.count_metrics(meeting_targets=True)
+        
+        # Operational figures from the dashboard rollups
+        today = date.today()
+        rental_overview = await self.rollup_repository.get_rental_overview(today)
+        inventory_overview = await self.rollup_repository.get_inventory_overview()
+        revenue_last_30_days = await self.rollup_repository.get_revenue(date_from=today - timedelta(days=29), date_to=today)
         
         # Get recent reports
         recent_reports = await self.get_reports(limit=10)
@@ -566,9 +412,13 @@ class AnalyticsService:
             failed_reports=report_summary['failed_reports'],
             active_alerts=active_alerts,
             critical_alerts=critical_alerts,
-            total_metrics=len(all_metrics),
-            metrics_with_targets=len(metrics_with_targets),
-            metrics_meeting_targets=len(metrics_meeting_targets),
+            total_metrics=total_metrics,
+            metrics_with_targets=metrics_with_targets,
+            metrics_meeting_targets=metrics_meeting_targets,
+            revenue_last_30_days=revenue_last_30_days,
+            active_rentals=rental_overview['active_rentals'],
+            overdue_returns=rental_overview['overdue_returns'],
+            inventory_utilization=inventory_overview['utilization_rate'],
             recent_reports=recent_reports,
             critical_alerts_list=critical_alerts_list,
             key_metrics=key_metrics
@@ -614,93 +464,96 @@ class AnalyticsService:
         )
     
     # Metric calculation and automation
-    async def calculate_key_metrics(self) -> List[BusinessMetricResponse]:
-        """Calculate and update key business metrics."""
+    KEY_METRIC_SOURCES = {
+        "total_revenue": ["transactions"],
+        "total_customers": ["customers"],
+        "inventory_utilization": ["inventory_units"],
+        "return_rate": ["rental_returns", "transactions"],
+    }
+    
+    async def calculate_key_metrics(self, incremental: bool = False) -> List[BusinessMetricResponse]:
+        """
+        Calculate and update key business metrics.
+        
+        All metrics come from pushed-down aggregate queries (one per source
+        table). With ``incremental`` the aggregates stored on the metrics at
+        the last run are reused and only rows changed since that watermark
+        are read.
+        """
+        previous_state = await self._load_key_metrics_state() if incremental else None
+        state = await self.key_metrics_repository.aggregate(previous_state)
+        values = {
+            component: Decimal(value)
+            for source_state in state.values()
+            for component, value in source_state["values"].items()
+        }
+        
+        def source_metadata(metric_name: str) -> Dict[str, Any]:
+            return {"sources": {source: state[source] for source in self.KEY_METRIC_SOURCES[metric_name]}}
+        
         metrics = []
         
         # Calculate total revenue
-        total_revenue = await self._calculate_total_revenue()
         revenue_metric = await self._update_or_create_metric(
             "total_revenue",
             MetricType.CURRENCY,
             "financial",
-            total_revenue,
-            unit="USD"
+            values["revenue"],
+            unit="USD",
+            metric_metadata=source_metadata("total_revenue")
         )
         metrics.append(BusinessMetricResponse.model_validate(revenue_metric))
         
         # Calculate total customers
-        total_customers = await self._calculate_total_customers()
         customers_metric = await self._update_or_create_metric(
             "total_customers",
             MetricType.COUNTER,
             "business",
-            total_customers,
-            unit="customers"
+            values["customers"],
+            unit="customers",
+            metric_metadata=source_metadata("total_customers")
         )
         metrics.append(BusinessMetricResponse.model_validate(customers_metric))
         
         # Calculate inventory utilization
-        inventory_utilization = await self._calculate_inventory_utilization()
         utilization_metric = await self._update_or_create_metric(
             "inventory_utilization",
             MetricType.PERCENTAGE,
             "operations",
-            inventory_utilization,
-            unit="%"
+            self._percentage(values["rented_units"], values["units"]),
+            unit="%",
+            metric_metadata=source_metadata("inventory_utilization")
         )
         metrics.append(BusinessMetricResponse.model_validate(utilization_metric))
         
         # Calculate return rate
-        return_rate = await self._calculate_return_rate()
         return_metric = await self._update_or_create_metric(
             "return_rate",
             MetricType.PERCENTAGE,
             "operations",
-            return_rate,
-            unit="%"
+            self._percentage(values["returns"], values["rental_transactions"]),
+            unit="%",
+            metric_metadata=source_metadata("return_rate")
         )
         metrics.append(BusinessMetricResponse.model_validate(return_metric))
         
         return metrics
     
-    async def _calculate_total_revenue(self) -> Decimal:
-        """Calculate total revenue from transactions."""
-        transactions = await self.transaction_repository.get_all(active_only=True)
-        total = sum(transaction.total_amount for transaction in transactions)
-        return total
-    
-    async def _calculate_total_customers(self) -> Decimal:
-        """Calculate total number of customers."""
-        customers = await self.customer_repository.get_all(active_only=True)
-        return Decimal(str(len(customers)))
-    
-    async def _calculate_inventory_utilization(self) -> Decimal:
-        """Calculate inventory utilization percentage."""
-        inventory_units = await self.inventory_unit_repository.get_all(active_only=True)
-        if not inventory_units:
+    async def _load_key_metrics_state(self) -> Dict[str, Any]:
+        """Collect the per-source aggregates stored on the key metrics."""
+        state: Dict[str, Any] = {}
+        for metric_name in self.KEY_METRIC_SOURCES:
+            metric = await self.metric_repository.get_by_name(metric_name)
+            if metric and metric.metric_metadata:
+                state.update(metric.metric_metadata.get("sources", {}))
+        return state
+    
+    @staticmethod
+    def _percentage(part: Decimal, whole: Decimal) -> Decimal:
+        """part / whole as a percentage with two decimals (0 when whole is 0)."""
+        if not whole:
             return Decimal("0")
-        
-        rented_units = len([unit for unit in inventory_units if unit.is_rented()])
-        total_units = len(inventory_units)
-        
-        utilization = (rented_units / total_units) * 100
-        return Decimal(str(utilization)).quantize(Decimal('0.01'))
-    
-    async def _calculate_return_rate(self) -> Decimal:
-        """Calculate return rate percentage."""
-        returns = await self.rental_return_repository.get_all(active_only=True)
-        transactions = await self.transaction_repository.get_all(active_only=True)
-        
-        if not transactions:
-            return Decimal("0")
-        
-        rental_transactions = [t for t in transactions if t.is_rental()]
-        if not rental_transactions:
-            return Decimal("0")
-        
-        return_rate = (len(returns) / len(rental_transactions)) * 100
-        return Decimal(str(return_rate)).quantize(Decimal('0.01'))
+        return (part / whole * 100).quantize(Decimal('0.01'))
     
     async def _update_or_create_metric(
         self, 
@@ -708,13 +561,16 @@ class AnalyticsService:
         metric_type: MetricType, 
         category: str, 
         value: Decimal,
-        unit: Optional[str] = None
+        unit: Optional[str] = None,
+        metric_metadata: Optional[Dict[str, Any]] = None
     ) -> BusinessMetric:
         """Update existing metric or create new one."""
         existing_metric = await self.metric_repository.get_by_name(metric_name)
         
         if existing_metric:
             existing_metric.update_value(value)
+            if metric_metadata is not None:
+                existing_metric.metric_metadata = metric_metadata
             await self.session.commit()
             await self.session.refresh(existing_metric)
             return existing_metric
@@ -724,6 +580,7 @@ class AnalyticsService:
                 metric_type=metric_type,
                 category=category,
                 current_value=value,
-                unit=unit
+                unit=unit,
+                metric_metadata=metric_metadata
             )
             return await self.metric_repository.create(metric_data)
\ No newline at end of file
@@ -81,6 +81,19 @@ role_hierarchy_table = Table(
 )
 
 
+# Transitive closure of role_hierarchy (non-reflexive); path_count is the
+# number of distinct paths from ancestor to descendant, so removing one edge
+# can be applied incrementally without recomputing the whole closure
+role_hierarchy_closure_table = Table(
+    'role_hierarchy_closure',
+    BaseModel.metadata,
+    Column('ancestor_role_id', UUIDType(), ForeignKey('roles.id'), primary_key=True),
+    Column('descendant_role_id', UUIDType(), ForeignKey('roles.id'), primary_key=True),
+    Column('path_count', Integer, nullable=False, default=1),
+    Index('idx_role_closure_descendant', 'descendant_role_id'),
+)
+
+
 class User(BaseModel):
     """
     User model for authentication and authorization.
@@ -0,0 +1,118 @@
+"""
+Compiled permission registry.
+
+Every permission code gets a fixed bit index so a user's permission set can
+be carried as a single integer bitmask (in the access token and in the RBAC
+cache) and permission checks become one AND/compare.
+
+Bit indices are assigned in a deterministic order: first the codes declared
+on ``constants.Permission``, then codes registered by ``PermissionChecker``
+instances as route modules are imported. The registry ``version`` is a digest
+of that order; masks stamped with a different version (e.g. tokens minted by
+an older deployment) are ignored and recompiled from the permission names.
+"""
+
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional
+
+from .constants import Permission
+
+
+def _declared_permission_codes() -> List[str]:
+    """Permission codes in declaration order."""
+    return [
+        value for name, value in vars(Permission).items()
+        if name.isupper() and isinstance(value, str)
+    ]
+
+
+class PermissionRegistry:
+    """Maps permission codes to bit positions."""
+
+    MASK_CLAIM = "pmask"
+    VERSION_CLAIM = "pver"
+
+    def __init__(self, codes: Iterable[str] = ()):
+        self._index: Dict[str, int] = {}
+        self._codes: List[str] = []
+        self._version: Optional[str] = None
+        self.register(*codes)
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._index
+
+    def register(self, *codes: str) -> None:
+        """Assign bits to codes that do not have one yet."""
+        for code in codes:
+            if code not in self._index:
+                self._index[code] = len(self._codes)
+                self._codes.append(code)
+                self._version = None
+
+    @property
+    def version(self) -> str:
+        """Digest of the code order; changes whenever a bit is added."""
+        if self._version is None:
+            digest = hashlib.blake2b("\n".join(self._codes).encode(), digest_size=6)
+            self._version = digest.hexdigest()
+        return self._version
+
+    def bit(self, code: str) -> int:
+        """Return the single-bit mask for a registered code."""
+        return 1 << self._index[code]
+
+    def mask(self, codes: Iterable[str]) -> int:
+        """Compile codes to a bitmask, ignoring unregistered codes."""
+        index = self._index
+        result = 0
+        for code in codes:
+            position = index.get(code)
+            if position is not None:
+                result |= 1 << position
+        return result
+
+    def require(self, codes: Iterable[str]) -> int:
+        """Register codes needed by a check and return their mask."""
+        codes = list(codes)
+        self.register(*codes)
+        return self.mask(codes)
+
+    def codes(self, mask: int) -> List[str]:
+        """Expand a bitmask back to its codes."""
+        result = []
+        position = 0
+        while mask:
+            if mask & 1:
+                result.append(self._codes[position])
+            mask >>= 1
+            position += 1
+        return result
+
+    def token_claims(self, codes: Iterable[str]) -> Dict[str, str]:
+        """JWT claims carrying the compiled mask for a permission set."""
+        return {
+            self.MASK_CLAIM: format(self.mask(codes), "x"),
+            self.VERSION_CLAIM: self.version
+        }
+
+    def decode_mask(self, mask: Optional[str], version: Optional[str]) -> Optional[int]:
+        """Parse a stored mask, or None if it was compiled by another registry version."""
+        if mask is None or version != self.version:
+            return None
+        try:
+            return int(mask, 16)
+        except (TypeError, ValueError):
+            return None
+
+    def user_mask(self, token_data: Any) -> int:
+        """Mask for verified token data, recompiling from names if needed."""
+        mask = getattr(token_data, "permission_mask", None)
+        if mask is not None and getattr(token_data, "permission_mask_version", None) == self.version:
+            return mask
+        return self.mask(token_data.permissions)
+
+
+permission_registry = PermissionRegistry(_declared_permission_codes())
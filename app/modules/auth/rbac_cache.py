@@ -14,6 +14,7 @@ from uuid import UUID
 from app.core.cache import cache_manager
 from app.core.config import settings
 from .models import Permission, Role, User
+from .permission_registry import permission_registry
 # from .rbac_service import RBACService  # Avoid circular import
 
 
@@ -25,7 +26,7 @@ class RBACCache:
     - User permission caching with TTL
     - Role hierarchy caching
     - Permission dependency caching
-    - Cache invalidation on permission changes
+    - Tag-based cache invalidation on permission changes (no keyspace scans)
     - Cache warming for frequently accessed data
     """
     
@@ -40,6 +41,10 @@ class RBACCache:
         """Generate cache key for user permissions."""
         return f"{self.cache_prefix}user_permissions:{user_id}"
     
+    def _user_permission_mask_key(self, user_id: UUID) -> str:
+        """Generate cache key for a user's compiled permission mask."""
+        return f"{self.cache_prefix}user_permission_mask:{user_id}"
+    
     def _role_permissions_key(self, role_id: UUID) -> str:
         """Generate cache key for role permissions."""
         return f"{self.cache_prefix}role_permissions:{role_id}"
@@ -64,6 +69,27 @@ class RBACCache:
         """Generate cache key for cache statistics."""
         return f"{self.cache_prefix}stats"
     
+    # Invalidation tags (every entry is also tagged with the RBAC-wide tag)
+    def _rbac_tag(self) -> str:
+        """Tag shared by all RBAC cache entries."""
+        return self.cache_prefix.rstrip(":")
+    
+    def _user_tag(self, user_id: UUID) -> str:
+        """Tag for entries derived from a user."""
+        return f"{self.cache_prefix}user:{user_id}"
+    
+    def _role_tag(self, role_id: UUID) -> str:
+        """Tag for entries derived from a role."""
+        return f"{self.cache_prefix}role:{role_id}"
+    
+    def _permission_tag(self, permission_id: UUID) -> str:
+        """Tag for entries derived from a permission."""
+        return f"{self.cache_prefix}permission:{permission_id}"
+    
+    async def _set(self, cache_key: str, value: Any, ttl: int, *tags: str) -> bool:
+        """Cache a value under the RBAC-wide tag and any additional tags."""
+        return await cache_manager.set(cache_key, value, ttl, tags=[self._rbac_tag(), *tags])
+    
     # User permission caching
     async def get_user_permissions(self, user_id: UUID) -> Optional[List[Dict[str, Any]]]:
         """Get cached user permissions."""
@@ -77,8 +103,20 @@ class RBACCache:
         await self._update_cache_stats('user_permissions', 'miss')
         return None
     
-    async def set_user_permissions(self, user_id: UUID, permissions: List[Permission], ttl: Optional[int] = None) -> bool:
-        """Cache user permissions."""
+    async def set_user_permissions(
+        self,
+        user_id: UUID,
+        permissions: List[Permission],
+        ttl: Optional[int] = None,
+        role_ids: Optional[List[UUID]] = None
+    ) -> bool:
+        """Cache user permissions.
+        
+        Passing the user's role ids tags the entry with those roles, so role
+        permission changes invalidate the permissions of every member. Pass
+        the roles they inherit from as well, so that a change further up the
+        hierarchy reaches them too.
+        """
         cache_key = self._user_permissions_key(user_id)
         ttl = ttl or self.default_ttl
         
@@ -97,7 +135,44 @@ class RBACCache:
                 'cached_at': datetime.utcnow().isoformat()
             })
         
-        return await cache_manager.set(cache_key, json.dumps(permissions_data), ttl)
+        role_tags = [self._role_tag(role_id) for role_id in role_ids or ()]
+        await self.set_user_permission_mask(user_id, self.compile_permission_mask(permissions), ttl, role_ids)
+        return await self._set(cache_key, json.dumps(permissions_data), ttl, self._user_tag(user_id), *role_tags)
+    
+    # Compiled permission mask caching
+    @staticmethod
+    def compile_permission_mask(permissions: List[Permission]) -> int:
+        """Compile permissions to a registry bitmask (by code and by resource:action)."""
+        codes = []
+        for perm in permissions:
+            codes.append(perm.code)
+            codes.append(f"{perm.resource}:{perm.action}")
+        return permission_registry.mask(codes)
+    
+    async def get_user_permission_mask(self, user_id: UUID) -> Optional[int]:
+        """Get a user's cached permission mask, if compiled by the current registry."""
+        cached_data = await cache_manager.get(self._user_permission_mask_key(user_id))
+        mask = None
+        if isinstance(cached_data, dict):
+            mask = permission_registry.decode_mask(cached_data.get('mask'), cached_data.get('version'))
+        
+        await self._update_cache_stats('user_permission_mask', 'hit' if mask is not None else 'miss')
+        return mask
+    
+    async def set_user_permission_mask(
+        self,
+        user_id: UUID,
+        mask: int,
+        ttl: Optional[int] = None,
+        role_ids: Optional[List[UUID]] = None
+    ) -> bool:
+        """Cache a user's permission mask with the registry version it was compiled with."""
+        role_tags = [self._role_tag(role_id) for role_id in role_ids or ()]
+        value = {'mask': format(mask, 'x'), 'version': permission_registry.version}
+        return await self._set(
+            self._user_permission_mask_key(user_id), value, ttl or self.default_ttl,
+            self._user_tag(user_id), *role_tags
+        )
     
     # Role permission caching
     async def get_role_permissions(self, role_id: UUID) -> Optional[List[Dict[str, Any]]]:
@@ -112,8 +187,14 @@ class RBACCache:
         await self._update_cache_stats('role_permissions', 'miss')
         return None
     
-    async def set_role_permissions(self, role_id: UUID, permissions: List[Permission], ttl: Optional[int] = None) -> bool:
-        """Cache role permissions."""
+    async def set_role_permissions(
+        self,
+        role_id: UUID,
+        permissions: List[Permission],
+        ttl: Optional[int] = None,
+        ancestor_role_ids: Optional[List[UUID]] = None
+    ) -> bool:
+        """Cache role permissions, tagged with the roles they are inherited from."""
         cache_key = self._role_permissions_key(role_id)
         ttl = ttl or self.default_ttl
         
@@ -129,7 +210,8 @@ class RBACCache:
                 'cached_at': datetime.utcnow().isoformat()
             })
         
-        return await cache_manager.set(cache_key, json.dumps(permissions_data), ttl)
+        ancestor_tags = [self._role_tag(ancestor_id) for ancestor_id in ancestor_role_ids or ()]
+        return await self._set(cache_key, json.dumps(permissions_data), ttl, self._role_tag(role_id), *ancestor_tags)
     
     # Role hierarchy caching
     async def get_role_hierarchy(self, role_id: UUID) -> Optional[Dict[str, Any]]:
@@ -157,7 +239,7 @@ class RBACCache:
             'cached_at': datetime.utcnow().isoformat()
         }
         
-        return await cache_manager.set(cache_key, json.dumps(serializable_data), ttl)
+        return await self._set(cache_key, json.dumps(serializable_data), ttl, self._role_tag(role_id))
     
     # Permission dependency caching
     async def get_permission_dependencies(self, permission_id: UUID) -> Optional[List[str]]:
@@ -177,7 +259,7 @@ class RBACCache:
         cache_key = self._permission_dependencies_key(permission_id)
         ttl = ttl or self.dependency_ttl
         
-        return await cache_manager.set(cache_key, json.dumps(dependencies), ttl)
+        return await self._set(cache_key, json.dumps(dependencies), ttl, self._permission_tag(permission_id))
     
     # Permission by code caching
     async def get_permission_by_code(self, permission_code: str) -> Optional[Dict[str, Any]]:
@@ -209,12 +291,13 @@ class RBACCache:
             'cached_at': datetime.utcnow().isoformat()
         }
         
-        return await cache_manager.set(cache_key, json.dumps(permission_data), ttl)
+        return await self._set(cache_key, json.dumps(permission_data), ttl, self._permission_tag(permission.id))
     
     # Cache invalidation methods
     async def invalidate_user_permissions(self, user_id: UUID) -> bool:
         """Invalidate cached user permissions."""
         cache_key = self._user_permissions_key(user_id)
+        await cache_manager.delete(self._user_permission_mask_key(user_id))
         return await cache_manager.delete(cache_key)
     
     async def invalidate_role_permissions(self, role_id: UUID) -> bool:
@@ -238,7 +321,7 @@ class RBACCache:
         return await cache_manager.delete(cache_key)
     
     # Bulk invalidation methods
-    async def invalidate_user_related_cache(self, user_id: UUID) -> Dict[str, bool]:
+    async def invalidate_user_related_cache(self, user_id: UUID) -> Dict[str, Any]:
         """Invalidate all cache entries related to a user."""
         results = {}
         
@@ -249,9 +332,12 @@ class RBACCache:
         user_roles_key = self._user_roles_key(user_id)
         results['user_roles'] = await cache_manager.delete(user_roles_key)
         
+        # Invalidate anything else tagged with the user
+        results['tagged_entries'] = await cache_manager.invalidate_tags(self._user_tag(user_id))
+        
         return results
     
-    async def invalidate_role_related_cache(self, role_id: UUID) -> Dict[str, bool]:
+    async def invalidate_role_related_cache(self, role_id: UUID) -> Dict[str, Any]:
         """Invalidate all cache entries related to a role."""
         results = {}
         
@@ -261,12 +347,12 @@ class RBACCache:
         # Invalidate role hierarchy
         results['role_hierarchy'] = await self.invalidate_role_hierarchy(role_id)
         
-        # TODO: Invalidate all users who have this role
-        # This would require tracking user-role relationships
+        # Invalidate everything cached with this role or a role inheriting from it
+        results['tagged_entries'] = await cache_manager.invalidate_tags(self._role_tag(role_id))
         
         return results
     
-    async def invalidate_permission_related_cache(self, permission_id: UUID, permission_code: str) -> Dict[str, bool]:
+    async def invalidate_permission_related_cache(self, permission_id: UUID, permission_code: str) -> Dict[str, Any]:
         """Invalidate all cache entries related to a permission."""
         results = {}
         
@@ -276,6 +362,9 @@ class RBACCache:
         # Invalidate permission by code
         results['permission_by_code'] = await self.invalidate_permission_by_code(permission_code)
         
+        # Invalidate anything else tagged with the permission
+        results['tagged_entries'] = await cache_manager.invalidate_tags(self._permission_tag(permission_id))
+        
         return results
     
     # Cache warming methods
@@ -292,7 +381,9 @@ class RBACCache:
         """Pre-warm role permissions cache."""
         try:
             permissions = await rbac_service.get_role_inherited_permissions(role_id)
-            return await self.set_role_permissions(role_id, permissions)
+            ancestors = await rbac_service._get_closure_neighbours(role_id, ancestors=True)
+            ancestor_role_ids = [ancestor_id for ancestor_id in ancestors if ancestor_id != role_id]
+            return await self.set_role_permissions(role_id, permissions, ancestor_role_ids=ancestor_role_ids)
         except Exception as e:
             print(f"Error warming role permissions cache: {e}")
             return False
@@ -321,7 +412,7 @@ class RBACCache:
             stats['last_updated'] = datetime.utcnow().isoformat()
             
             # Cache for 1 hour
-            await cache_manager.set(stats_key, json.dumps(stats), 3600)
+            await self._set(stats_key, json.dumps(stats), 3600)
         except Exception as e:
             print(f"Error updating cache stats: {e}")
     
@@ -350,9 +441,8 @@ class RBACCache:
     async def clear_all_cache(self) -> Dict[str, Any]:
         """Clear all RBAC cache entries."""
         try:
-            # Get all cache keys with our prefix
-            pattern = f"{self.cache_prefix}*"
-            deleted_count = await cache_manager.delete_pattern(pattern)
+            # Every RBAC entry is registered under the RBAC-wide tag
+            deleted_count = await cache_manager.invalidate_tags(self._rbac_tag())
             
             return {
                 'success': True,
@@ -12,12 +12,13 @@ from typing import Optional, List, Dict, Set, Any
 from uuid import UUID
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, and_, or_, bindparam
 from sqlalchemy.orm import selectinload
 
 from .models import (
     User, Role, Permission, PermissionCategory, PermissionDependency,
-    RBACauditlog, user_roles_table, role_permissions_table, user_permissions_table
+    RBACauditlog, user_roles_table, role_permissions_table, user_permissions_table,
+    role_hierarchy_closure_table
 )
 from .constants import (
     UserType, PermissionRiskLevel, RoleTemplate, PermissionCategory as PermissionCategoryEnum,
@@ -27,6 +28,7 @@ from .constants import (
 from .repository import AuthRepository
 from app.core.errors import ValidationError, NotFoundError, ConflictError, AuthenticationError
 from .rbac_cache import rbac_cache
+from .permission_registry import permission_registry
 # from app.core.security import get_current_user_id  # Not needed for this implementation
 
 
@@ -351,12 +353,13 @@ class RBACService:
         Returns:
             Dict with 'has_permission', 'risk_level', 'requires_approval', and 'missing_dependencies' keys
         """
-        # Get user permissions
-        user_permissions = await self.get_user_all_permissions(user_id)
-        user_permission_codes = {perm.code for perm in user_permissions}
-        
         # Check if user has the permission
-        has_permission = permission_code in user_permission_codes
+        if permission_code in permission_registry:
+            user_mask = await self.get_user_permission_mask(user_id)
+            has_permission = bool(user_mask & permission_registry.bit(permission_code))
+        else:
+            user_permissions = await self.get_user_all_permissions(user_id)
+            has_permission = permission_code in {perm.code for perm in user_permissions}
         
         # Get permission details
         permission = await self.get_permission_by_code(permission_code)
@@ -454,12 +457,36 @@ class RBACService:
         
         permissions_list = list(all_permissions.values())
         
-        # Cache the result if caching is enabled
+        # Cache the result if caching is enabled, tagged with the user's roles and their ancestors
         if use_cache:
-            await rbac_cache.set_user_permissions(user_id, permissions_list)
+            await rbac_cache.set_user_permissions(
+                user_id, permissions_list, role_ids=await self._get_user_role_closure(user_id)
+            )
         
         return permissions_list
     
+    async def get_user_permission_mask(self, user_id: UUID, use_cache: bool = True) -> int:
+        """
+        Get a user's permissions as a compiled registry bitmask.
+        
+        Served from the RBAC cache without rebuilding Permission objects;
+        on a miss the permissions are loaded (which also caches the mask).
+        
+        Args:
+            user_id: User ID
+            use_cache: Whether to use cached results
+            
+        Returns:
+            Permission bitmask (see permission_registry)
+        """
+        if use_cache:
+            cached_mask = await rbac_cache.get_user_permission_mask(user_id)
+            if cached_mask is not None:
+                return cached_mask
+        
+        permissions = await self.get_user_all_permissions(user_id, use_cache=use_cache)
+        return rbac_cache.compile_permission_mask(permissions)
+    
     async def get_permission_by_code(self, permission_code: str, use_cache: bool = True) -> Optional[Permission]:
         """Get permission by code."""
         # Try to get from cache first
@@ -783,8 +810,13 @@ class RBACService:
         )
         
         await self.session.execute(insert_stmt)
+        affected_role_ids = await self._update_role_closure(parent_role_id, child_role_id, 1)
         await self.session.commit()
         
+        # Roles below the new edge may inherit new permissions
+        for role_id in affected_role_ids:
+            await rbac_cache.invalidate_role_related_cache(role_id)
+        
         return {
             'success': True,
             'message': f'Role hierarchy created: {parent_role.name} -> {child_role.name}'
@@ -818,8 +850,13 @@ class RBACService:
         )
         
         await self.session.execute(delete_stmt)
+        affected_role_ids = await self._update_role_closure(parent_role_id, child_role_id, -1)
         await self.session.commit()
         
+        # Roles below the removed edge may lose inherited permissions
+        for role_id in affected_role_ids:
+            await rbac_cache.invalidate_role_related_cache(role_id)
+        
         return {
             'success': True,
             'message': 'Role hierarchy relationship removed'
@@ -827,83 +864,179 @@ class RBACService:
     
     async def _check_circular_dependency(self, parent_role_id: UUID, child_role_id: UUID) -> bool:
         """Check if adding this hierarchy would create a circular dependency."""
-        from .models import role_hierarchy_table
-        
         # Check if child_role_id is already a parent of parent_role_id (direct or indirect)
-        visited = set()
-        return await self._has_path_to_role(child_role_id, parent_role_id, visited)
+        return await self._has_path_to_role(child_role_id, parent_role_id)
     
-    async def _has_path_to_role(self, start_role_id: UUID, target_role_id: UUID, visited: set) -> bool:
-        """Check if there's a path from start_role to target_role through hierarchy."""
-        from .models import role_hierarchy_table
-        
+    async def _has_path_to_role(self, start_role_id: UUID, target_role_id: UUID, visited: Optional[set] = None) -> bool:
+        """Check if there's a path from start_role to target_role through hierarchy (one closure lookup)."""
         if start_role_id == target_role_id:
             return True
         
-        if start_role_id in visited:
-            return False
-        
-        visited.add(start_role_id)
+        path_query = select(role_hierarchy_closure_table.c.path_count).where(
+            and_(
+                role_hierarchy_closure_table.c.ancestor_role_id == start_role_id,
+                role_hierarchy_closure_table.c.descendant_role_id == target_role_id
+            )
+        )
+        result = await self.session.execute(path_query)
+        return result.first() is not None
+    
+    async def _get_closure_neighbours(self, role_id: UUID, ancestors: bool) -> Dict[UUID, int]:
+        """Get a role's ancestors or descendants with path counts, including the role itself."""
+        closure = role_hierarchy_closure_table.c
+        if ancestors:
+            query = select(closure.ancestor_role_id, closure.path_count).where(closure.descendant_role_id == role_id)
+        else:
+            query = select(closure.descendant_role_id, closure.path_count).where(closure.ancestor_role_id == role_id)
         
-        # Get all child roles of start_role
-        child_query = select(role_hierarchy_table.c.child_role_id).where(
-            role_hierarchy_table.c.parent_role_id == start_role_id
+        result = await self.session.execute(query)
+        neighbours = {related_role_id: path_count for related_role_id, path_count in result.all()}
+        neighbours[role_id] = 1
+        return neighbours
+    
+    async def _get_user_role_closure(self, user_id: UUID) -> List[UUID]:
+        """Get a user's roles and every role above them in the hierarchy."""
+        closure = role_hierarchy_closure_table.c
+        direct_roles = select(user_roles_table.c.role_id).where(user_roles_table.c.user_id == user_id)
+        ancestor_roles = select(closure.ancestor_role_id).where(
+            closure.descendant_role_id.in_(direct_roles.scalar_subquery())
         )
+        result = await self.session.execute(direct_roles.union(ancestor_roles))
+        return list(result.scalars().all())
+    
+    async def _update_role_closure(self, parent_role_id: UUID, child_role_id: UUID, sign: int) -> List[UUID]:
+        """
+        Apply the addition (sign=1) or removal (sign=-1) of one hierarchy edge to the closure.
         
-        child_result = await self.session.execute(child_query)
-        child_role_ids = [row[0] for row in child_result.fetchall()]
+        Every path through the edge joins an ancestor of the parent to a
+        descendant of the child, so only those pairs change, by the product of
+        their path counts. Returns the child and its descendants.
+        """
+        closure = role_hierarchy_closure_table.c
+        ancestors = await self._get_closure_neighbours(parent_role_id, ancestors=True)
+        descendants = await self._get_closure_neighbours(child_role_id, ancestors=False)
         
-        # Recursively check each child
-        for child_role_id in child_role_ids:
-            if await self._has_path_to_role(child_role_id, target_role_id, visited):
-                return True
+        existing_query = select(closure.ancestor_role_id, closure.descendant_role_id, closure.path_count).where(
+            and_(
+                closure.ancestor_role_id.in_(list(ancestors)),
+                closure.descendant_role_id.in_(list(descendants))
+            )
+        )
+        existing_result = await self.session.execute(existing_query)
+        existing = {(ancestor, descendant): count for ancestor, descendant, count in existing_result.all()}
+        
+        inserts, updates, deletes = [], [], []
+        for ancestor_id, ancestor_paths in ancestors.items():
+            for descendant_id, descendant_paths in descendants.items():
+                current = existing.get((ancestor_id, descendant_id), 0)
+                path_count = current + sign * ancestor_paths * descendant_paths
+                row = {'a': ancestor_id, 'd': descendant_id, 'n': path_count}
+                if path_count <= 0:
+                    if current:
+                        deletes.append(row)
+                elif current:
+                    updates.append(row)
+                else:
+                    inserts.append({
+                        'ancestor_role_id': ancestor_id,
+                        'descendant_role_id': descendant_id,
+                        'path_count': path_count
+                    })
         
-        return False
+        pair_matches = and_(
+            closure.ancestor_role_id == bindparam('a'),
+            closure.descendant_role_id == bindparam('d')
+        )
+        if inserts:
+            await self.session.execute(role_hierarchy_closure_table.insert(), inserts)
+        if updates:
+            await self.session.execute(
+                role_hierarchy_closure_table.update().where(pair_matches).values(path_count=bindparam('n')),
+                updates
+            )
+        if deletes:
+            await self.session.execute(role_hierarchy_closure_table.delete().where(pair_matches), deletes)
+        
+        return list(descendants)
     
-    async def get_role_inherited_permissions(self, role_id: UUID) -> List[Permission]:
-        """Get all permissions for a role including inherited permissions from parent roles."""
+    async def rebuild_role_closure(self) -> Dict[str, Any]:
+        """Recompute the role closure from role_hierarchy (backfill or repair)."""
         from .models import role_hierarchy_table
         
-        # Get direct permissions
-        direct_permissions = await self.repository.get_role_permissions(role_id)
-        permission_map = {perm.id: perm for perm in direct_permissions}
-        
-        # Get inherited permissions from parent roles
-        await self._collect_inherited_permissions(role_id, permission_map, set())
+        edges_result = await self.session.execute(
+            select(role_hierarchy_table.c.parent_role_id, role_hierarchy_table.c.child_role_id)
+        )
+        children: Dict[UUID, List[UUID]] = {}
+        for parent_role_id, child_role_id in edges_result.all():
+            children.setdefault(parent_role_id, []).append(child_role_id)
+        
+        # Path counts from each role to everything below it (memoized DFS over the DAG)
+        memo: Dict[UUID, Dict[UUID, int]] = {}
+        
+        def paths_from(role_id: UUID, stack: Set[UUID]) -> Dict[UUID, int]:
+            if role_id in memo:
+                return memo[role_id]
+            if role_id in stack:
+                raise ValidationError("Circular dependency detected in role hierarchy")
+            stack.add(role_id)
+            counts: Dict[UUID, int] = {}
+            for child_role_id in children.get(role_id, []):
+                counts[child_role_id] = counts.get(child_role_id, 0) + 1
+                for descendant_id, path_count in paths_from(child_role_id, stack).items():
+                    counts[descendant_id] = counts.get(descendant_id, 0) + path_count
+            stack.discard(role_id)
+            memo[role_id] = counts
+            return counts
+        
+        rows = [
+            {'ancestor_role_id': ancestor_id, 'descendant_role_id': descendant_id, 'path_count': path_count}
+            for ancestor_id in list(children)
+            for descendant_id, path_count in paths_from(ancestor_id, set()).items()
+        ]
+        
+        await self.session.execute(role_hierarchy_closure_table.delete())
+        if rows:
+            await self.session.execute(role_hierarchy_closure_table.insert(), rows)
+        await self.session.commit()
         
-        return list(permission_map.values())
+        return {
+            'success': True,
+            'closure_rows': len(rows)
+        }
     
-    async def _collect_inherited_permissions(self, role_id: UUID, permission_map: Dict[UUID, Permission], visited: set):
-        """Recursively collect inherited permissions from parent roles."""
-        from .models import role_hierarchy_table
-        
-        if role_id in visited:
-            return
+    async def get_role_inherited_permissions(self, role_id: UUID) -> List[Permission]:
+        """
+        Get all permissions for a role including inherited permissions from parent roles.
         
-        visited.add(role_id)
+        Ancestors reachable through inheriting edges are resolved with a
+        recursive CTE, so the whole lookup is a single statement.
+        """
+        from .models import role_hierarchy_table
         
-        # Get parent roles that allow permission inheritance
-        parent_query = select(
-            role_hierarchy_table.c.parent_role_id,
-            role_hierarchy_table.c.inherit_permissions
-        ).where(
-            role_hierarchy_table.c.child_role_id == role_id
+        hierarchy = role_hierarchy_table.c
+        inherited_roles = select(hierarchy.parent_role_id.label('role_id')).where(
+            and_(
+                hierarchy.child_role_id == role_id,
+                hierarchy.inherit_permissions == True
+            )
+        ).cte('inherited_roles', recursive=True)
+        inherited_roles = inherited_roles.union(
+            select(hierarchy.parent_role_id).join(
+                inherited_roles, hierarchy.child_role_id == inherited_roles.c.role_id
+            ).where(hierarchy.inherit_permissions == True)
         )
         
-        parent_result = await self.session.execute(parent_query)
-        parent_data = parent_result.fetchall()
+        permissions_query = select(Permission).join(
+            role_permissions_table, Permission.id == role_permissions_table.c.permission_id
+        ).where(
+            or_(
+                role_permissions_table.c.role_id == role_id,
+                role_permissions_table.c.role_id.in_(select(inherited_roles.c.role_id))
+            )
+        ).distinct()
         
-        for parent_role_id, inherit_permissions in parent_data:
-            if inherit_permissions:
-                # Get permissions from parent role
-                parent_permissions = await self.repository.get_role_permissions(parent_role_id)
-                
-                # Add to permission map
-                for perm in parent_permissions:
-                    permission_map[perm.id] = perm
-                
-                # Recursively get permissions from parent's parents
-                await self._collect_inherited_permissions(parent_role_id, permission_map, visited)
+        result = await self.session.execute(permissions_query)
+        return list(result.scalars().all())
     
     async def get_user_all_permissions_with_hierarchy(self, user_id: UUID) -> Dict[str, Any]:
         """Get all permissions for a user including role hierarchy inheritance."""
@@ -1553,8 +1686,8 @@ class RBACService:
         if results['failed_count'] > 0:
             results['success'] = False
         
-        # Invalidate role cache after bulk permission assignment
-        await rbac_cache.invalidate_role_permissions(role_id)
+        # Invalidate role cache (and cached permissions of its members) after bulk assignment
+        await rbac_cache.invalidate_role_related_cache(role_id)
         
         # Log bulk operation
         await self.log_rbac_action(
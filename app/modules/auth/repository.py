@@ -5,6 +5,7 @@ from sqlalchemy import select, func, or_, and_, desc, asc
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload, joinedload
 
+from app.core.auth_cache import user_activity
 from .models import User, Role, Permission, user_roles_table, role_permissions_table
 # from app.shared.pagination import Page
 
@@ -139,6 +140,7 @@ class AuthRepository:
                 setattr(user, key, value)
         
         await self.session.commit()
+        user_activity.invalidate(user_id)
         await self.session.refresh(user)
         
         return user
@@ -151,6 +153,7 @@ class AuthRepository:
         
         user.is_active = False
         await self.session.commit()
+        user_activity.invalidate(user_id)
         
         return True
     
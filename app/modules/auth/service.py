@@ -12,13 +12,16 @@ from .schemas import (
     PermissionResponse, UserRoleAssignment, RolePermissionAssignment,
     UserPermissionsResponse, EmailVerificationRequest, ResendVerificationRequest
 )
+from app.core.password_hashing import password_hasher
 from app.core.security import (
-    verify_password, get_password_hash, validate_password,
+    validate_password,
     create_access_token, create_refresh_token, verify_token, 
     create_password_reset_token, verify_password_reset_token,
     create_email_verification_token, verify_email_verification_token
 )
 from app.core.errors import ValidationError, NotFoundError, ConflictError, AuthenticationError
+from .permission_registry import permission_registry
+from .rbac_cache import rbac_cache
 from app.shared.pagination import Page
 
 
@@ -48,7 +51,7 @@ class AuthService:
             raise ConflictError(f"Email '{user_data.email}' is already registered")
         
         # Hash password
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await password_hasher.hash(user_data.password)
         
         # Create user data
         user_dict = {
@@ -79,8 +82,11 @@ class AuthService:
         if not user:
             raise AuthenticationError("Invalid username or password")
         
-        # Verify password
-        if not verify_password(login_data.password, user.password_hash):
+        # Verify password, upgrading the hash if the scheme or cost changed
+        valid, new_password_hash = await password_hasher.verify_and_update(
+            login_data.password, user.password_hash
+        )
+        if not valid:
             raise AuthenticationError("Invalid username or password")
         
         # Check if user is active
@@ -92,7 +98,10 @@ class AuthService:
         #     raise AuthenticationError("Please verify your email address")
         
         # Update last login
-        await self.repository.update_user(user.id, {"last_login": datetime.utcnow()})
+        login_update = {"last_login": datetime.utcnow()}
+        if new_password_hash is not None:
+            login_update["password_hash"] = new_password_hash
+        await self.repository.update_user(user.id, login_update)
         
         # Get user permissions
         permissions = await self.repository.get_user_permissions(user.id)
@@ -103,7 +112,8 @@ class AuthService:
             "sub": user.email,
             "user_id": str(user.id),
             "permissions": permission_names,
-            "role": user.role.value
+            "role": user.role.value,
+            **permission_registry.token_claims(permission_names)
         }
         
         access_token = create_access_token(token_data)
@@ -142,7 +152,8 @@ class AuthService:
             "sub": user.email,
             "user_id": str(user.id),
             "permissions": permission_names,
-            "role": user.role.value
+            "role": user.role.value,
+            **permission_registry.token_claims(permission_names)
         }
         
         access_token = create_access_token(token_data)
@@ -196,7 +207,7 @@ class AuthService:
             raise NotFoundError("User not found")
         
         # Verify current password
-        if not verify_password(password_change.current_password, user.password_hash):
+        if not await password_hasher.verify(password_change.current_password, user.password_hash):
             raise AuthenticationError("Current password is incorrect")
         
         # Validate new password
@@ -206,7 +217,7 @@ class AuthService:
             raise ValidationError(str(e))
         
         # Hash new password
-        new_password_hash = get_password_hash(password_change.new_password)
+        new_password_hash = await password_hasher.hash(password_change.new_password)
         
         # Update password
         await self.repository.update_user(user_id, {"password_hash": new_password_hash})
@@ -247,7 +258,7 @@ class AuthService:
             raise ValidationError(str(e))
         
         # Hash new password
-        new_password_hash = get_password_hash(reset_confirm.new_password)
+        new_password_hash = await password_hasher.hash(reset_confirm.new_password)
         
         # Update password
         await self.repository.update_user(user.id, {"password_hash": new_password_hash})
@@ -522,13 +533,18 @@ class AuthService:
         if not success:
             raise ConflictError("Permission is already assigned to role")
         
+        # Members of the role and of the roles below it have cached the old permissions
+        await rbac_cache.invalidate_role_related_cache(assignment.role_id)
         return True
     
     async def remove_permission_from_role(self, assignment: RolePermissionAssignment) -> bool:
         """Remove permission from role."""
-        return await self.repository.remove_permission_from_role(
+        removed = await self.repository.remove_permission_from_role(
             assignment.role_id, assignment.permission_id
         )
+        if removed:
+            await rbac_cache.invalidate_role_related_cache(assignment.role_id)
+        return removed
     
     async def get_role_permissions(self, role_id: UUID) -> List[PermissionResponse]:
         """Get permissions for a role."""
@@ -116,6 +116,7 @@ class Customer(BaseModel):
         Index('idx_customer_city', 'city'),
         Index('idx_customer_state', 'state'),
         Index('idx_customer_country', 'country'),
+        Index('idx_customer_updated_at', 'updated_at'),
 # Removed is_active index - column is inherited from BaseModel
     )
     
@@ -338,6 +338,7 @@ class InventoryUnit(BaseModel):
         Index('idx_inventory_unit_status', 'status'),
         Index('idx_inventory_unit_condition', 'condition'),
         Index('idx_inventory_unit_serial', 'serial_number'),
+        Index('idx_inventory_unit_updated_at', 'updated_at'),
 # Removed is_active index - column is inherited from BaseModel
     )
     
@@ -1,8 +1,8 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Mapping
 from uuid import UUID
 from decimal import Decimal
 from datetime import datetime
-from sqlalchemy import and_, or_, func, select, update, delete, desc, asc
+from sqlalchemy import Integer, String, and_, or_, case, cast, func, select, true, update, delete, desc, asc
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload, joinedload
 
@@ -14,6 +14,12 @@ from app.modules.inventory.schemas import (
     ItemCreate, ItemUpdate, InventoryUnitCreate, InventoryUnitUpdate,
     StockLevelCreate, StockLevelUpdate
 )
+from app.shared.filters import SortOrder, SortSpec
+from app.shared.pagination import CountMode, CursorPage, paginate_keyset
+
+
+# Non-nullable columns the unit keyset page can be ordered by
+UNIT_CURSOR_SORT_FIELDS = {"unit_code", "created_at", "updated_at"}
 
 
 class ItemRepository:
@@ -301,20 +307,15 @@ class InventoryUnitRepository:
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
     
-    async def get_all(
-        self, 
-        skip: int = 0, 
-        limit: int = 100,
+    def _filter_conditions(
+        self,
         item_id: Optional[UUID] = None,
         location_id: Optional[UUID] = None,
         status: Optional[InventoryUnitStatus] = None,
         condition: Optional[InventoryUnitCondition] = None,
         active_only: bool = True
-    ) -> List[InventoryUnit]:
-        """Get all inventory units with optional filtering."""
-        query = select(InventoryUnit)
-        
-        # Apply filters
+    ) -> list:
+        """WHERE conditions shared by the list, count and page queries."""
         conditions = []
         if active_only:
             conditions.append(InventoryUnit.is_active == True)
@@ -326,7 +327,23 @@ class InventoryUnitRepository:
             conditions.append(InventoryUnit.status == status.value)
         if condition:
             conditions.append(InventoryUnit.condition == condition.value)
+        return conditions
+    
+    async def get_all(
+        self, 
+        skip: int = 0, 
+        limit: int = 100,
+        item_id: Optional[UUID] = None,
+        location_id: Optional[UUID] = None,
+        status: Optional[InventoryUnitStatus] = None,
+        condition: Optional[InventoryUnitCondition] = None,
+        active_only: bool = True
+    ) -> List[InventoryUnit]:
+        """Get all inventory units with optional filtering."""
+        query = select(InventoryUnit)
         
+        # Apply filters
+        conditions = self._filter_conditions(item_id, location_id, status, condition, active_only)
         if conditions:
             query = query.where(and_(*conditions))
         
@@ -335,6 +352,30 @@ class InventoryUnitRepository:
         result = await self.session.execute(query)
         return result.scalars().all()
     
+    async def get_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        sort_by: str = "unit_code",
+        sort_order: SortOrder = SortOrder.ASC,
+        count: CountMode = CountMode.NONE,
+        **filters
+    ) -> CursorPage:
+        """Keyset page of inventory units; takes the same filters as get_all."""
+        if sort_by not in UNIT_CURSOR_SORT_FIELDS:
+            raise ValueError(f"Cannot sort inventory units by '{sort_by}'")
+        
+        query = select(InventoryUnit)
+        conditions = self._filter_conditions(**filters)
+        if conditions:
+            query = query.where(and_(*conditions))
+        
+        return await paginate_keyset(
+            self.session, query, InventoryUnit,
+            [SortSpec(field=sort_by, order=sort_order)],
+            cursor=cursor, limit=limit, count=count
+        )
+    
     async def count_all(
         self,
         item_id: Optional[UUID] = None,
@@ -347,18 +388,7 @@ class InventoryUnitRepository:
         query = select(func.count(InventoryUnit.id))
         
         # Apply filters
-        conditions = []
-        if active_only:
-            conditions.append(InventoryUnit.is_active == True)
-        if item_id:
-            conditions.append(InventoryUnit.item_id == str(item_id))
-        if location_id:
-            conditions.append(InventoryUnit.location_id == str(location_id))
-        if status:
-            conditions.append(InventoryUnit.status == status.value)
-        if condition:
-            conditions.append(InventoryUnit.condition == condition.value)
-        
+        conditions = self._filter_conditions(item_id, location_id, status, condition, active_only)
         if conditions:
             query = query.where(and_(*conditions))
         
@@ -625,4 +655,207 @@ class StockLevelRepository:
         
         stock_level.is_active = False
         await self.session.commit()
-        return True
\ No newline at end of file
+        return True
+    
+    # Quantity changes
+    #
+    # Quantities are changed by single conditional UPDATEs that do the
+    # arithmetic in the database and return the new row, never by reading a
+    # row, changing it in Python and writing it back. A concurrent change to
+    # the same row waits for the row lock, and the guard is evaluated against
+    # the committed row, so two reservations cannot both take the last unit.
+    # None of these methods commit.
+    
+    @staticmethod
+    def by_id(stock_id: UUID) -> List[Any]:
+        """Criteria selecting a stock level by ID."""
+        stock = StockLevel.__table__
+        return [stock.c.id == stock_id]
+    
+    @staticmethod
+    def by_item_location(item_id: UUID, location_id: UUID) -> List[Any]:
+        """Criteria selecting the stock level of an item at a location."""
+        stock = StockLevel.__table__
+        return [stock.c.item_id == item_id, stock.c.location_id == location_id]
+    
+    @staticmethod
+    def _quantity(field: str):
+        """A quantity column as an integer (quantities are stored as strings)."""
+        return cast(StockLevel.__table__.c[field], Integer)
+    
+    async def _change_quantities(
+        self,
+        criteria: List[Any],
+        guard: Any,
+        quantities: Dict[str, Any],
+        updated_by: Optional[str] = None
+    ) -> Optional[Mapping[str, Any]]:
+        """
+        Set quantity expressions on an active stock level where guard holds.
+        
+        Returns:
+            The updated row, or None if no active stock level matched or the
+            guard did not hold
+        """
+        stock = StockLevel.__table__
+        values = {field: cast(expression, String(10)) for field, expression in quantities.items()}
+        values["updated_at"] = func.now()
+        if updated_by:
+            values["updated_by"] = updated_by
+        
+        result = await self.session.execute(
+            update(stock)
+            .where(*criteria, stock.c.is_active == True, guard)
+            .values(**values)
+            .returning(*stock.c)
+        )
+        return result.mappings().first()
+    
+    async def reserve(
+        self, criteria: List[Any], quantity: int, updated_by: Optional[str] = None
+    ) -> Optional[Mapping[str, Any]]:
+        """Move quantity from available to reserved if that much is available."""
+        available = self._quantity("quantity_available")
+        return await self._change_quantities(
+            criteria,
+            available >= quantity,
+            {
+                "quantity_reserved": self._quantity("quantity_reserved") + quantity,
+                "quantity_available": available - quantity,
+            },
+            updated_by
+        )
+    
+    async def release(
+        self, criteria: List[Any], quantity: int, updated_by: Optional[str] = None
+    ) -> Optional[Mapping[str, Any]]:
+        """Move quantity from reserved back to available if that much is reserved."""
+        reserved = self._quantity("quantity_reserved")
+        return await self._change_quantities(
+            criteria,
+            reserved >= quantity,
+            {
+                "quantity_reserved": reserved - quantity,
+                "quantity_available": self._quantity("quantity_available") + quantity,
+            },
+            updated_by
+        )
+    
+    async def adjust(
+        self, criteria: List[Any], adjustment: int, updated_by: Optional[str] = None
+    ) -> Optional[Mapping[str, Any]]:
+        """Change quantity on hand if it stays non-negative; available is on hand less reserved."""
+        on_hand = self._quantity("quantity_on_hand") + adjustment
+        unreserved = on_hand - self._quantity("quantity_reserved")
+        return await self._change_quantities(
+            criteria,
+            on_hand >= 0,
+            {
+                "quantity_on_hand": on_hand,
+                "quantity_available": case((unreserved > 0, unreserved), else_=0),
+            },
+            updated_by
+        )
+    
+    async def add_unit(
+        self, criteria: List[Any], available: bool, updated_by: Optional[str] = None
+    ) -> Optional[Mapping[str, Any]]:
+        """Count one more unit on hand, and available if the unit is."""
+        quantities = {"quantity_on_hand": self._quantity("quantity_on_hand") + 1}
+        if available:
+            quantities["quantity_available"] = self._quantity("quantity_available") + 1
+        return await self._change_quantities(criteria, true(), quantities, updated_by)
+    
+    async def get_quantities(self, criteria: List[Any]) -> Optional[Mapping[str, Any]]:
+        """Current quantities of an active stock level, used to explain a failed change."""
+        stock = StockLevel.__table__
+        result = await self.session.execute(
+            select(
+                stock.c.id, stock.c.item_id, stock.c.quantity_on_hand,
+                stock.c.quantity_available, stock.c.quantity_reserved
+            ).where(*criteria, stock.c.is_active == True)
+        )
+        return result.mappings().first()
+
+class InventoryReportRepository:
+    """
+    Set-based queries behind the inventory report.
+    
+    Item rows are read through the table rather than the mapped class so
+    that unit counts come from one grouped subquery instead of a lazy load
+    of ``Item.inventory_units`` per item. ``Item`` has no ``is_active``
+    column; like ``Item.is_active()`` the rows report an item as active
+    when its status is ACTIVE.
+    """
+    
+    def __init__(self, session: AsyncSession):
+        self.session = session
+    
+    @staticmethod
+    def _item_columns():
+        items = Item.__table__
+        return [
+            items.c.id, items.c.item_code, items.c.item_name, items.c.item_type, items.c.item_status,
+            items.c.purchase_price, items.c.rental_price_per_day, items.c.sale_price,
+            (items.c.item_status == ItemStatus.ACTIVE.value).label("is_active"),
+            items.c.created_at, items.c.updated_at
+        ]
+    
+    def _unit_counts(self):
+        """Active unit counts by status per item."""
+        units = InventoryUnit.__table__
+        return select(
+            units.c.item_id,
+            func.count().label("total_inventory_units"),
+            func.count().filter(units.c.status == InventoryUnitStatus.AVAILABLE.value).label("available_units"),
+            func.count().filter(units.c.status == InventoryUnitStatus.RENTED.value).label("rented_units")
+        ).where(units.c.is_active == True).group_by(units.c.item_id).subquery("unit_counts")
+    
+    async def get_items_with_unit_counts(self, active_only: bool = True) -> List[Dict[str, Any]]:
+        """Items with their unit counts, in one statement."""
+        items = Item.__table__
+        counts = self._unit_counts()
+        query = select(
+            *self._item_columns(),
+            func.coalesce(counts.c.total_inventory_units, 0).label("total_inventory_units"),
+            func.coalesce(counts.c.available_units, 0).label("available_units"),
+            func.coalesce(counts.c.rented_units, 0).label("rented_units")
+        ).select_from(
+            items.outerjoin(counts, counts.c.item_id == items.c.id)
+        ).where(items.c.deleted_at.is_(None))
+        
+        if active_only:
+            query = query.where(items.c.item_status == ItemStatus.ACTIVE.value)
+        
+        query = query.order_by(asc(items.c.item_name))
+        
+        result = await self.session.execute(query)
+        return [dict(row) for row in result.mappings()]
+    
+    async def count_items(self) -> Dict[str, int]:
+        """Total and active item counts."""
+        items = Item.__table__
+        row = (await self.session.execute(
+            select(
+                func.count().label("total_items"),
+                func.count().filter(items.c.item_status == ItemStatus.ACTIVE.value).label("total_active_items")
+            ).where(items.c.deleted_at.is_(None))
+        )).mappings().one()
+        return dict(row)
+    
+    async def get_reorder_candidates(self) -> List[Dict[str, Any]]:
+        """Items with at least one active stock level at or below its reorder point."""
+        items = Item.__table__
+        stock = StockLevel.__table__
+        low_stock = select(stock.c.item_id).where(
+            and_(
+                stock.c.is_active == True,
+                cast(stock.c.quantity_on_hand, Integer) <= cast(stock.c.reorder_point, Integer)
+            )
+        )
+        query = select(*self._item_columns()).where(
+            items.c.id.in_(low_stock)
+        ).order_by(asc(items.c.item_name))
+        
+        result = await self.session.execute(query)
+        return [dict(row) for row in result.mappings()]
@@ -11,10 +11,12 @@ from app.modules.inventory.schemas import (
     InventoryUnitCreate, InventoryUnitUpdate, InventoryUnitResponse, InventoryUnitListResponse,
     InventoryUnitStatusUpdate,
     StockLevelCreate, StockLevelUpdate, StockLevelResponse, StockLevelListResponse,
-    StockAdjustment, StockReservation, StockReservationRelease,
+    StockAdjustment, StockReservation, StockReservationRelease, StockBatchReservation,
     InventoryReport, ItemWithInventoryResponse
 )
-from app.core.errors import NotFoundError, ValidationError, ConflictError
+from app.core.errors import NotFoundError, ValidationError, ConflictError, InsufficientStockException
+from app.shared.filters import SortOrder
+from app.shared.pagination import CountMode, CursorPage
 
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
@@ -166,6 +168,38 @@ async def create_inventory_unit(
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
 
 
+@router.get("/units/cursor", response_model=CursorPage[InventoryUnitResponse])
+async def get_inventory_unit_page(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    sort_by: str = Query("unit_code", description="unit_code, created_at or updated_at"),
+    sort_order: SortOrder = Query(SortOrder.ASC),
+    count: CountMode = Query(CountMode.NONE, description="Report no total, a planner estimate, or an exact count"),
+    item_id: Optional[UUID] = None,
+    location_id: Optional[UUID] = None,
+    unit_status: Optional[InventoryUnitStatus] = Query(None, alias="status"),
+    condition: Optional[InventoryUnitCondition] = None,
+    active_only: bool = Query(True),
+    service: InventoryService = Depends(get_inventory_service)
+):
+    """Get inventory units with cursor pagination; deep pages cost the same as the first."""
+    try:
+        return await service.get_inventory_unit_page(
+            cursor=cursor,
+            limit=limit,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            count=count,
+            item_id=item_id,
+            location_id=location_id,
+            status=unit_status,
+            condition=condition,
+            active_only=active_only
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
 @router.get("/units/{unit_id}", response_model=InventoryUnitResponse)
 async def get_inventory_unit(
     unit_id: UUID,
@@ -378,10 +412,26 @@ async def reserve_stock(
         return await service.reserve_stock(stock_id, reservation_data)
     except NotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except InsufficientStockException as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail={"message": e.message, **e.details})
     except ValidationError as e:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
 
 
+@router.post("/stock/reservations", response_model=List[StockLevelResponse])
+async def reserve_stock_batch(
+    reservation_data: StockBatchReservation,
+    service: InventoryService = Depends(get_inventory_service)
+):
+    """Reserve stock for several items at once; nothing is reserved if any item is short."""
+    try:
+        return await service.reserve_stock_batch(reservation_data)
+    except NotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except InsufficientStockException as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail={"message": e.message, **e.details})
+
+
 @router.post("/stock/{stock_id}/release", response_model=StockLevelResponse)
 async def release_stock_reservation(
     stock_id: UUID,
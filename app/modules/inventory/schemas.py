@@ -389,6 +389,19 @@ class StockReservationRelease(BaseModel):
     reason: Optional[str] = Field(None, description="Reason for release")
 
 
+class StockReservationLine(BaseModel):
+    """One item of a batched stock reservation."""
+    item_id: UUID = Field(..., description="Item ID")
+    location_id: UUID = Field(..., description="Location ID")
+    quantity: int = Field(..., ge=1, description="Quantity to reserve")
+
+
+class StockBatchReservation(BaseModel):
+    """Schema for reserving stock for several items at once, all or nothing."""
+    lines: List[StockReservationLine] = Field(..., min_length=1, max_length=500, description="Items to reserve")
+    reason: Optional[str] = Field(None, description="Reason for reservation")
+
+
 class ItemWithInventoryResponse(BaseModel):
     """Schema for item with inventory details."""
     model_config = ConfigDict(from_attributes=True)
@@ -404,29 +417,14 @@ class ItemWithInventoryResponse(BaseModel):
     is_active: bool
     created_at: datetime
     updated_at: datetime
+    total_inventory_units: int = 0
+    available_units: int = 0
+    rented_units: int = 0
     
     @computed_field
     @property
     def display_name(self) -> str:
         return f"{self.item_name} ({self.item_code})"
-    
-    @computed_field
-    @property
-    def total_inventory_units(self) -> int:
-        """This will be populated by the service layer."""
-        return 0
-    
-    @computed_field
-    @property
-    def available_units(self) -> int:
-        """This will be populated by the service layer."""
-        return 0
-    
-    @computed_field
-    @property
-    def rented_units(self) -> int:
-        """This will be populated by the service layer."""
-        return 0
 
 
 class InventoryReport(BaseModel):
@@ -437,6 +435,7 @@ class InventoryReport(BaseModel):
     total_inventory_units: int
     total_available_units: int
     total_rented_units: int
+    utilization_rate: Decimal = Decimal("0")
     items_needing_reorder: List[ItemListResponse]
     
     
@@ -1,24 +1,28 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from uuid import UUID
 from decimal import Decimal
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.errors import NotFoundError, ValidationError, ConflictError
+from app.core.errors import NotFoundError, ValidationError, ConflictError, InsufficientStockException
+from app.shared.filters import SortOrder
+from app.shared.pagination import CountMode, CursorPage
 from app.modules.inventory.models import (
     Item, InventoryUnit, StockLevel, 
     ItemType, ItemStatus, InventoryUnitStatus, InventoryUnitCondition
 )
 from app.modules.inventory.repository import (
-    ItemRepository, InventoryUnitRepository, StockLevelRepository
+    ItemRepository, InventoryUnitRepository, StockLevelRepository, InventoryReportRepository
 )
 from app.modules.inventory.schemas import (
     ItemCreate, ItemUpdate, ItemResponse, ItemListResponse,
     InventoryUnitCreate, InventoryUnitUpdate, InventoryUnitResponse,
     StockLevelCreate, StockLevelUpdate, StockLevelResponse,
-    StockAdjustment, StockReservation, StockReservationRelease,
+    StockAdjustment, StockReservation, StockReservationRelease, StockBatchReservation,
     InventoryReport, ItemWithInventoryResponse
 )
+from app.modules.analytics.repository import DashboardRollupRepository
+from app.modules.rentals.availability import rental_availability
 
 
 class InventoryService:
@@ -29,6 +33,8 @@ class InventoryService:
         self.item_repository = ItemRepository(session)
         self.inventory_unit_repository = InventoryUnitRepository(session)
         self.stock_level_repository = StockLevelRepository(session)
+        self.report_repository = InventoryReportRepository(session)
+        self.rollup_repository = DashboardRollupRepository(session)
     
     # Item operations
     async def create_item(self, item_data: ItemCreate) -> ItemResponse:
@@ -160,6 +166,7 @@ class InventoryService:
         
         # Update stock levels
         await self._update_stock_levels_for_unit_creation(unit)
+        rental_availability.invalidate_items([unit.item_id])
         
         return InventoryUnitResponse.model_validate(unit)
     
@@ -194,6 +201,26 @@ class InventoryService:
         
         return [InventoryUnitResponse.model_validate(unit) for unit in units]
     
+    async def get_inventory_unit_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        sort_by: str = "unit_code",
+        sort_order: SortOrder = SortOrder.ASC,
+        count: CountMode = CountMode.NONE,
+        **filters
+    ) -> CursorPage[InventoryUnitResponse]:
+        """Get one keyset page of inventory units, taking the same filters as get_inventory_units."""
+        page = await self.inventory_unit_repository.get_page(
+            cursor=cursor,
+            limit=limit,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            count=count,
+            **filters
+        )
+        return page.map(InventoryUnitResponse.model_validate)
+    
     async def get_available_units(
         self, 
         item_id: Optional[UUID] = None,
@@ -216,6 +243,7 @@ class InventoryService:
         
         # Update unit
         unit = await self.inventory_unit_repository.update(unit_id, unit_data)
+        rental_availability.invalidate_items([existing_unit.item_id, unit.item_id])
         return InventoryUnitResponse.model_validate(unit)
     
     async def update_unit_status(
@@ -239,6 +267,7 @@ class InventoryService:
         
         await self.session.commit()
         await self.session.refresh(unit)
+        rental_availability.invalidate_items([unit.item_id])
         
         return InventoryUnitResponse.model_validate(unit)
     
@@ -273,6 +302,7 @@ class InventoryService:
         unit.return_from_rent(condition)
         await self.session.commit()
         await self.session.refresh(unit)
+        rental_availability.invalidate_items([unit.item_id])
         
         return InventoryUnitResponse.model_validate(unit)
     
@@ -288,6 +318,7 @@ class InventoryService:
         unit.mark_as_sold()
         await self.session.commit()
         await self.session.refresh(unit)
+        rental_availability.invalidate_items([unit.item_id])
         
         return InventoryUnitResponse.model_validate(unit)
     
@@ -343,41 +374,82 @@ class InventoryService:
         stock_level = await self.stock_level_repository.update(stock_id, stock_data)
         return StockLevelResponse.model_validate(stock_level)
     
-    async def adjust_stock(self, stock_id: UUID, adjustment_data: StockAdjustment) -> StockLevelResponse:
-        """Adjust stock quantity."""
-        stock_level = await self.stock_level_repository.get_by_id(stock_id)
-        if not stock_level:
-            raise NotFoundError(f"Stock level with ID {stock_id} not found")
+    async def adjust_stock(
+        self, stock_id: UUID, adjustment_data: StockAdjustment, updated_by: Optional[str] = None
+    ) -> StockLevelResponse:
+        """Adjust stock quantity on hand with one conditional UPDATE."""
+        criteria = self.stock_level_repository.by_id(stock_id)
+        stock_level = await self.stock_level_repository.adjust(criteria, adjustment_data.adjustment, updated_by)
+        if stock_level is None:
+            await self._stock_change_failed(criteria, stock_id)
+            raise ValidationError("Quantity adjustment would result in negative stock")
         
-        stock_level.adjust_quantity(adjustment_data.adjustment)
         await self.session.commit()
-        await self.session.refresh(stock_level)
-        
-        return StockLevelResponse.model_validate(stock_level)
-    
-    async def reserve_stock(self, stock_id: UUID, reservation_data: StockReservation) -> StockLevelResponse:
-        """Reserve stock quantity."""
-        stock_level = await self.stock_level_repository.get_by_id(stock_id)
-        if not stock_level:
-            raise NotFoundError(f"Stock level with ID {stock_id} not found")
+        return StockLevelResponse.model_validate(dict(stock_level))
+    
+    async def reserve_stock(
+        self, stock_id: UUID, reservation_data: StockReservation, reserved_by: Optional[str] = None
+    ) -> StockLevelResponse:
+        """Reserve stock quantity with one conditional UPDATE."""
+        criteria = self.stock_level_repository.by_id(stock_id)
+        stock_level = await self.stock_level_repository.reserve(criteria, reservation_data.quantity, reserved_by)
+        if stock_level is None:
+            current = await self._stock_change_failed(criteria, stock_id)
+            raise InsufficientStockException(
+                str(current["item_id"]), reservation_data.quantity, int(current["quantity_available"])
+            )
         
-        stock_level.reserve_quantity(reservation_data.quantity)
         await self.session.commit()
-        await self.session.refresh(stock_level)
-        
-        return StockLevelResponse.model_validate(stock_level)
+        return StockLevelResponse.model_validate(dict(stock_level))
     
-    async def release_stock_reservation(self, stock_id: UUID, release_data: StockReservationRelease) -> StockLevelResponse:
-        """Release stock reservation."""
-        stock_level = await self.stock_level_repository.get_by_id(stock_id)
-        if not stock_level:
-            raise NotFoundError(f"Stock level with ID {stock_id} not found")
+    async def reserve_stock_batch(
+        self, reservation_data: StockBatchReservation, reserved_by: Optional[str] = None
+    ) -> List[StockLevelResponse]:
+        """
+        Reserve stock for several items in one transaction, all or nothing.
+        
+        Lines for the same item and location are combined. Stock levels are
+        updated in (item, location) order whatever the order of the lines,
+        so two batches sharing items always lock their rows in the same order
+        and cannot deadlock.
+        
+        Returns:
+            The reserved stock levels, in (item, location) order
+        """
+        requested: Dict[Tuple[UUID, UUID], int] = {}
+        for line in reservation_data.lines:
+            key = (line.item_id, line.location_id)
+            requested[key] = requested.get(key, 0) + line.quantity
+        
+        reserved = []
+        try:
+            for (item_id, location_id), quantity in sorted(requested.items(), key=lambda entry: str(entry[0])):
+                criteria = self.stock_level_repository.by_item_location(item_id, location_id)
+                stock_level = await self.stock_level_repository.reserve(criteria, quantity, reserved_by)
+                if stock_level is None:
+                    current = await self._stock_change_failed(criteria, f"{item_id} at {location_id}")
+                    raise InsufficientStockException(str(item_id), quantity, int(current["quantity_available"]))
+                reserved.append(stock_level)
+            
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        
+        return [StockLevelResponse.model_validate(dict(stock_level)) for stock_level in reserved]
+    
+    async def release_stock_reservation(
+        self, stock_id: UUID, release_data: StockReservationRelease, released_by: Optional[str] = None
+    ) -> StockLevelResponse:
+        """Release stock reservation with one conditional UPDATE."""
+        criteria = self.stock_level_repository.by_id(stock_id)
+        stock_level = await self.stock_level_repository.release(criteria, release_data.quantity, released_by)
+        if stock_level is None:
+            await self._stock_change_failed(criteria, stock_id)
+            raise ValidationError("Cannot release more than reserved quantity")
         
-        stock_level.release_reservation(release_data.quantity)
         await self.session.commit()
-        await self.session.refresh(stock_level)
-        
-        return StockLevelResponse.model_validate(stock_level)
+        return StockLevelResponse.model_validate(dict(stock_level))
     
     async def get_low_stock_items(self) -> List[StockLevelResponse]:
         """Get items with low stock."""
@@ -387,38 +459,25 @@ class InventoryService:
     # Reporting operations
     async def get_inventory_report(self) -> InventoryReport:
         """Get comprehensive inventory report."""
-        # Get all items
-        items = await self.item_repository.get_all(active_only=True)
+        # Items with their unit counts, and item totals
+        items = await self.report_repository.get_items_with_unit_counts(active_only=True)
+        item_counts = await self.report_repository.count_items()
         
-        # Get inventory counts
-        total_items = len(items)
-        total_active_items = len([item for item in items if item.is_active])
-        
-        # Get all inventory units
-        all_units = await self.inventory_unit_repository.get_all(active_only=True)
-        total_inventory_units = len(all_units)
-        total_available_units = len([unit for unit in all_units if unit.is_available()])
-        total_rented_units = len([unit for unit in all_units if unit.is_rented()])
+        # Unit counts come from the dashboard rollups
+        unit_overview = await self.rollup_repository.get_inventory_overview()
         
         # Get items needing reorder
-        low_stock_items = await self.stock_level_repository.get_low_stock_items()
-        items_needing_reorder = []
-        for stock_level in low_stock_items:
-            item = await self.item_repository.get_by_id(UUID(stock_level.item_id))
-            if item:
-                items_needing_reorder.append(ItemListResponse.model_validate(item))
-        
-        # Convert items to response format
-        item_responses = [ItemWithInventoryResponse.model_validate(item) for item in items]
+        reorder_candidates = await self.report_repository.get_reorder_candidates()
         
         return InventoryReport(
-            items=item_responses,
-            total_items=total_items,
-            total_active_items=total_active_items,
-            total_inventory_units=total_inventory_units,
-            total_available_units=total_available_units,
-            total_rented_units=total_rented_units,
-            items_needing_reorder=items_needing_reorder
+            items=[ItemWithInventoryResponse.model_validate(item) for item in items],
+            total_items=item_counts['total_items'],
+            total_active_items=item_counts['total_active_items'],
+            total_inventory_units=unit_overview['total_units'],
+            total_available_units=unit_overview['available_units'],
+            total_rented_units=unit_overview['rented_units'],
+            utilization_rate=unit_overview['utilization_rate'],
+            items_needing_reorder=[ItemListResponse.model_validate(item) for item in reorder_candidates]
         )
     
     # Helper methods
@@ -490,21 +549,13 @@ class InventoryService:
     
     async def _update_stock_levels_for_unit_creation(self, unit: InventoryUnit):
         """Update stock levels when a new inventory unit is created."""
-        # Get or create stock level for the item/location
-        stock_level = await self.stock_level_repository.get_by_item_location(
-            UUID(unit.item_id), UUID(unit.location_id)
+        # Count the unit on the existing stock level, or create one
+        stock_level = await self.stock_level_repository.add_unit(
+            self.stock_level_repository.by_item_location(UUID(str(unit.item_id)), UUID(str(unit.location_id))),
+            unit.is_available()
         )
         
         if stock_level:
-            # Increment quantity
-            current_quantity = int(stock_level.quantity_on_hand)
-            new_quantity = current_quantity + 1
-            stock_level.quantity_on_hand = str(new_quantity)
-            
-            # Update available quantity if the unit is available
-            if unit.is_available():
-                stock_level.quantity_available = str(int(stock_level.quantity_available) + 1)
-            
             await self.session.commit()
         else:
             # Create new stock level
@@ -514,4 +565,17 @@ class InventoryService:
                 quantity_on_hand="1",
                 quantity_available="1" if unit.is_available() else "0"
             )
-            await self.stock_level_repository.create(stock_data)
\ No newline at end of file
+            await self.stock_level_repository.create(stock_data)
+    
+    async def _stock_change_failed(self, criteria: List[Any], identifier: Any) -> Dict[str, Any]:
+        """
+        Roll back a refused quantity change and read the stock level it targeted.
+        
+        Raises:
+            NotFoundError: If there is no active stock level to change
+        """
+        await self.session.rollback()
+        current = await self.stock_level_repository.get_quantities(criteria)
+        if current is None:
+            raise NotFoundError("Stock level", identifier)
+        return dict(current)
@@ -1,10 +1,12 @@
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator, Iterable
 from uuid import UUID
-from sqlalchemy import select, func, or_, and_, desc, asc, text
+from datetime import datetime
+from sqlalchemy import select, insert, update, func, literal, or_, and_, desc, asc, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload, joinedload
 
 from .models import Category, CategoryPath
+from app.shared.repository import MAX_BIND_PARAMETERS
 # from app.shared.pagination import Page
 
 
@@ -95,16 +97,14 @@ class CategoryRepository:
             return []
         
         path_segments = category.get_path_segments()
-        ancestors = []
+        ancestor_paths = ["/".join(path_segments[:i + 1]) for i in range(len(path_segments) - 1)]
         
-        # Build paths for each ancestor
-        for i in range(len(path_segments) - 1):
-            ancestor_path = "/".join(path_segments[:i + 1])
-            ancestor = await self.get_by_path(ancestor_path)
-            if ancestor:
-                ancestors.append(ancestor)
-        
-        return ancestors
+        # All ancestors in one query, ordered from the root down
+        query = select(Category).where(
+            Category.category_path.in_(ancestor_paths)
+        ).order_by(Category.category_level)
+        result = await self.session.execute(query)
+        return result.scalars().all()
     
     async def get_siblings(self, category_id: UUID) -> List[Category]:
         """Get sibling categories."""
@@ -254,7 +254,7 @@ class CategoryRepository:
         new_parent_id: Optional[UUID],
         updated_by: Optional[str] = None
     ) -> Optional[Category]:
-        """Move category to a new parent."""
+        """Move category (and its subtree) to a new parent."""
         category = await self.get_by_id(category_id)
         if not category:
             return None
@@ -274,21 +274,99 @@ class CategoryRepository:
             new_level = 1
             new_path = category.name
         
-        # Update category
-        category.move_to_parent(
-            new_parent_id=new_parent_id,
-            new_level=new_level,
+        return await self.rewrite_subtree(
+            category_id,
             new_path=new_path,
+            new_level=new_level,
+            values={"parent_category_id": new_parent_id},
             updated_by=updated_by
         )
+    
+    async def rewrite_subtree(
+        self,
+        category_id: UUID,
+        new_path: str,
+        new_level: int,
+        values: Optional[Dict[str, Any]] = None,
+        updated_by: Optional[str] = None
+    ) -> Optional[Category]:
+        """Rewrite a subtree (see rewrite_subtree_paths) and return the reloaded root."""
+        if await self.rewrite_subtree_paths(category_id, new_path, new_level, values, updated_by) is None:
+            return None
         
-        # Update all descendants
-        await self._update_descendant_paths(category)
+        result = await self.session.execute(
+            select(Category).where(Category.id == category_id).execution_options(populate_existing=True)
+        )
+        return result.scalar_one_or_none()
+    
+    async def rewrite_subtree_paths(
+        self,
+        category_id: UUID,
+        new_path: str,
+        new_level: int,
+        values: Optional[Dict[str, Any]] = None,
+        updated_by: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Give a category a new path and level and carry its subtree along.
+        
+        The subtree root is locked (SELECT ... FOR UPDATE), then a single
+        UPDATE swaps the old path prefix of every descendant for the new one
+        and shifts their level by the same amount as the root. ``values``
+        are extra columns set on the root (e.g. name, parent). Everything is
+        committed as one transaction.
+        
+        Returns the number of descendants rewritten, or None if the category
+        does not exist.
+        """
+        categories = Category.__table__
+        root = (await self.session.execute(
+            select(categories.c.category_path, categories.c.category_level)
+            .where(categories.c.id == category_id)
+            .with_for_update()
+        )).one_or_none()
+        if root is None:
+            return None
+        old_path, old_level = root
+        subtree = categories.c.category_path.startswith(f"{old_path}/", autoescape=True)
+        now = datetime.utcnow()
         
-        await self.session.commit()
-        await self.session.refresh(category)
+        try:
+            # The longest descendant path must still fit the column
+            longest = (await self.session.execute(
+                select(func.max(func.length(categories.c.category_path))).where(subtree)
+            )).scalar() or len(old_path)
+            if longest - len(old_path) + len(new_path) > 500:
+                raise ValueError("Category path cannot exceed 500 characters")
+            
+            result = await self.session.execute(
+                update(categories)
+                .where(subtree)
+                .values(
+                    category_path=literal(new_path) + func.substr(categories.c.category_path, len(old_path) + 1),
+                    category_level=categories.c.category_level + (new_level - old_level),
+                    updated_at=now,
+                    updated_by=updated_by
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await self.session.execute(
+                update(categories)
+                .where(categories.c.id == category_id)
+                .values(
+                    category_path=new_path,
+                    category_level=new_level,
+                    updated_at=now,
+                    updated_by=updated_by,
+                    **(values or {})
+                )
+            )
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
         
-        return category
+        return result.rowcount
     
     async def delete(self, category_id: UUID) -> bool:
         """Soft delete category by setting is_active to False."""
@@ -537,6 +615,81 @@ class CategoryRepository:
         # For now, return empty list
         return []
     
+    async def get_path_index(self) -> Dict[str, Dict[str, Any]]:
+        """Map every category path to its id, level and leaf flag, in one query."""
+        categories = Category.__table__
+        result = await self.session.execute(
+            select(categories.c.id, categories.c.category_path, categories.c.category_level, categories.c.is_leaf)
+        )
+        return {row["category_path"]: dict(row) for row in result.mappings()}
+    
+    async def insert_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Insert prepared category rows with multi-row INSERT statements.
+        
+        Rows must all have the same keys. Large batches are split to stay
+        under the driver's bind parameter limit. Does not commit.
+        """
+        if not rows:
+            return
+        categories = Category.__table__
+        batch_size = max(1, MAX_BIND_PARAMETERS // len(rows[0]))
+        for start in range(0, len(rows), batch_size):
+            await self.session.execute(insert(categories).values(rows[start:start + batch_size]))
+    
+    async def mark_non_leaf(self, category_ids: Iterable[UUID], updated_by: Optional[str] = None) -> int:
+        """Clear is_leaf on the given categories in one UPDATE. Does not commit."""
+        category_ids = list(category_ids)
+        if not category_ids:
+            return 0
+        categories = Category.__table__
+        result = await self.session.execute(
+            update(categories)
+            .where(categories.c.id.in_(category_ids), categories.c.is_leaf == True)
+            .values(is_leaf=False, updated_at=datetime.utcnow(), updated_by=updated_by)
+        )
+        return result.rowcount
+    
+    async def stream_export_rows(
+        self,
+        include_inactive: bool = False,
+        batch_size: int = 1000
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield every category with its child and item counts, parents first.
+        
+        Rows are fetched from a server-side cursor ``batch_size`` at a time,
+        so memory use does not grow with the size of the table.
+        """
+        from app.modules.inventory.models import Item
+        
+        categories = Category.__table__
+        items = Item.__table__
+        child_counts = select(
+            categories.c.parent_category_id.label("category_id"), func.count().label("child_count")
+        ).where(categories.c.parent_category_id.isnot(None)).group_by(categories.c.parent_category_id).subquery()
+        item_counts = select(
+            items.c.category_id, func.count().label("item_count")
+        ).where(items.c.category_id.isnot(None)).group_by(items.c.category_id).subquery()
+        
+        query = select(
+            categories.c.id, categories.c.name, categories.c.parent_category_id, categories.c.category_path,
+            categories.c.category_level, categories.c.display_order, categories.c.is_leaf, categories.c.is_active,
+            categories.c.created_at, categories.c.updated_at, categories.c.created_by, categories.c.updated_by,
+            func.coalesce(child_counts.c.child_count, 0).label("child_count"),
+            func.coalesce(item_counts.c.item_count, 0).label("item_count")
+        ).select_from(
+            categories
+            .outerjoin(child_counts, child_counts.c.category_id == categories.c.id)
+            .outerjoin(item_counts, item_counts.c.category_id == categories.c.id)
+        ).order_by(categories.c.category_path).execution_options(yield_per=batch_size)
+        if not include_inactive:
+            query = query.where(categories.c.is_active == True)
+        
+        result = await self.session.stream(query)
+        async for row in result.mappings():
+            yield dict(row)
+    
     async def update_display_orders(
         self, 
         category_orders: List[Tuple[UUID, int]]
@@ -557,24 +710,6 @@ class CategoryRepository:
         
         return updated_categories
     
-    async def _update_descendant_paths(self, parent_category: Category):
-        """Update paths for all descendants when parent is moved."""
-        descendants = await self.get_descendants(parent_category.id)
-        
-        for descendant in descendants:
-            # Calculate new path
-            old_path_segments = descendant.get_path_segments()
-            parent_path_segments = parent_category.get_path_segments()
-            
-            # Replace the parent part of the path
-            descendant_relative_segments = old_path_segments[len(parent_path_segments):]
-            new_path_segments = parent_path_segments + descendant_relative_segments
-            new_path = "/".join(new_path_segments)
-            
-            # Update descendant
-            descendant.category_path = new_path
-            descendant.category_level = len(new_path_segments)
-    
     def _apply_filters(self, query, filters: Dict[str, Any]):
         """Apply filters to query."""
         for key, value in filters.items():
@@ -1,7 +1,7 @@
 from typing import Optional, List
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 from .service import CategoryService
 from .schemas import (
@@ -220,10 +220,11 @@ async def get_category_tree(
     service: CategoryService = Depends(get_category_service)
 ):
     """Get hierarchical category tree."""
-    return await service.get_category_tree(
+    content = await service.get_category_tree_json(
         root_id=root_id,
         include_inactive=include_inactive
     )
+    return Response(content=content, media_type="application/json")
 
 
 @router.get("/{category_id}/hierarchy", response_model=CategoryHierarchy)
@@ -241,6 +242,21 @@ async def get_category_hierarchy(
         )
 
 
+@router.get("/{category_id}/breadcrumb", response_model=List[CategorySummary])
+async def get_category_breadcrumb(
+    category_id: UUID,
+    service: CategoryService = Depends(get_category_service)
+):
+    """Get the categories from the root down to a category."""
+    try:
+        return await service.get_category_breadcrumb(category_id)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+
 @router.get("/search/", response_model=List[CategorySummary])
 async def search_categories(
     q: str = Query(..., min_length=1, description="Search query"),
@@ -319,13 +335,17 @@ async def export_categories(
     include_inactive: bool = Query(False, description="Include inactive categories"),
     service: CategoryService = Depends(get_category_service)
 ):
-    """Export categories data."""
-    return await service.export_categories(include_inactive=include_inactive)
+    """Export categories data, streamed as a JSON array."""
+    return StreamingResponse(
+        service.stream_export_json(include_inactive=include_inactive),
+        media_type="application/json"
+    )
 
 
 @router.post("/import/", response_model=CategoryImportResult)
 async def import_categories(
     categories_data: List[CategoryImport],
+    bulk: bool = Query(True, description="Use the bulk import engine"),
     service: CategoryService = Depends(get_category_service),
     current_user_id: Optional[str] = None  # TODO: Get from auth context
 ):
@@ -333,7 +353,8 @@ async def import_categories(
     try:
         return await service.import_categories(
             import_data=categories_data,
-            created_by=current_user_id
+            created_by=current_user_id,
+            bulk=bulk
         )
     except ValidationError as e:
         raise HTTPException(
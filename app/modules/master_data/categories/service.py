@@ -1,8 +1,11 @@
-from typing import List, Optional, Dict, Any, Tuple
-from uuid import UUID
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator
+from uuid import UUID, uuid4
 from datetime import datetime
 
+from sqlalchemy.exc import IntegrityError
+
 from .repository import CategoryRepository
+from .tree_index import category_index
 from .models import Category, CategoryPath
 from .schemas import (
     CategoryCreate, CategoryUpdate, CategoryMove, CategoryResponse, 
@@ -86,6 +89,7 @@ class CategoryService:
         
         # Create category
         category = await self.repository.create(create_data)
+        category_index.invalidate()
         
         # Convert to response
         return await self._to_response(category)
@@ -184,16 +188,19 @@ class CategoryService:
             else:
                 new_path = category_data.name
             
-            update_data["category_path"] = new_path
-        
-        # Update category
-        updated_category = await self.repository.update(category_id, update_data)
+            # Rename and rewrite descendant paths in one statement and transaction
+            updated_category = await self.repository.rewrite_subtree(
+                category_id,
+                new_path=new_path,
+                new_level=existing_category.category_level,
+                values={key: update_data[key] for key in ("name", "display_order", "is_active") if key in update_data},
+                updated_by=updated_by
+            )
+        else:
+            updated_category = await self.repository.update(category_id, update_data)
         if not updated_category:
             raise NotFoundError(f"Category with id {category_id} not found")
-        
-        # Update descendant paths if name changed
-        if path_update_needed:
-            await self._update_descendant_paths_after_rename(updated_category)
+        category_index.invalidate()
         
         return await self._to_response(updated_category)
     
@@ -246,6 +253,7 @@ class CategoryService:
         # Update new parent if needed
         if move_data.new_parent_id:
             await self._update_parent_leaf_status(move_data.new_parent_id)
+        category_index.invalidate()
         
         return await self._to_response(moved_category)
     
@@ -275,6 +283,7 @@ class CategoryService:
         # Update parent leaf status if needed
         if success and category.parent_category_id:
             await self._update_parent_leaf_status(category.parent_category_id)
+        category_index.invalidate()
         
         return success
     
@@ -292,57 +301,28 @@ class CategoryService:
         Returns:
             List of category trees
         """
-        # Get all categories in tree
-        categories = await self.repository.get_tree(root_id)
-        
-        if not include_inactive:
-            categories = [cat for cat in categories if cat.is_active]
-        
-        # Build tree structure
-        category_dict = {cat.id: cat for cat in categories}
-        tree_nodes = {}
-        
-        # Create tree nodes
-        for category in categories:
-            tree_node = CategoryTree(
-                id=category.id,
-                name=category.name,
-                category_path=category.category_path,
-                category_level=category.category_level,
-                parent_category_id=category.parent_category_id,
-                display_order=category.display_order,
-                is_leaf=category.is_leaf,
-                is_active=category.is_active,
-                child_count=category.child_count,
-                item_count=category.item_count,
-                children=[]
-            )
-            tree_nodes[category.id] = tree_node
-        
-        # Build parent-child relationships
-        root_nodes = []
-        for category in categories:
-            tree_node = tree_nodes[category.id]
-            
-            if category.parent_category_id and category.parent_category_id in tree_nodes:
-                parent_node = tree_nodes[category.parent_category_id]
-                parent_node.children.append(tree_node)
-            else:
-                root_nodes.append(tree_node)
-        
-        # Sort children by display order and name
-        def sort_children(node):
-            node.children.sort(key=lambda x: (x.display_order, x.name))
-            for child in node.children:
-                sort_children(child)
-        
-        for root in root_nodes:
-            sort_children(root)
+        index = await category_index.get(self.repository.session)
+        return [CategoryTree.model_validate(node) for node in index.tree(root_id, include_inactive)]
+    
+    async def get_category_tree_json(
+        self,
+        root_id: Optional[UUID] = None,
+        include_inactive: bool = False
+    ) -> bytes:
+        """Get the category tree as serialized JSON.
         
-        # Sort root nodes
-        root_nodes.sort(key=lambda x: (x.display_order, x.name))
+        The serialized tree is cached with the category index, so repeated
+        requests skip both the database and response serialization.
         
-        return root_nodes
+        Args:
+            root_id: Root category ID (None for full tree)
+            include_inactive: Include inactive categories
+            
+        Returns:
+            JSON array of category trees
+        """
+        index = await category_index.get(self.repository.session)
+        return index.tree_json(root_id, include_inactive)
     
     async def get_category_hierarchy(self, category_id: UUID) -> CategoryHierarchy:
         """Get category hierarchy information.
@@ -356,34 +336,41 @@ class CategoryService:
         Raises:
             NotFoundError: If category not found
         """
-        category = await self.repository.get_by_id(category_id)
+        index = await category_index.get(self.repository.session)
+        category = index.get(category_id)
         if not category:
-            raise NotFoundError(f"Category with id {category_id} not found")
-        
-        # Get ancestors
-        ancestors = await self.repository.get_ancestors(category_id)
-        ancestor_summaries = [await self._to_summary(cat) for cat in ancestors]
-        
-        # Get descendants
-        descendants = await self.repository.get_descendants(category_id)
-        descendant_summaries = [await self._to_summary(cat) for cat in descendants]
-        
-        # Get siblings
-        siblings = await self.repository.get_siblings(category_id)
-        sibling_summaries = [await self._to_summary(cat) for cat in siblings]
+            raise NotFoundError("Category", category_id)
         
-        # Build path to root
-        path_to_root = ancestor_summaries + [await self._to_summary(category)]
+        ancestors = [CategorySummary(**node) for node in index.ancestors(category_id)]
         
         return CategoryHierarchy(
             category_id=category_id,
-            ancestors=ancestor_summaries,
-            descendants=descendant_summaries,
-            siblings=sibling_summaries,
-            depth=category.category_level,
-            path_to_root=path_to_root
+            ancestors=ancestors,
+            descendants=[CategorySummary(**node) for node in index.descendants(category_id)],
+            siblings=[CategorySummary(**node) for node in index.siblings(category_id)],
+            depth=category["category_level"],
+            path_to_root=ancestors + [CategorySummary(**category)]
         )
     
+    async def get_category_breadcrumb(self, category_id: UUID) -> List[CategorySummary]:
+        """Get the categories from the root down to a category.
+        
+        Args:
+            category_id: Category UUID
+            
+        Returns:
+            Ancestor summaries followed by the category itself
+            
+        Raises:
+            NotFoundError: If category not found
+        """
+        index = await category_index.get(self.repository.session)
+        category = index.get(category_id)
+        if not category:
+            raise NotFoundError("Category", category_id)
+        
+        return [CategorySummary(**node) for node in index.ancestors(category_id) + [category]]
+    
     async def list_categories(
         self,
         page: int = 1,
@@ -566,6 +553,7 @@ class CategoryService:
                     "category_id": str(category_id),
                     "error": str(e)
                 })
+        category_index.invalidate()
         
         return CategoryBulkResult(
             success_count=success_count,
@@ -583,50 +571,181 @@ class CategoryService:
             include_inactive: Include inactive categories
             
         Returns:
-            List of category export data
+            List of category export data, parents before children
         """
-        categories = await self.repository.list(
-            skip=0,
-            limit=10000,  # Large limit for export
-            include_inactive=include_inactive
-        )
+        return [
+            CategoryExport.model_validate(row)
+            async for row in self.repository.stream_export_rows(include_inactive=include_inactive)
+        ]
+    
+    async def stream_export_json(
+        self,
+        include_inactive: bool = False,
+        batch_size: int = 1000
+    ) -> AsyncIterator[bytes]:
+        """Export categories as a JSON array, produced incrementally.
         
-        export_data = []
-        for category in categories:
-            export_item = CategoryExport(
-                id=category.id,
-                name=category.name,
-                parent_category_id=category.parent_category_id,
-                category_path=category.category_path,
-                category_level=category.category_level,
-                display_order=category.display_order,
-                is_leaf=category.is_leaf,
-                is_active=category.is_active,
-                created_at=category.created_at,
-                updated_at=category.updated_at,
-                created_by=category.created_by,
-                updated_by=category.updated_by,
-                child_count=category.child_count,
-                item_count=category.item_count
-            )
-            export_data.append(export_item)
+        Rows are read from a server-side cursor and serialized as they
+        arrive, so the export is not capped and never held in memory whole.
         
-        return export_data
+        Args:
+            include_inactive: Include inactive categories
+            batch_size: Rows fetched per round trip
+            
+        Yields:
+            Chunks of the JSON document
+        """
+        yield b"["
+        separator = b""
+        async for row in self.repository.stream_export_rows(include_inactive, batch_size):
+            yield separator + CategoryExport.model_validate(row).model_dump_json().encode("utf-8")
+            separator = b","
+        yield b"]"
     
     async def import_categories(
         self,
         import_data: List[CategoryImport],
-        created_by: Optional[str] = None
+        created_by: Optional[str] = None,
+        bulk: bool = True
     ) -> CategoryImportResult:
         """Import categories data.
         
+        In bulk mode the existing paths are prefetched in one query and rows
+        are processed by depth, so parents listed after their children still
+        resolve. Each depth is inserted with a multi-row INSERT and the whole
+        import is committed once. Rows that fail are reported in ``errors``
+        and do not stop the rest of the batch; their children fail with a
+        missing parent.
+        
         Args:
             import_data: List of category import data
             created_by: User importing the data
+            bulk: Use the bulk engine (False falls back to one create per row)
             
         Returns:
             Import operation result
         """
+        if not bulk:
+            return await self._import_categories_row_by_row(import_data, created_by)
+        
+        known = await self.repository.get_path_index()
+        levels: Dict[int, List[Tuple[int, CategoryImport]]] = {}
+        for row, category_data in enumerate(import_data, 1):
+            parent_path = category_data.parent_category_path
+            depth = parent_path.count("/") + 1 if parent_path else 0
+            levels.setdefault(depth, []).append((row, category_data))
+        
+        now = datetime.utcnow()
+        successful_imports = 0
+        skipped_imports = 0
+        errors = []
+        parent_ids = set()
+        try:
+            for depth in sorted(levels):
+                batch = []
+                for row, category_data in levels[depth]:
+                    parent = None
+                    if category_data.parent_category_path:
+                        parent = known.get(category_data.parent_category_path)
+                        if parent is None:
+                            errors.append({
+                                "row": row,
+                                "error": f"Parent category '{category_data.parent_category_path}' not found"
+                            })
+                            continue
+                    
+                    category_path = (
+                        f"{parent['category_path']}/{category_data.name}" if parent else category_data.name
+                    )
+                    if category_path in known:
+                        skipped_imports += 1
+                        continue
+                    if len(category_path) > 500:
+                        errors.append({"row": row, "error": "Category path cannot exceed 500 characters"})
+                        continue
+                    
+                    values = {
+                        "id": uuid4(),
+                        "name": category_data.name,
+                        "parent_category_id": parent["id"] if parent else None,
+                        "category_path": category_path,
+                        "category_level": parent["category_level"] + 1 if parent else 1,
+                        "display_order": category_data.display_order,
+                        "is_leaf": True,
+                        "is_active": category_data.is_active,
+                        "created_at": now,
+                        "updated_at": now,
+                        "created_by": created_by,
+                        "updated_by": created_by,
+                    }
+                    known[category_path] = values
+                    batch.append((row, values))
+                
+                for row, values, error in await self._insert_import_batch(batch):
+                    if error is None:
+                        successful_imports += 1
+                        if values["parent_category_id"] is not None:
+                            parent_ids.add(values["parent_category_id"])
+                    else:
+                        # Children of a failed row will not find their parent
+                        known.pop(values["category_path"], None)
+                        errors.append({"row": row, "error": error})
+            
+            await self.repository.mark_non_leaf(parent_ids, updated_by=created_by)
+            await self.repository.session.commit()
+        except Exception:
+            await self.repository.session.rollback()
+            raise
+        finally:
+            category_index.invalidate()
+        
+        return CategoryImportResult(
+            total_processed=len(import_data),
+            successful_imports=successful_imports,
+            failed_imports=len(errors),
+            skipped_imports=skipped_imports,
+            errors=sorted(errors, key=lambda error: error["row"])
+        )
+    
+    async def _insert_import_batch(
+        self,
+        batch: List[Tuple[int, Dict[str, Any]]]
+    ) -> List[Tuple[int, Dict[str, Any], Optional[str]]]:
+        """Insert one depth of an import, isolating rows the database rejects.
+        
+        The batch is inserted in a savepoint. If a constraint fails (e.g. a
+        category created concurrently), the rows are retried one savepoint at
+        a time so only the offending rows are reported.
+        
+        Returns:
+            (row, values, error) for every row, error being None on success
+        """
+        if not batch:
+            return []
+        session = self.repository.session
+        try:
+            async with session.begin_nested():
+                await self.repository.insert_rows([values for _, values in batch])
+            return [(row, values, None) for row, values in batch]
+        except IntegrityError:
+            pass
+        
+        results = []
+        for row, values in batch:
+            try:
+                async with session.begin_nested():
+                    await self.repository.insert_rows([values])
+                results.append((row, values, None))
+            except IntegrityError as e:
+                results.append((row, values, f"Category '{values['category_path']}' could not be created: {e.orig}"))
+        return results
+    
+    async def _import_categories_row_by_row(
+        self,
+        import_data: List[CategoryImport],
+        created_by: Optional[str] = None
+    ) -> CategoryImportResult:
+        """Import categories one create_category call at a time, in input order."""
         total_processed = len(import_data)
         successful_imports = 0
         failed_imports = 0
@@ -774,26 +893,6 @@ class CategoryService:
                 {"is_leaf": should_be_leaf}
             )
     
-    async def _update_descendant_paths_after_rename(self, category: Category):
-        """Update descendant paths after category rename."""
-        descendants = await self.repository.get_descendants(category.id)
-        
-        for descendant in descendants:
-            # Calculate new path
-            old_segments = descendant.get_path_segments()
-            category_segments = category.get_path_segments()
-            
-            # Replace the category part of the path
-            descendant_relative_segments = old_segments[len(category_segments):]
-            new_path_segments = category_segments + descendant_relative_segments
-            new_path = "/".join(new_path_segments)
-            
-            # Update descendant
-            await self.repository.update(
-                descendant.id,
-                {"category_path": new_path}
-            )
-    
     async def _to_response(self, category: Category) -> CategoryResponse:
         """Convert category model to response schema."""
         return CategoryResponse(
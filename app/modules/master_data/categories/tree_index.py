@@ -0,0 +1,203 @@
+"""
+In-memory category tree index.
+
+Categories change rarely and are read on almost every inventory screen, so
+the whole hierarchy is loaded with one query and kept per process. Each
+category gets Euler-tour numbers ``(tin, tout)`` from a pre-order walk:
+``v`` is in the subtree of ``u`` iff ``tin[u] <= tin[v] <= tout[u]``, and the
+subtree itself is a contiguous slice of the pre-order list. Ancestor chains
+and sorted child lists are precomputed; serialized tree JSON is memoised.
+
+``CategoryService`` invalidates the index after every write. Other workers
+pick up changes when their copy is older than CATEGORY_INDEX_TTL.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import func, select
+
+from app.core.cache_codecs import JSONSerializer
+from app.core.config import settings
+from app.core.snapshot_cache import SnapshotCache
+from .models import Category
+
+
+SUMMARY_FIELDS = (
+    "id", "name", "category_path", "category_level", "parent_category_id",
+    "display_order", "is_leaf", "is_active", "child_count", "item_count"
+)
+
+
+class CategoryTreeIndex:
+    """Immutable snapshot of the category hierarchy."""
+
+    def __init__(self, rows: Iterable[Dict[str, Any]]):
+        self.nodes: Dict[UUID, Dict[str, Any]] = {}
+        self.children: Dict[Optional[UUID], List[UUID]] = {}
+        for row in rows:
+            node = dict(row)
+            self.nodes[node["id"]] = node
+            self.children.setdefault(node["parent_category_id"], []).append(node["id"])
+
+        # Parents missing from the table are treated as roots
+        orphans = [parent for parent in self.children if parent is not None and parent not in self.nodes]
+        for parent in orphans:
+            self.children.setdefault(None, []).extend(self.children.pop(parent))
+
+        for child_ids in self.children.values():
+            child_ids.sort(key=self._sort_key)
+        for node_id, node in self.nodes.items():
+            node["child_count"] = len(self.children.get(node_id, ()))
+
+        self.order: List[UUID] = []
+        self.tin: Dict[UUID, int] = {}
+        self.tout: Dict[UUID, int] = {}
+        self.ancestor_ids: Dict[UUID, Tuple[UUID, ...]] = {}
+        self._number()
+        self._json: Dict[Tuple[Optional[UUID], bool], bytes] = {}
+
+    def _sort_key(self, node_id: UUID):
+        node = self.nodes[node_id]
+        return node["display_order"], node["name"]
+
+    def _number(self):
+        """Pre-order walk assigning Euler-tour intervals and ancestor chains (iterative)."""
+        stack: List[Tuple[UUID, Tuple[UUID, ...], bool]] = [
+            (root, (), False) for root in reversed(self.children.get(None, []))
+        ]
+        while stack:
+            node_id, ancestors, leaving = stack.pop()
+            if leaving:
+                self.tout[node_id] = len(self.order) - 1
+                continue
+            self.tin[node_id] = len(self.order)
+            self.order.append(node_id)
+            self.ancestor_ids[node_id] = ancestors
+            stack.append((node_id, ancestors, True))
+            chain = ancestors + (node_id,)
+            for child in reversed(self.children.get(node_id, [])):
+                stack.append((child, chain, False))
+
+    def __contains__(self, category_id: UUID) -> bool:
+        return category_id in self.nodes
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def get(self, category_id: UUID) -> Optional[Dict[str, Any]]:
+        return self.nodes.get(category_id)
+
+    def is_descendant(self, category_id: UUID, ancestor_id: UUID) -> bool:
+        """True if category_id is strictly below ancestor_id."""
+        if category_id not in self.tin or ancestor_id not in self.tin or category_id == ancestor_id:
+            return False
+        return self.tin[ancestor_id] < self.tin[category_id] <= self.tout[ancestor_id]
+
+    def ancestors(self, category_id: UUID) -> List[Dict[str, Any]]:
+        """Ancestors from the root down to the parent."""
+        return [self.nodes[node_id] for node_id in self.ancestor_ids.get(category_id, ())]
+
+    def descendants(self, category_id: UUID, include_inactive: bool = False) -> List[Dict[str, Any]]:
+        """All categories below category_id, in pre-order."""
+        if category_id not in self.tin:
+            return []
+        subtree = self.order[self.tin[category_id] + 1:self.tout[category_id] + 1]
+        return [
+            self.nodes[node_id] for node_id in subtree
+            if include_inactive or self.nodes[node_id]["is_active"]
+        ]
+
+    def children_of(self, category_id: Optional[UUID], include_inactive: bool = False) -> List[Dict[str, Any]]:
+        return [
+            self.nodes[node_id] for node_id in self.children.get(category_id, [])
+            if include_inactive or self.nodes[node_id]["is_active"]
+        ]
+
+    def siblings(self, category_id: UUID, include_inactive: bool = False) -> List[Dict[str, Any]]:
+        node = self.nodes.get(category_id)
+        if node is None:
+            return []
+        return [
+            sibling for sibling in self.children_of(node["parent_category_id"], include_inactive)
+            if sibling["id"] != category_id
+        ]
+
+    def tree(self, root_id: Optional[UUID] = None, include_inactive: bool = False) -> List[Dict[str, Any]]:
+        """
+        Nested tree dicts (CategoryTree shape).
+
+        A category whose parent is filtered out (inactive, or outside the
+        requested subtree) is listed at the top level.
+        """
+        if root_id is None:
+            candidates = self.order
+        elif root_id in self.tin:
+            candidates = self.order[self.tin[root_id]:self.tout[root_id] + 1]
+        else:
+            return []
+
+        built: Dict[UUID, Dict[str, Any]] = {}
+        roots = []
+        for node_id in candidates:
+            node = self.nodes[node_id]
+            if not include_inactive and not node["is_active"]:
+                continue
+            tree_node = {field: node[field] for field in SUMMARY_FIELDS}
+            tree_node["children"] = []
+            built[node_id] = tree_node
+            parent = built.get(node["parent_category_id"])
+            (parent["children"] if parent is not None else roots).append(tree_node)
+
+        roots.sort(key=lambda tree_node: (tree_node["display_order"], tree_node["name"]))
+        return roots
+
+    def tree_json(self, root_id: Optional[UUID] = None, include_inactive: bool = False) -> bytes:
+        """Serialized tree(), computed once per snapshot and arguments."""
+        key = (root_id, include_inactive)
+        if key not in self._json:
+            self._json[key] = JSONSerializer().encode(self.tree(root_id, include_inactive))
+        return self._json[key]
+
+
+class CategoryIndexCache:
+    """Process-wide holder that builds the index on demand."""
+
+    def __init__(self, ttl: int = settings.CATEGORY_INDEX_TTL):
+        self._snapshot = SnapshotCache(ttl, max_size=1)
+
+    @staticmethod
+    def _query():
+        """Every category with its item count, in one statement."""
+        from app.modules.inventory.models import Item
+
+        categories = Category.__table__
+        items = Item.__table__
+        item_counts = select(
+            items.c.category_id, func.count().label("item_count")
+        ).where(items.c.category_id.isnot(None)).group_by(items.c.category_id).subquery()
+        return select(
+            categories.c.id, categories.c.name, categories.c.category_path, categories.c.category_level,
+            categories.c.parent_category_id, categories.c.display_order, categories.c.is_leaf,
+            categories.c.is_active, func.coalesce(item_counts.c.item_count, 0).label("item_count")
+        ).select_from(
+            categories.outerjoin(item_counts, item_counts.c.category_id == categories.c.id)
+        )
+
+    async def get(self, session) -> CategoryTreeIndex:
+        """Current index, rebuilt if invalidated or older than the TTL."""
+        index = self._snapshot.get(None, None)
+        if index is not None:
+            return index
+
+        generation = self._snapshot.generation
+        result = await session.execute(self._query())
+        index = CategoryTreeIndex(result.mappings())
+        self._snapshot.put(None, index, generation)
+        return index
+
+    def invalidate(self):
+        self._snapshot.invalidate()
+
+
+category_index = CategoryIndexCache()
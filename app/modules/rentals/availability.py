@@ -0,0 +1,271 @@
+"""
+In-memory rental availability index.
+
+Availability used to be a point-in-time ``InventoryUnit.status`` check;
+answering "which units of item X are free between A and B" meant scanning
+transaction line rental periods. This module keeps, per item, the booked
+rental periods as sorted interval lists:
+
+- each bookable unit has its bookings merged into disjoint intervals, sorted
+  by start and therefore also by end, so whether the unit is free over
+  ``[a, b]`` is one ``bisect`` on the ends;
+- lines booked against the item without a specific unit are kept as a step
+  function of booked quantity over time (sorted change points with the level
+  from each point on), so the peak demand over ``[a, b]`` is a ``bisect``
+  plus a walk over the change points inside the range.
+
+Rental periods are whole days, inclusive at both ends, like
+``TransactionHeader.get_rental_days``. A booking holds its units while its
+transaction is neither cancelled nor refunded and the line has not been
+returned. An in-progress rental that is past its end date is overdue and
+keeps its units until it comes back.
+
+Items are loaded on demand, two statements per batch of items, and kept per
+process. Transaction and inventory writes in this process invalidate the
+items they touch; other workers pick the change up within
+RENTAL_AVAILABILITY_TTL seconds.
+"""
+
+import math
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.core.snapshot_cache import MISSING, SnapshotCache
+
+
+# Unit statuses that can take future bookings. Rented units are free again
+# once their current rental ends; units in maintenance, damaged, sold or
+# retired cannot be booked until their status changes.
+BOOKABLE_UNIT_STATUSES = ("AVAILABLE", "RENTED")
+
+# Transactions whose lines no longer hold units
+RELEASED_TRANSACTION_STATUSES = ("CANCELLED", "REFUNDED")
+
+ONE_DAY = timedelta(days=1)
+
+
+def _merge(intervals: Iterable[Tuple[date, date]]) -> Tuple[List[date], List[date]]:
+    """Sorted, disjoint (starts, ends) covering the given inclusive intervals."""
+    starts: List[date] = []
+    ends: List[date] = []
+    for start, end in sorted(intervals):
+        # Back-to-back days merge too: booked through the 3rd and from the 4th is one block
+        if ends and start <= ends[-1] + ONE_DAY:
+            if end > ends[-1]:
+                ends[-1] = end
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+class ItemSchedule:
+    """Booked periods of one item's units, and of its bookings without a unit."""
+
+    def __init__(
+        self,
+        unit_ids: Iterable[UUID],
+        unit_bookings: Dict[UUID, List[Tuple[date, date]]],
+        item_bookings: Iterable[Tuple[date, date, int]],
+        transaction_ids: Iterable[UUID] = ()
+    ):
+        self.unit_ids: List[UUID] = sorted(unit_ids, key=str)
+        # Transactions with bookings in the schedule, so their writes can find it
+        self.transaction_ids = frozenset(transaction_ids)
+        self.unit_busy: Dict[UUID, Tuple[List[date], List[date]]] = {
+            unit_id: _merge(unit_bookings[unit_id]) for unit_id in self.unit_ids if unit_bookings.get(unit_id)
+        }
+
+        changes: Dict[date, int] = {}
+        for start, end, quantity in item_bookings:
+            changes[start] = changes.get(start, 0) + quantity
+            changes[end + ONE_DAY] = changes.get(end + ONE_DAY, 0) - quantity
+        self.demand_points: List[date] = sorted(changes)
+        self.demand_levels: List[int] = []
+        level = 0
+        for point in self.demand_points:
+            level += changes[point]
+            self.demand_levels.append(level)
+
+    def unit_is_free(self, unit_id: UUID, start: date, end: date) -> bool:
+        busy = self.unit_busy.get(unit_id)
+        if busy is None:
+            return True
+        starts, ends = busy
+        # First booked block that ends on or after start; free if it starts after end
+        i = bisect_left(ends, start)
+        return i == len(ends) or starts[i] > end
+
+    def peak_demand(self, start: date, end: date) -> int:
+        """Most units booked without a specific unit on any day in [start, end]."""
+        points = self.demand_points
+        i = bisect_right(points, start) - 1
+        peak = self.demand_levels[i] if i >= 0 else 0
+        i += 1
+        while i < len(points) and points[i] <= end:
+            peak = max(peak, self.demand_levels[i])
+            i += 1
+        return peak
+
+    def free_units(self, start: date, end: date) -> List[UUID]:
+        """Units with no booking overlapping [start, end]."""
+        return [unit_id for unit_id in self.unit_ids if self.unit_is_free(unit_id, start, end)]
+
+    def daily_available(self, start: date, end: date) -> List[int]:
+        """Units that can be booked on each day from start to end."""
+        days = (end - start).days + 1
+        busy = [0] * (days + 1)
+        for starts, ends in self.unit_busy.values():
+            i = bisect_left(ends, start)
+            while i < len(starts) and starts[i] <= end:
+                busy[max(0, (starts[i] - start).days)] += 1
+                busy[min(days, (ends[i] - start).days + 1)] -= 1
+                i += 1
+
+        points = self.demand_points
+        j = bisect_right(points, start) - 1
+        demand = self.demand_levels[j] if j >= 0 else 0
+        j += 1
+
+        available = []
+        booked_units = 0
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            booked_units += busy[offset]
+            while j < len(points) and points[j] <= day:
+                demand = self.demand_levels[j]
+                j += 1
+            available.append(max(0, len(self.unit_ids) - booked_units - demand))
+        return available
+
+
+class RentalAvailabilityIndex:
+    """Process-wide holder that loads item schedules on demand."""
+
+    def __init__(
+        self,
+        ttl: int = settings.RENTAL_AVAILABILITY_TTL,
+        max_items: int = settings.RENTAL_AVAILABILITY_MAX_ITEMS
+    ):
+        self._schedules = SnapshotCache(ttl, max_items)
+
+    @staticmethod
+    def _unit_query(item_ids: List[UUID]):
+        from app.modules.inventory.models import InventoryUnit
+
+        units = InventoryUnit.__table__
+        return select(units.c.id, units.c.item_id).where(
+            units.c.item_id.in_(item_ids),
+            units.c.is_active == True,
+            units.c.status.in_(BOOKABLE_UNIT_STATUSES)
+        )
+
+    @staticmethod
+    def _booking_query(item_ids: List[UUID]):
+        """Rental periods still holding units, with the header's dates as the fallback."""
+        from app.modules.transactions.models import LineItemType, TransactionHeader, TransactionLine
+
+        headers = TransactionHeader.__table__
+        lines = TransactionLine.__table__
+        start = func.coalesce(lines.c.rental_start_date, headers.c.rental_start_date)
+        end = func.coalesce(lines.c.rental_end_date, headers.c.rental_end_date)
+        return select(
+            lines.c.transaction_id, lines.c.item_id, lines.c.inventory_unit_id,
+            (lines.c.quantity - lines.c.returned_quantity).label("quantity"),
+            start.label("start_date"), end.label("end_date"), headers.c.status
+        ).select_from(
+            lines.join(headers, headers.c.id == lines.c.transaction_id)
+        ).where(
+            lines.c.item_id.in_(item_ids),
+            lines.c.line_type == LineItemType.PRODUCT.value,
+            lines.c.is_active == True,
+            lines.c.return_date.is_(None),
+            lines.c.returned_quantity < lines.c.quantity,
+            headers.c.transaction_type == "RENTAL",
+            headers.c.status.notin_(RELEASED_TRANSACTION_STATUSES),
+            headers.c.actual_return_date.is_(None),
+            start.isnot(None),
+            end.isnot(None)
+        )
+
+    async def _load(self, session, item_ids: List[UUID]) -> Dict[UUID, ItemSchedule]:
+        """Schedules for the given items, in two statements."""
+        units: Dict[UUID, List[UUID]] = {item_id: [] for item_id in item_ids}
+        for row in (await session.execute(self._unit_query(item_ids))).mappings():
+            units[row["item_id"]].append(row["id"])
+
+        today = date.today()
+        unit_bookings: Dict[UUID, Dict[UUID, List[Tuple[date, date]]]] = {item_id: {} for item_id in item_ids}
+        item_bookings: Dict[UUID, List[Tuple[date, date, int]]] = {item_id: [] for item_id in item_ids}
+        transactions: Dict[UUID, Set[UUID]] = {item_id: set() for item_id in item_ids}
+        for row in (await session.execute(self._booking_query(item_ids))).mappings():
+            start, end = row["start_date"], row["end_date"]
+            # Overdue rentals keep their units until they are returned
+            if row["status"] == "IN_PROGRESS" and end < today:
+                end = today
+            if end < start:
+                continue
+            transactions[row["item_id"]].add(row["transaction_id"])
+            unit_id = row["inventory_unit_id"]
+            if unit_id is not None:
+                unit_bookings[row["item_id"]].setdefault(unit_id, []).append((start, end))
+            else:
+                item_bookings[row["item_id"]].append((start, end, math.ceil(row["quantity"])))
+
+        return {
+            item_id: ItemSchedule(units[item_id], unit_bookings[item_id], item_bookings[item_id], transactions[item_id])
+            for item_id in item_ids
+        }
+
+    async def get_many(self, session, item_ids: Iterable[UUID]) -> Dict[UUID, ItemSchedule]:
+        """Schedules for many items, loading the missing or expired ones together."""
+        item_ids = list(dict.fromkeys(item_ids))
+        schedules: Dict[UUID, ItemSchedule] = {}
+        missing = []
+        for item_id in item_ids:
+            schedule = self._schedules.get(item_id)
+            if schedule is MISSING:
+                missing.append(item_id)
+            else:
+                schedules[item_id] = schedule
+
+        if missing:
+            generation = self._schedules.generation
+            loaded = await self._load(session, missing)
+            self._schedules.put_many(loaded.items(), generation)
+            schedules.update(loaded)
+
+        return schedules
+
+    async def get(self, session, item_id: UUID) -> ItemSchedule:
+        return (await self.get_many(session, [item_id]))[item_id]
+
+    def invalidate_items(self, item_ids: Iterable[Optional[UUID]]):
+        """Drop the schedules of items whose units or bookings changed."""
+        # ORM objects may still hold the string form they were created with
+        self._schedules.invalidate([
+            item_id if isinstance(item_id, UUID) else UUID(str(item_id))
+            for item_id in item_ids if item_id is not None
+        ])
+
+    def invalidate_transaction(self, transaction_id: UUID):
+        """Drop the schedules of every cached item the transaction books."""
+        transaction_id = transaction_id if isinstance(transaction_id, UUID) else UUID(str(transaction_id))
+        self.invalidate_items([
+            item_id for item_id, schedule in self._schedules.items() if transaction_id in schedule.transaction_ids
+        ])
+
+    def invalidate(self):
+        """Drop every schedule."""
+        self._schedules.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._schedules.stats()
+
+
+rental_availability = RentalAvailabilityIndex()
@@ -121,6 +121,7 @@ class RentalReturn(BaseModel):
         Index('idx_rental_return_location', 'return_location_id'),
         Index('idx_rental_return_processed_by', 'processed_by'),
         Index('idx_rental_return_expected_date', 'expected_return_date'),
+        Index('idx_rental_return_updated_at', 'updated_at'),
 # Removed is_active index - column is inherited from BaseModel
     )
     
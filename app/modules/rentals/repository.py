@@ -195,7 +195,7 @@ class RentalReturnRepository:
         result = await self.session.execute(query)
         return result.scalars().all()
     
-    async def get_overdue_returns(self, as_of_date: date = None) -> List[RentalReturn]:
+    async def get_overdue_returns(self, as_of_date: date = None, limit: Optional[int] = None) -> List[RentalReturn]:
         """Get overdue returns."""
         if as_of_date is None:
             as_of_date = date.today()
@@ -212,6 +212,8 @@ class RentalReturnRepository:
         )
         
         query = query.order_by(asc(RentalReturn.expected_return_date))
+        if limit is not None:
+            query = query.limit(limit)
         
         result = await self.session.execute(query)
         return result.scalars().all()
@@ -291,65 +293,70 @@ class RentalReturnRepository:
         date_to: Optional[date] = None,
         active_only: bool = True
     ) -> Dict[str, Any]:
-        """Get return summary statistics."""
-        query = select(RentalReturn)
-        
+        """Get return summary statistics from one GROUP BY (status, type) query."""
+        returns = RentalReturn.__table__
         conditions = []
         if active_only:
-            conditions.append(RentalReturn.is_active == True)
+            conditions.append(returns.c.is_active == True)
         if date_from:
-            conditions.append(RentalReturn.return_date >= date_from)
+            conditions.append(returns.c.return_date >= date_from)
         if date_to:
-            conditions.append(RentalReturn.return_date <= date_to)
-        
+            conditions.append(returns.c.return_date <= date_to)
+        
+        completed = returns.c.return_status == ReturnStatus.COMPLETED.value
+        query = select(
+            returns.c.return_status,
+            returns.c.return_type,
+            func.count(),
+            func.sum(returns.c.total_late_fee),
+            func.sum(returns.c.total_damage_fee),
+            func.sum(returns.c.total_refund_amount),
+            func.sum(self._hours_between(returns.c.created_at, returns.c.updated_at)).filter(completed)
+        )
         if conditions:
             query = query.where(and_(*conditions))
         
-        result = await self.session.execute(query)
-        returns = result.scalars().all()
-        
-        total_returns = len(returns)
-        completed_returns = len([r for r in returns if r.return_status == ReturnStatus.COMPLETED.value])
-        pending_returns = len([r for r in returns if r.return_status in [ReturnStatus.PENDING.value, ReturnStatus.INITIATED.value]])
-        cancelled_returns = len([r for r in returns if r.return_status == ReturnStatus.CANCELLED.value])
-        
-        total_late_fees = sum(r.total_late_fee for r in returns)
-        total_damage_fees = sum(r.total_damage_fee for r in returns)
-        total_refunds = sum(r.total_refund_amount for r in returns)
-        
-        # Count by status
-        status_counts = {}
-        for status in ReturnStatus:
-            status_counts[status.value] = len([r for r in returns if r.return_status == status.value])
-        
-        # Count by type
-        type_counts = {}
-        for return_type in ReturnType:
-            type_counts[return_type.value] = len([r for r in returns if r.return_type == return_type.value])
-        
-        # Calculate average processing time
-        completed_with_times = [r for r in returns if r.return_status == ReturnStatus.COMPLETED.value and r.created_at and r.updated_at]
-        if completed_with_times:
-            total_processing_time = sum(
-                (r.updated_at - r.created_at).total_seconds() / 3600 
-                for r in completed_with_times
-            )
-            average_processing_time = total_processing_time / len(completed_with_times)
-        else:
-            average_processing_time = 0.0
+        result = await self.session.execute(
+            query.group_by(returns.c.return_status, returns.c.return_type)
+        )
+        
+        total_returns = 0
+        total_late_fees = Decimal("0")
+        total_damage_fees = Decimal("0")
+        total_refunds = Decimal("0")
+        total_processing_time = 0.0
+        status_counts = {status.value: 0 for status in ReturnStatus}
+        type_counts = {return_type.value: 0 for return_type in ReturnType}
+        
+        for return_status, return_type, count, late_fees, damage_fees, refunds, processing_hours in result:
+            total_returns += count
+            total_late_fees += Decimal(str(late_fees or 0))
+            total_damage_fees += Decimal(str(damage_fees or 0))
+            total_refunds += Decimal(str(refunds or 0))
+            total_processing_time += float(processing_hours or 0)
+            status_counts[return_status] = status_counts.get(return_status, 0) + count
+            type_counts[return_type] = type_counts.get(return_type, 0) + count
+        
+        completed_returns = status_counts[ReturnStatus.COMPLETED.value]
         
         return {
             'total_returns': total_returns,
             'completed_returns': completed_returns,
-            'pending_returns': pending_returns,
-            'cancelled_returns': cancelled_returns,
+            'pending_returns': status_counts[ReturnStatus.PENDING.value] + status_counts[ReturnStatus.INITIATED.value],
+            'cancelled_returns': status_counts[ReturnStatus.CANCELLED.value],
             'total_late_fees': total_late_fees,
             'total_damage_fees': total_damage_fees,
             'total_refunds': total_refunds,
             'returns_by_status': status_counts,
             'returns_by_type': type_counts,
-            'average_processing_time': average_processing_time
+            'average_processing_time': total_processing_time / completed_returns if completed_returns else 0.0
         }
+    
+    def _hours_between(self, start, end):
+        """SQL expression for the hours between two timestamp columns."""
+        if self.session.bind is not None and self.session.bind.dialect.name == "postgresql":
+            return func.extract('epoch', end - start) / 3600
+        return (func.julianday(end) - func.julianday(start)) * 24
 
 
 class RentalReturnLineRepository:
@@ -536,6 +543,17 @@ class InspectionReportRepository:
         result = await self.session.execute(query)
         return result.scalars().all()
     
+    async def count_pending_inspections(self) -> int:
+        """Count pending inspections."""
+        query = select(func.count(InspectionReport.id)).where(
+            and_(
+                InspectionReport.inspection_status == InspectionStatus.PENDING.value,
+                InspectionReport.is_active == True
+            )
+        )
+        result = await self.session.execute(query)
+        return result.scalar()
+    
     async def get_completed_inspections(
         self, 
         date_from: Optional[date] = None,
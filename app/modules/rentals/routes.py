@@ -15,7 +15,8 @@ from app.modules.rentals.schemas import (
     ReturnStatusUpdate, LineStatusUpdate, DamageAssessment, FeeCalculation,
     DepositCalculation, InspectionCompletion, InspectionFailure,
     RentalReturnSummary, RentalReturnReport, RentalReturnSearch,
-    RentalDashboard, RentalAnalytics
+    RentalDashboard, RentalAnalytics,
+    AvailabilitySearch, ItemAvailabilityResponse, AvailabilityCalendarRequest, ItemAvailabilityCalendar
 )
 from app.modules.rentals.models import ReturnStatus, ReturnType, DamageLevel, InspectionStatus
 
@@ -398,6 +399,31 @@ async def fail_inspection(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
+# Availability endpoints
+@router.get("/availability", response_model=ItemAvailabilityResponse)
+async def search_availability(
+    item_id: UUID = Query(..., description="Item ID"),
+    start_date: date = Query(..., description="First rental day"),
+    end_date: date = Query(..., description="Last rental day"),
+    service: RentalService = Depends(get_rental_service)
+):
+    """Units of an item free for the whole rental period."""
+    if end_date < start_date:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="End date must be on or after start date")
+    return await service.search_availability(
+        AvailabilitySearch(item_id=item_id, start_date=start_date, end_date=end_date)
+    )
+
+
+@router.post("/availability/calendar", response_model=List[ItemAvailabilityCalendar])
+async def get_availability_calendar(
+    request: AvailabilityCalendarRequest,
+    service: RentalService = Depends(get_rental_service)
+):
+    """Units of each item that can be booked on each day of the range."""
+    return await service.get_availability_calendar(request)
+
+
 # Dashboard and Reporting endpoints
 @router.get("/dashboard", response_model=RentalDashboard)
 async def get_rental_dashboard(
@@ -560,4 +560,59 @@ class RentalAnalytics(BaseModel):
     return_trends: dict[str, Any]
     damage_statistics: dict[str, Any]
     fee_analysis: dict[str, Any]
-    customer_behavior: dict[str, Any]
\ No newline at end of file
+    customer_behavior: dict[str, Any]
+
+
+class AvailabilitySearch(BaseModel):
+    """Schema for an item availability search over a rental period."""
+    item_id: UUID = Field(..., description="Item ID")
+    start_date: date = Field(..., description="First rental day")
+    end_date: date = Field(..., description="Last rental day")
+    
+    @field_validator('end_date')
+    @classmethod
+    def validate_date_range(cls, v, info):
+        if info.data.get('start_date') is not None and v < info.data.get('start_date'):
+            raise ValueError("End date must be on or after start date")
+        return v
+
+
+class ItemAvailabilityResponse(BaseModel):
+    """Schema for the units of an item free for a whole rental period."""
+    item_id: UUID
+    start_date: date
+    end_date: date
+    total_units: int
+    available_count: int
+    available_unit_ids: List[UUID]
+
+
+class AvailabilityCalendarRequest(BaseModel):
+    """Schema for a daily availability calendar of many items."""
+    item_ids: List[UUID] = Field(..., min_length=1, max_length=500, description="Item IDs")
+    start_date: date = Field(..., description="First day")
+    end_date: date = Field(..., description="Last day")
+    
+    @field_validator('end_date')
+    @classmethod
+    def validate_date_range(cls, v, info):
+        start_date = info.data.get('start_date')
+        if start_date is not None:
+            if v < start_date:
+                raise ValueError("End date must be on or after start date")
+            if (v - start_date).days >= 366:
+                raise ValueError("Calendar cannot span more than 366 days")
+        return v
+
+
+class DailyAvailability(BaseModel):
+    """Schema for the units of an item that can be booked on one day."""
+    date: date
+    available: int
+
+
+class ItemAvailabilityCalendar(BaseModel):
+    """Schema for the daily availability of one item."""
+    item_id: UUID
+    total_units: int
+    days: List[DailyAvailability]
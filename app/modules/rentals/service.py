@@ -1,7 +1,7 @@
 from typing import Optional, List, Dict, Any
 from uuid import UUID
 from decimal import Decimal
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.errors import NotFoundError, ValidationError, ConflictError
@@ -20,10 +20,14 @@ from app.modules.rentals.schemas import (
     ReturnStatusUpdate, LineStatusUpdate, DamageAssessment, FeeCalculation,
     DepositCalculation, InspectionCompletion, InspectionFailure,
     RentalReturnSummary, RentalReturnReport, RentalReturnSearch,
-    RentalDashboard, RentalAnalytics
+    RentalDashboard, RentalAnalytics,
+    AvailabilitySearch, ItemAvailabilityResponse, AvailabilityCalendarRequest,
+    ItemAvailabilityCalendar, DailyAvailability
 )
+from app.modules.rentals.availability import rental_availability
 from app.modules.transactions.repository import TransactionHeaderRepository
 from app.modules.inventory.repository import InventoryUnitRepository
+from app.modules.analytics.repository import DashboardRollupRepository
 
 
 class RentalService:
@@ -36,6 +40,7 @@ class RentalService:
         self.inspection_repository = InspectionReportRepository(session)
         self.transaction_repository = TransactionHeaderRepository(session)
         self.inventory_unit_repository = InventoryUnitRepository(session)
+        self.rollup_repository = DashboardRollupRepository(session)
     
     # Rental Return operations
     async def create_rental_return(self, return_data: RentalReturnCreate) -> RentalReturnResponse:
@@ -181,6 +186,7 @@ class RentalService:
         rental_return.finalize_return()
         
         await self.session.commit()
+        rental_availability.invalidate_transaction(rental_return.rental_transaction_id)
         await self.session.refresh(rental_return)
         
         return RentalReturnResponse.model_validate(rental_return)
@@ -445,56 +451,58 @@ class RentalService:
         
         return InspectionReportResponse.model_validate(report)
     
+    # Availability operations
+    async def search_availability(self, search: AvailabilitySearch) -> ItemAvailabilityResponse:
+        """Units of an item free for the whole rental period."""
+        schedule = await rental_availability.get(self.session, search.item_id)
+        free_units = schedule.free_units(search.start_date, search.end_date)
+        
+        return ItemAvailabilityResponse(
+            item_id=search.item_id,
+            start_date=search.start_date,
+            end_date=search.end_date,
+            total_units=len(schedule.unit_ids),
+            available_count=max(0, len(free_units) - schedule.peak_demand(search.start_date, search.end_date)),
+            available_unit_ids=free_units
+        )
+    
+    async def get_availability_calendar(self, request: AvailabilityCalendarRequest) -> List[ItemAvailabilityCalendar]:
+        """Units of each item that can be booked on each day of the range."""
+        schedules = await rental_availability.get_many(self.session, request.item_ids)
+        days = [request.start_date + timedelta(days=offset) for offset in range((request.end_date - request.start_date).days + 1)]
+        
+        calendars = []
+        for item_id, schedule in schedules.items():
+            available = schedule.daily_available(request.start_date, request.end_date)
+            calendars.append(ItemAvailabilityCalendar(
+                item_id=item_id,
+                total_units=len(schedule.unit_ids),
+                days=[DailyAvailability(date=day, available=count) for day, count in zip(days, available)]
+            ))
+        return calendars
+    
     # Reporting operations
     async def get_rental_dashboard(self) -> RentalDashboard:
         """Get rental dashboard data."""
         today = date.today()
         
-        # Get active rentals (transactions in progress)
-        active_rentals_count = await self.transaction_repository.count_all(
-            status=TransactionStatus.IN_PROGRESS,
-            transaction_type=TransactionType.RENTAL
-        )
-        
-        # Get overdue returns
-        overdue_returns = await self.return_repository.get_overdue_returns(today)
-        overdue_count = len(overdue_returns)
-        
-        # Get returns due today
-        returns_due_today = await self.return_repository.get_returns_due_today(today)
-        due_today_count = len(returns_due_today)
-        
-        # Get returns due this week
-        week_end = today + timedelta(days=7)
-        returns_due_week = await self.return_repository.get_all(
-            date_from=today,
-            date_to=week_end,
-            return_status=ReturnStatus.PENDING
-        )
-        due_week_count = len(returns_due_week)
+        # Counts and fees come from the dashboard rollups
+        overview = await self.rollup_repository.get_rental_overview(today)
         
         # Get pending inspections
-        pending_inspections = await self.inspection_repository.get_pending_inspections()
-        pending_inspections_count = len(pending_inspections)
-        
-        # Calculate total outstanding fees
-        all_returns = await self.return_repository.get_all(
-            return_status=ReturnStatus.IN_PROGRESS
-        )
-        total_outstanding_fees = sum(
-            ret.total_late_fee + ret.total_damage_fee for ret in all_returns
-        )
+        pending_inspections_count = await self.inspection_repository.count_pending_inspections()
         
-        # Get recent returns
+        # Get recent and most overdue returns
         recent_returns = await self.return_repository.get_all(limit=10)
+        overdue_returns = await self.return_repository.get_overdue_returns(today, limit=10)
         
         return RentalDashboard(
-            active_rentals=active_rentals_count,
-            overdue_returns=overdue_count,
-            returns_due_today=due_today_count,
-            returns_due_this_week=due_week_count,
+            active_rentals=overview['active_rentals'],
+            overdue_returns=overview['overdue_returns'],
+            returns_due_today=overview['returns_due_today'],
+            returns_due_this_week=overview['returns_due_this_week'],
             pending_inspections=pending_inspections_count,
-            total_outstanding_fees=total_outstanding_fees,
+            total_outstanding_fees=overview['total_outstanding_fees'],
             recent_returns=[RentalReturnListResponse.model_validate(ret) for ret in recent_returns],
             overdue_returns_list=[RentalReturnListResponse.model_validate(ret) for ret in overdue_returns]
         )
@@ -7,6 +7,7 @@ from pydantic import BaseModel
 
 from app.core.errors import NotFoundError, ValidationError, ConflictError
 from app.shared.dependencies import get_session
+from app.shared.pagination import CountMode, CursorPage
 from app.modules.system.service import SystemService
 from app.modules.system.models import (
     SettingType, SettingCategory, BackupStatus, BackupType, AuditAction
@@ -458,6 +459,47 @@ async def get_audit_logs(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+@router.get("/audit-logs/cursor", response_model=CursorPage[AuditLogResponse])
+async def get_audit_log_page(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum records to return"),
+    count: CountMode = Query(CountMode.NONE, description="Report no total, a planner estimate, or an exact count"),
+    user_id: Optional[UUID] = Query(None, description="Filter by user ID"),
+    action: Optional[str] = Query(None, description="Filter by action"),
+    entity_type: Optional[str] = Query(None, description="Filter by entity type"),
+    entity_id: Optional[str] = Query(None, description="Filter by entity ID"),
+    success: Optional[bool] = Query(None, description="Filter by success status"),
+    start_date: Optional[datetime] = Query(None, description="Filter by start date"),
+    end_date: Optional[datetime] = Query(None, description="Filter by end date"),
+    service: SystemService = Depends(get_system_service)
+):
+    """Get audit logs, newest first, with cursor pagination."""
+    action_enum = None
+    if action:
+        try:
+            action_enum = AuditAction(action)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid action: {action}")
+    
+    try:
+        page = await service.get_audit_log_page(
+            cursor=cursor,
+            limit=limit,
+            count=count,
+            user_id=user_id,
+            action=action_enum,
+            entity_type=entity_type,
+            entity_id=entity_id,
+            success=success,
+            start_date=start_date,
+            end_date=end_date
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return page.map(AuditLogResponse.model_validate)
+
+
 @router.get("/audit-logs/{audit_log_id}", response_model=AuditLogResponse)
 async def get_audit_log(
     audit_log_id: UUID,
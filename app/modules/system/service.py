@@ -5,6 +5,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete, and_, or_, func
 
 from app.core.errors import NotFoundError, ValidationError, ConflictError
+from app.shared.filters import SortOrder, SortSpec
+from app.shared.pagination import CountMode, CursorPage, paginate_keyset
 from app.modules.system.models import (
     SystemSetting, SystemBackup, AuditLog,
     SettingType, SettingCategory, BackupStatus, BackupType, AuditAction
@@ -584,10 +586,8 @@ class SystemService:
         
         return audit_log
     
-    async def get_audit_logs(
+    def _audit_log_query(
         self,
-        skip: int = 0,
-        limit: int = 100,
         user_id: Optional[UUID] = None,
         action: Optional[AuditAction] = None,
         entity_type: Optional[str] = None,
@@ -595,8 +595,8 @@ class SystemService:
         success: Optional[bool] = None,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None
-    ) -> List[AuditLog]:
-        """Get audit logs with optional filtering."""
+    ):
+        """Filtered audit log query, without ordering or paging."""
         query = select(AuditLog).where(AuditLog.is_active == True)
         
         if user_id:
@@ -614,11 +614,43 @@ class SystemService:
         if end_date:
             query = query.where(AuditLog.created_at <= end_date)
         
+        return query
+    
+    async def get_audit_logs(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        user_id: Optional[UUID] = None,
+        action: Optional[AuditAction] = None,
+        entity_type: Optional[str] = None,
+        entity_id: Optional[str] = None,
+        success: Optional[bool] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> List[AuditLog]:
+        """Get audit logs with optional filtering."""
+        query = self._audit_log_query(
+            user_id, action, entity_type, entity_id, success, start_date, end_date
+        )
         query = query.order_by(AuditLog.created_at.desc()).offset(skip).limit(limit)
         
         result = await self.session.execute(query)
         return result.scalars().all()
     
+    async def get_audit_log_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        count: CountMode = CountMode.NONE,
+        **filters
+    ) -> CursorPage:
+        """Keyset page of audit logs, newest first; takes the same filters as get_audit_logs."""
+        return await paginate_keyset(
+            self.session, self._audit_log_query(**filters), AuditLog,
+            [SortSpec(field="created_at", order=SortOrder.DESC)],
+            cursor=cursor, limit=limit, count=count
+        )
+    
     async def get_audit_log(self, audit_log_id: UUID) -> Optional[AuditLog]:
         """Get audit log by ID."""
         query = select(AuditLog).where(
@@ -1,8 +1,8 @@
 from enum import Enum
-from typing import Optional, List, TYPE_CHECKING
-from decimal import Decimal
+from typing import Optional, List, Dict, Tuple, TYPE_CHECKING
+from decimal import Decimal, ROUND_HALF_UP
 from datetime import datetime, date
-from sqlalchemy import Column, String, Numeric, Boolean, Text, DateTime, Date, ForeignKey, Integer, Index
+from sqlalchemy import Column, String, Numeric, Boolean, Text, DateTime, Date, ForeignKey, Integer, Index, Table, func
 from sqlalchemy.orm import relationship, validates
 from sqlalchemy.ext.hybrid import hybrid_property
 
@@ -81,6 +81,87 @@ class LineItemType(str, Enum):
     REFUND = "REFUND"
 
 
+# Statuses in which lines can no longer be added, changed or removed
+LOCKED_TRANSACTION_STATUSES = (
+    TransactionStatus.COMPLETED.value,
+    TransactionStatus.CANCELLED.value,
+    TransactionStatus.REFUNDED.value,
+)
+
+# Header total each line type feeds; other line types leave the totals alone
+LINE_TYPE_TOTALS = {
+    LineItemType.PRODUCT.value: "subtotal",
+    LineItemType.SERVICE.value: "subtotal",
+    LineItemType.DISCOUNT.value: "discount_amount",
+    LineItemType.TAX.value: "tax_amount",
+    LineItemType.DEPOSIT.value: "deposit_amount",
+}
+
+CENT = Decimal("0.01")
+
+
+def compute_line_amounts(
+    line_type: str,
+    quantity: Decimal,
+    unit_price: Decimal,
+    discount_percentage: Decimal,
+    discount_amount: Decimal,
+    tax_rate: Decimal,
+    tax_amount: Decimal
+) -> Tuple[Decimal, Decimal, Decimal]:
+    """
+    Discount, tax and line total for one line, rounded to cents as stored.
+    
+    Returns:
+        (discount_amount, tax_amount, line_total); discount lines get a
+        negative total
+    """
+    subtotal = quantity * unit_price
+    if discount_percentage > 0:
+        discount_amount = subtotal * (discount_percentage / 100)
+    discounted_amount = subtotal - discount_amount
+    if tax_rate > 0:
+        tax_amount = discounted_amount * (tax_rate / 100)
+    line_total = discounted_amount + tax_amount
+    if line_type == LineItemType.DISCOUNT.value:
+        line_total = -abs(line_total)
+    return tuple(Decimal(amount).quantize(CENT, ROUND_HALF_UP) for amount in (discount_amount, tax_amount, line_total))
+
+
+def line_total_deltas(line_type: str, line_total: Decimal, sign: int = 1) -> Dict[str, Decimal]:
+    """
+    Change to the header totals from adding (sign=1) or removing (sign=-1)
+    one active line. total_amount follows from the other three.
+    """
+    field = LINE_TYPE_TOTALS.get(line_type)
+    if field is None:
+        return {}
+    amount = Decimal(line_total) * sign
+    # Discount lines carry negative totals; the header keeps a positive discount
+    if field == "discount_amount":
+        amount = -amount
+    return {field: amount}
+
+
+# Optional pre-aggregated daily rollup of transaction headers. One row per day
+# and (status, type, payment status, active) combination, so summaries over
+# long date ranges read O(days) rows instead of every transaction.
+transaction_daily_summary_table = Table(
+    'transaction_daily_summary',
+    BaseModel.metadata,
+    Column('summary_date', Date, primary_key=True),
+    Column('status', String(20), primary_key=True),
+    Column('transaction_type', String(20), primary_key=True),
+    Column('payment_status', String(20), primary_key=True),
+    Column('is_active', Boolean, primary_key=True),
+    Column('transaction_count', Integer, nullable=False, default=0),
+    Column('total_amount', Numeric(15, 2), nullable=False, default=0),
+    Column('paid_amount', Numeric(15, 2), nullable=False, default=0),
+    Column('refreshed_at', DateTime(timezone=True), nullable=False, server_default=func.now()),
+    Index('idx_transaction_daily_summary_refreshed', 'refreshed_at'),
+)
+
+
 class TransactionHeader(BaseModel):
     """
     Transaction header model for managing transactions.
@@ -157,6 +238,7 @@ class TransactionHeader(BaseModel):
         Index('idx_transaction_status', 'status'),
         Index('idx_transaction_payment_status', 'payment_status'),
         Index('idx_transaction_rental_dates', 'rental_start_date', 'rental_end_date'),
+        Index('idx_transaction_updated_at', 'updated_at'),
 # Removed is_active index - column is inherited from BaseModel
     )
     
@@ -327,40 +409,18 @@ class TransactionHeader(BaseModel):
         self.updated_by = updated_by
     
     def calculate_totals(self):
-        """Recalculate transaction totals from lines."""
-        if not self.transaction_lines:
-            self.subtotal = Decimal("0.00")
-            self.discount_amount = Decimal("0.00")
-            self.tax_amount = Decimal("0.00")
-            self.deposit_amount = Decimal("0.00")
-            self.total_amount = Decimal("0.00")
-            return
-        
-        # Calculate subtotal from product/service lines
-        self.subtotal = sum(
-            line.line_total for line in self.transaction_lines
-            if line.line_type in [LineItemType.PRODUCT.value, LineItemType.SERVICE.value]
-        )
-        
-        # Calculate discount from discount lines
-        self.discount_amount = abs(sum(
-            line.line_total for line in self.transaction_lines
-            if line.line_type == LineItemType.DISCOUNT.value
-        ))
-        
-        # Calculate tax from tax lines
-        self.tax_amount = sum(
-            line.line_total for line in self.transaction_lines
-            if line.line_type == LineItemType.TAX.value
-        )
-        
-        # Calculate deposit amount
-        self.deposit_amount = sum(
-            line.line_total for line in self.transaction_lines
-            if line.line_type == LineItemType.DEPOSIT.value
-        )
-        
-        # Calculate total
+        """Recalculate transaction totals from active lines in one pass."""
+        totals = {field: Decimal("0.00") for field in set(LINE_TYPE_TOTALS.values())}
+        for line in self.transaction_lines or []:
+            if line.is_active is False:
+                continue
+            for field, amount in line_total_deltas(line.line_type, line.line_total).items():
+                totals[field] += amount
+        
+        self.subtotal = totals["subtotal"]
+        self.discount_amount = totals["discount_amount"]
+        self.tax_amount = totals["tax_amount"]
+        self.deposit_amount = totals["deposit_amount"]
         self.total_amount = self.subtotal - self.discount_amount + self.tax_amount
     
     def apply_payment(
@@ -712,25 +772,10 @@ class TransactionLine(BaseModel):
     
     def calculate_line_total(self):
         """Calculate line total based on quantity, price, discount, and tax."""
-        # Base calculation
-        subtotal = self.quantity * self.unit_price
-        
-        # Apply discount
-        if self.discount_percentage > 0:
-            self.discount_amount = subtotal * (self.discount_percentage / 100)
-        
-        discounted_amount = subtotal - self.discount_amount
-        
-        # Calculate tax
-        if self.tax_rate > 0:
-            self.tax_amount = discounted_amount * (self.tax_rate / 100)
-        
-        # Calculate final total
-        self.line_total = discounted_amount + self.tax_amount
-        
-        # For discount lines, make total negative
-        if self.line_type == LineItemType.DISCOUNT.value:
-            self.line_total = -abs(self.line_total)
+        self.discount_amount, self.tax_amount, self.line_total = compute_line_amounts(
+            self.line_type, self.quantity, self.unit_price, self.discount_percentage,
+            self.discount_amount, self.tax_rate, self.tax_amount
+        )
     
     def apply_discount(
         self,
@@ -1,21 +1,30 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Mapping, Set, Tuple
 from uuid import UUID
 from decimal import Decimal
-from datetime import datetime, date
-from sqlalchemy import and_, or_, func, select, update, delete, desc, asc
+from datetime import datetime, date, timedelta
+from sqlalchemy import Date, String, and_, or_, func, select, update, delete, desc, asc, cast, insert, literal, null, true
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload, joinedload
 
+from app.core.errors import ConfigurationException
+from app.modules.analytics.rollups import ROLLUPS, record_row_changes
 from app.modules.transactions.models import (
     TransactionHeader, TransactionLine,
     TransactionType, TransactionStatus, PaymentMethod, PaymentStatus,
-    RentalPeriodUnit, LineItemType
+    RentalPeriodUnit, LineItemType, transaction_daily_summary_table,
+    LINE_TYPE_TOTALS, LOCKED_TRANSACTION_STATUSES
 )
 from app.modules.transactions.schemas import (
     TransactionHeaderCreate, TransactionHeaderUpdate,
     TransactionLineCreate, TransactionLineUpdate,
     TransactionSearch
 )
+from app.shared.filters import SortOrder, SortSpec
+from app.shared.pagination import CountMode, CursorPage, paginate_keyset
+
+
+# Non-nullable columns the keyset page can be ordered by
+CURSOR_SORT_FIELDS = {"transaction_date", "created_at", "transaction_number", "total_amount"}
 
 
 class TransactionHeaderRepository:
@@ -66,10 +75,106 @@ class TransactionHeaderRepository:
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
     
-    async def get_all(
-        self, 
-        skip: int = 0, 
-        limit: int = 100,
+    async def apply_total_deltas(
+        self,
+        transaction_id: UUID,
+        deltas: Dict[str, Decimal],
+        updated_by: Optional[str] = None
+    ) -> Optional[Mapping[str, Any]]:
+        """
+        Shift header totals by the given amounts in one UPDATE, without committing.
+        
+        The arithmetic happens in the database, so concurrent line changes
+        cannot overwrite each other's totals. The update only applies while
+        the transaction is still modifiable. A total change is recorded in
+        the dashboard rollups in the same transaction.
+        
+        Returns:
+            The new totals, or None if the transaction does not exist or is
+            completed, cancelled or refunded
+        """
+        headers = TransactionHeader.__table__
+        values = {field: headers.c[field] + amount for field, amount in deltas.items() if amount}
+        total_delta = (
+            deltas.get("subtotal", 0) - deltas.get("discount_amount", 0) + deltas.get("tax_amount", 0)
+        )
+        if total_delta:
+            values["total_amount"] = headers.c.total_amount + total_delta
+        values["updated_at"] = datetime.utcnow()
+        if updated_by:
+            values["updated_by"] = updated_by
+        
+        result = await self.session.execute(
+            update(headers)
+            .where(headers.c.id == transaction_id, headers.c.status.notin_(LOCKED_TRANSACTION_STATUSES))
+            .values(**values)
+            .returning(
+                headers.c.id, headers.c.subtotal, headers.c.discount_amount, headers.c.tax_amount,
+                headers.c.deposit_amount, headers.c.total_amount, *self._rollup_columns()
+            )
+        )
+        header = result.mappings().first()
+        if header is not None and total_delta:
+            new = dict(header)
+            old = {**new, "total_amount": new["total_amount"] - total_delta}
+            await self._record_total_change(old, new)
+        return header
+    
+    @staticmethod
+    def _rollup_columns():
+        """Header columns the dashboard rollups are computed from."""
+        headers = TransactionHeader.__table__
+        attributes = {
+            attribute
+            for rollup in ROLLUPS.values() if rollup.model is TransactionHeader
+            for attribute in rollup.attributes
+        }
+        return [headers.c[attribute] for attribute in sorted(attributes)]
+    
+    async def _record_total_change(self, old: Dict[str, Any], new: Dict[str, Any]):
+        """Core updates skip the rollups' flush listener; record the change directly."""
+        await self.session.run_sync(
+            lambda session: record_row_changes(session.connection(), TransactionHeader, [(old, new)])
+        )
+    
+    async def recalculate_totals(self, transaction_id: UUID) -> None:
+        """Recompute header totals from active lines in one UPDATE, without committing."""
+        headers = TransactionHeader.__table__
+        lines = TransactionLine.__table__
+        
+        def line_sum(field: str):
+            line_types = [line_type for line_type, target in LINE_TYPE_TOTALS.items() if target == field]
+            return select(func.coalesce(func.sum(lines.c.line_total), 0)).where(
+                lines.c.transaction_id == headers.c.id,
+                lines.c.is_active == True,
+                lines.c.line_type.in_(line_types)
+            ).scalar_subquery()
+        
+        # Lock the header and read the state the rollups currently count
+        old = (await self.session.execute(
+            select(*self._rollup_columns()).where(headers.c.id == transaction_id).with_for_update()
+        )).mappings().first()
+        if old is None:
+            return
+        
+        subtotal = line_sum("subtotal")
+        discount = func.abs(line_sum("discount_amount"))
+        tax = line_sum("tax_amount")
+        new = (await self.session.execute(
+            update(headers).where(headers.c.id == transaction_id).values(
+                subtotal=subtotal,
+                discount_amount=discount,
+                tax_amount=tax,
+                deposit_amount=line_sum("deposit_amount"),
+                total_amount=subtotal - discount + tax,
+                updated_at=datetime.utcnow()
+            ).returning(*self._rollup_columns())
+        )).mappings().one()
+        if new["total_amount"] != old["total_amount"]:
+            await self._record_total_change(dict(old), dict(new))
+    
+    def _filter_conditions(
+        self,
         transaction_type: Optional[TransactionType] = None,
         status: Optional[TransactionStatus] = None,
         payment_status: Optional[PaymentStatus] = None,
@@ -79,11 +184,8 @@ class TransactionHeaderRepository:
         date_from: Optional[date] = None,
         date_to: Optional[date] = None,
         active_only: bool = True
-    ) -> List[TransactionHeader]:
-        """Get all transaction headers with optional filtering."""
-        query = select(TransactionHeader)
-        
-        # Apply filters
+    ) -> list:
+        """WHERE conditions shared by the list, count and page queries."""
         conditions = []
         if active_only:
             conditions.append(TransactionHeader.is_active == True)
@@ -103,7 +205,30 @@ class TransactionHeaderRepository:
             conditions.append(TransactionHeader.transaction_date >= datetime.combine(date_from, datetime.min.time()))
         if date_to:
             conditions.append(TransactionHeader.transaction_date <= datetime.combine(date_to, datetime.max.time()))
+        return conditions
+    
+    async def get_all(
+        self, 
+        skip: int = 0, 
+        limit: int = 100,
+        transaction_type: Optional[TransactionType] = None,
+        status: Optional[TransactionStatus] = None,
+        payment_status: Optional[PaymentStatus] = None,
+        customer_id: Optional[UUID] = None,
+        location_id: Optional[UUID] = None,
+        sales_person_id: Optional[UUID] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        active_only: bool = True
+    ) -> List[TransactionHeader]:
+        """Get all transaction headers with optional filtering."""
+        query = select(TransactionHeader)
         
+        # Apply filters
+        conditions = self._filter_conditions(
+            transaction_type, status, payment_status, customer_id, location_id,
+            sales_person_id, date_from, date_to, active_only
+        )
         if conditions:
             query = query.where(and_(*conditions))
         
@@ -112,6 +237,30 @@ class TransactionHeaderRepository:
         result = await self.session.execute(query)
         return result.scalars().all()
     
+    async def get_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        sort_by: str = "transaction_date",
+        sort_order: SortOrder = SortOrder.DESC,
+        count: CountMode = CountMode.NONE,
+        **filters
+    ) -> CursorPage:
+        """Keyset page of transaction headers; takes the same filters as get_all."""
+        if sort_by not in CURSOR_SORT_FIELDS:
+            raise ValueError(f"Cannot sort transactions by '{sort_by}'")
+        
+        query = select(TransactionHeader)
+        conditions = self._filter_conditions(**filters)
+        if conditions:
+            query = query.where(and_(*conditions))
+        
+        return await paginate_keyset(
+            self.session, query, TransactionHeader,
+            [SortSpec(field=sort_by, order=sort_order)],
+            cursor=cursor, limit=limit, count=count
+        )
+    
     async def count_all(
         self,
         transaction_type: Optional[TransactionType] = None,
@@ -128,26 +277,10 @@ class TransactionHeaderRepository:
         query = select(func.count(TransactionHeader.id))
         
         # Apply filters
-        conditions = []
-        if active_only:
-            conditions.append(TransactionHeader.is_active == True)
-        if transaction_type:
-            conditions.append(TransactionHeader.transaction_type == transaction_type.value)
-        if status:
-            conditions.append(TransactionHeader.status == status.value)
-        if payment_status:
-            conditions.append(TransactionHeader.payment_status == payment_status.value)
-        if customer_id:
-            conditions.append(TransactionHeader.customer_id == str(customer_id))
-        if location_id:
-            conditions.append(TransactionHeader.location_id == str(location_id))
-        if sales_person_id:
-            conditions.append(TransactionHeader.sales_person_id == str(sales_person_id))
-        if date_from:
-            conditions.append(TransactionHeader.transaction_date >= datetime.combine(date_from, datetime.min.time()))
-        if date_to:
-            conditions.append(TransactionHeader.transaction_date <= datetime.combine(date_to, datetime.max.time()))
-        
+        conditions = self._filter_conditions(
+            transaction_type, status, payment_status, customer_id, location_id,
+            sales_person_id, date_from, date_to, active_only
+        )
         if conditions:
             query = query.where(and_(*conditions))
         
@@ -329,58 +462,201 @@ class TransactionHeaderRepository:
         await self.session.commit()
         return True
     
+    # Rows updated up to this long before the last rollup refresh are treated as
+    # dirty again, covering transactions that committed after the refresh began
+    SUMMARY_REFRESH_MARGIN = timedelta(minutes=5)
+    
     async def get_transaction_summary(
         self,
         date_from: Optional[date] = None,
         date_to: Optional[date] = None,
-        active_only: bool = True
+        active_only: bool = True,
+        use_rollup: bool = False
     ) -> Dict[str, Any]:
-        """Get transaction summary statistics."""
-        query = select(TransactionHeader)
-        
-        conditions = []
-        if active_only:
-            conditions.append(TransactionHeader.is_active == True)
-        if date_from:
-            conditions.append(TransactionHeader.transaction_date >= datetime.combine(date_from, datetime.min.time()))
-        if date_to:
-            conditions.append(TransactionHeader.transaction_date <= datetime.combine(date_to, datetime.max.time()))
+        """
+        Get transaction summary statistics.
+        
+        Counts and sums come from one GROUP BY (status, type, payment status)
+        query, so only the groups are returned. With ``use_rollup`` the query
+        reads the daily rollup table (brought up to date first) instead of
+        the transactions, which keeps long date ranges O(days).
+        """
+        if use_rollup:
+            await self.sync_daily_summary()
+            summary = transaction_daily_summary_table
+            conditions = []
+            if active_only:
+                conditions.append(summary.c.is_active == True)
+            if date_from:
+                conditions.append(summary.c.summary_date >= date_from)
+            if date_to:
+                conditions.append(summary.c.summary_date <= date_to)
+            
+            query = select(
+                summary.c.status,
+                summary.c.transaction_type,
+                summary.c.payment_status,
+                func.sum(summary.c.transaction_count),
+                func.sum(summary.c.total_amount),
+                func.sum(summary.c.paid_amount)
+            )
+            group_by = [summary.c.status, summary.c.transaction_type, summary.c.payment_status]
+        else:
+            header = TransactionHeader.__table__
+            conditions = self._summary_conditions(date_from, date_to, active_only)
+            query = select(
+                header.c.status,
+                header.c.transaction_type,
+                header.c.payment_status,
+                func.count(),
+                func.sum(header.c.total_amount),
+                func.sum(header.c.paid_amount)
+            )
+            group_by = [header.c.status, header.c.transaction_type, header.c.payment_status]
         
         if conditions:
             query = query.where(and_(*conditions))
         
-        result = await self.session.execute(query)
-        transactions = result.scalars().all()
+        result = await self.session.execute(query.group_by(*group_by))
         
-        total_transactions = len(transactions)
-        total_amount = sum(t.total_amount for t in transactions)
-        total_paid = sum(t.paid_amount for t in transactions)
-        total_outstanding = total_amount - total_paid
+        total_transactions = 0
+        total_amount = Decimal("0")
+        total_paid = Decimal("0")
+        status_counts = {status.value: 0 for status in TransactionStatus}
+        type_counts = {transaction_type.value: 0 for transaction_type in TransactionType}
+        payment_status_counts = {payment_status.value: 0 for payment_status in PaymentStatus}
         
-        # Count by status
-        status_counts = {}
-        for status in TransactionStatus:
-            status_counts[status.value] = len([t for t in transactions if t.status == status.value])
-        
-        # Count by type
-        type_counts = {}
-        for transaction_type in TransactionType:
-            type_counts[transaction_type.value] = len([t for t in transactions if t.transaction_type == transaction_type.value])
-        
-        # Count by payment status
-        payment_status_counts = {}
-        for payment_status in PaymentStatus:
-            payment_status_counts[payment_status.value] = len([t for t in transactions if t.payment_status == payment_status.value])
+        for status, transaction_type, payment_status, count, amount, paid in result:
+            count = int(count or 0)
+            total_transactions += count
+            total_amount += Decimal(str(amount or 0))
+            total_paid += Decimal(str(paid or 0))
+            status_counts[status] = status_counts.get(status, 0) + count
+            type_counts[transaction_type] = type_counts.get(transaction_type, 0) + count
+            payment_status_counts[payment_status] = payment_status_counts.get(payment_status, 0) + count
         
         return {
             'total_transactions': total_transactions,
             'total_amount': total_amount,
             'total_paid': total_paid,
-            'total_outstanding': total_outstanding,
+            'total_outstanding': total_amount - total_paid,
             'transactions_by_status': status_counts,
             'transactions_by_type': type_counts,
             'transactions_by_payment_status': payment_status_counts
         }
+    
+    def _summary_conditions(
+        self,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        active_only: bool = True
+    ) -> List[Any]:
+        header = TransactionHeader.__table__
+        conditions = []
+        if active_only:
+            conditions.append(header.c.is_active == True)
+        if date_from:
+            conditions.append(header.c.transaction_date >= datetime.combine(date_from, datetime.min.time()))
+        if date_to:
+            conditions.append(header.c.transaction_date <= datetime.combine(date_to, datetime.max.time()))
+        return conditions
+    
+    async def refresh_daily_summary(self, days: Optional[List[date]] = None) -> None:
+        """
+        Recompute the daily rollup rows for the given days (every day when None).
+        
+        Current groups are upserted and groups that no longer exist are
+        deleted afterwards, so concurrent refreshes of the same day (two
+        summary requests at once) never collide on the primary key.
+        """
+        summary = transaction_daily_summary_table
+        header = TransactionHeader.__table__
+        summary_date = func.date(header.c.transaction_date, type_=Date)
+        refreshed_at = datetime.utcnow()
+        
+        stale_query = delete(summary).where(summary.c.refreshed_at < refreshed_at)
+        source = select(
+            summary_date,
+            header.c.status,
+            header.c.transaction_type,
+            header.c.payment_status,
+            header.c.is_active,
+            func.count(),
+            func.coalesce(func.sum(header.c.total_amount), 0),
+            func.coalesce(func.sum(header.c.paid_amount), 0),
+            literal(refreshed_at, summary.c.refreshed_at.type)
+        ).where(true())
+        
+        if days is not None:
+            if not days:
+                return
+            stale_query = stale_query.where(summary.c.summary_date.in_(days))
+            source = source.where(or_(*[
+                and_(
+                    header.c.transaction_date >= datetime.combine(day, datetime.min.time()),
+                    header.c.transaction_date < datetime.combine(day + timedelta(days=1), datetime.min.time())
+                )
+                for day in days
+            ]))
+        
+        group_by = [
+            summary_date, header.c.status, header.c.transaction_type, header.c.payment_status, header.c.is_active
+        ]
+        # Upsert in key order so concurrent refreshes lock rows in the same order
+        source = source.group_by(*group_by).order_by(*group_by)
+        
+        dialect = (await self.session.connection()).dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            raise ConfigurationException(f"The daily summary rollup is not supported on {dialect}")
+        
+        measures = ['transaction_count', 'total_amount', 'paid_amount', 'refreshed_at']
+        statement = dialect_insert(summary).from_select(
+            ['summary_date', 'status', 'transaction_type', 'payment_status', 'is_active', *measures],
+            source
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[column.name for column in summary.primary_key],
+            set_={column: statement.excluded[column] for column in measures}
+        )
+        await self.session.execute(statement)
+        await self.session.execute(stale_query)
+    
+    async def refresh_summary_days(self, days: List[date]) -> None:
+        """Refresh the given days of the rollup, if it has been built yet."""
+        summary = transaction_daily_summary_table
+        built = (await self.session.execute(select(summary.c.summary_date).limit(1))).first()
+        if built is not None:
+            await self.refresh_daily_summary(days)
+    
+    async def sync_daily_summary(self) -> None:
+        """
+        Refresh the rollup for days with transactions updated since the last refresh.
+        
+        Soft deletes are covered (``is_active`` is part of the rollup key);
+        moving a transaction to another date or deleting it outright needs
+        an explicit ``refresh_daily_summary`` for the old day. Nothing is
+        written when no transaction changed since the last refresh.
+        """
+        summary = transaction_daily_summary_table
+        header = TransactionHeader.__table__
+        last_refresh = (await self.session.execute(select(func.max(summary.c.refreshed_at)))).scalar()
+        if last_refresh is None:
+            await self.refresh_daily_summary()
+            return
+        
+        if isinstance(last_refresh, str):
+            last_refresh = datetime.fromisoformat(last_refresh)
+        result = await self.session.execute(
+            select(func.date(header.c.transaction_date, type_=Date)).distinct().where(
+                header.c.updated_at > last_refresh - self.SUMMARY_REFRESH_MARGIN
+            )
+        )
+        days = [date.fromisoformat(day) if isinstance(day, str) else day for day in result.scalars()]
+        await self.refresh_daily_summary(days)
 
 
 class TransactionLineRepository:
@@ -418,6 +694,79 @@ class TransactionLineRepository:
         await self.session.refresh(line)
         return line
     
+    async def find_references(
+        self,
+        transaction_id: UUID,
+        item_ids: Iterable[UUID] = (),
+        inventory_unit_ids: Iterable[UUID] = ()
+    ) -> Tuple[Optional[str], Set[UUID], Set[UUID]]:
+        """
+        Look up a transaction and the items and units its new lines point at, in one query.
+        
+        Returns:
+            (transaction status or None if missing, existing item IDs,
+            existing inventory unit IDs)
+        """
+        from app.modules.inventory.models import Item, InventoryUnit
+        
+        headers = TransactionHeader.__table__
+        items = Item.__table__
+        units = InventoryUnit.__table__
+        item_ids, inventory_unit_ids = list(item_ids), list(inventory_unit_ids)
+        
+        queries = [
+            select(literal("transaction").label("kind"), headers.c.id, headers.c.status)
+            .where(headers.c.id == transaction_id)
+        ]
+        if item_ids:
+            queries.append(
+                select(literal("item"), items.c.id, cast(null(), String(20))).where(items.c.id.in_(item_ids))
+            )
+        if inventory_unit_ids:
+            queries.append(
+                select(literal("inventory_unit"), units.c.id, cast(null(), String(20)))
+                .where(units.c.id.in_(inventory_unit_ids))
+            )
+        
+        query = queries[0] if len(queries) == 1 else queries[0].union_all(*queries[1:])
+        result = await self.session.execute(query)
+        
+        status, found = None, {"item": set(), "inventory_unit": set()}
+        for kind, reference_id, reference_status in result:
+            if kind == "transaction":
+                status = reference_status
+            else:
+                found[kind].add(reference_id)
+        return status, found["item"], found["inventory_unit"]
+    
+    async def insert_lines(self, rows: List[Dict[str, Any]]) -> List[Mapping[str, Any]]:
+        """Insert prepared line rows in batched statements, without committing."""
+        lines = TransactionLine.__table__
+        result = await self.session.execute(
+            insert(lines).returning(*lines.c, sort_by_parameter_order=True), rows
+        )
+        return list(result.mappings().all())
+    
+    async def get_with_status(self, line_id: UUID) -> Optional[Mapping[str, Any]]:
+        """A line's columns plus its transaction's status, locking the line."""
+        lines = TransactionLine.__table__
+        headers = TransactionHeader.__table__
+        result = await self.session.execute(
+            select(*lines.c, headers.c.status.label("transaction_status"))
+            .join_from(lines, headers, headers.c.id == lines.c.transaction_id)
+            .where(lines.c.id == line_id)
+            .with_for_update(of=lines)
+        )
+        return result.mappings().first()
+    
+    async def update_values(self, line_id: UUID, values: Dict[str, Any]) -> Optional[Mapping[str, Any]]:
+        """Update a line's columns in one statement, without committing."""
+        lines = TransactionLine.__table__
+        result = await self.session.execute(
+            update(lines).where(lines.c.id == line_id).values(**values).returning(*lines.c)
+        )
+        return result.mappings().first()
+    
     async def get_by_id(self, line_id: UUID) -> Optional[TransactionLine]:
         """Get transaction line by ID."""
         query = select(TransactionLine).where(TransactionLine.id == line_id)
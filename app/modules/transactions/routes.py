@@ -10,12 +10,14 @@ from app.modules.transactions.models import TransactionType, TransactionStatus,
 from app.modules.transactions.schemas import (
     TransactionHeaderCreate, TransactionHeaderUpdate, TransactionHeaderResponse,
     TransactionHeaderListResponse, TransactionWithLinesResponse,
-    TransactionLineCreate, TransactionLineUpdate, TransactionLineResponse,
+    TransactionLineCreate, TransactionLinesCreate, TransactionLineUpdate, TransactionLineResponse,
     TransactionLineListResponse, PaymentCreate, RefundCreate, StatusUpdate,
     DiscountApplication, ReturnProcessing, RentalPeriodUpdate, RentalReturn,
     TransactionSummary, TransactionReport, TransactionSearch
 )
 from app.core.errors import NotFoundError, ValidationError, ConflictError
+from app.shared.filters import SortOrder
+from app.shared.pagination import CountMode, CursorPage
 
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
@@ -41,6 +43,46 @@ async def create_transaction(
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
 
 
+@router.get("/cursor", response_model=CursorPage[TransactionHeaderListResponse])
+async def get_transaction_page(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    sort_by: str = Query("transaction_date", description="transaction_date, created_at, transaction_number or total_amount"),
+    sort_order: SortOrder = Query(SortOrder.DESC),
+    count: CountMode = Query(CountMode.NONE, description="Report no total, a planner estimate, or an exact count"),
+    transaction_type: Optional[TransactionType] = None,
+    transaction_status: Optional[TransactionStatus] = Query(None, alias="status"),
+    payment_status: Optional[PaymentStatus] = None,
+    customer_id: Optional[UUID] = None,
+    location_id: Optional[UUID] = None,
+    sales_person_id: Optional[UUID] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    active_only: bool = Query(True),
+    service: TransactionService = Depends(get_transaction_service)
+):
+    """Get transactions with cursor pagination; deep pages cost the same as the first."""
+    try:
+        return await service.get_transaction_page(
+            cursor=cursor,
+            limit=limit,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            count=count,
+            transaction_type=transaction_type,
+            status=transaction_status,
+            payment_status=payment_status,
+            customer_id=customer_id,
+            location_id=location_id,
+            sales_person_id=sales_person_id,
+            date_from=date_from,
+            date_to=date_to,
+            active_only=active_only
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
 @router.get("/{transaction_id}", response_model=TransactionHeaderResponse)
 async def get_transaction(
     transaction_id: UUID,
@@ -259,6 +301,25 @@ async def add_transaction_line(
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
 
 
+@router.post(
+    "/{transaction_id}/lines/bulk",
+    response_model=List[TransactionLineResponse],
+    status_code=status.HTTP_201_CREATED
+)
+async def add_transaction_lines(
+    transaction_id: UUID,
+    lines_data: TransactionLinesCreate,
+    service: TransactionService = Depends(get_transaction_service)
+):
+    """Add many lines to a transaction in one commit."""
+    try:
+        return await service.add_transaction_lines(transaction_id, lines_data.lines)
+    except NotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+
+
 @router.get("/lines/{line_id}", response_model=TransactionLineResponse)
 async def get_transaction_line(
     line_id: UUID,
@@ -361,13 +422,15 @@ async def get_transaction_summary(
     date_from: Optional[date] = Query(None, description="Start date"),
     date_to: Optional[date] = Query(None, description="End date"),
     active_only: bool = Query(True),
+    use_rollup: bool = Query(False, description="Read whole days from the daily summary rollup"),
     service: TransactionService = Depends(get_transaction_service)
 ):
     """Get transaction summary."""
     return await service.get_transaction_summary(
         date_from=date_from,
         date_to=date_to,
-        active_only=active_only
+        active_only=active_only,
+        use_rollup=use_rollup
     )
 
 
@@ -211,6 +211,19 @@ class TransactionLineCreate(BaseModel):
         return v
 
 
+class TransactionLinesCreate(BaseModel):
+    """Schema for adding many lines to a transaction at once."""
+    lines: List[TransactionLineCreate] = Field(..., min_length=1, max_length=1000, description="Lines to add")
+    
+    @field_validator('lines')
+    @classmethod
+    def validate_unique_line_numbers(cls, v):
+        line_numbers = [line.line_number for line in v]
+        if len(set(line_numbers)) != len(line_numbers):
+            raise ValueError("Line numbers must be unique")
+        return v
+
+
 class TransactionLineUpdate(BaseModel):
     """Schema for updating a transaction line."""
     line_type: Optional[LineItemType] = Field(None, description="Line item type")
@@ -1,14 +1,17 @@
 from typing import Optional, List, Dict, Any
-from uuid import UUID
+from uuid import UUID, uuid4
 from decimal import Decimal
 from datetime import datetime, date
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.errors import NotFoundError, ValidationError, ConflictError
+from app.shared.filters import SortOrder
+from app.shared.pagination import CountMode, CursorPage
 from app.modules.transactions.models import (
     TransactionHeader, TransactionLine,
     TransactionType, TransactionStatus, PaymentMethod, PaymentStatus,
-    RentalPeriodUnit, LineItemType
+    RentalPeriodUnit, LineItemType, LOCKED_TRANSACTION_STATUSES,
+    compute_line_amounts, line_total_deltas
 )
 from app.modules.transactions.repository import (
     TransactionHeaderRepository, TransactionLineRepository
@@ -23,6 +26,16 @@ from app.modules.transactions.schemas import (
 )
 from app.modules.customers.repository import CustomerRepository
 from app.modules.inventory.repository import ItemRepository, InventoryUnitRepository
+from app.modules.rentals.availability import rental_availability
+
+
+def _sum_deltas(deltas) -> Dict[str, Decimal]:
+    """Add up header total changes field by field."""
+    total: Dict[str, Decimal] = {}
+    for delta in deltas:
+        for field, amount in delta.items():
+            total[field] = total.get(field, Decimal("0.00")) + amount
+    return total
 
 
 class TransactionService:
@@ -112,6 +125,26 @@ class TransactionService:
         
         return [TransactionHeaderListResponse.model_validate(transaction) for transaction in transactions]
     
+    async def get_transaction_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        sort_by: str = "transaction_date",
+        sort_order: SortOrder = SortOrder.DESC,
+        count: CountMode = CountMode.NONE,
+        **filters
+    ) -> CursorPage[TransactionHeaderListResponse]:
+        """Get one keyset page of transactions, taking the same filters as get_transactions."""
+        page = await self.transaction_repository.get_page(
+            cursor=cursor,
+            limit=limit,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            count=count,
+            **filters
+        )
+        return page.map(TransactionHeaderListResponse.model_validate)
+    
     async def search_transactions(
         self, 
         search_params: TransactionSearch,
@@ -141,7 +174,14 @@ class TransactionService:
             raise ValidationError("Cannot update completed, cancelled, or refunded transactions")
         
         # Update transaction
+        old_date = existing_transaction.transaction_date
         transaction = await self.transaction_repository.update(transaction_id, transaction_data)
+        rental_availability.invalidate_transaction(transaction_id)
+        
+        # The daily summary only notices changed rows on their current day
+        if old_date.date() != transaction.transaction_date.date():
+            await self.transaction_repository.refresh_summary_days([old_date.date()])
+            await self.session.commit()
         return TransactionHeaderResponse.model_validate(transaction)
     
     async def delete_transaction(self, transaction_id: UUID) -> bool:
@@ -155,7 +195,9 @@ class TransactionService:
         if existing_transaction.status not in [TransactionStatus.DRAFT.value, TransactionStatus.PENDING.value]:
             raise ValidationError("Can only delete draft or pending transactions")
         
-        return await self.transaction_repository.delete(transaction_id)
+        deleted = await self.transaction_repository.delete(transaction_id)
+        rental_availability.invalidate_transaction(transaction_id)
+        return deleted
     
     async def update_transaction_status(self, transaction_id: UUID, status_update: StatusUpdate) -> TransactionHeaderResponse:
         """Update transaction status."""
@@ -176,6 +218,7 @@ class TransactionService:
             transaction.notes = (transaction.notes or "") + status_note
         
         await self.session.commit()
+        rental_availability.invalidate_transaction(transaction_id)
         await self.session.refresh(transaction)
         
         return TransactionHeaderResponse.model_validate(transaction)
@@ -225,6 +268,7 @@ class TransactionService:
             transaction.notes = (transaction.notes or "") + refund_note
         
         await self.session.commit()
+        rental_availability.invalidate_transaction(transaction_id)
         await self.session.refresh(transaction)
         
         return TransactionHeaderResponse.model_validate(transaction)
@@ -239,6 +283,7 @@ class TransactionService:
         transaction.cancel_transaction(reason)
         
         await self.session.commit()
+        rental_availability.invalidate_transaction(transaction_id)
         await self.session.refresh(transaction)
         
         return TransactionHeaderResponse.model_validate(transaction)
@@ -276,6 +321,7 @@ class TransactionService:
             transaction.notes = (transaction.notes or "") + return_note
         
         await self.session.commit()
+        rental_availability.invalidate_transaction(transaction_id)
         await self.session.refresh(transaction)
         
         return TransactionHeaderResponse.model_validate(transaction)
@@ -283,34 +329,56 @@ class TransactionService:
     # Transaction Line operations
     async def add_transaction_line(self, transaction_id: UUID, line_data: TransactionLineCreate) -> TransactionLineResponse:
         """Add line to transaction."""
-        # Check if transaction exists
-        transaction = await self.transaction_repository.get_by_id(transaction_id)
-        if not transaction:
-            raise NotFoundError(f"Transaction with ID {transaction_id} not found")
+        lines = await self.add_transaction_lines(transaction_id, [line_data])
+        return lines[0]
+    
+    async def add_transaction_lines(
+        self,
+        transaction_id: UUID,
+        lines_data: List[TransactionLineCreate],
+        created_by: Optional[str] = None
+    ) -> List[TransactionLineResponse]:
+        """
+        Add lines to a transaction in a single commit.
+        
+        The transaction, items and inventory units are checked with one
+        query, the lines are inserted in batched statements and the header
+        totals are shifted by the lines' contribution instead of being
+        recomputed from every line.
+        """
+        if not lines_data:
+            raise ValidationError("At least one line is required")
+        
+        item_ids = {line_data.item_id for line_data in lines_data if line_data.item_id}
+        unit_ids = {line_data.inventory_unit_id for line_data in lines_data if line_data.inventory_unit_id}
+        transaction_status, found_items, found_units = await self.line_repository.find_references(
+            transaction_id, item_ids, unit_ids
+        )
         
-        # Check if transaction can be modified
-        if transaction.status in [TransactionStatus.COMPLETED.value, TransactionStatus.CANCELLED.value, TransactionStatus.REFUNDED.value]:
+        if transaction_status is None:
+            raise NotFoundError("Transaction", transaction_id)
+        if transaction_status in LOCKED_TRANSACTION_STATUSES:
             raise ValidationError("Cannot add lines to completed, cancelled, or refunded transactions")
+        missing_items = item_ids - found_items
+        if missing_items:
+            raise NotFoundError("Item", sorted(missing_items, key=str)[0])
+        missing_units = unit_ids - found_units
+        if missing_units:
+            raise NotFoundError("Inventory unit", sorted(missing_units, key=str)[0])
+        
+        rows = [self._line_row(transaction_id, line_data, created_by) for line_data in lines_data]
+        deltas = _sum_deltas(line_total_deltas(row["line_type"], row["line_total"]) for row in rows)
+        
+        try:
+            inserted = await self.line_repository.insert_lines(rows)
+            await self._apply_total_deltas(transaction_id, deltas, created_by)
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        rental_availability.invalidate_items(row["item_id"] for row in rows)
         
-        # Verify item exists if provided
-        if line_data.item_id:
-            item = await self.item_repository.get_by_id(line_data.item_id)
-            if not item:
-                raise NotFoundError(f"Item with ID {line_data.item_id} not found")
-        
-        # Verify inventory unit exists if provided
-        if line_data.inventory_unit_id:
-            inventory_unit = await self.inventory_unit_repository.get_by_id(line_data.inventory_unit_id)
-            if not inventory_unit:
-                raise NotFoundError(f"Inventory unit with ID {line_data.inventory_unit_id} not found")
-        
-        # Create line
-        line = await self.line_repository.create(transaction_id, line_data)
-        
-        # Recalculate transaction totals
-        await self._recalculate_transaction_totals(transaction_id)
-        
-        return TransactionLineResponse.model_validate(line)
+        return [TransactionLineResponse.model_validate(dict(line)) for line in inserted]
     
     async def get_transaction_line(self, line_id: UUID) -> TransactionLineResponse:
         """Get transaction line by ID."""
@@ -326,51 +394,79 @@ class TransactionService:
         return [TransactionLineResponse.model_validate(line) for line in lines]
     
     async def update_transaction_line(self, line_id: UUID, line_data: TransactionLineUpdate) -> TransactionLineResponse:
-        """Update transaction line."""
-        # Check if line exists
-        existing_line = await self.line_repository.get_by_id(line_id)
+        """Update transaction line and shift the header totals by the change, in one commit."""
+        existing_line = await self.line_repository.get_with_status(line_id)
         if not existing_line:
-            raise NotFoundError(f"Transaction line with ID {line_id} not found")
+            raise NotFoundError("Transaction line", line_id)
         
         # Check if transaction can be modified
-        transaction = await self.transaction_repository.get_by_id(UUID(existing_line.transaction_id))
-        if transaction.status in [TransactionStatus.COMPLETED.value, TransactionStatus.CANCELLED.value, TransactionStatus.REFUNDED.value]:
+        if existing_line["transaction_status"] in LOCKED_TRANSACTION_STATUSES:
             raise ValidationError("Cannot update lines in completed, cancelled, or refunded transactions")
         
-        # Update line
-        line = await self.line_repository.update(line_id, line_data)
+        values = {
+            field: value.value if isinstance(value, (LineItemType, RentalPeriodUnit)) else value
+            for field, value in line_data.model_dump(exclude_unset=True).items()
+        }
+        merged = {**existing_line, **values}
+        values["discount_amount"], values["tax_amount"], values["line_total"] = compute_line_amounts(
+            merged["line_type"], merged["quantity"], merged["unit_price"], merged["discount_percentage"],
+            merged["discount_amount"], merged["tax_rate"], merged["tax_amount"]
+        )
         
-        # Recalculate transaction totals
-        await self._recalculate_transaction_totals(UUID(existing_line.transaction_id))
+        deltas = {}
+        if existing_line["is_active"]:
+            deltas = _sum_deltas([
+                line_total_deltas(existing_line["line_type"], existing_line["line_total"], sign=-1),
+                line_total_deltas(merged["line_type"], values["line_total"]),
+            ])
+        
+        try:
+            line = await self.line_repository.update_values(line_id, values)
+            if existing_line["is_active"]:
+                await self._apply_total_deltas(existing_line["transaction_id"], deltas)
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        rental_availability.invalidate_items([existing_line["item_id"], line["item_id"]])
         
-        return TransactionLineResponse.model_validate(line)
+        return TransactionLineResponse.model_validate(dict(line))
     
     async def delete_transaction_line(self, line_id: UUID) -> bool:
-        """Delete transaction line."""
-        # Check if line exists
-        existing_line = await self.line_repository.get_by_id(line_id)
+        """Soft delete transaction line and remove it from the header totals, in one commit."""
+        existing_line = await self.line_repository.get_with_status(line_id)
         if not existing_line:
-            raise NotFoundError(f"Transaction line with ID {line_id} not found")
+            raise NotFoundError("Transaction line", line_id)
         
         # Check if transaction can be modified
-        transaction = await self.transaction_repository.get_by_id(UUID(existing_line.transaction_id))
-        if transaction.status in [TransactionStatus.COMPLETED.value, TransactionStatus.CANCELLED.value, TransactionStatus.REFUNDED.value]:
+        if existing_line["transaction_status"] in LOCKED_TRANSACTION_STATUSES:
             raise ValidationError("Cannot delete lines from completed, cancelled, or refunded transactions")
         
-        # Delete line
-        success = await self.line_repository.delete(line_id)
-        
-        if success:
-            # Recalculate transaction totals
-            await self._recalculate_transaction_totals(UUID(existing_line.transaction_id))
+        if not existing_line["is_active"]:
+            return True
+        
+        try:
+            await self.line_repository.update_values(
+                line_id, {"is_active": False, "deleted_at": datetime.utcnow()}
+            )
+            await self._apply_total_deltas(
+                existing_line["transaction_id"],
+                line_total_deltas(existing_line["line_type"], existing_line["line_total"], sign=-1)
+            )
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        rental_availability.invalidate_items([existing_line["item_id"]])
         
-        return success
+        return True
     
     async def apply_line_discount(self, line_id: UUID, discount_data: DiscountApplication) -> TransactionLineResponse:
         """Apply discount to transaction line."""
         line = await self.line_repository.get_by_id(line_id)
         if not line:
             raise NotFoundError(f"Transaction line with ID {line_id} not found")
+        previous_total = line.line_total
         
         # Apply discount
         line.apply_discount(
@@ -383,12 +479,16 @@ class TransactionService:
             discount_note = f"\n[DISCOUNT] {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}: {discount_data.reason}"
             line.notes = (line.notes or "") + discount_note
         
+        # Shift transaction totals by the change in this line, in the same commit
+        if line.is_active:
+            await self._apply_total_deltas(line.transaction_id, _sum_deltas([
+                line_total_deltas(line.line_type, previous_total, sign=-1),
+                line_total_deltas(line.line_type, line.line_total),
+            ]))
+        
         await self.session.commit()
         await self.session.refresh(line)
         
-        # Recalculate transaction totals
-        await self._recalculate_transaction_totals(UUID(line.transaction_id))
-        
         return TransactionLineResponse.model_validate(line)
     
     async def process_line_return(self, line_id: UUID, return_data: ReturnProcessing) -> TransactionLineResponse:
@@ -411,6 +511,7 @@ class TransactionService:
         
         await self.session.commit()
         await self.session.refresh(line)
+        rental_availability.invalidate_items([line.item_id])
         
         return TransactionLineResponse.model_validate(line)
     
@@ -434,6 +535,7 @@ class TransactionService:
         
         await self.session.commit()
         await self.session.refresh(line)
+        rental_availability.invalidate_items([line.item_id])
         
         return TransactionLineResponse.model_validate(line)
     
@@ -442,13 +544,15 @@ class TransactionService:
         self,
         date_from: Optional[date] = None,
         date_to: Optional[date] = None,
-        active_only: bool = True
+        active_only: bool = True,
+        use_rollup: bool = False
     ) -> TransactionSummary:
         """Get transaction summary."""
         summary_data = await self.transaction_repository.get_transaction_summary(
             date_from=date_from,
             date_to=date_to,
-            active_only=active_only
+            active_only=active_only,
+            use_rollup=use_rollup
         )
         
         return TransactionSummary(
@@ -506,11 +610,54 @@ class TransactionService:
     
     # Helper methods
     async def _recalculate_transaction_totals(self, transaction_id: UUID):
-        """Recalculate transaction totals."""
-        transaction = await self.transaction_repository.get_with_lines(transaction_id)
-        if transaction:
-            transaction.calculate_totals()
-            await self.session.commit()
+        """Recalculate transaction totals from every active line (repairs drifted totals)."""
+        await self.transaction_repository.recalculate_totals(transaction_id)
+        await self.session.commit()
+    
+    async def _apply_total_deltas(
+        self,
+        transaction_id: UUID,
+        deltas: Dict[str, Decimal],
+        updated_by: Optional[str] = None
+    ):
+        """Shift header totals; fails if the transaction was locked meanwhile."""
+        header = await self.transaction_repository.apply_total_deltas(transaction_id, deltas, updated_by)
+        if header is None:
+            raise ValidationError("Cannot modify lines of completed, cancelled, or refunded transactions")
+    
+    @staticmethod
+    def _line_row(transaction_id: UUID, line_data: TransactionLineCreate, created_by: Optional[str]) -> Dict[str, Any]:
+        """Column values for a new line, with its amounts calculated."""
+        line_type = LineItemType(line_data.line_type).value
+        discount_amount, tax_amount, line_total = compute_line_amounts(
+            line_type, line_data.quantity, line_data.unit_price, line_data.discount_percentage,
+            line_data.discount_amount, line_data.tax_rate, Decimal("0.00")
+        )
+        return {
+            "id": uuid4(),
+            "transaction_id": transaction_id,
+            "line_number": line_data.line_number,
+            "line_type": line_type,
+            "item_id": line_data.item_id,
+            "inventory_unit_id": line_data.inventory_unit_id,
+            "description": line_data.description,
+            "quantity": line_data.quantity,
+            "unit_price": line_data.unit_price,
+            "discount_percentage": line_data.discount_percentage,
+            "discount_amount": discount_amount,
+            "tax_rate": line_data.tax_rate,
+            "tax_amount": tax_amount,
+            "line_total": line_total,
+            "rental_period_value": line_data.rental_period_value,
+            "rental_period_unit": line_data.rental_period_unit.value if line_data.rental_period_unit else None,
+            "rental_start_date": line_data.rental_start_date,
+            "rental_end_date": line_data.rental_end_date,
+            "returned_quantity": Decimal("0"),
+            "notes": line_data.notes,
+            "is_active": True,
+            "created_by": created_by,
+            "updated_by": created_by,
+        }
     
     async def _validate_transaction_modification(self, transaction: TransactionHeader):
         """Validate if transaction can be modified."""
@@ -541,4 +688,5 @@ class TransactionService:
                 raise NotFoundError(f"Inventory unit with ID {inventory_unit_id} not found")
             
             if not inventory_unit.is_available():
-                raise ValidationError("Inventory unit is not available")
\ No newline at end of file
+                raise ValidationError("Inventory unit is not available")
+
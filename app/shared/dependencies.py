@@ -9,8 +9,10 @@ from pydantic import BaseModel
 
 from app.db.session import get_session
 from app.core.security import decode_access_token, TokenData
+from app.core.auth_cache import user_activity
 from app.core.config import settings
 from app.core.errors import AuthenticationException, AuthorizationException
+from app.modules.auth.permission_registry import permission_registry
 
 
 # OAuth2 scheme
@@ -55,21 +57,23 @@ async def get_current_user_data(
 async def get_current_active_user(
     session: AsyncSessionDep,
     token_data: TokenData = Depends(get_current_user_data)
-):
-    """
-    Get current active user from database.
+) -> TokenData:
     """
-    from app.modules.auth.models import User
+    Get current user data from token, rejecting deactivated users.
     
-    if not token_data.user_id:
+    Checks the in-memory is_active snapshot instead of loading the User
+    row, so most requests do no database work. Load the user through the
+    auth service when its fields are needed.
+    """
+    try:
+        user_id = UUID(token_data.user_id)
+    except (TypeError, ValueError):
         raise AuthenticationException("Invalid user token")
     
-    # Fetch user from database
-    user = await session.get(User, UUID(token_data.user_id))
-    if not user or not user.is_active:
+    if not await user_activity.is_active(session, user_id):
         raise AuthenticationException("User not found or inactive")
     
-    return user
+    return token_data
 
 
 async def get_optional_current_user(
@@ -95,6 +99,9 @@ class PermissionChecker:
     """
     Dependency class for checking permissions.
     
+    Required permissions are compiled to a bitmask once, so each check is a
+    single AND/compare against the mask carried in the token.
+    
     Usage:
         ```python
         @router.get("/admin", dependencies=[Depends(PermissionChecker("admin:read"))])
@@ -108,17 +115,17 @@ class PermissionChecker:
             [required_permissions] if isinstance(required_permissions, str) 
             else required_permissions
         )
+        self.required_mask = permission_registry.require(self.required_permissions)
     
     async def __call__(
         self,
         current_user: TokenData = Depends(get_current_user_data)
     ) -> TokenData:
         """Check if user has required permissions."""
-        user_permissions = set(current_user.permissions)
-        required = set(self.required_permissions)
+        user_mask = permission_registry.user_mask(current_user)
         
-        if not required.issubset(user_permissions):
-            missing = required - user_permissions
+        if user_mask & self.required_mask != self.required_mask:
+            missing = permission_registry.codes(self.required_mask & ~user_mask)
             raise AuthorizationException(
                 f"Missing required permissions: {', '.join(missing)}"
             )
@@ -1,38 +1,308 @@
-from typing import Generic, TypeVar, List, Optional, Dict, Any
+from typing import Generic, TypeVar, List, Optional, Dict, Any, Sequence, Tuple, Mapping
 from pydantic import BaseModel
 from math import ceil
+from enum import Enum
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+import base64
+import json
+
+from sqlalchemy import Select, and_, or_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.shared.filters import FilterBuilder, SortOrder, SortSpec
 
 T = TypeVar('T')
 
 
 class Page(BaseModel, Generic[T]):
     """Generic pagination container."""
-    
+
     items: List[T]
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
     has_next: bool
     has_prev: bool
-    
+
     @classmethod
     def create(
         cls,
         items: List[T],
-        total: int,
+        total: Optional[int],
         page: int,
-        page_size: int
+        page_size: int,
+        has_next: Optional[bool] = None
     ) -> 'Page[T]':
-        """Create a paginated response."""
+        """Create a paginated response.
+
+        ``total`` may be None when the caller skipped the count; pass
+        ``has_next`` instead (e.g. by fetching one extra row).
+        """
+        if total is None:
+            return cls(
+                items=items,
+                page=page,
+                page_size=page_size,
+                has_next=bool(has_next),
+                has_prev=page > 1
+            )
+
         total_pages = ceil(total / page_size) if page_size > 0 else 0
-        
+
         return cls(
             items=items,
             total=total,
             page=page,
             page_size=page_size,
             total_pages=total_pages,
-            has_next=page < total_pages,
+            has_next=page < total_pages if has_next is None else has_next,
             has_prev=page > 1
-        )
\ No newline at end of file
+        )
+
+
+class CountMode(str, Enum):
+    """How a cursor page reports the total number of rows."""
+    NONE = "none"           # No total; scrolling clients never pay for COUNT(*)
+    ESTIMATE = "estimate"   # Planner row estimate (PostgreSQL), exact elsewhere
+    EXACT = "exact"         # SELECT COUNT(*) over the filtered query
+
+
+class CursorPage(BaseModel, Generic[T]):
+    """Keyset-paginated response.
+
+    Pass ``next_cursor`` back as ``cursor`` to fetch the following page.
+    """
+
+    items: List[T]
+    limit: int
+    next_cursor: Optional[str] = None
+    has_next: bool
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+
+    def map(self, function) -> 'CursorPage':
+        """Same page with every item converted by function."""
+        return self.model_copy(update={"items": [function(item) for item in self.items]})
+
+
+# Cursor value encoding
+_CURSOR_VERSION = 1
+
+
+def _encode_value(value: Any) -> Any:
+    """Tag values that JSON cannot round-trip."""
+    if isinstance(value, Enum):
+        value = value.value
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    if isinstance(value, UUID):
+        return {"uuid": str(value)}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    raise ValueError(f"Cannot use a {type(value).__name__} value in a cursor")
+
+
+def _decode_value(value: Any) -> Any:
+    if not isinstance(value, dict):
+        return value
+    (tag, text), = value.items()
+    if tag == "dt":
+        return datetime.fromisoformat(text)
+    if tag == "d":
+        return date.fromisoformat(text)
+    if tag == "dec":
+        return Decimal(text)
+    if tag == "uuid":
+        return UUID(text)
+    raise ValueError(f"Unknown cursor value tag: {tag}")
+
+
+def _sort_signature(sort_specs: Sequence[SortSpec]) -> List[str]:
+    return [f"{spec.field}:{SortOrder(spec.order).value}" for spec in sort_specs]
+
+
+def encode_cursor(sort_specs: Sequence[SortSpec], values: Sequence[Any]) -> str:
+    """Opaque cursor holding the sort key values of the last row seen."""
+    payload = {
+        "v": _CURSOR_VERSION,
+        "s": _sort_signature(sort_specs),
+        "k": [_encode_value(value) for value in values],
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, sort_specs: Sequence[SortSpec]) -> List[Any]:
+    """Sort key values from a cursor made by encode_cursor for the same sort.
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another sort
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [_decode_value(value) for value in payload["k"]]
+        signature = payload["s"]
+        version = payload["v"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+    if version != _CURSOR_VERSION or signature != _sort_signature(sort_specs) or len(values) != len(sort_specs):
+        raise ValueError("Pagination cursor does not match the requested sort")
+    return values
+
+
+def keyset_sort(sort_specs: Sequence[SortSpec], tiebreaker: str = "id") -> List[SortSpec]:
+    """Sort specs made total by appending the unique tiebreaker column."""
+    specs = [spec for spec in sort_specs if spec.field != tiebreaker]
+    last_order = specs[-1].order if specs else SortOrder.ASC
+    return specs + [SortSpec(field=tiebreaker, order=last_order)]
+
+
+def apply_keyset(
+    query: Select,
+    model: Any,
+    sort_specs: Sequence[SortSpec],
+    cursor: Optional[str] = None
+) -> Select:
+    """
+    Order a query by sort_specs and seek past the row a cursor points at.
+
+    sort_specs must already end with a unique column (see keyset_sort) and
+    name non-nullable columns of the model. The seek predicate is the
+    expanded row comparison ``a > :a OR (a = :a AND b > :b) ...`` so mixed
+    ascending and descending keys are supported and each key can use an
+    index.
+    """
+    fields = []
+    for spec in sort_specs:
+        if "." in spec.field:
+            raise ValueError(f"Cannot paginate by related field '{spec.field}'")
+        fields.append((FilterBuilder.get_field(model, spec.field), SortOrder(spec.order)))
+
+    if cursor is not None:
+        values = decode_cursor(cursor, sort_specs)
+        branches = []
+        for position, (field, order) in enumerate(fields):
+            equal_prefix = [fields[i][0] == values[i] for i in range(position)]
+            beyond = field < values[position] if order == SortOrder.DESC else field > values[position]
+            branches.append(and_(*equal_prefix, beyond))
+        query = query.where(or_(*branches))
+
+    return query.order_by(*[
+        field.desc() if order == SortOrder.DESC else field.asc() for field, order in fields
+    ])
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) wrapper so binds go through normal type processing."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def count_rows(
+    session: AsyncSession,
+    query: Select,
+    mode: CountMode = CountMode.EXACT
+) -> Tuple[Optional[int], bool]:
+    """
+    Count the rows a query would return.
+
+    Returns:
+        (total, is_estimate); total is None for CountMode.NONE. Estimates
+        come from the PostgreSQL planner and fall back to an exact count on
+        other databases.
+    """
+    if mode == CountMode.NONE:
+        return None, False
+
+    query = query.order_by(None).limit(None).offset(None)
+    if mode == CountMode.ESTIMATE:
+        connection = await session.connection()
+        if connection.dialect.name == "postgresql":
+            result = await session.execute(_Explain(query))
+            plan = result.scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"]), True
+
+    result = await session.execute(select(func.count()).select_from(query.subquery()))
+    return result.scalar_one(), False
+
+
+def _sort_value(item: Any, field: str) -> Any:
+    if isinstance(item, Mapping):
+        return item[field]
+    return getattr(item, field)
+
+
+async def paginate_keyset(
+    session: AsyncSession,
+    query: Select,
+    model: Any,
+    sort_specs: Sequence[SortSpec],
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    count: CountMode = CountMode.NONE,
+    scalars: bool = True,
+    tiebreaker: str = "id"
+) -> CursorPage:
+    """
+    Fetch one keyset page of a filtered query.
+
+    The page costs a single indexed range scan of ``limit + 1`` rows no
+    matter how deep the client has scrolled; a count query only runs when
+    ``count`` asks for one.
+
+    Args:
+        session: Database session
+        query: Filtered select without ORDER BY, OFFSET or LIMIT
+        model: Model (or column collection) the sort fields belong to
+        sort_specs: Requested sort; the tiebreaker column is appended
+        cursor: next_cursor from the previous page
+        limit: Page size
+        count: Whether and how to report the total
+        scalars: Return ORM entities (True) or row mappings (False)
+        tiebreaker: Unique column that makes the order total
+
+    Raises:
+        ValueError: If the cursor is invalid or does not match the sort
+    """
+    sort_specs = keyset_sort(sort_specs, tiebreaker)
+    total, total_is_estimate = await count_rows(session, query, count)
+
+    result = await session.execute(apply_keyset(query, model, sort_specs, cursor).limit(limit + 1))
+    rows = list(result.scalars().all() if scalars else result.mappings().all())
+    has_next = len(rows) > limit
+    items = rows[:limit]
+
+    next_cursor = None
+    if has_next:
+        last = items[-1]
+        next_cursor = encode_cursor(sort_specs, [_sort_value(last, spec.field) for spec in sort_specs])
+
+    return CursorPage(
+        items=items,
+        limit=limit,
+        next_cursor=next_cursor,
+        has_next=has_next,
+        total=total,
+        total_is_estimate=total_is_estimate
+    )
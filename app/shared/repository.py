@@ -1,18 +1,29 @@
-from typing import Generic, TypeVar, Optional, List, Dict, Any, Type
+from typing import Generic, TypeVar, Optional, List, Dict, Any, Type, Iterator, Sequence
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, update, delete
+from sqlalchemy import select, func, insert, update, delete, bindparam
 from sqlalchemy.orm import selectinload
 from datetime import datetime
 
+from app.core.errors import ConfigurationException
 from app.db.base import BaseModel
+from app.shared.filters import SortOrder, SortSpec
+from app.shared.pagination import CountMode, CursorPage, paginate_keyset
 
 ModelType = TypeVar("ModelType", bound=BaseModel)
 
+# Rows per statement for the bulk write methods
+DEFAULT_BULK_CHUNK_SIZE = 1000
+
+# asyncpg accepts at most 32767 bind parameters per statement
+MAX_BIND_PARAMETERS = 30000
+
 
 class BaseRepository(Generic[ModelType]):
     """Base repository class with common database operations."""
     
+    bulk_chunk_size: int = DEFAULT_BULK_CHUNK_SIZE
+    
     def __init__(self, model: Type[ModelType], session: AsyncSession):
         self.model = model
         self.session = session
@@ -109,45 +120,188 @@ class BaseRepository(Generic[ModelType]):
         result = await self.session.execute(query)
         return result.scalar() > 0
     
-    async def bulk_create(self, objs_data: List[Dict[str, Any]]) -> List[ModelType]:
-        """Create multiple records."""
-        db_objs = [self.model(**obj_data) for obj_data in objs_data]
-        self.session.add_all(db_objs)
-        await self.session.commit()
-        
-        # Refresh all objects
-        for db_obj in db_objs:
-            await self.session.refresh(db_obj)
+    def _check_bulk_write(self):
+        """Bulk statements skip the ORM flush; refuse them on dashboard rollup sources."""
+        from app.modules.analytics.rollups import check_bulk_write
         
+        check_bulk_write(self.model.__table__)
+    
+    def _chunks(
+        self,
+        rows: Sequence[Dict[str, Any]],
+        chunk_size: Optional[int] = None
+    ) -> Iterator[Sequence[Dict[str, Any]]]:
+        """Split rows into chunks that respect chunk_size and the bind parameter limit."""
+        if not rows:
+            return
+        size = chunk_size or self.bulk_chunk_size
+        columns = max(len(row) for row in rows)
+        size = max(1, min(size, MAX_BIND_PARAMETERS // max(columns, 1)))
+        for start in range(0, len(rows), size):
+            yield rows[start:start + size]
+    
+    async def bulk_create(
+        self,
+        objs_data: List[Dict[str, Any]],
+        chunk_size: Optional[int] = None
+    ) -> List[ModelType]:
+        """
+        Create multiple records.
+        
+        Each chunk is one ORM bulk INSERT ... RETURNING, so the created
+        objects come back fully loaded without a refresh per row. Model
+        __init__ is not called; column defaults still apply.
+        """
+        if not objs_data:
+            return []
+        self._check_bulk_write()
+        
+        db_objs: List[ModelType] = []
+        try:
+            for chunk in self._chunks(objs_data, chunk_size):
+                result = await self.session.scalars(insert(self.model).returning(self.model), list(chunk))
+                db_objs.extend(result.all())
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
         return db_objs
     
+    async def bulk_insert(
+        self,
+        rows: List[Dict[str, Any]],
+        chunk_size: Optional[int] = None
+    ) -> List[UUID]:
+        """
+        Insert rows without loading ORM objects and return their ids.
+        
+        Uses a Core executemany INSERT ... RETURNING per chunk, which the
+        driver sends as multi-row VALUES batches.
+        """
+        if not rows:
+            return []
+        self._check_bulk_write()
+        
+        table = self.model.__table__
+        ids: List[UUID] = []
+        try:
+            for chunk in self._chunks(rows, chunk_size):
+                result = await self.session.execute(insert(table).returning(table.c.id), list(chunk))
+                ids.extend(result.scalars().all())
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        return ids
+    
     async def bulk_update(
         self,
         updates: List[Dict[str, Any]],
-        key_field: str = "id"
+        key_field: str = "id",
+        chunk_size: Optional[int] = None
     ) -> int:
-        """Bulk update records."""
+        """
+        Bulk update records.
+        
+        Rows are grouped by the set of columns they change and each group is
+        sent as one executemany UPDATE with the key bound per row. Rows
+        without a key_field value are ignored.
+        
+        Returns:
+            Number of rows submitted
+        """
         if not updates:
             return 0
+        self._check_bulk_write()
         
-        stmt = update(self.model)
-        
-        # Execute bulk update
+        table = self.model.__table__
+        now = datetime.utcnow()
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
         for update_data in updates:
-            key_value = update_data.pop(key_field)
-            update_data['updated_at'] = datetime.utcnow()
+            if update_data.get(key_field) is None:
+                continue
+            params = {key: value for key, value in update_data.items() if key != key_field and key in table.c}
+            if "updated_at" in table.c:
+                params["updated_at"] = now
+            params["_key"] = update_data[key_field]
+            groups.setdefault(tuple(sorted(params)), []).append(params)
+        
+        count = 0
+        try:
+            for params_list in groups.values():
+                statement = update(table).where(table.c[key_field] == bindparam("_key"))
+                for chunk in self._chunks(params_list, chunk_size):
+                    await self.session.execute(statement, list(chunk))
+                    count += len(chunk)
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        return count
+    
+    async def bulk_upsert(
+        self,
+        rows: List[Dict[str, Any]],
+        conflict_columns: Sequence[str] = ("id",),
+        update_columns: Optional[Sequence[str]] = None,
+        chunk_size: Optional[int] = None
+    ) -> int:
+        """
+        Insert rows, updating those that conflict (INSERT ... ON CONFLICT).
+        
+        Args:
+            rows: Rows to write; all rows should have the same keys
+            conflict_columns: Columns of the unique constraint to match on
+            update_columns: Columns overwritten on conflict; defaults to every
+                supplied column except the key, id and creation audit fields.
+                An empty sequence means conflicting rows are left unchanged.
+            chunk_size: Rows per statement
             
-            await self.session.execute(
-                stmt.where(getattr(self.model, key_field) == key_value).values(**update_data)
-            )
-        
-        await self.session.commit()
-        return len(updates)
+        Returns:
+            Number of rows submitted
+        """
+        if not rows:
+            return 0
+        self._check_bulk_write()
+        
+        dialect = (await self.session.connection()).dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            raise ConfigurationException(f"Upsert is not supported on {dialect}")
+        
+        table = self.model.__table__
+        if update_columns is None:
+            skip = set(conflict_columns) | {"id", "created_at", "created_by"}
+            update_columns = [key for key in rows[0] if key in table.c and key not in skip]
+        
+        statement = dialect_insert(table)
+        if update_columns:
+            set_ = {column: statement.excluded[column] for column in update_columns}
+            if "updated_at" in table.c:
+                set_["updated_at"] = datetime.utcnow()
+            statement = statement.on_conflict_do_update(index_elements=list(conflict_columns), set_=set_)
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=list(conflict_columns))
+        
+        count = 0
+        try:
+            for chunk in self._chunks(rows, chunk_size):
+                await self.session.execute(statement, list(chunk))
+                count += len(chunk)
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        return count
     
     async def bulk_delete(self, ids: List[UUID]) -> int:
         """Bulk soft delete records."""
         if not ids:
             return 0
+        self._check_bulk_write()
         
         stmt = update(self.model).where(
             self.model.id.in_(ids)
@@ -164,6 +318,7 @@ class BaseRepository(Generic[ModelType]):
         """Bulk hard delete records."""
         if not ids:
             return 0
+        self._check_bulk_write()
         
         stmt = delete(self.model).where(self.model.id.in_(ids))
         result = await self.session.execute(stmt)
@@ -236,6 +391,31 @@ class BaseRepository(Generic[ModelType]):
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
     
+    async def get_cursor_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+        sort: Optional[List[SortSpec]] = None,
+        count: CountMode = CountMode.NONE,
+        active_only: bool = True,
+        **filters
+    ) -> CursorPage:
+        """Get a keyset page (newest first unless sort is given) without a COUNT query by default."""
+        query = select(self.model)
+        
+        if active_only:
+            query = query.where(self.model.is_active == True)
+        
+        for key, value in filters.items():
+            if value is not None and hasattr(self.model, key):
+                query = query.where(getattr(self.model, key) == value)
+        
+        return await paginate_keyset(
+            self.session, query, self.model,
+            sort or [SortSpec(field="created_at", order=SortOrder.DESC)],
+            cursor=cursor, limit=limit, count=count
+        )
+    
     async def get_paginated(
         self,
         page: int = 1,
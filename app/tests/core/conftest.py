@@ -0,0 +1,171 @@
+import time
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Optional, Tuple
+
+import pytest
+
+from app.core.cache import CacheManager
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the redis.asyncio client used by the cache."""
+
+    def __init__(self):
+        self.store: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self.calls = 0
+
+    def _live(self, key: str) -> Optional[Any]:
+        item = self.store.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            del self.store[key]
+            return None
+        return value
+
+    async def ping(self):
+        return True
+
+    async def get(self, key):
+        self.calls += 1
+        return self._live(key)
+
+    async def set(self, key, value, ex=None):
+        self.calls += 1
+        self.store[key] = (value, time.time() + ex if ex else None)
+        return True
+
+    async def setex(self, key, ttl, value):
+        return await self.set(key, value, ex=ttl)
+
+    async def delete(self, *keys):
+        self.calls += 1
+        return sum(1 for key in keys if self.store.pop(key, None) is not None)
+
+    async def exists(self, key):
+        self.calls += 1
+        return 1 if self._live(key) is not None else 0
+
+    async def incr(self, key, amount=1):
+        self.calls += 1
+        value = int(self._live(key) or 0) + amount
+        expires_at = self.store.get(key, (None, None))[1]
+        self.store[key] = (str(value), expires_at)
+        return value
+
+    async def expire(self, key, ttl, nx=False, gt=False):
+        self.calls += 1
+        if self._live(key) is None:
+            return False
+        current = self.store[key][1]
+        expires_at = time.time() + ttl
+        if nx and current is not None:
+            return False
+        if gt and (current is None or expires_at <= current):
+            return False
+        self.store[key] = (self.store[key][0], expires_at)
+        return True
+
+    async def pttl(self, key):
+        self.calls += 1
+        if self._live(key) is None:
+            return -2
+        expires_at = self.store[key][1]
+        return -1 if expires_at is None else int((expires_at - time.time()) * 1000)
+
+    async def sadd(self, key, *members):
+        self.calls += 1
+        current = self._live(key) or set()
+        added = len(set(members) - current)
+        self.store[key] = (current | set(members), self.store.get(key, (None, None))[1])
+        return added
+
+    async def smembers(self, key):
+        self.calls += 1
+        return set(self._live(key) or set())
+
+    async def hincrby(self, key, field, amount=1):
+        self.calls += 1
+        current = self._live(key) or {}
+        current[field] = int(current.get(field, 0)) + amount
+        self.store[key] = (current, self.store.get(key, (None, None))[1])
+        return current[field]
+
+    async def hgetall(self, key):
+        self.calls += 1
+        return dict(self._live(key) or {})
+
+    async def lpush(self, key, *values):
+        self.calls += 1
+        current = self._live(key) or []
+        current[:0] = list(reversed(values))
+        self.store[key] = (current, self.store.get(key, (None, None))[1])
+        return len(current)
+
+    async def ltrim(self, key, start, end):
+        self.calls += 1
+        current = self._live(key) or []
+        self.store[key] = (current[start:end + 1], self.store.get(key, (None, None))[1])
+        return True
+
+    async def lrange(self, key, start, end):
+        self.calls += 1
+        return list((self._live(key) or [])[start:end + 1])
+
+    async def scan_iter(self, match="*", count=None):
+        self.calls += 1
+        for key in list(self.store):
+            if self._live(key) is not None and fnmatchcase(key, match):
+                yield key
+
+    async def keys(self, pattern):
+        self.calls += 1
+        return [key for key in list(self.store) if self._live(key) is not None and fnmatchcase(key, pattern)]
+
+    async def info(self):
+        return {"redis_version": "fake", "keyspace_hits": 0, "keyspace_misses": 0}
+
+    async def close(self):
+        pass
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Queues commands and runs them against FakeRedis as a single round trip."""
+
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        calls_before = self.redis.calls
+        results = []
+        for name, args, kwargs in self.commands:
+            results.append(await getattr(self.redis, name)(*args, **kwargs))
+        self.redis.calls = calls_before + 1
+        self.commands = []
+        return results
+
+
+@pytest.fixture
+def fake_redis() -> FakeRedis:
+    """In-memory Redis double."""
+    return FakeRedis()
+
+
+@pytest.fixture
+def cache(fake_redis: FakeRedis) -> CacheManager:
+    """Connected CacheManager backed by FakeRedis."""
+    manager = CacheManager()
+    manager.redis = fake_redis
+    manager.connected = True
+    return manager
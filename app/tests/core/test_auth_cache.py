@@ -0,0 +1,186 @@
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core import security
+from app.core.auth_cache import UserActivityCache, VerifiedTokenCache, verified_tokens
+from app.core.config import settings
+from app.core.errors import AuthenticationException
+from app.db.base import BaseModel
+from app.modules.auth.models import User
+from app.shared import dependencies
+
+
+users = User.__table__
+
+
+def _access_token(**claims):
+    data = {"sub": "user@example.com", "user_id": str(uuid.uuid4()), "permissions": ["items:read"]}
+    data.update(claims)
+    return security.create_access_token(data)
+
+
+@pytest.fixture(autouse=True)
+def empty_token_cache():
+    verified_tokens.clear()
+    yield
+    verified_tokens.clear()
+
+
+@pytest_asyncio.fixture
+async def user_engine():
+    """In-memory users table holding one active and one inactive user."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    ids = {"active": uuid.uuid4(), "inactive": uuid.uuid4()}
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: BaseModel.metadata.create_all(sync_conn, tables=[users]))
+        now = datetime(2024, 1, 1)
+        for name, user_id in ids.items():
+            await conn.execute(users.insert().values(
+                id=user_id, username=name, email=f"{name}@example.com", password_hash="x",
+                first_name=name, last_name="User", is_active=name == "active", created_at=now, updated_at=now
+            ))
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(1))
+    yield engine, ids, statements
+    await engine.dispose()
+
+
+@pytest.mark.unit
+class TestVerifiedTokenCache:
+    """Verified access tokens skip signature checks until they expire."""
+
+    def test_second_decode_skips_verification(self, monkeypatch):
+        token = _access_token()
+        calls = []
+        decode = security._decode_jwt
+        monkeypatch.setattr(security, "_decode_jwt", lambda token: calls.append(1) or decode(token))
+
+        first = security.decode_access_token(token)
+        second = security.decode_access_token(token)
+
+        assert first.email == "user@example.com"
+        assert second is first
+        assert len(calls) == 1
+        assert verified_tokens.stats()["hits"] >= 1
+
+    def test_tampered_token_is_still_rejected(self):
+        token = _access_token()
+        security.decode_access_token(token)
+
+        header, payload, signature = token.split(".")
+        forged = ".".join([header, payload, signature[::-1]])
+        with pytest.raises(HTTPException):
+            security.decode_access_token(forged)
+
+    def test_entries_expire_with_the_token(self, monkeypatch):
+        cache = VerifiedTokenCache(max_size=10)
+        cache.put("a", "data", time.time() + 60)
+        cache.put("no-exp", "data", None)
+        assert cache.get("a") == "data"
+        assert cache.get("no-exp") is None
+
+        monkeypatch.setattr(time, "time", lambda: 10 ** 12)
+        assert cache.get("a") is None
+        assert cache.stats()["size"] == 0
+
+    def test_least_recently_used_token_is_evicted(self):
+        cache = VerifiedTokenCache(max_size=2)
+        expires_at = time.time() + 60
+        cache.put("a", 1, expires_at)
+        cache.put("b", 2, expires_at)
+        cache.get("a")
+        cache.put("c", 3, expires_at)
+
+        assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+    def test_expired_token_is_rejected(self):
+        token = security.create_access_token(
+            {"sub": "user@example.com", "user_id": str(uuid.uuid4())}, expires_delta=timedelta(seconds=-5)
+        )
+        with pytest.raises(HTTPException, match="expired"):
+            security.decode_access_token(token)
+        assert verified_tokens.stats()["size"] == 0
+
+
+@pytest.mark.unit
+class TestJWTBackends:
+    """Tokens round-trip through either JWT library."""
+
+    @pytest.mark.parametrize("backend", [
+        "jose",
+        pytest.param("pyjwt", marks=pytest.mark.skipif(not security.PYJWT_AVAILABLE, reason="PyJWT is not installed")),
+    ])
+    def test_round_trip(self, monkeypatch, backend):
+        monkeypatch.setattr(settings, "JWT_BACKEND", backend)
+        token = _access_token(role="admin")
+
+        payload = security.verify_token(token)
+        reset = security.create_password_reset_token("user@example.com")
+
+        assert payload["role"] == "admin"
+        assert security.verify_password_reset_token(reset) == "user@example.com"
+        assert security.verify_password_reset_token(token) is None
+        with pytest.raises(HTTPException):
+            security.verify_token(token + "x")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestUserActivityCache:
+    """is_active snapshots served from memory until invalidated."""
+
+    async def test_snapshot_avoids_repeat_queries(self, user_engine):
+        engine, ids, statements = user_engine
+        cache = UserActivityCache(ttl=60, max_size=10)
+
+        async with AsyncSession(engine) as session:
+            results = [await cache.is_active(session, ids["active"]) for _ in range(5)]
+            inactive = await cache.is_active(session, ids["inactive"])
+            missing = await cache.is_active(session, uuid.uuid4())
+
+        assert results == [True] * 5
+        assert not inactive and not missing
+        assert len(statements) == 3
+
+    async def test_invalidate_reloads_user(self, user_engine):
+        engine, ids, statements = user_engine
+        cache = UserActivityCache(ttl=60, max_size=10)
+
+        async with AsyncSession(engine) as session:
+            assert await cache.is_active(session, ids["active"])
+            await session.execute(users.update().where(users.c.id == ids["active"]).values(is_active=False))
+            await session.commit()
+            assert await cache.is_active(session, ids["active"])
+
+            cache.invalidate(ids["active"])
+            assert not await cache.is_active(session, ids["active"])
+
+    async def test_ttl_bounds_staleness(self, user_engine):
+        engine, ids, statements = user_engine
+        cache = UserActivityCache(ttl=0, max_size=10)
+
+        async with AsyncSession(engine) as session:
+            await cache.is_active(session, ids["active"])
+            await cache.is_active(session, ids["active"])
+
+        assert len(statements) == 2
+
+    async def test_active_user_dependency_uses_the_snapshot(self, user_engine, monkeypatch):
+        engine, ids, statements = user_engine
+        monkeypatch.setattr(dependencies, "user_activity", UserActivityCache(ttl=60, max_size=10))
+        active = security.TokenData(user_id=str(ids["active"]))
+
+        async with AsyncSession(engine) as session:
+            for _ in range(3):
+                assert await dependencies.get_current_active_user(session, active) is active
+            with pytest.raises(AuthenticationException):
+                await dependencies.get_current_active_user(session, security.TokenData(user_id=str(ids["inactive"])))
+
+        assert len(statements) == 2
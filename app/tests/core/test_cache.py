@@ -0,0 +1,196 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.cache import CacheConfig, LocalCache
+
+
+@pytest.mark.unit
+class TestLocalCache:
+    """Test the in-process cache tier."""
+
+    def test_lru_eviction(self):
+        """Least recently used entries are evicted first."""
+        local = LocalCache(max_entries=2, ttl=60)
+        local.set("a", b"1", 60)
+        local.set("b", b"2", 60)
+        local.get("a")
+        local.set("c", b"3", 60)
+
+        assert local.get("a") is not None
+        assert local.get("b") is None
+        assert local.get("c") is not None
+        assert local.evictions == 1
+
+    def test_entries_expire(self):
+        """Entries are dropped once their deadline passes."""
+        local = LocalCache(max_entries=10, ttl=60)
+        local.set("a", b"1", 60, expires_at=time.time() - 1)
+        local.set("b", b"2", 60)
+
+        assert local.get("a") is None
+        assert local.get("b").local_deadline <= time.time() + 60
+
+    def test_delete_matching(self):
+        """Glob patterns remove matching entries only."""
+        local = LocalCache(max_entries=10, ttl=60)
+        local.set("customer:detail:1", b"1", 60)
+        local.set("customer:detail:2", b"2", 60)
+        local.set("inventory:item:1", b"3", 60)
+
+        assert local.delete_matching("customer:*") == 2
+        assert len(local) == 1
+
+
+@pytest.mark.unit
+class TestCacheManagerTiers:
+    """Test the two-tier CacheManager."""
+
+    async def test_get_served_from_local_tier(self, cache, fake_redis):
+        """A second read of a key does not touch Redis."""
+        await cache.set("customer:detail:1", {"name": "Alice"})
+        cache.local.clear()
+
+        assert await cache.get("customer:detail:1") == {"name": "Alice"}
+        calls = fake_redis.calls
+        assert await cache.get("customer:detail:1") == {"name": "Alice"}
+        assert fake_redis.calls == calls
+
+        stats = cache.get_tier_statistics()
+        assert stats["l1"]["hits"] == 1
+        assert stats["l1"]["misses"] == 1
+        assert stats["l2"]["hits"] == 1
+
+    async def test_local_tier_returns_copies(self, cache):
+        """Mutating a returned value does not affect the cached entry."""
+        await cache.set("key", {"items": [1]})
+        value = await cache.get("key")
+        value["items"].append(2)
+
+        assert await cache.get("key") == {"items": [1]}
+
+    async def test_delete_clears_both_tiers(self, cache, fake_redis):
+        """Deleting a key removes it locally and in Redis."""
+        await cache.set("key", "value")
+        await cache.delete("key")
+
+        assert await cache.get("key") is None
+        assert "key" not in fake_redis.store
+
+    async def test_get_or_set_coalesces_concurrent_misses(self, cache):
+        """Concurrent misses on one key run the callback only once."""
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"total": 42}
+
+        results = await asyncio.gather(*[cache.get_or_set("hot", compute) for _ in range(10)])
+
+        assert calls == 1
+        assert all(result == {"total": 42} for result in results)
+        assert cache.get_tier_statistics()["coalesced"] == 9
+
+    async def test_get_or_set_propagates_errors_to_waiters(self, cache):
+        """A failing callback raises in every coalesced caller and is not cached."""
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(
+            *[cache.get_or_set("hot", compute) for _ in range(3)],
+            return_exceptions=True
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert await cache.get("hot") is None
+
+    async def test_get_or_set_stores_recompute_time(self, cache, fake_redis):
+        """The recompute time is stored next to the value for early refresh."""
+        await cache.get_or_set("hot", lambda: "value", ttl=60)
+
+        assert "hot" + CacheConfig.EARLY_REFRESH_SUFFIX in fake_redis.store
+
+    async def test_early_refresh_near_expiry(self, cache):
+        """Values about to expire are recomputed before they expire."""
+        cache.local.set("hot", cache.codec.encode("stale"), 60, delta=10.0, expires_at=time.time() + 0.001)
+
+        assert await cache.get_or_set("hot", lambda: "fresh", ttl=60) == "fresh"
+        assert cache.get_tier_statistics()["early_refreshes"] == 1
+
+    async def test_no_early_refresh_when_far_from_expiry(self, cache):
+        """Values far from expiry are served as-is."""
+        cache.local.set("hot", cache.codec.encode("cached"), 3600, delta=0.001)
+
+        assert await cache.get_or_set("hot", lambda: "fresh", ttl=3600) == "cached"
+        assert cache.get_tier_statistics()["early_refreshes"] == 0
+
+    async def test_disconnected_cache_calls_through(self, cache):
+        """Without Redis, get_or_set always computes and nothing is cached."""
+        cache.connected = False
+
+        assert await cache.get_or_set("key", lambda: 1) == 1
+        assert await cache.get("key") is None
+
+
+@pytest.mark.unit
+class TestTagInvalidation:
+    """Test tag-based cache invalidation."""
+
+    async def test_invalidate_tag_deletes_tagged_keys(self, cache, fake_redis):
+        """Invalidating a tag removes every key registered under it."""
+        await cache.set("customer:detail:1", {"id": 1}, tags=["customer:1", "customer"])
+        await cache.set("customer:orders:1", [1, 2], tags=["customer:1"])
+        await cache.set("customer:detail:2", {"id": 2}, tags=["customer:2", "customer"])
+
+        assert await cache.invalidate_tags("customer:1") == 2
+
+        assert await cache.get("customer:detail:1") is None
+        assert await cache.get("customer:orders:1") is None
+        assert await cache.get("customer:detail:2") == {"id": 2}
+        assert "tag:customer:1" not in fake_redis.store
+
+    async def test_tag_set_expires_with_its_longest_lived_member(self, cache, fake_redis):
+        """A tag set lives as long as its longest member, not a fixed floor."""
+        margin = CacheConfig.TAG_TTL_MARGIN
+        await cache.set("customer:detail:1", {"id": 1}, ttl=60, tags=["customer"])
+        assert 0 < await fake_redis.pttl("tag:customer") <= (60 + margin) * 1000
+
+        await cache.set("customer:orders:1", [1], ttl=600, tags=["customer"])
+        assert (600 + margin - 5) * 1000 < await fake_redis.pttl("tag:customer")
+
+        await cache.set("customer:detail:2", {"id": 2}, ttl=30, tags=["customer"])
+        assert (600 + margin - 5) * 1000 < await fake_redis.pttl("tag:customer")
+
+    async def test_invalidate_broad_tag(self, cache):
+        """A shared tag invalidates entries across ids."""
+        await cache.set("inventory:item:1", {"id": 1}, tags=["inventory:1", "inventory"])
+        await cache.set("inventory:availability:2", {"id": 2}, tags=["inventory:2", "inventory"])
+
+        assert await cache.invalidate_tags("inventory") == 2
+
+    async def test_get_or_set_registers_tags(self, cache):
+        """Computed values are registered under their tags too."""
+        await cache.get_or_set("analytics:dashboard:day", lambda: {"revenue": 1}, tags=["analytics"])
+
+        assert await cache.invalidate_tags("analytics") == 1
+        assert await cache.get("analytics:dashboard:day") is None
+
+    async def test_invalidate_unknown_tag(self, cache):
+        """Invalidating a tag nobody used is a no-op."""
+        assert await cache.invalidate_tags("missing") == 0
+
+    async def test_delete_pattern_uses_scan(self, cache, fake_redis):
+        """Pattern deletes iterate with SCAN rather than KEYS."""
+        for i in range(3):
+            await cache.set(f"session:{i}", i)
+
+        async def forbidden(pattern):
+            raise AssertionError("KEYS must not be used")
+        fake_redis.keys = forbidden
+
+        assert await cache.delete_pattern("session:*") == 3
+        assert await cache.count_pattern("session:*") == 0
@@ -0,0 +1,118 @@
+import json
+import pickle
+from datetime import date
+from decimal import Decimal
+from typing import List
+
+import pytest
+from pydantic import BaseModel
+
+from app.core import cache_codecs
+from app.core.cache_codecs import (
+    CacheCodec,
+    COMPRESSOR_NONE,
+    MSGPACK_AVAILABLE,
+    SERIALIZER_BYTES,
+    SERIALIZER_JSON,
+    SERIALIZER_PICKLE,
+    SERIALIZER_PYDANTIC,
+    SERIALIZER_PYDANTIC_LIST,
+    SERIALIZER_STR,
+)
+from app.core.errors import ConfigurationException
+
+
+class SampleItem(BaseModel):
+    """Model used to exercise the Pydantic fast path."""
+
+    id: int
+    name: str
+    price: Decimal
+    tags: List[str] = []
+
+
+def _header(payload: bytes):
+    return payload[0] & 0x07, (payload[0] >> 3) & 0x03
+
+
+@pytest.mark.unit
+class TestCacheCodec:
+    """Test the headered cache codec."""
+
+    @pytest.fixture
+    def codec(self):
+        return CacheCodec(compression="zlib", compression_threshold=256)
+
+    @pytest.mark.parametrize("value", [
+        {"id": 1, "items": [1, 2.5, None, True], "name": "ümlaut"},
+        [1, 2, 3],
+        42,
+        None,
+    ])
+    def test_plain_data_round_trip(self, codec, value):
+        """Plain data uses the plain-data serializer and round-trips."""
+        payload = codec.encode(value)
+
+        assert _header(payload)[0] == SERIALIZER_JSON or MSGPACK_AVAILABLE
+        assert codec.decode(payload) == value
+
+    def test_text_and_bytes_are_stored_verbatim(self, codec):
+        """Strings and bytes skip JSON quoting entirely."""
+        assert codec.encode("hello")[1:] == b"hello"
+        assert _header(codec.encode("hello"))[0] == SERIALIZER_STR
+        assert _header(codec.encode(b"\x00\xff"))[0] == SERIALIZER_BYTES
+        assert codec.decode(codec.encode(b"\x00\xff")) == b"\x00\xff"
+
+    def test_pydantic_models_round_trip(self, codec):
+        """Pydantic models and lists of models come back as models."""
+        item = SampleItem(id=1, name="Drill", price=Decimal("9.99"), tags=["power"])
+
+        payload = codec.encode(item)
+        assert _header(payload)[0] == SERIALIZER_PYDANTIC
+        assert codec.decode(payload) == item
+
+        payload = codec.encode([item, item])
+        assert _header(payload)[0] == SERIALIZER_PYDANTIC_LIST
+        assert codec.decode(payload) == [item, item]
+
+    def test_unsupported_values_fall_back_to_pickle(self, codec):
+        """Arbitrary objects are pickled."""
+        value = {date(2024, 1, 1)}
+
+        payload = codec.encode(value)
+        assert _header(payload)[0] == SERIALIZER_PICKLE
+        assert codec.decode(payload) == value
+
+    def test_large_payloads_are_compressed(self, codec):
+        """Payloads above the threshold are compressed, smaller ones are not."""
+        small = codec.encode({"a": 1})
+        large_value = {"rows": ["x" * 10 for _ in range(200)]}
+        large = codec.encode(large_value)
+
+        assert _header(small)[1] == COMPRESSOR_NONE
+        assert _header(large)[1] != COMPRESSOR_NONE
+        assert len(large) < len(json.dumps(large_value))
+        assert codec.decode(large) == large_value
+
+    def test_legacy_payloads_are_readable(self, codec):
+        """Values written by the old JSON/pickle-via-latin-1 scheme still decode."""
+        legacy_json = json.dumps({"a": 1}).encode()
+        legacy_pickle = pickle.dumps({1, 2}).decode("latin-1").encode("utf-8")
+
+        assert codec.decode(legacy_json) == {"a": 1}
+        assert codec.decode(legacy_pickle) == {1, 2}
+
+    @pytest.mark.parametrize("options", [
+        {"plain_serializer": "orjson"},
+        {"plain_serializer": "msgpack"},
+        {"plain_serializer": "pickle"},
+        {"compression": "zstd", "compression_threshold": 256},
+    ])
+    def test_missing_libraries_are_configuration_errors(self, monkeypatch, options):
+        """Requesting an uninstalled serializer or compressor fails instead of downgrading."""
+        monkeypatch.setattr(cache_codecs, "ORJSON_AVAILABLE", False)
+        monkeypatch.setattr(cache_codecs, "MSGPACK_AVAILABLE", False)
+        monkeypatch.setattr(cache_codecs, "ZSTD_AVAILABLE", False)
+
+        with pytest.raises(ConfigurationException):
+            CacheCodec(**options)
@@ -0,0 +1,328 @@
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from httpx import ASGITransport, AsyncClient
+
+from app.core import middleware
+from app.core.middleware import BROTLI_AVAILABLE, CacheMiddleware, CompressionMiddleware, negotiate_encoding
+from app.core.security import create_access_token
+from app.modules.analytics import routes as analytics_routes
+from app.modules.analytics.schemas import AnalyticsReportResponse
+
+
+def _token(permissions, email="user@example.com"):
+    return create_access_token({"sub": email, "user_id": email, "permissions": permissions, "role": "staff"})
+
+
+@pytest.fixture
+def counting_app():
+    """Small app whose handlers count how often they actually run."""
+    app = FastAPI()
+    app.state.calls = 0
+
+    @app.get("/api/v1/inventory/items")
+    async def list_items():
+        app.state.calls += 1
+        return [{"id": i, "name": f"Item {i}"} for i in range(3)]
+
+    @app.post("/api/v1/inventory/items")
+    async def create_item():
+        return {"id": 99}
+
+    @app.post("/api/v1/inventory/items/{item_id}/units")
+    async def create_unit(item_id: int):
+        return {"id": 7}
+
+    @app.get("/api/v1/inventory/tracked")
+    async def tracked():
+        app.state.calls += 1
+        return JSONResponse(
+            {"tracked": True},
+            headers={"X-Request-ID": f"request-{app.state.calls}", "X-RateLimit-Remaining": "41"}
+        )
+
+    @app.get("/api/v1/categories")
+    async def list_categories():
+        app.state.calls += 1
+        return [{"id": 1, "item_count": app.state.calls}]
+
+    @app.get("/api/v1/analytics/dashboard")
+    async def dashboard():
+        app.state.calls += 1
+        return {"revenue": 0}
+
+    @app.get("/api/v1/auth/me")
+    async def me():
+        app.state.calls += 1
+        return {"id": "me"}
+
+    @app.get("/api/v1/inventory/stream")
+    async def stream():
+        app.state.calls += 1
+
+        async def chunks():
+            for _ in range(4):
+                yield b"x" * 1024
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return app
+
+
+@pytest.fixture
+async def client(counting_app, cache, monkeypatch):
+    monkeypatch.setattr(middleware, "cache_manager", cache)
+    wrapped = CacheMiddleware(
+        counting_app, cache_ttl=60, max_body_size=2048,
+        public_path_prefixes=["/api/v1/inventory", "/api/v1/categories"],
+        related_modules={"/api/v1/inventory": ["/api/v1/categories"]}
+    )
+    async with AsyncClient(transport=ASGITransport(app=wrapped), base_url="http://test") as test_client:
+        yield test_client
+
+
+@pytest.mark.unit
+class TestCacheMiddleware:
+    """Test the pure-ASGI HTTP cache middleware."""
+
+    async def test_hit_replays_identical_bytes(self, client, counting_app):
+        """The second request is served from the cache with the same body."""
+        first = await client.get("/api/v1/inventory/items")
+        second = await client.get("/api/v1/inventory/items")
+
+        assert first.headers["x-cache"] == "MISS"
+        assert second.headers["x-cache"] == "HIT"
+        assert second.content == first.content
+        assert second.headers["etag"] == first.headers["etag"]
+        assert second.headers["content-type"] == "application/json"
+        assert counting_app.state.calls == 1
+
+    async def test_if_none_match_returns_304(self, client):
+        """Conditional requests with a matching ETag get an empty 304."""
+        etag = (await client.get("/api/v1/inventory/items")).headers["etag"]
+
+        response = await client.get("/api/v1/inventory/items", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    async def test_authenticated_requests_are_scoped_by_permissions(self, client, counting_app):
+        """Callers share entries only when their permission sets match."""
+        reader = {"Authorization": f"Bearer {_token(['INVENTORY_VIEW'])}"}
+        other_reader = {"Authorization": f"Bearer {_token(['INVENTORY_VIEW'], 'other@example.com')}"}
+        admin = {"Authorization": f"Bearer {_token(['INVENTORY_VIEW', 'INVENTORY_UPDATE'])}"}
+
+        await client.get("/api/v1/inventory/items", headers=reader)
+        shared = await client.get("/api/v1/inventory/items", headers=other_reader)
+        separate = await client.get("/api/v1/inventory/items", headers=admin)
+
+        assert shared.headers["x-cache"] == "HIT"
+        assert shared.headers["cache-control"] == "private, no-cache"
+        assert separate.headers["x-cache"] == "MISS"
+        assert counting_app.state.calls == 2
+
+    async def test_authenticated_requests_outside_shared_paths_bypass_cache(self, client, counting_app):
+        """Identity-specific endpoints are never cached for authenticated callers."""
+        headers = {"Authorization": f"Bearer {_token([])}"}
+
+        await client.get("/api/v1/auth/me", headers=headers)
+        response = await client.get("/api/v1/auth/me", headers=headers)
+
+        assert "x-cache" not in response.headers
+        assert counting_app.state.calls == 2
+
+    async def test_invalid_token_bypasses_cache(self, client, counting_app):
+        """Unverifiable tokens are passed to the route untouched."""
+        await client.get("/api/v1/inventory/items")
+        response = await client.get("/api/v1/inventory/items", headers={"Authorization": "Bearer bogus"})
+
+        assert "x-cache" not in response.headers
+        assert counting_app.state.calls == 2
+
+    async def test_successful_write_invalidates_resource(self, client, counting_app):
+        """A POST to a resource drops its cached GET responses."""
+        await client.get("/api/v1/inventory/items")
+        await client.post("/api/v1/inventory/items")
+        response = await client.get("/api/v1/inventory/items")
+
+        assert response.headers["x-cache"] == "MISS"
+        assert counting_app.state.calls == 2
+
+    async def test_nested_write_invalidates_the_module(self, client, counting_app):
+        """A write below a resource drops the cached listings of its whole module."""
+        await client.get("/api/v1/inventory/items")
+        await client.post("/api/v1/inventory/items/1/units")
+        response = await client.get("/api/v1/inventory/items")
+
+        assert response.headers["x-cache"] == "MISS"
+        assert CacheMiddleware._resource_tag("/api/v1/inventory/items/1/units") == "http:/api/v1/inventory"
+
+    async def test_anonymous_requests_outside_public_paths_bypass_cache(self, client, counting_app):
+        """Modules not on the public list, such as dashboards, are never cached."""
+        await client.get("/api/v1/analytics/dashboard")
+        response = await client.get("/api/v1/analytics/dashboard")
+
+        assert "x-cache" not in response.headers
+        assert counting_app.state.calls == 2
+
+    async def test_write_invalidates_related_modules(self, client, counting_app):
+        """An inventory write drops cached category responses that count its items."""
+        await client.get("/api/v1/categories")
+        await client.post("/api/v1/inventory/items")
+        response = await client.get("/api/v1/categories")
+
+        assert response.headers["x-cache"] == "MISS"
+        assert response.json() == [{"id": 1, "item_count": 2}]
+
+    async def test_per_request_headers_are_not_replayed(self, client, counting_app):
+        """Hits carry no stored request ID or rate limit state."""
+        first = await client.get("/api/v1/inventory/tracked")
+        second = await client.get("/api/v1/inventory/tracked")
+
+        assert first.headers["x-request-id"] == "request-1"
+        assert second.headers["x-cache"] == "HIT"
+        assert "x-request-id" not in second.headers
+        assert "x-ratelimit-remaining" not in second.headers
+
+    async def test_hits_carry_the_current_request_id(self, counting_app, cache, monkeypatch):
+        """Behind the monitoring middleware a hit gets the new request's ID."""
+        monkeypatch.setattr(middleware, "cache_manager", cache)
+        wrapped = CacheMiddleware(counting_app, cache_ttl=60, public_path_prefixes=["/api/v1/inventory"])
+
+        async def with_request_id(scope, receive, send):
+            scope.setdefault("state", {})["request_id"] = "fresh-id"
+            await wrapped(scope, receive, send)
+
+        async with AsyncClient(transport=ASGITransport(app=with_request_id), base_url="http://test") as test_client:
+            await test_client.get("/api/v1/inventory/tracked")
+            hit = await test_client.get("/api/v1/inventory/tracked")
+
+        assert hit.headers["x-cache"] == "HIT"
+        assert hit.headers["x-request-id"] == "fresh-id"
+
+    async def test_report_status_is_never_cached(self, cache, monkeypatch):
+        """Polling a queued report sees the workers' progress even on a cacheable path."""
+        monkeypatch.setattr(middleware, "cache_manager", cache)
+        now = datetime.utcnow()
+        report = SimpleNamespace(
+            id=uuid.uuid4(), report_name="sales", report_type="SALES", report_format="CSV",
+            report_status="PENDING", start_date=None, end_date=None, filters=None, parameters=None,
+            file_path=None, file_size=None, generated_by=uuid.uuid4(), started_at=None, generated_at=None,
+            error_message=None, report_metadata=None, is_active=True, created_at=now, updated_at=now
+        )
+
+        class ReportStatusService:
+            async def get_report(self, report_id):
+                return AnalyticsReportResponse.model_validate(report)
+
+        app = FastAPI()
+        app.include_router(analytics_routes.router, prefix="/api/v1")
+        app.dependency_overrides[analytics_routes.get_analytics_service] = ReportStatusService
+        wrapped = CacheMiddleware(app, cache_ttl=60, public_path_prefixes=["/api/v1/analytics"])
+        async with AsyncClient(transport=ASGITransport(app=wrapped), base_url="http://test") as test_client:
+            pending = await test_client.get(f"/api/v1/analytics/reports/{report.id}")
+            # The worker finishes outside any HTTP request, so nothing is invalidated
+            report.report_status = "COMPLETED"
+            completed = await test_client.get(f"/api/v1/analytics/reports/{report.id}")
+
+        assert pending.json()["report_status"] == "PENDING"
+        assert completed.json()["report_status"] == "COMPLETED"
+        assert completed.headers["cache-control"] == "no-store"
+        assert "x-cache" not in completed.headers
+
+    async def test_large_streaming_bodies_pass_through(self, client, counting_app):
+        """Streaming bodies above the size limit are forwarded and not cached."""
+        first = await client.get("/api/v1/inventory/stream")
+        second = await client.get("/api/v1/inventory/stream")
+
+        assert len(first.content) == 4096
+        assert second.content == first.content
+        assert counting_app.state.calls == 2
+
+
+@pytest.fixture
+async def compressed_client(counting_app):
+    wrapped = CompressionMiddleware(counting_app, minimum_size=256)
+    async with AsyncClient(transport=ASGITransport(app=wrapped), base_url="http://test") as test_client:
+        yield test_client
+
+
+@pytest.mark.unit
+class TestCompressionMiddleware:
+    """Test the streaming compression middleware."""
+
+    @pytest.mark.parametrize("header, expected", [
+        ("gzip", "gzip"),
+        ("gzip;q=0.5, br", "br" if BROTLI_AVAILABLE else "gzip"),
+        ("br;q=0, gzip;q=0.1", "gzip"),
+        ("identity", "identity"),
+        ("", "identity"),
+        ("*", "br" if BROTLI_AVAILABLE else "gzip"),
+    ])
+    def test_negotiate_encoding(self, header, expected):
+        """q-values are honoured and unsupported codings are ignored."""
+        assert negotiate_encoding(header) == expected
+
+    async def test_streaming_body_is_gzipped_incrementally(self, compressed_client):
+        """Multi-chunk bodies are compressed without a Content-Length."""
+        response = await compressed_client.get(
+            "/api/v1/inventory/stream", headers={"Accept-Encoding": "gzip"}
+        )
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.content == b"x" * 4096
+
+    async def test_small_bodies_are_not_compressed(self, compressed_client):
+        """Bodies under the minimum size are sent as-is but still vary."""
+        response = await compressed_client.get(
+            "/api/v1/inventory/items", headers={"Accept-Encoding": "gzip"}
+        )
+
+        assert "content-encoding" not in response.headers
+        assert "Accept-Encoding" in response.headers["vary"]
+
+    async def test_identity_clients_get_plain_body(self, compressed_client):
+        """Clients that do not accept a supported coding get the raw body."""
+        response = await compressed_client.get(
+            "/api/v1/inventory/stream", headers={"Accept-Encoding": "identity"}
+        )
+
+        assert "content-encoding" not in response.headers
+        assert response.content == b"x" * 4096
+
+    @pytest.mark.skipif(not BROTLI_AVAILABLE, reason="brotli not installed")
+    async def test_brotli_is_preferred(self, compressed_client):
+        """Brotli wins over gzip when both are accepted."""
+        response = await compressed_client.get(
+            "/api/v1/inventory/stream", headers={"Accept-Encoding": "gzip, br"}
+        )
+
+        assert response.headers["content-encoding"] == "br"
+        assert response.content == b"x" * 4096
+
+    async def test_cache_stores_one_variant_per_encoding(self, counting_app, cache, monkeypatch):
+        """Cached compressed bytes are only replayed to clients of the same coding."""
+        monkeypatch.setattr(middleware, "cache_manager", cache)
+        wrapped = CacheMiddleware(
+            CompressionMiddleware(counting_app, minimum_size=256), cache_ttl=60,
+            public_path_prefixes=["/api/v1/inventory"]
+        )
+        async with AsyncClient(transport=ASGITransport(app=wrapped), base_url="http://test") as test_client:
+            gzipped = await test_client.get("/api/v1/inventory/stream", headers={"Accept-Encoding": "gzip"})
+            replay = await test_client.get("/api/v1/inventory/stream", headers={"Accept-Encoding": "gzip"})
+            plain = await test_client.get("/api/v1/inventory/stream", headers={"Accept-Encoding": "identity"})
+
+        assert replay.headers["x-cache"] == "HIT"
+        assert replay.headers["content-encoding"] == "gzip"
+        assert replay.content == gzipped.content == b"x" * 4096
+        assert plain.headers["x-cache"] == "MISS"
+        assert "content-encoding" not in plain.headers
+        assert plain.headers["etag"] != gzipped.headers["etag"]
+        assert counting_app.state.calls == 2
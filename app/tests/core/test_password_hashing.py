@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core import password_hashing
+from app.core.config import settings
+from app.core.errors import ServiceOverloadedException
+from app.core.password_hashing import (
+    ARGON2_AVAILABLE, AsyncPasswordHasher, hash_password_sync, needs_rehash,
+    verify_and_update_sync, verify_password_sync
+)
+
+
+@pytest.fixture(autouse=True)
+def cheap_bcrypt(monkeypatch):
+    """Minimum bcrypt cost so the suite stays fast."""
+    monkeypatch.setattr(settings, "PASSWORD_HASH_SCHEME", "bcrypt")
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+
+
+@pytest.fixture
+def hasher():
+    hasher = AsyncPasswordHasher(max_workers=2, max_queue=2, executor="thread")
+    yield hasher
+    hasher.shutdown()
+
+
+@pytest.mark.unit
+class TestPasswordHashing:
+    """Blocking hash primitives."""
+
+    def test_round_trip(self):
+        hashed = hash_password_sync("Secret123!")
+
+        assert hashed.startswith("$2b$04$")
+        assert verify_password_sync("Secret123!", hashed)
+        assert not verify_password_sync("secret123!", hashed)
+        assert not verify_password_sync("", hashed)
+        assert not verify_password_sync("Secret123!", "not-a-hash")
+
+    def test_long_passwords_compare_first_72_bytes(self):
+        hashed = hash_password_sync("x" * 100)
+
+        assert verify_password_sync("x" * 72 + "y", hashed)
+
+    def test_cost_change_triggers_rehash(self, monkeypatch):
+        hashed = hash_password_sync("Secret123!")
+        assert not needs_rehash(hashed)
+        assert verify_and_update_sync("Secret123!", hashed) == (True, None)
+
+        monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+        valid, new_hash = verify_and_update_sync("Secret123!", hashed)
+
+        assert needs_rehash(hashed)
+        assert valid and new_hash.startswith("$2b$05$")
+        assert verify_password_sync("Secret123!", new_hash)
+        assert verify_and_update_sync("wrong", hashed) == (False, None)
+
+    @pytest.mark.skipif(not ARGON2_AVAILABLE, reason="argon2-cffi is not installed")
+    def test_bcrypt_hashes_upgrade_to_argon2id(self, monkeypatch):
+        hashed = hash_password_sync("Secret123!")
+        monkeypatch.setattr(settings, "PASSWORD_HASH_SCHEME", "argon2id")
+        monkeypatch.setattr(settings, "ARGON2_MEMORY_COST", 1024)
+
+        valid, new_hash = verify_and_update_sync("Secret123!", hashed)
+
+        assert valid and new_hash.startswith("$argon2id$")
+        assert verify_password_sync("Secret123!", new_hash)
+        assert not needs_rehash(new_hash)
+
+    def test_global_hasher_uses_settings(self):
+        hasher = password_hashing.password_hasher
+        assert hasher.capacity == settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_QUEUE
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestAsyncPasswordHasher:
+    """Hashing on the bounded pool."""
+
+    async def test_hash_verify_and_update(self, hasher, monkeypatch):
+        hashed = await hasher.hash("Secret123!")
+        assert await hasher.verify("Secret123!", hashed)
+
+        monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+        valid, new_hash = await hasher.verify_and_update("Secret123!", hashed)
+
+        stats = hasher.stats()
+        assert valid and new_hash.startswith("$2b$05$")
+        assert (stats["submitted"], stats["completed"], stats["rehashed"]) == (3, 3, 1)
+        assert stats["in_flight"] == 0
+        assert stats["run"]["count"] == 3
+
+    async def test_rejects_beyond_workers_plus_queue(self, hasher):
+        release = threading.Event()
+        blocked = [asyncio.ensure_future(hasher._run(release.wait, 5)) for _ in range(4)]
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(ServiceOverloadedException) as exc_info:
+            await hasher.verify("Secret123!", "$2b$04$x")
+        assert exc_info.value.status_code == 503
+        assert hasher.stats()["queued"] == 2
+
+        release.set()
+        await asyncio.gather(*blocked)
+        stats = hasher.stats()
+        assert (stats["rejected"], stats["completed"], stats["in_flight"]) == (1, 4, 0)
+
+    async def test_cancelled_caller_keeps_slot_until_worker_finishes(self, hasher):
+        release = threading.Event()
+        task = asyncio.ensure_future(hasher._run(release.wait, 5))
+        await asyncio.sleep(0.05)
+
+        task.cancel()
+        await asyncio.sleep(0.01)
+        assert hasher.in_flight == 1
+
+        release.set()
+        for _ in range(100):
+            if hasher.in_flight == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert hasher.in_flight == 0
+
+    async def test_event_loop_stays_responsive(self, hasher, monkeypatch):
+        monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 10)
+        hashed = hash_password_sync("Secret123!")
+        started = time.perf_counter()
+        verify_password_sync("Secret123!", hashed)
+        single_verify = time.perf_counter() - started
+
+        gaps = []
+
+        async def ticker(stop):
+            last = time.perf_counter()
+            while not stop.is_set():
+                await asyncio.sleep(0.001)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        stop = asyncio.Event()
+        tick = asyncio.ensure_future(ticker(stop))
+        results = await asyncio.gather(*[hasher.verify("Secret123!", hashed) for _ in range(4)])
+        stop.set()
+        await tick
+
+        assert all(results)
+        assert max(gaps) < single_verify / 2
+
@@ -0,0 +1,208 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.core import rate_limit
+from app.core.middleware import RateLimitMiddleware
+from app.core.rate_limit import (
+    LocalTokenBucket,
+    RateLimiter,
+    RateLimitPolicy,
+    RateLimitRule,
+    parse_rate_limit,
+)
+from app.core.security import create_access_token
+
+
+class FakeScript:
+    """Stands in for a registered Lua script; records each call."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    async def __call__(self, keys=None, args=None):
+        self.calls.append((keys, args))
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        return self.reply
+
+
+class ScriptingRedis:
+    """Redis double exposing only register_script."""
+
+    def __init__(self, reply):
+        self.script = FakeScript(reply)
+        self.sources = []
+
+    def register_script(self, source):
+        self.sources.append(source)
+        return self.script
+
+
+@pytest.fixture
+def redis_limiter(monkeypatch):
+    def build(reply, algorithm="gcra"):
+        client = ScriptingRedis(reply)
+        monkeypatch.setattr(rate_limit.cache_manager, "redis", client)
+        monkeypatch.setattr(rate_limit.cache_manager, "connected", True)
+        return RateLimiter(algorithm), client
+    return build
+
+
+@pytest.mark.unit
+class TestRateLimitRules:
+    """Test rule parsing and policy resolution."""
+
+    @pytest.mark.parametrize("value, expected", [
+        ("100/minute", RateLimitRule(100, 60)),
+        ("10/second", RateLimitRule(10, 1)),
+        ("1000 / 2hours", RateLimitRule(1000, 7200)),
+        ("5/day", RateLimitRule(5, 86400)),
+    ])
+    def test_parse_rate_limit(self, value, expected):
+        assert parse_rate_limit(value) == expected
+
+    @pytest.mark.parametrize("value", ["", "abc", "0/minute", "10/fortnight"])
+    def test_parse_rate_limit_rejects_invalid(self, value):
+        with pytest.raises(ValueError):
+            parse_rate_limit(value)
+
+    def test_route_rules_take_precedence_with_own_bucket(self):
+        policy = RateLimitPolicy(
+            "100/minute",
+            tiers={"ADMIN": "600/minute"},
+            routes={"/api/v1/auth": "20/minute", "/api/v1/auth/login": "5/minute"}
+        )
+
+        assert policy.resolve("/api/v1/auth/login", "ADMIN", "user:1") == (
+            "route:/api/v1/auth/login:user:1", RateLimitRule(5, 60)
+        )
+        assert policy.resolve("/api/v1/auth/me", "ADMIN", "user:1")[1] == RateLimitRule(20, 60)
+        assert policy.resolve("/api/v1/items", "ADMIN", "user:1") == ("tier:ADMIN:user:1", RateLimitRule(600, 60))
+        assert policy.resolve("/api/v1/items", "EMPLOYEE", "user:1")[1] == RateLimitRule(100, 60)
+
+
+@pytest.mark.unit
+class TestLocalTokenBucket:
+    """Test the in-process fallback bucket."""
+
+    def test_allows_burst_up_to_limit_then_rejects(self):
+        bucket = LocalTokenBucket()
+        rule = RateLimitRule(3, 60)
+
+        results = [bucket.hit("k", rule) for _ in range(4)]
+
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert [r.remaining for r in results[:3]] == [2, 1, 0]
+        assert 0 < results[3].retry_after <= 20
+
+    def test_refills_over_time(self, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr(rate_limit.time, "monotonic", lambda: clock[0])
+        bucket = LocalTokenBucket()
+        rule = RateLimitRule(2, 10)
+
+        bucket.hit("k", rule)
+        bucket.hit("k", rule)
+        assert not bucket.hit("k", rule).allowed
+
+        clock[0] += 5
+        assert bucket.hit("k", rule).allowed
+
+    def test_key_count_is_bounded(self):
+        bucket = LocalTokenBucket(max_keys=2)
+        for key in ("a", "b", "c"):
+            bucket.hit(key, RateLimitRule(1, 60))
+
+        assert list(bucket._buckets) == ["b", "c"]
+
+
+@pytest.mark.unit
+class TestRateLimiter:
+    """Test backend selection of the rate limiter."""
+
+    async def test_redis_path_is_one_script_call(self, redis_limiter):
+        limiter, client = redis_limiter([1, 99, 0, 600])
+
+        result = await limiter.hit("tier:anonymous:ip:1", RateLimitRule(100, 60))
+        await limiter.hit("tier:anonymous:ip:1", RateLimitRule(100, 60))
+
+        assert result.allowed and result.remaining == 99 and result.backend == "redis"
+        assert len(client.script.calls) == 2
+        assert len(client.sources) == 1
+        keys, args = client.script.calls[0]
+        assert keys == ["rate_limit:gcra:100:60:tier:anonymous:ip:1"]
+        assert args == [600.0, 60000.0]
+
+    async def test_redis_rejection_reports_retry_after(self, redis_limiter):
+        limiter, _ = redis_limiter([0, 0, 1500, 60000], algorithm="sliding_window")
+
+        result = await limiter.hit("k", RateLimitRule(10, 60))
+
+        assert not result.allowed
+        assert result.retry_after == 1.5
+
+    async def test_falls_back_to_local_bucket_on_redis_error(self, redis_limiter):
+        limiter, _ = redis_limiter(ConnectionError("down"))
+
+        results = [await limiter.hit("k", RateLimitRule(1, 60)) for _ in range(2)]
+
+        assert [r.backend for r in results] == ["local", "local"]
+        assert [r.allowed for r in results] == [True, False]
+
+    async def test_uses_local_bucket_when_disconnected(self, monkeypatch):
+        monkeypatch.setattr(rate_limit.cache_manager, "connected", False)
+
+        result = await RateLimiter().hit("k", RateLimitRule(1, 60))
+
+        assert result.backend == "local"
+
+
+@pytest.mark.unit
+class TestRateLimitMiddleware:
+    """Test the rate limiting middleware with the local backend."""
+
+    @pytest.fixture
+    async def client(self, monkeypatch):
+        monkeypatch.setattr(rate_limit.cache_manager, "connected", False)
+        app = FastAPI()
+
+        @app.get("/api/v1/items")
+        async def items():
+            return {"ok": True}
+
+        @app.post("/api/v1/auth/login")
+        async def login():
+            return {"ok": True}
+
+        wrapped = RateLimitMiddleware(
+            app,
+            requests_per_minute=5,
+            tier_limits={"anonymous": "2/minute", "ADMIN": "4/minute"},
+            route_limits={"/api/v1/auth/login": "1/minute"},
+            limiter=RateLimiter()
+        )
+        async with AsyncClient(transport=ASGITransport(app=wrapped), base_url="http://test") as test_client:
+            yield test_client
+
+    async def test_anonymous_callers_get_429_after_tier_limit(self, client):
+        responses = [await client.get("/api/v1/items") for _ in range(3)]
+
+        assert [r.status_code for r in responses] == [200, 200, 429]
+        assert responses[0].headers["x-ratelimit-limit"] == "2"
+        assert responses[0].headers["x-ratelimit-remaining"] == "1"
+        assert int(responses[2].headers["retry-after"]) >= 1
+
+    async def test_authenticated_callers_use_role_tier(self, client):
+        token = create_access_token({"sub": "a@example.com", "user_id": "u1", "permissions": [], "role": "ADMIN"})
+        headers = {"Authorization": f"Bearer {token}"}
+
+        responses = [await client.get("/api/v1/items", headers=headers) for _ in range(5)]
+
+        assert [r.status_code for r in responses] == [200, 200, 200, 200, 429]
+
+    async def test_route_limit_uses_separate_bucket(self, client):
+        assert (await client.post("/api/v1/auth/login")).status_code == 200
+        assert (await client.post("/api/v1/auth/login")).status_code == 429
+        assert (await client.get("/api/v1/items")).status_code == 200
@@ -0,0 +1,178 @@
+import asyncio
+import random
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.core import middleware, request_metrics as request_metrics_module
+from app.core.middleware import PerformanceMonitoringMiddleware
+from app.core.request_metrics import LatencyHistogram, MetricsAggregator
+
+
+@pytest.fixture
+def aggregator(cache, monkeypatch):
+    """Aggregator flushing into FakeRedis, installed as the module singleton."""
+    instance = MetricsAggregator(flush_interval=0.01, max_slow_requests=3)
+    monkeypatch.setattr(request_metrics_module, "cache_manager", cache)
+    monkeypatch.setattr(middleware, "request_metrics", instance)
+    return instance
+
+
+@pytest.mark.unit
+class TestLatencyHistogram:
+    """Test the log-linear latency histogram."""
+
+    def test_bucket_bounds_contain_value(self):
+        for value in [0, 1, 63, 64, 65, 127, 128, 1000, 123456, 10 ** 9]:
+            low, high = LatencyHistogram.bucket_bounds(LatencyHistogram.bucket_index(value))
+            assert low <= value <= high
+
+    def test_percentiles_within_relative_error(self):
+        rng = random.Random(7)
+        samples = sorted(rng.uniform(0.001, 2.0) for _ in range(10000))
+        histogram = LatencyHistogram()
+        for sample in samples:
+            histogram.record(sample)
+
+        for percent in (50, 90, 99):
+            exact = samples[int(len(samples) * percent / 100) - 1]
+            assert histogram.percentile(percent) == pytest.approx(exact, rel=0.04)
+        assert histogram.total == 10000
+
+    def test_merge_equals_combined_recording(self):
+        first, second, combined = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for i, value in enumerate([0.01, 0.02, 0.5, 1.5, 0.003]):
+            (first if i % 2 else second).record(value)
+            combined.record(value)
+
+        first.merge(second)
+
+        assert first.counts == combined.counts
+        assert first.percentile(99) == combined.percentile(99)
+
+
+@pytest.mark.unit
+class TestMetricsAggregator:
+    """Test recording and flushing of request metrics."""
+
+    async def test_flush_is_one_round_trip_and_merges(self, aggregator, fake_redis):
+        for duration in (0.01, 0.02, 0.03):
+            aggregator.record("GET", "/api/v1/items/{item_id}", 200, duration)
+        aggregator.record("POST", "/api/v1/items", 201, 0.05)
+
+        fake_redis.calls = 0
+        assert await aggregator.flush()
+        assert fake_redis.calls == 1
+
+        aggregator.record("GET", "/api/v1/items/{item_id}", 404, 0.04)
+        await aggregator.flush()
+
+        cluster = await aggregator.read_cluster()
+        assert cluster["counters"]["requests:total"] == 5
+        assert cluster["counters"]["requests:status:200"] == 3
+        assert cluster["histograms"]["GET /api/v1/items/{item_id}"].total == 4
+        assert cluster["histograms"][MetricsAggregator.ALL_ROUTES].total == 5
+
+    async def test_failed_flush_keeps_deltas(self, aggregator, fake_redis):
+        aggregator.record("GET", "/x", 200, 0.01)
+
+        def broken_pipeline(transaction=True):
+            raise ConnectionError("down")
+
+        fake_redis.pipeline = broken_pipeline
+        assert not await aggregator.flush()
+        del fake_redis.pipeline
+
+        assert await aggregator.flush()
+        assert (await aggregator.read_cluster())["counters"]["requests:total"] == 1
+
+    async def test_histograms_only_cover_recent_windows(self, aggregator, monkeypatch):
+        aggregator.window, aggregator.windows = 60.0, 2
+        now = [6000.0]
+        monkeypatch.setattr(request_metrics_module.time, "time", lambda: now[0])
+
+        aggregator.record("GET", "/x", 200, 2.0)
+        await aggregator.flush()
+        now[0] += 60
+        aggregator.record("GET", "/x", 200, 0.01)
+        await aggregator.flush()
+        assert aggregator.histograms["GET /x"].total == 2
+        assert (await aggregator.read_cluster())["histograms"]["GET /x"].total == 2
+
+        # Two windows on, the slow request has aged out of both views
+        now[0] += 60
+        aggregator.record("GET", "/x", 200, 0.01)
+        await aggregator.flush()
+        cluster = await aggregator.read_cluster()
+
+        for histograms in (aggregator.histograms, cluster["histograms"]):
+            assert histograms["GET /x"].total == 2
+            assert histograms["GET /x"].max_value < 1_000_000
+        assert len(aggregator._window_histograms) == 2
+        assert cluster["counters"]["requests:total"] == 3
+
+    async def test_slow_requests_are_bounded(self, aggregator):
+        for i in range(5):
+            aggregator.record_slow_request({"request_id": str(i), "duration": float(i)})
+        await aggregator.flush()
+
+        recent = await aggregator.read_slow_requests(10)
+
+        assert [item["request_id"] for item in recent] == ["4", "3", "2"]
+
+    async def test_background_task_flushes(self, aggregator, fake_redis):
+        aggregator.record("GET", "/x", 200, 0.01)
+        aggregator.start()
+        await asyncio.sleep(0.05)
+        await aggregator.stop()
+
+        assert (await aggregator.read_cluster())["counters"]["requests:total"] == 1
+
+
+@pytest.mark.unit
+class TestPerformanceMonitoringMiddleware:
+    """Test the request metrics middleware."""
+
+    @pytest.fixture
+    async def client(self, aggregator):
+        app = FastAPI()
+
+        @app.get("/api/v1/items/{item_id}")
+        async def get_item(item_id: int):
+            return {"id": item_id}
+
+        wrapped = PerformanceMonitoringMiddleware(app, slow_request_threshold=0.0, aggregator=aggregator)
+        async with AsyncClient(transport=ASGITransport(app=wrapped), base_url="http://test") as test_client:
+            yield test_client
+
+    async def test_records_route_template_without_redis_io(self, client, aggregator, fake_redis):
+        fake_redis.calls = 0
+
+        response = await client.get("/api/v1/items/1")
+        await client.get("/api/v1/items/2")
+        await client.get("/missing")
+
+        assert "x-request-id" in response.headers
+        assert response.headers["x-response-time"].endswith("s")
+        assert fake_redis.calls == 0
+        assert aggregator.histograms["GET /api/v1/items/{item_id}"].total == 2
+        assert aggregator.histograms["GET unmatched"].total == 1
+        assert aggregator.counters["requests:status:404"] == 1
+
+    async def test_performance_metrics_report_percentiles(self, client, aggregator):
+        for item_id in range(10):
+            await client.get(f"/api/v1/items/{item_id}")
+        await aggregator.flush()
+
+        metrics = await middleware.get_performance_metrics()
+        slow = await middleware.get_slow_requests(limit=2)
+
+        assert metrics["source"] == "cluster"
+        assert metrics["requests_total"] == 10
+        assert metrics["methods"] == {"GET": 10}
+        route = metrics["routes"]["GET /api/v1/items/{item_id}"]
+        assert route["count"] == 10
+        assert 0 < route["p50_ms"] <= route["p99_ms"] <= route["max_ms"] + 0.001
+        assert len(slow) == 2
+        assert slow[0]["route"] == "/api/v1/items/{item_id}"
@@ -0,0 +1,52 @@
+import pytest
+
+from app.core.snapshot_cache import MISSING, SnapshotCache
+
+
+@pytest.mark.unit
+class TestSnapshotCache:
+    """Test the process-local snapshot holder."""
+
+    def test_values_expire_after_ttl(self):
+        fresh = SnapshotCache(ttl=60, max_size=10)
+        expired = SnapshotCache(ttl=0, max_size=10)
+        for cache in (fresh, expired):
+            cache.put("a", 1, cache.generation)
+
+        assert fresh.get("a") == 1
+        assert expired.get("a") is MISSING
+        assert expired.get("a", None) is None
+        assert fresh.stats() == {"size": 1, "hits": 1, "misses": 0}
+
+    def test_load_overtaken_by_a_write_is_not_kept(self):
+        cache = SnapshotCache(ttl=60, max_size=10)
+        generation = cache.generation
+        cache.invalidate(["a"])
+        cache.put("a", "stale", generation)
+
+        assert cache.get("a") is MISSING
+        cache.put("a", "fresh", cache.generation)
+        assert cache.get("a") == "fresh"
+
+    def test_least_recently_used_value_is_evicted(self):
+        cache = SnapshotCache(ttl=60, max_size=2)
+        cache.put_many([("a", 1), ("b", 2)], cache.generation)
+        cache.get("a")
+        cache.put("c", 3, cache.generation)
+
+        assert dict(cache.items()) == {"a": 1, "c": 3}
+
+    def test_invalidate_keys_or_everything(self):
+        cache = SnapshotCache(ttl=60, max_size=10)
+        cache.put_many([("a", 1), ("b", 2), ("c", 3)], cache.generation)
+
+        cache.invalidate(["a", "missing"])
+        assert len(cache) == 2
+        cache.invalidate()
+        assert len(cache) == 0
+
+    def test_zero_size_keeps_nothing(self):
+        cache = SnapshotCache(ttl=60, max_size=0)
+        cache.put("a", 1, cache.generation)
+
+        assert len(cache) == 0
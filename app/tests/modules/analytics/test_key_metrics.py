@@ -0,0 +1,124 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.modules.analytics.repository import KeyMetricsRepository
+from app.tests.modules.conftest import insert_row
+
+
+SOURCES = KeyMetricsRepository._sources()
+OLD = datetime(2020, 1, 1)
+WATERMARK = datetime(2021, 1, 1)
+NEW = datetime(2022, 1, 1)
+
+
+@pytest_asyncio.fixture
+async def metrics_session(memory_engine):
+    """In-memory database with just the key metric source tables."""
+    engine = await memory_engine(*(table for table, _ in SOURCES.values()))
+    async with AsyncSession(engine) as session:
+        yield session
+
+
+async def _insert(session, source, created_at=OLD, **values):
+    row = await insert_row(
+        session, SOURCES[source][0], created_at=created_at, updated_at=created_at, **values
+    )
+    return row["id"]
+
+
+async def _seed(session):
+    await _insert(session, "transactions", total_amount=Decimal("100.00"), transaction_type="RENTAL")
+    await _insert(session, "transactions", total_amount=Decimal("50.50"), transaction_type="SALE")
+    await _insert(session, "transactions", total_amount=Decimal("999"), transaction_type="RENTAL", is_active=False)
+    await _insert(session, "customers")
+    await _insert(session, "inventory_units", status="RENTED")
+    await _insert(session, "inventory_units", status="AVAILABLE")
+    await _insert(session, "rental_returns")
+
+
+def _values(state):
+    return {
+        component: Decimal(value)
+        for source_state in state.values()
+        for component, value in source_state["values"].items()
+    }
+
+
+def _at_watermark(state):
+    return {name: dict(source_state, watermark=WATERMARK.isoformat()) for name, source_state in state.items()}
+
+
+@pytest.mark.unit
+class TestKeyMetricsRepository:
+    """Test SQL-side and incremental key metric aggregation."""
+
+    async def test_full_aggregate_counts_active_rows(self, metrics_session):
+        await _seed(metrics_session)
+
+        state = await KeyMetricsRepository(metrics_session).aggregate()
+
+        assert _values(state) == {
+            "revenue": Decimal("150.50"),
+            "rental_transactions": 1,
+            "customers": 1,
+            "units": 2,
+            "rented_units": 1,
+            "returns": 1,
+        }
+        assert {source["mode"] for source in state.values()} == {"full"}
+
+    async def test_incremental_folds_in_new_rows(self, metrics_session):
+        repository = KeyMetricsRepository(metrics_session)
+        await _seed(metrics_session)
+        previous = _at_watermark(await repository.aggregate())
+
+        await _insert(metrics_session, "transactions", created_at=NEW, total_amount=Decimal("25"), transaction_type="RENTAL")
+        await _insert(metrics_session, "customers", created_at=NEW)
+        state = await repository.aggregate(previous)
+
+        assert state["transactions"]["mode"] == "incremental"
+        assert state["rental_returns"]["mode"] == "incremental"
+        assert _values(state) == _values(await repository.aggregate())
+        assert _values(state)["revenue"] == Decimal("175.50")
+        assert _values(state)["customers"] == 2
+
+    async def test_changed_existing_rows_trigger_full_recompute(self, metrics_session):
+        repository = KeyMetricsRepository(metrics_session)
+        await _seed(metrics_session)
+        previous = _at_watermark(await repository.aggregate())
+
+        units = SOURCES["inventory_units"][0]
+        await metrics_session.execute(
+            update(units).where(units.c.status == "AVAILABLE").values(status="RENTED", updated_at=NEW)
+        )
+        state = await repository.aggregate(previous)
+
+        assert state["inventory_units"]["mode"] == "full"
+        assert state["customers"]["mode"] == "incremental"
+        assert _values(state)["rented_units"] == 2
+
+    async def test_missing_or_mismatched_state_falls_back_to_full(self, metrics_session):
+        repository = KeyMetricsRepository(metrics_session)
+        await _seed(metrics_session)
+
+        state = await repository.aggregate({"customers": {"watermark": WATERMARK.isoformat(), "values": {"other": "1"}}})
+
+        assert {source["mode"] for source in state.values()} == {"full"}
+        assert _values(state)["customers"] == 1
+
+    async def test_watermark_uses_the_row_clock(self, metrics_session):
+        repository = KeyMetricsRepository(metrics_session)
+        await _seed(metrics_session)
+        previous = await repository.aggregate()
+
+        await _insert(metrics_session, "customers", created_at=datetime.utcnow())
+        state = await repository.aggregate(previous)
+
+        assert datetime.fromisoformat(previous["customers"]["watermark"]) <= datetime.utcnow()
+        assert state["customers"]["mode"] == "incremental"
+        assert _values(state)["customers"] == 2
@@ -0,0 +1,131 @@
+import csv
+import json
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.base import BaseModel
+from app.modules.analytics.report_pipeline import PYARROW_AVAILABLE, REPORT_SOURCES, ReportPipeline
+from app.modules.analytics.schemas import ReportGenerationRequest
+from app.modules.transactions.models import TransactionHeader
+
+
+TRANSACTIONS = TransactionHeader.__table__
+
+
+@pytest_asyncio.fixture
+async def report_session(tmp_path):
+    """File-backed database (the cursor runs on its own connection) with sales rows."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'reports.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: BaseModel.metadata.create_all(sync_conn, tables=[TRANSACTIONS]))
+        await conn.execute(TRANSACTIONS.insert(), [
+            {
+                "id": uuid.uuid4(),
+                "transaction_number": f"TX-{i:04d}",
+                "transaction_type": "SALE" if i % 4 else "RENTAL",
+                "transaction_date": datetime(2024, 1, 1 + i % 28),
+                "customer_id": uuid.uuid4(),
+                "location_id": uuid.uuid4(),
+                "status": "COMPLETED",
+                "payment_status": "PAID",
+                "subtotal": Decimal("10"),
+                "discount_amount": Decimal("0"),
+                "tax_amount": Decimal("1"),
+                "total_amount": Decimal(i) + Decimal("0.50"),
+                "paid_amount": Decimal("0"),
+                "deposit_amount": Decimal("0"),
+                "is_active": True,
+            }
+            for i in range(100)
+        ])
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+def _report(report_type="SALES", report_format="NDJSON"):
+    return SimpleNamespace(
+        id=uuid.uuid4(), report_name="sales", report_type=report_type,
+        report_format=report_format, report_metadata=None, attempts=1
+    )
+
+
+@pytest.mark.unit
+class TestReportPipeline:
+    """Test streaming report generation."""
+
+    async def test_ndjson_streams_all_rows_in_batches(self, report_session, tmp_path):
+        report = _report()
+        pipeline = ReportPipeline(report_session, reports_dir=str(tmp_path), batch_size=7, progress_interval=0)
+        batches = [batch async for batch in pipeline.stream_rows(REPORT_SOURCES["SALES"], ReportGenerationRequest())]
+
+        file_path, file_size = await pipeline.run(report, ReportGenerationRequest())
+
+        rows = [json.loads(line) for line in open(file_path)]
+        assert max(len(batch) for batch in batches) == 7
+        assert len(rows) == 75
+        assert {row["status"] for row in rows} == {"COMPLETED"}
+        assert file_size > 0
+        assert report.report_metadata == {"rows_written": 75, "total_rows": 75, "progress": 100.0}
+
+    async def test_csv_has_header_and_respects_date_range(self, report_session, tmp_path):
+        report = _report(report_format="CSV")
+        request = ReportGenerationRequest(start_date=datetime(2024, 1, 1), end_date=datetime(2024, 1, 2))
+
+        file_path, _ = await ReportPipeline(report_session, reports_dir=str(tmp_path)).run(report, request)
+
+        with open(file_path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert list(rows[0]) == REPORT_SOURCES["SALES"].fields
+        assert {row["transaction_date"][:10] for row in rows} <= {"2024-01-01", "2024-01-02"}
+        assert len(rows) == report.report_metadata["rows_written"]
+
+    async def test_json_document_keeps_header(self, report_session, tmp_path):
+        report = _report(report_type="FINANCIAL", report_format="JSON")
+
+        file_path, _ = await ReportPipeline(report_session, reports_dir=str(tmp_path), batch_size=30).run(
+            report, ReportGenerationRequest(filters={"region": "north"})
+        )
+
+        document = json.load(open(file_path))
+        assert document["report_type"] == "FINANCIAL"
+        assert document["filters"] == {"region": "north"}
+        assert len(document["data"]) == 100
+        assert document["data"][0]["net_amount"] == document["data"][0]["total_amount"] - 1
+
+    async def test_report_types_without_source_produce_empty_file(self, report_session, tmp_path):
+        report = _report(report_type="SYSTEM", report_format="JSON")
+
+        file_path, _ = await ReportPipeline(report_session, reports_dir=str(tmp_path)).run(
+            report, ReportGenerationRequest()
+        )
+
+        assert json.load(open(file_path))["data"] == []
+
+    @pytest.mark.skipif(PYARROW_AVAILABLE, reason="pyarrow installed")
+    async def test_parquet_without_pyarrow_fails_and_cleans_up(self, report_session, tmp_path):
+        report = _report(report_format="PARQUET")
+
+        with pytest.raises(ValueError):
+            await ReportPipeline(report_session, reports_dir=str(tmp_path)).run(report, ReportGenerationRequest())
+
+        assert not list(tmp_path.glob("*.parquet"))
+
+    @pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow not installed")
+    async def test_parquet_writes_one_row_group_per_batch(self, report_session, tmp_path):
+        import pyarrow.parquet
+
+        report = _report(report_format="PARQUET")
+        file_path, _ = await ReportPipeline(report_session, reports_dir=str(tmp_path), batch_size=25).run(
+            report, ReportGenerationRequest()
+        )
+
+        parquet_file = pyarrow.parquet.ParquetFile(file_path)
+        assert parquet_file.metadata.num_rows == 75
+        assert parquet_file.metadata.num_row_groups == 3
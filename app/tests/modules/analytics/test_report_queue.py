@@ -0,0 +1,203 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.base import BaseModel
+from app.modules.analytics.report_queue import ReportJobQueue, ReportWorker, reports
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    """File-backed database with the analytics reports table."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'queue.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: BaseModel.metadata.create_all(sync_conn, tables=[reports]))
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def _add_report(session_factory, report_type="SALES", queued=True, available_at=None):
+    report_id = uuid.uuid4()
+    async with session_factory() as session:
+        await session.execute(reports.insert().values(
+            id=report_id, report_name="report", report_type=report_type, report_format="CSV",
+            report_status="PENDING", generated_by=uuid.uuid4(), attempts=0, is_active=True,
+            available_at=(available_at or datetime.utcnow() - timedelta(seconds=1)) if queued else None
+        ))
+        await session.commit()
+    return report_id
+
+
+async def _report(session_factory, report_id):
+    async with session_factory() as session:
+        return (await session.execute(select(reports).where(reports.c.id == report_id))).one()
+
+
+@pytest.mark.unit
+class TestReportJobQueue:
+    """Test leasing, retries and concurrency limits of the report queue."""
+
+    async def test_claims_only_queued_reports_once(self, session_factory):
+        queue = ReportJobQueue(session_factory, type_limits={})
+        queued = await _add_report(session_factory)
+        await _add_report(session_factory, queued=False)
+
+        claims = await asyncio.gather(*(queue.claim(f"worker-{i}") for i in range(5)))
+
+        assert [claim for claim in claims if claim] == [queued]
+        row = await _report(session_factory, queued)
+        assert row.report_status == "GENERATING"
+        assert row.attempts == 1
+        assert row.lease_owner in {f"worker-{i}" for i in range(5)}
+
+    async def test_type_limit_holds_back_saturated_types(self, session_factory):
+        queue = ReportJobQueue(session_factory, type_limits={"FINANCIAL": 1})
+        first = await _add_report(session_factory, "FINANCIAL")
+        second = await _add_report(session_factory, "FINANCIAL")
+        sales = await _add_report(session_factory, "SALES")
+
+        claimed = [await queue.claim("worker") for _ in range(3)]
+
+        assert claimed[0] == first
+        assert claimed[1] == sales
+        assert claimed[2] is None
+        assert await queue.complete(first, "worker", "first.csv", 10)
+        assert await queue.claim("worker") == second
+
+    async def test_concurrent_claims_respect_type_limit(self, session_factory):
+        queue = ReportJobQueue(session_factory, type_limits={"FINANCIAL": 2})
+        for _ in range(6):
+            await _add_report(session_factory, "FINANCIAL")
+
+        claims = await asyncio.gather(*(queue.claim(f"worker-{i}") for i in range(6)))
+
+        claimed = [claim for claim in claims if claim]
+        assert len(claimed) == 2
+        for report_id in claimed:
+            row = await _report(session_factory, report_id)
+            assert row.started_at is not None and row.generated_at is None
+
+    async def test_failures_back_off_then_fail(self, session_factory):
+        queue = ReportJobQueue(session_factory, max_attempts=2, retry_backoff=60, type_limits={})
+        report_id = await _add_report(session_factory)
+
+        assert await queue.claim("worker") == report_id
+        assert await queue.fail(report_id, "worker", "boom") is True
+        row = await _report(session_factory, report_id)
+        assert row.report_status == "PENDING"
+        assert row.available_at > datetime.utcnow() + timedelta(seconds=50)
+        assert await queue.claim("worker") is None
+
+        async with session_factory() as session:
+            await session.execute(update(reports).values(available_at=datetime.utcnow() - timedelta(seconds=1)))
+            await session.commit()
+        assert await queue.claim("worker") == report_id
+        assert await queue.fail(report_id, "worker", "boom again") is False
+
+        row = await _report(session_factory, report_id)
+        assert row.report_status == "FAILED"
+        assert row.error_message == "boom again"
+        assert row.available_at is None
+
+    async def test_expired_lease_is_reclaimed(self, session_factory):
+        queue = ReportJobQueue(session_factory, lease_seconds=60, type_limits={})
+        report_id = await _add_report(session_factory)
+        assert await queue.claim("crashed") == report_id
+
+        async with session_factory() as session:
+            await session.execute(update(reports).values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1)))
+            await session.commit()
+
+        assert await queue.claim("survivor") == report_id
+        assert await queue.heartbeat(report_id, "crashed") is False
+        assert await queue.heartbeat(report_id, "survivor") is True
+        assert (await _report(session_factory, report_id)).attempts == 2
+
+    async def test_only_the_lease_holder_completes(self, session_factory):
+        queue = ReportJobQueue(session_factory, lease_seconds=60, type_limits={})
+        report_id = await _add_report(session_factory)
+        assert await queue.claim("slow") == report_id
+        async with session_factory() as session:
+            await session.execute(update(reports).values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1)))
+            await session.commit()
+        assert await queue.claim("survivor") == report_id
+
+        assert await queue.complete(report_id, "slow", "slow.csv", 10) is False
+        row = await _report(session_factory, report_id)
+        assert (row.report_status, row.file_path, row.lease_owner) == ("GENERATING", None, "survivor")
+
+        assert await queue.complete(report_id, "survivor", "survivor.csv", 20) is True
+        row = await _report(session_factory, report_id)
+        assert (row.report_status, row.file_path, row.file_size) == ("COMPLETED", "survivor.csv", "20")
+        assert row.lease_owner is None and row.available_at is None and row.generated_at is not None
+
+
+@pytest.mark.unit
+class TestReportWorker:
+    """Test the worker loop around the queue."""
+
+    async def test_success_completes_and_failure_requeues(self, session_factory):
+        queue = ReportJobQueue(session_factory, type_limits={})
+        good = await _add_report(session_factory)
+        bad = await _add_report(session_factory, available_at=datetime.utcnow())
+        handled = []
+
+        async def handler(report_id):
+            handled.append(report_id)
+            if report_id == bad:
+                raise RuntimeError("generation failed")
+            return "good.csv", 10
+
+        worker = ReportWorker(queue, handler, concurrency=1, worker_id="worker")
+        assert await worker.run_once() is True
+        assert await worker.run_once() is True
+        assert await worker.run_once() is False
+
+        assert handled == [good, bad]
+        good_row = await _report(session_factory, good)
+        assert (good_row.report_status, good_row.available_at) == ("COMPLETED", None)
+        bad_row = await _report(session_factory, bad)
+        assert bad_row.report_status == "PENDING"
+        assert bad_row.error_message == "generation failed"
+
+    async def test_start_and_stop(self, session_factory):
+        queue = ReportJobQueue(session_factory, type_limits={})
+        report_ids = [await _add_report(session_factory) for _ in range(4)]
+        done = asyncio.Event()
+        handled = []
+
+        async def handler(report_id):
+            handled.append(report_id)
+            if len(handled) == len(report_ids):
+                done.set()
+            return "report.csv", 10
+
+        worker = ReportWorker(queue, handler, concurrency=2, poll_interval=0.01)
+        worker.start()
+        await asyncio.wait_for(done.wait(), timeout=5)
+        await worker.stop()
+
+        assert sorted(handled) == sorted(report_ids)
+
+    async def test_lost_lease_discards_the_file(self, session_factory, tmp_path):
+        queue = ReportJobQueue(session_factory, type_limits={})
+        report_id = await _add_report(session_factory)
+        file_path = tmp_path / "late.csv"
+
+        async def handler(report_id):
+            file_path.write_text("rows")
+            # Meanwhile the lease expired and another worker reclaimed the report
+            async with session_factory() as session:
+                await session.execute(update(reports).values(lease_owner="survivor"))
+                await session.commit()
+            return str(file_path), 4
+
+        assert await ReportWorker(queue, handler, concurrency=1, worker_id="slow").run_once() is True
+
+        assert not file_path.exists()
+        assert (await _report(session_factory, report_id)).report_status == "GENERATING"
@@ -0,0 +1,283 @@
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.modules.analytics.repository import DashboardRollupRepository
+from app.modules.analytics.rollups import (
+    NO_DUE_DATE, ROLLUPS, UNASSIGNED, _add_unit_changes, _category_moves, apply_deltas, items, rebuild_rollups,
+    record_changes, returns, transactions, units
+)
+from app.tests.modules.conftest import insert_row as _insert
+
+
+TODAY = date(2024, 6, 15)
+LOCATION = uuid.uuid4()
+CATEGORY = uuid.uuid4()
+
+
+@pytest_asyncio.fixture
+async def rollup_session(memory_engine):
+    """In-memory database with the rollup source and target tables."""
+    engine = await memory_engine(transactions, returns, units, items, *(rollup.table for rollup in ROLLUPS.values()))
+    async with AsyncSession(engine) as session:
+        yield session
+
+
+async def _seed(session):
+    """Source rows covering every rollup, returned as (table name, row) pairs."""
+    item = await _insert(session, items, category_id=CATEGORY)
+    loose_item = await _insert(session, items, category_id=None)
+    rows = [
+        ("transactions", await _insert(
+            session, transactions, location_id=LOCATION, transaction_type="RENTAL", status="IN_PROGRESS",
+            transaction_date=datetime(2024, 6, 14, 9), total_amount=Decimal("120.00")
+        )),
+        ("transactions", await _insert(
+            session, transactions, location_id=LOCATION, transaction_type="SALE", status="COMPLETED",
+            transaction_date=datetime(2024, 6, 14, 17), total_amount=Decimal("30.00")
+        )),
+        ("transactions", await _insert(
+            session, transactions, location_id=LOCATION, transaction_type="SALE", status="CANCELLED",
+            transaction_date=datetime(2024, 6, 14, 18), total_amount=Decimal("500.00")
+        )),
+        ("transactions", await _insert(
+            session, transactions, location_id=LOCATION, transaction_type="RENTAL", status="IN_PROGRESS",
+            transaction_date=datetime(2024, 6, 14, 18), total_amount=Decimal("999.00"), is_active=False
+        )),
+        ("returns", await _insert(
+            session, returns, return_location_id=LOCATION, expected_return_date=TODAY - timedelta(days=2),
+            return_status="INITIATED", total_late_fee=Decimal("10.00"), total_damage_fee=Decimal("5.00")
+        )),
+        ("returns", await _insert(
+            session, returns, return_location_id=None, expected_return_date=TODAY,
+            return_status="PENDING", total_late_fee=Decimal("0"), total_damage_fee=Decimal("0")
+        )),
+        ("returns", await _insert(
+            session, returns, return_location_id=LOCATION, expected_return_date=TODAY + timedelta(days=3),
+            return_status="PENDING", total_late_fee=Decimal("0"), total_damage_fee=Decimal("0")
+        )),
+        ("returns", await _insert(
+            session, returns, return_location_id=LOCATION, expected_return_date=TODAY - timedelta(days=9),
+            return_status="COMPLETED", total_late_fee=Decimal("40.00"), total_damage_fee=Decimal("0")
+        )),
+        ("returns", await _insert(
+            session, returns, return_location_id=LOCATION, expected_return_date=None,
+            return_status="INITIATED", total_late_fee=Decimal("0"), total_damage_fee=Decimal("0")
+        )),
+        ("units", await _insert(session, units, item_id=item["id"], location_id=LOCATION, status="RENTED")),
+        ("units", await _insert(session, units, item_id=item["id"], location_id=LOCATION, status="AVAILABLE")),
+        ("units", await _insert(session, units, item_id=item["id"], location_id=LOCATION, status="RETIRED")),
+        ("units", await _insert(session, units, item_id=loose_item["id"], location_id=LOCATION, status="AVAILABLE")),
+    ]
+    categories = {item["id"]: CATEGORY, loose_item["id"]: None}
+    return rows, categories
+
+
+def _changes(table_name, old, new, categories):
+    """Rollup changes for one source row, as the flush listener produces them."""
+    if table_name == "units":
+        for state in (old, new):
+            if state:
+                state["category_id"] = categories[state["item_id"]]
+        return [("category_inventory", old, new)]
+    names = {"transactions": ["daily_location", "rental_status"], "returns": ["return_due"]}[table_name]
+    return [(name, old, new) for name in names]
+
+
+async def _contents(session):
+    contents = {}
+    for name, rollup in ROLLUPS.items():
+        result = await session.execute(select(rollup.table))
+        contents[name] = {
+            tuple(str(row[key]) for key in rollup.keys): tuple(Decimal(str(row[m])) for m in rollup.measures)
+            for row in result.mappings()
+            if any(row[m] for m in rollup.measures)
+        }
+    return contents
+
+
+async def _rebuild(session):
+    connection = await session.connection()
+    await connection.run_sync(rebuild_rollups)
+
+
+async def _record(session, changes):
+    connection = await session.connection()
+    await connection.run_sync(record_changes, changes)
+
+
+@pytest.mark.unit
+class TestRollupRebuild:
+    """Backfilling the rollups from source rows."""
+
+    @pytest.mark.asyncio
+    async def test_rebuild_groups_source_rows(self, rollup_session):
+        await _seed(rollup_session)
+        await _rebuild(rollup_session)
+        contents = await _contents(rollup_session)
+
+        location = str(LOCATION)
+        assert contents["daily_location"] == {
+            ("2024-06-14", location, "IN_PROGRESS"): (1, Decimal("120.00"), 1),
+            ("2024-06-14", location, "COMPLETED"): (1, Decimal("30.00"), 0),
+            ("2024-06-14", location, "CANCELLED"): (1, Decimal("500.00"), 0),
+        }
+        assert contents["rental_status"] == {(location, "IN_PROGRESS"): (1,)}
+        assert contents["return_due"][(str(UNASSIGNED), str(TODAY), "PENDING")] == (1, 0, 0)
+        assert contents["return_due"][(location, str(NO_DUE_DATE), "INITIATED")] == (1, 0, 0)
+        assert contents["category_inventory"] == {
+            (str(CATEGORY), location, "RENTED"): (1,),
+            (str(CATEGORY), location, "AVAILABLE"): (1,),
+            (str(CATEGORY), location, "RETIRED"): (1,),
+            (str(UNASSIGNED), location, "AVAILABLE"): (1,),
+        }
+
+    @pytest.mark.asyncio
+    async def test_rebuild_replaces_existing_rows(self, rollup_session):
+        await _seed(rollup_session)
+        await _rebuild(rollup_session)
+        first = await _contents(rollup_session)
+        await _rebuild(rollup_session)
+        assert await _contents(rollup_session) == first
+
+
+@pytest.mark.unit
+class TestIncrementalMaintenance:
+    """Applying row changes as deltas keeps the rollups equal to a rebuild."""
+
+    @pytest.mark.asyncio
+    async def test_inserts_match_rebuild(self, rollup_session):
+        rows, categories = await _seed(rollup_session)
+        await _record(rollup_session, [
+            change for table_name, row in rows for change in _changes(table_name, None, dict(row), categories)
+        ])
+        incremental = await _contents(rollup_session)
+
+        await _rebuild(rollup_session)
+        assert incremental == await _contents(rollup_session)
+
+    @pytest.mark.asyncio
+    async def test_updates_and_deletes_match_rebuild(self, rollup_session):
+        rows, categories = await _seed(rollup_session)
+        await _rebuild(rollup_session)
+
+        tables = {"transactions": transactions, "returns": returns, "units": units}
+        edits = [
+            (0, {"status": "COMPLETED"}),
+            (1, {"is_active": False}),
+            (4, {"return_status": "COMPLETED", "total_late_fee": Decimal("12.50")}),
+            (5, {"expected_return_date": TODAY + timedelta(days=1), "return_location_id": LOCATION}),
+            (9, {"status": "AVAILABLE"}),
+            (10, {"location_id": uuid.uuid4()}),
+        ]
+        changes = []
+        for index, values in edits:
+            table_name, old = rows[index]
+            new = {**old, **values}
+            await rollup_session.execute(
+                tables[table_name].update().where(tables[table_name].c.id == old["id"]).values(**values)
+            )
+            changes.extend(_changes(table_name, dict(old), new, categories))
+
+        table_name, deleted = rows[12]
+        await rollup_session.execute(units.delete().where(units.c.id == deleted["id"]))
+        changes.extend(_changes(table_name, dict(deleted), None, categories))
+
+        await _record(rollup_session, changes)
+        incremental = await _contents(rollup_session)
+
+        await _rebuild(rollup_session)
+        assert incremental == await _contents(rollup_session)
+
+    @pytest.mark.asyncio
+    async def test_category_move_with_unit_writes_in_one_flush(self, rollup_session):
+        rows, _ = await _seed(rollup_session)
+        await _rebuild(rollup_session)
+        item_id = rows[9][1]["item_id"]
+        new_category = uuid.uuid4()
+
+        # One flush: the item moves category, one of its units is rented and a new unit is added
+        await rollup_session.execute(items.update().where(items.c.id == item_id).values(category_id=new_category))
+        rented = dict(rows[10][1])
+        await rollup_session.execute(units.update().where(units.c.id == rented["id"]).values(status="RENTED"))
+        added = await _insert(rollup_session, units, item_id=item_id, location_id=LOCATION, status="AVAILABLE")
+        unit_changes = [(rented, {**rented, "status": "RENTED"}), (None, dict(added))]
+        moved_items = {item_id: (CATEGORY, new_category)}
+
+        def apply(connection):
+            deltas = defaultdict(dict)
+            _add_unit_changes(connection, deltas, unit_changes, moved_items)
+            _category_moves(connection, deltas, moved_items, [rented["id"], added["id"]])
+            apply_deltas(connection, deltas)
+
+        connection = await rollup_session.connection()
+        await connection.run_sync(apply)
+        incremental = await _contents(rollup_session)
+
+        await _rebuild(rollup_session)
+        assert incremental == await _contents(rollup_session)
+        assert incremental["category_inventory"][(str(new_category), str(LOCATION), "AVAILABLE")] == (1,)
+        assert incremental["category_inventory"][(str(new_category), str(LOCATION), "RENTED")] == (2,)
+
+    @pytest.mark.asyncio
+    async def test_repeated_keys_in_one_batch_are_merged(self, rollup_session):
+        rows, categories = await _seed(rollup_session)
+        rental = dict(rows[0][1])
+        await _record(rollup_session, [
+            *_changes("transactions", None, dict(rental), categories),
+            *_changes("transactions", dict(rental), {**rental, "status": "COMPLETED"}, categories),
+        ])
+        contents = await _contents(rollup_session)
+
+        assert contents["rental_status"] == {(str(LOCATION), "COMPLETED"): (1,)}
+
+
+@pytest.mark.unit
+class TestDashboardRollupRepository:
+    """Dashboard reads over the rollup tables."""
+
+    @pytest.mark.asyncio
+    async def test_rental_overview(self, rollup_session):
+        await _seed(rollup_session)
+        await _rebuild(rollup_session)
+
+        overview = await DashboardRollupRepository(rollup_session).get_rental_overview(TODAY)
+
+        assert overview == {
+            "active_rentals": 1,
+            "overdue_returns": 1,
+            "returns_due_today": 1,
+            "returns_due_this_week": 2,
+            "total_outstanding_fees": Decimal("15.00"),
+        }
+
+    @pytest.mark.asyncio
+    async def test_inventory_overview(self, rollup_session):
+        await _seed(rollup_session)
+        await _rebuild(rollup_session)
+        repository = DashboardRollupRepository(rollup_session)
+
+        overview = await repository.get_inventory_overview()
+        categories = await repository.get_category_utilization()
+
+        assert overview["total_units"] == 4
+        assert overview["available_units"] == 2
+        assert overview["rented_units"] == 1
+        assert overview["utilization_rate"] == Decimal("33.33")
+        assert categories[str(UNASSIGNED)] == {"AVAILABLE": 1}
+
+    @pytest.mark.asyncio
+    async def test_revenue_excludes_cancelled(self, rollup_session):
+        await _seed(rollup_session)
+        await _rebuild(rollup_session)
+        repository = DashboardRollupRepository(rollup_session)
+
+        assert await repository.get_revenue(date_from=TODAY - timedelta(days=1), date_to=TODAY) == Decimal("150.00")
+        assert await repository.get_revenue(date_from=TODAY) == Decimal("0")
+        assert await repository.get_revenue(location_id=uuid.uuid4()) == Decimal("0")
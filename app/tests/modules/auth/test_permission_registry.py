@@ -0,0 +1,94 @@
+import pytest
+
+from app.core.errors import AuthorizationException
+from app.core.security import TokenData, create_access_token, decode_access_token
+from app.modules.auth.constants import Permission
+from app.modules.auth.permission_registry import PermissionRegistry, permission_registry
+from app.shared.dependencies import PermissionChecker
+
+
+def _token_data(permissions, with_mask=True):
+    claims = {"sub": "user@example.com", "user_id": "u1", "permissions": permissions}
+    if with_mask:
+        claims.update(permission_registry.token_claims(permissions))
+    return decode_access_token(create_access_token(claims))
+
+
+@pytest.mark.unit
+class TestPermissionRegistry:
+    """Test the compiled permission registry."""
+
+    def test_constants_get_stable_leading_bits(self):
+        first = PermissionRegistry([Permission.SYSTEM_CONFIG_READ, Permission.USER_CREATE])
+
+        assert permission_registry.bit(Permission.SYSTEM_CONFIG_READ) == 1
+        assert first.bit(Permission.USER_CREATE) == 2
+        assert Permission.ROLE_REVOKE in permission_registry
+
+    def test_mask_round_trip_ignores_unknown_codes(self):
+        registry = PermissionRegistry(["a", "b", "c"])
+
+        mask = registry.mask(["c", "a", "unknown"])
+
+        assert mask == 0b101
+        assert registry.codes(mask) == ["a", "c"]
+
+    def test_version_changes_when_bits_are_added(self):
+        registry = PermissionRegistry(["a"])
+        version = registry.version
+
+        registry.register("a")
+        assert registry.version == version
+        registry.register("b")
+        assert registry.version != version
+
+    def test_stale_masks_are_rejected(self):
+        registry = PermissionRegistry(["a", "b"])
+        claims = registry.token_claims(["b"])
+
+        assert registry.decode_mask(claims["pmask"], claims["pver"]) == 0b10
+        registry.register("c")
+        assert registry.decode_mask(claims["pmask"], claims["pver"]) is None
+
+    def test_token_carries_mask(self):
+        token_data = _token_data(["locations:read", Permission.USER_READ])
+
+        assert token_data.permission_mask_version == permission_registry.version
+        assert token_data.permission_mask == permission_registry.mask(["locations:read", Permission.USER_READ])
+
+
+@pytest.mark.unit
+class TestPermissionChecker:
+    """Test bitmask-based permission checks."""
+
+    async def test_allows_when_all_required_bits_are_set(self):
+        checker = PermissionChecker(["registry-test:read", "registry-test:list"])
+        token_data = _token_data(["registry-test:read", "registry-test:list", "other:write"])
+
+        assert await checker(current_user=token_data) is token_data
+
+    async def test_reports_missing_permissions(self):
+        checker = PermissionChecker(["registry-test:read", "registry-test:delete"])
+        token_data = _token_data(["registry-test:read"])
+
+        with pytest.raises(AuthorizationException) as exc_info:
+            await checker(current_user=token_data)
+
+        assert "registry-test:delete" in str(exc_info.value)
+        assert "registry-test:read" not in str(exc_info.value)
+
+    async def test_tokens_without_mask_fall_back_to_names(self):
+        checker = PermissionChecker("registry-test:export")
+
+        allowed = TokenData(email="user@example.com", permissions=["registry-test:export"])
+        stale = TokenData(
+            email="user@example.com",
+            permissions=["registry-test:export"],
+            permission_mask=0,
+            permission_mask_version="stale"
+        )
+
+        assert await checker(current_user=allowed) is allowed
+        assert await checker(current_user=stale) is stale
+        with pytest.raises(AuthorizationException):
+            await checker(current_user=TokenData(email="user@example.com", permissions=[]))
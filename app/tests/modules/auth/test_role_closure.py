@@ -0,0 +1,114 @@
+import random
+import uuid
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.base import BaseModel
+from app.modules.auth.models import role_hierarchy_closure_table, role_hierarchy_table, user_roles_table
+from app.modules.auth.rbac_service import RBACService
+
+
+@pytest_asyncio.fixture
+async def closure_session():
+    """In-memory database with just the role hierarchy and user role tables."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda sync_conn: BaseModel.metadata.create_all(
+                sync_conn, tables=[role_hierarchy_table, role_hierarchy_closure_table, user_roles_table]
+            )
+        )
+    async with AsyncSession(engine) as session:
+        yield session
+    await engine.dispose()
+
+
+async def _add_edge(service: RBACService, parent, child):
+    await service.session.execute(
+        role_hierarchy_table.insert().values(parent_role_id=parent, child_role_id=child, inherit_permissions=True)
+    )
+    await service._update_role_closure(parent, child, 1)
+
+
+async def _remove_edge(service: RBACService, parent, child):
+    await service.session.execute(
+        role_hierarchy_table.delete().where(
+            (role_hierarchy_table.c.parent_role_id == parent) & (role_hierarchy_table.c.child_role_id == child)
+        )
+    )
+    await service._update_role_closure(parent, child, -1)
+
+
+async def _closure(session):
+    result = await session.execute(select(role_hierarchy_closure_table))
+    return {(row.ancestor_role_id, row.descendant_role_id): row.path_count for row in result}
+
+
+@pytest.mark.unit
+class TestRoleClosure:
+    """Test incremental maintenance of the role hierarchy closure."""
+
+    async def test_diamond_counts_paths_and_survives_edge_removal(self, closure_session):
+        service = RBACService(closure_session)
+        top, left, right, bottom = (uuid.uuid4() for _ in range(4))
+
+        for parent, child in [(top, left), (top, right), (left, bottom), (right, bottom)]:
+            await _add_edge(service, parent, child)
+
+        closure = await _closure(closure_session)
+        assert closure[(top, bottom)] == 2
+        assert await service._has_path_to_role(top, bottom)
+        assert not await service._has_path_to_role(bottom, top)
+
+        await _remove_edge(service, left, bottom)
+
+        closure = await _closure(closure_session)
+        assert closure[(top, bottom)] == 1
+        assert (left, bottom) not in closure
+        assert await service._has_path_to_role(top, bottom)
+
+    async def test_cycle_detection_is_a_closure_lookup(self, closure_session):
+        service = RBACService(closure_session)
+        a, b, c = (uuid.uuid4() for _ in range(3))
+        await _add_edge(service, a, b)
+        await _add_edge(service, b, c)
+
+        assert await service._check_circular_dependency(c, a)
+        assert await service._check_circular_dependency(a, a)
+        assert not await service._check_circular_dependency(a, c)
+
+    async def test_incremental_matches_rebuild(self, closure_session):
+        service = RBACService(closure_session)
+        rng = random.Random(3)
+        roles = [uuid.uuid4() for _ in range(12)]
+        edges = set()
+        # Random DAG: edges only go from lower to higher index
+        while len(edges) < 25:
+            i, j = sorted(rng.sample(range(len(roles)), 2))
+            edges.add((roles[i], roles[j]))
+        for parent, child in edges:
+            await _add_edge(service, parent, child)
+        for parent, child in rng.sample(sorted(edges), 8):
+            await _remove_edge(service, parent, child)
+
+        incremental = await _closure(closure_session)
+        result = await service.rebuild_role_closure()
+
+        assert result["closure_rows"] == len(incremental)
+        assert await _closure(closure_session) == incremental
+
+    async def test_user_roles_include_inherited_roles(self, closure_session):
+        service = RBACService(closure_session)
+        top, middle, bottom, other = (uuid.uuid4() for _ in range(4))
+        await _add_edge(service, top, middle)
+        await _add_edge(service, middle, bottom)
+        await _add_edge(service, other, top)
+        user_id = uuid.uuid4()
+        await closure_session.execute(user_roles_table.insert().values(user_id=user_id, role_id=middle))
+
+        # Cached permissions are tagged with these, so a change to top or other reaches the user
+        assert set(await service._get_user_role_closure(user_id)) == {middle, top, other}
+        assert await service._get_user_role_closure(uuid.uuid4()) == []
@@ -0,0 +1,64 @@
+import uuid
+from datetime import date, datetime
+
+import pytest_asyncio
+from sqlalchemy import Boolean, Date, DateTime, Integer, Numeric
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.base import BaseModel, UUIDType
+
+
+PLACEHOLDER_DATE = date(2024, 1, 1)
+
+
+def filler(column):
+    """Placeholder value for a required column."""
+    if isinstance(column.type, UUIDType):
+        return uuid.uuid4()
+    if isinstance(column.type, Boolean):
+        return False
+    if isinstance(column.type, DateTime):
+        return datetime.combine(PLACEHOLDER_DATE, datetime.min.time())
+    if isinstance(column.type, Date):
+        return PLACEHOLDER_DATE
+    if isinstance(column.type, (Integer, Numeric)):
+        return 0
+    return uuid.uuid4().hex[:10]
+
+
+def placeholder_row(table, **values):
+    """An active row with a fresh id and placeholders for every other required column."""
+    row = {
+        column.name: filler(column)
+        for column in table.columns
+        if not column.nullable and column.server_default is None
+    }
+    row["id"] = uuid.uuid4()
+    if "is_active" in table.c:
+        row["is_active"] = True
+    row.update(values)
+    return row
+
+
+async def insert_row(conn, table, **values):
+    """Insert a placeholder row through a connection or session and return it."""
+    row = placeholder_row(table, **values)
+    await conn.execute(table.insert().values(**row))
+    return row
+
+
+@pytest_asyncio.fixture
+async def memory_engine():
+    """Factory for in-memory databases holding just the given tables."""
+    engines = []
+
+    async def create(*tables):
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        engines.append(engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: BaseModel.metadata.create_all(sync_conn, tables=list(tables)))
+        return engine
+
+    yield create
+    for engine in engines:
+        await engine.dispose()
@@ -0,0 +1,98 @@
+import uuid
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.modules.analytics.rollups import ROLLUPS, rebuild_rollups
+from app.modules.inventory.models import InventoryUnit, Item, StockLevel
+from app.modules.inventory.service import InventoryService
+from app.tests.modules.conftest import insert_row
+
+
+items = Item.__table__
+units = InventoryUnit.__table__
+stock = StockLevel.__table__
+
+
+class QueryCounter:
+    """Counts statements sent to the database."""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+@pytest_asyncio.fixture
+async def report_engine(memory_engine):
+    """In-memory database with the inventory and rollup tables."""
+    return await memory_engine(items, units, stock, ROLLUPS["category_inventory"].table)
+
+
+async def _insert(conn, table, **values):
+    return (await insert_row(conn, table, **values))["id"]
+
+
+async def _seed(engine, item_count):
+    """Items with two available and one rented unit; every third item is low on stock."""
+    location = uuid.uuid4()
+    async with engine.begin() as conn:
+        for i in range(item_count):
+            item_id = await _insert(
+                conn, items, item_name=f"Item {i:04d}", item_code=f"IT{i:04d}",
+                item_type="RENTAL", item_status="ACTIVE", purchase_price=Decimal("10.00")
+            )
+            for status in ("AVAILABLE", "AVAILABLE", "RENTED"):
+                await _insert(conn, units, item_id=item_id, location_id=location, status=status)
+            await _insert(
+                conn, stock, item_id=item_id, location_id=location,
+                quantity_on_hand="2" if i % 3 == 0 else "20", reorder_point="5"
+            )
+        await _insert(
+            conn, items, item_name="Retired", item_code="RETIRED",
+            item_type="SALE", item_status="DISCONTINUED", purchase_price=Decimal("1.00")
+        )
+        await conn.run_sync(rebuild_rollups, ["category_inventory"])
+
+
+async def _report(engine):
+    counter = QueryCounter(engine)
+    async with AsyncSession(engine) as session:
+        report = await InventoryService(session).get_inventory_report()
+    return report, counter.count
+
+
+@pytest.mark.unit
+class TestInventoryReport:
+    """Inventory report queries."""
+
+    @pytest.mark.asyncio
+    async def test_report_contents(self, report_engine):
+        await _seed(report_engine, 6)
+
+        report, _ = await _report(report_engine)
+
+        assert report.total_items == 7
+        assert report.total_active_items == 6
+        assert len(report.items) == 6
+        assert all(item.total_inventory_units == 3 for item in report.items)
+        assert all(item.available_units == 2 and item.rented_units == 1 for item in report.items)
+        assert report.total_inventory_units == 18
+        assert report.total_available_units == 12
+        assert report.total_rented_units == 6
+        assert [item.item_code for item in report.items_needing_reorder] == ["IT0000", "IT0003"]
+
+    @pytest.mark.asyncio
+    async def test_query_count_does_not_grow_with_catalogue(self, report_engine):
+        await _seed(report_engine, 60)
+
+        report, queries = await _report(report_engine)
+
+        assert len(report.items) == 60
+        assert len(report.items_needing_reorder) == 20
+        assert queries <= 4
@@ -0,0 +1,178 @@
+import asyncio
+import random
+import uuid
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.errors import InsufficientStockException, NotFoundError, ValidationError
+from app.db.base import BaseModel
+from app.modules.inventory.models import StockLevel
+from app.modules.inventory.schemas import (
+    StockAdjustment, StockBatchReservation, StockReservation, StockReservationLine, StockReservationRelease
+)
+from app.modules.inventory.service import InventoryService
+
+
+stock = StockLevel.__table__
+
+
+async def _create_stock(engine, on_hand, reserved=0, location_id=None):
+    """Insert an active stock level and return (stock_id, item_id, location_id)."""
+    ids = (uuid.uuid4(), uuid.uuid4(), location_id or uuid.uuid4())
+    async with engine.begin() as conn:
+        await conn.execute(stock.insert().values(
+            id=ids[0], item_id=ids[1], location_id=ids[2], quantity_on_hand=str(on_hand),
+            quantity_available=str(on_hand - reserved), quantity_reserved=str(reserved), quantity_on_order="0",
+            minimum_level="0", maximum_level="0", reorder_point="0", is_active=True
+        ))
+    return ids
+
+
+async def _quantities(engine, stock_id):
+    async with engine.connect() as conn:
+        row = (await conn.execute(select(stock).where(stock.c.id == stock_id))).mappings().one()
+    return int(row["quantity_on_hand"]), int(row["quantity_available"]), int(row["quantity_reserved"])
+
+
+@pytest_asyncio.fixture
+async def stock_engine():
+    """In-memory database with the stock levels table."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: BaseModel.metadata.create_all(sync_conn, tables=[stock]))
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def shared_stock_engine(tmp_path):
+    """File database so that every session gets its own connection, as in production."""
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'stock.db'}", pool_size=20, connect_args={"timeout": 60}
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: BaseModel.metadata.create_all(sync_conn, tables=[stock]))
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestStockQuantityChanges:
+    """Reserve, release and adjust are single conditional UPDATEs."""
+
+    async def test_reserve_is_one_statement(self, stock_engine):
+        stock_id, _, _ = await _create_stock(stock_engine, 10)
+        statements = []
+        event.listen(
+            stock_engine.sync_engine, "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement.split()[0].upper())
+        )
+
+        async with AsyncSession(stock_engine) as session:
+            response = await InventoryService(session).reserve_stock(stock_id, StockReservation(quantity=4), "clerk")
+
+        assert (response.quantity_available, response.quantity_reserved) == ("6", "4")
+        assert statements == ["UPDATE"]
+        assert await _quantities(stock_engine, stock_id) == (10, 6, 4)
+
+    async def test_refused_changes_leave_stock_untouched(self, stock_engine):
+        stock_id, item_id, _ = await _create_stock(stock_engine, 5, reserved=2)
+
+        async with AsyncSession(stock_engine) as session:
+            service = InventoryService(session)
+            with pytest.raises(InsufficientStockException) as excinfo:
+                await service.reserve_stock(stock_id, StockReservation(quantity=4))
+            with pytest.raises(ValidationError):
+                await service.release_stock_reservation(stock_id, StockReservationRelease(quantity=3))
+            with pytest.raises(ValidationError):
+                await service.adjust_stock(stock_id, StockAdjustment(adjustment=-6))
+            with pytest.raises(NotFoundError):
+                await service.reserve_stock(uuid.uuid4(), StockReservation(quantity=1))
+
+        assert excinfo.value.details == {"item_id": str(item_id), "requested_quantity": 4, "available_quantity": 3}
+        assert await _quantities(stock_engine, stock_id) == (5, 3, 2)
+
+    async def test_release_and_adjust(self, stock_engine):
+        stock_id, _, _ = await _create_stock(stock_engine, 5, reserved=2)
+
+        async with AsyncSession(stock_engine) as session:
+            service = InventoryService(session)
+            await service.release_stock_reservation(stock_id, StockReservationRelease(quantity=2))
+            await service.reserve_stock(stock_id, StockReservation(quantity=3))
+            response = await service.adjust_stock(stock_id, StockAdjustment(adjustment=-4))
+
+        # Available never goes below zero when stock on hand drops under the reservations
+        assert (response.quantity_on_hand, response.quantity_available) == ("1", "0")
+        assert await _quantities(stock_engine, stock_id) == (1, 0, 3)
+
+    async def test_batch_is_all_or_nothing(self, stock_engine):
+        location_id = uuid.uuid4()
+        first = await _create_stock(stock_engine, 5, location_id=location_id)
+        second = await _create_stock(stock_engine, 1, location_id=location_id)
+
+        async with AsyncSession(stock_engine) as session:
+            service = InventoryService(session)
+            with pytest.raises(InsufficientStockException):
+                await service.reserve_stock_batch(StockBatchReservation(lines=[
+                    StockReservationLine(item_id=first[1], location_id=location_id, quantity=2),
+                    StockReservationLine(item_id=second[1], location_id=location_id, quantity=1),
+                    StockReservationLine(item_id=second[1], location_id=location_id, quantity=1),
+                ]))
+            reserved = await service.reserve_stock_batch(StockBatchReservation(lines=[
+                StockReservationLine(item_id=second[1], location_id=location_id, quantity=1),
+                StockReservationLine(item_id=first[1], location_id=location_id, quantity=2),
+            ]))
+
+        assert [response.item_id for response in reserved] == sorted([first[1], second[1]], key=str)
+        assert await _quantities(stock_engine, first[0]) == (5, 3, 2)
+        assert await _quantities(stock_engine, second[0]) == (1, 0, 1)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestConcurrentReservations:
+    """Many sessions reserving the same stock at once never oversell it."""
+
+    async def test_single_item_is_never_oversold(self, shared_stock_engine):
+        stock_id, _, _ = await _create_stock(shared_stock_engine, 25)
+
+        async def reserve():
+            async with AsyncSession(shared_stock_engine) as session:
+                try:
+                    await InventoryService(session).reserve_stock(stock_id, StockReservation(quantity=1))
+                    return True
+                except InsufficientStockException:
+                    return False
+
+        results = await asyncio.gather(*[reserve() for _ in range(200)])
+
+        assert results.count(True) == 25
+        assert await _quantities(shared_stock_engine, stock_id) == (25, 0, 25)
+
+    async def test_overlapping_batches_never_oversell_or_deadlock(self, shared_stock_engine):
+        location_id = uuid.uuid4()
+        stocks = [await _create_stock(shared_stock_engine, 30, location_id=location_id) for _ in range(3)]
+        rng = random.Random(7)
+
+        async def order():
+            # Each order wants one of every item, listed in a random order
+            lines = [
+                StockReservationLine(item_id=item_id, location_id=location_id, quantity=1)
+                for _, item_id, _ in rng.sample(stocks, len(stocks))
+            ]
+            async with AsyncSession(shared_stock_engine) as session:
+                try:
+                    await InventoryService(session).reserve_stock_batch(StockBatchReservation(lines=lines))
+                    return True
+                except InsufficientStockException:
+                    return False
+
+        results = await asyncio.wait_for(asyncio.gather(*[order() for _ in range(100)]), timeout=120)
+
+        assert results.count(True) == 30
+        for stock_id, _, _ in stocks:
+            assert await _quantities(shared_stock_engine, stock_id) == (30, 0, 30)
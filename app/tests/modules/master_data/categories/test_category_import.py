@@ -0,0 +1,160 @@
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.base import BaseModel
+from app.modules.inventory.models import Item
+from app.modules.master_data.categories.models import Category
+from app.modules.master_data.categories.repository import CategoryRepository
+from app.modules.master_data.categories.schemas import CategoryImport
+from app.modules.master_data.categories.service import CategoryService
+
+
+categories = Category.__table__
+
+
+@pytest_asyncio.fixture
+async def import_engine():
+    """In-memory database holding Electronics (a leaf) and an inactive Archive."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda sync_conn: BaseModel.metadata.create_all(sync_conn, tables=[categories, Item.__table__])
+        )
+        now = datetime(2024, 1, 1)
+        for name, is_active in (("Electronics", True), ("Archive", False)):
+            await conn.execute(categories.insert().values(
+                id=uuid.uuid4(), name=name, category_path=name, category_level=1, display_order=0,
+                is_leaf=True, is_active=is_active, created_at=now, updated_at=now
+            ))
+    yield engine
+    await engine.dispose()
+
+
+async def _rows(engine):
+    async with engine.connect() as conn:
+        result = await conn.execute(select(categories))
+        return {row["category_path"]: dict(row) for row in result.mappings()}
+
+
+def _import(name, parent=None, **values):
+    return CategoryImport(name=name, parent_category_path=parent, **values)
+
+
+@pytest.mark.unit
+class TestBulkCategoryImport:
+    """Bulk import with in-memory parent resolution."""
+
+    @pytest.mark.asyncio
+    async def test_children_before_parents_resolve(self, import_engine):
+        async with AsyncSession(import_engine) as session:
+            result = await CategoryService(CategoryRepository(session)).import_categories([
+                _import("Laptops", "Electronics/Computers"),
+                _import("Gaming", "Electronics/Computers/Laptops", display_order=3),
+                _import("Computers", "Electronics"),
+                _import("Garden"),
+            ], created_by="importer")
+
+        rows = await _rows(import_engine)
+        assert (result.successful_imports, result.failed_imports, result.skipped_imports) == (4, 0, 0)
+        gaming = rows["Electronics/Computers/Laptops/Gaming"]
+        assert gaming["category_level"] == 4
+        assert gaming["display_order"] == 3
+        assert gaming["parent_category_id"] == rows["Electronics/Computers/Laptops"]["id"]
+        assert gaming["created_by"] == "importer"
+        assert not rows["Electronics"]["is_leaf"]
+        assert not rows["Electronics/Computers"]["is_leaf"]
+        assert gaming["is_leaf"] and rows["Garden"]["is_leaf"]
+
+    @pytest.mark.asyncio
+    async def test_errors_and_duplicates_do_not_abort_batch(self, import_engine):
+        long_name = "y" * 100
+        chain = ["Electronics/" + "/".join([long_name] * depth) for depth in range(5)]
+        async with AsyncSession(import_engine) as session:
+            result = await CategoryService(CategoryRepository(session)).import_categories([
+                _import("Electronics"),
+                _import("Phones", "Electronics"),
+                _import("Phones", "Electronics"),
+                _import("Sofas", "Furniture"),
+                *[_import(long_name, parent.rstrip("/")) for parent in reversed(chain)],
+                _import("Old", "Archive", is_active=False),
+            ])
+
+        rows = await _rows(import_engine)
+        assert result.total_processed == 10
+        assert result.successful_imports == 6
+        assert result.skipped_imports == 2
+        assert [error["row"] for error in result.errors] == [4, 5]
+        assert "Furniture" in result.errors[0]["error"]
+        assert "500" in result.errors[1]["error"]
+        assert not rows["Archive/Old"]["is_active"]
+        assert "Furniture/Sofas" not in rows
+
+    @pytest.mark.asyncio
+    async def test_rows_rejected_by_database_are_isolated(self, import_engine):
+        async with import_engine.begin() as conn:
+            electronics = (await conn.execute(
+                select(categories.c.id).where(categories.c.category_path == "Electronics")
+            )).scalar()
+            # Inconsistent legacy row: same name and parent, different path
+            await conn.execute(categories.insert().values(
+                id=uuid.uuid4(), name="Cameras", parent_category_id=electronics, category_path="Legacy/Cameras",
+                category_level=2, display_order=0, is_leaf=True, is_active=True,
+                created_at=datetime(2024, 1, 1), updated_at=datetime(2024, 1, 1)
+            ))
+
+        async with AsyncSession(import_engine) as session:
+            result = await CategoryService(CategoryRepository(session)).import_categories([
+                _import("Cameras", "Electronics"),
+                _import("Lenses", "Electronics/Cameras"),
+                _import("Audio", "Electronics"),
+            ])
+
+        rows = await _rows(import_engine)
+        assert result.successful_imports == 1
+        assert [error["row"] for error in result.errors] == [1, 2]
+        assert "Electronics/Audio" in rows
+
+    @pytest.mark.asyncio
+    async def test_one_insert_per_depth(self, import_engine):
+        statements = []
+        event.listen(
+            import_engine.sync_engine, "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement.split()[0].upper())
+        )
+        import_data = [_import(f"Group {g}", "Electronics") for g in range(20)] + [
+            _import(f"Item {i}", f"Electronics/Group {i % 20}") for i in range(400)
+        ]
+        async with AsyncSession(import_engine) as session:
+            result = await CategoryService(CategoryRepository(session)).import_categories(import_data)
+
+        assert result.successful_imports == 420
+        assert statements.count("INSERT") == 2
+        assert statements.count("SELECT") == 1
+        assert statements.count("UPDATE") == 1
+
+
+@pytest.mark.unit
+class TestStreamingCategoryExport:
+    """Export streamed from a server-side cursor."""
+
+    @pytest.mark.asyncio
+    async def test_export_is_parents_first_json(self, import_engine):
+        async with AsyncSession(import_engine) as session:
+            service = CategoryService(CategoryRepository(session))
+            await service.import_categories([_import("Computers", "Electronics"), _import("Laptops", "Electronics/Computers")])
+
+            active = json.loads(b"".join([chunk async for chunk in service.stream_export_json(batch_size=2)]))
+            everything = await service.export_categories(include_inactive=True)
+
+        assert [row["category_path"] for row in active] == [
+            "Electronics", "Electronics/Computers", "Electronics/Computers/Laptops"
+        ]
+        assert active[0]["child_count"] == 1
+        assert active[0]["item_count"] == 0
+        assert len(everything) == 4
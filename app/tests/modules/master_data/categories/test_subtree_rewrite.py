@@ -0,0 +1,135 @@
+import uuid
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.base import BaseModel
+from app.modules.master_data.categories.models import Category
+from app.modules.master_data.categories.repository import CategoryRepository
+
+
+categories = Category.__table__
+
+
+@pytest_asyncio.fixture
+async def subtree_engine():
+    """In-memory database with a small category tree."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: BaseModel.metadata.create_all(sync_conn, tables=[categories]))
+        ids = {}
+        for path in [
+            "Electronics", "Electronics/Computers", "Electronics/Computers/Laptops",
+            "Electronics/Computers/Laptops/Gaming", "Electronics/Phones",
+            "Electronics2", "Electronics2/Cables", "Furniture", "50%_Off", "50%_Off/Clearance", "50X_Off",
+        ]:
+            *parent, name = path.split("/")
+            ids[path] = uuid.uuid4()
+            await conn.execute(categories.insert().values(
+                id=ids[path], name=name, category_path=path, category_level=path.count("/") + 1,
+                parent_category_id=ids["/".join(parent)] if parent else None,
+                display_order=0, is_leaf=False, is_active=True,
+                created_at=datetime(2024, 1, 1), updated_at=datetime(2024, 1, 1)
+            ))
+    yield engine, ids
+    await engine.dispose()
+
+
+async def _paths(engine):
+    async with engine.connect() as conn:
+        result = await conn.execute(select(categories.c.category_path, categories.c.category_level))
+        return dict(result.all())
+
+
+@pytest.mark.unit
+class TestSubtreeRewrite:
+    """Set-based subtree rename and move."""
+
+    @pytest.mark.asyncio
+    async def test_rename_rewrites_descendant_prefixes_only(self, subtree_engine):
+        engine, ids = subtree_engine
+        async with AsyncSession(engine) as session:
+            rewritten = await CategoryRepository(session).rewrite_subtree_paths(
+                ids["Electronics"], new_path="Devices", new_level=1, values={"name": "Devices"}
+            )
+
+        paths = await _paths(engine)
+        assert rewritten == 4
+        assert paths["Devices"] == 1
+        assert paths["Devices/Computers/Laptops/Gaming"] == 4
+        assert paths["Devices/Phones"] == 2
+        assert "Electronics2/Cables" in paths
+        assert not any(path.startswith("Electronics/") for path in paths)
+
+    @pytest.mark.asyncio
+    async def test_move_shifts_levels(self, subtree_engine):
+        engine, ids = subtree_engine
+        furniture = ids["Furniture"]
+        async with AsyncSession(engine) as session:
+            await CategoryRepository(session).rewrite_subtree_paths(
+                ids["Electronics/Computers"],
+                new_path="Furniture/Computers", new_level=2,
+                values={"parent_category_id": furniture}
+            )
+            parent = (await session.execute(
+                select(categories.c.parent_category_id).where(categories.c.id == ids["Electronics/Computers"])
+            )).scalar()
+
+        paths = await _paths(engine)
+        assert parent == furniture
+        assert paths["Furniture/Computers/Laptops/Gaming"] == 4
+        assert "Electronics/Computers" not in paths
+        assert paths["Electronics/Phones"] == 2
+
+        async with AsyncSession(engine) as session:
+            await CategoryRepository(session).rewrite_subtree_paths(
+                ids["Electronics/Computers/Laptops"], new_path="Laptops", new_level=1,
+                values={"parent_category_id": None}
+            )
+        paths = await _paths(engine)
+        assert paths["Laptops"] == 1
+        assert paths["Laptops/Gaming"] == 2
+
+    @pytest.mark.asyncio
+    async def test_like_wildcards_in_paths_are_escaped(self, subtree_engine):
+        engine, ids = subtree_engine
+        async with AsyncSession(engine) as session:
+            rewritten = await CategoryRepository(session).rewrite_subtree_paths(
+                ids["50%_Off"], new_path="Sale", new_level=1, values={"name": "Sale"}
+            )
+
+        paths = await _paths(engine)
+        assert rewritten == 1
+        assert "Sale/Clearance" in paths
+        assert "50X_Off" in paths
+
+    @pytest.mark.asyncio
+    async def test_statement_count_is_independent_of_subtree_size(self, subtree_engine):
+        engine, ids = subtree_engine
+        statements = []
+        event.listen(
+            engine.sync_engine, "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement.split()[0].upper())
+        )
+        async with AsyncSession(engine) as session:
+            await CategoryRepository(session).rewrite_subtree_paths(
+                ids["Electronics"], new_path="Devices", new_level=1, values={"name": "Devices"}
+            )
+
+        assert statements.count("UPDATE") == 2
+
+    @pytest.mark.asyncio
+    async def test_overlong_paths_roll_back(self, subtree_engine):
+        engine, ids = subtree_engine
+        async with AsyncSession(engine) as session:
+            with pytest.raises(ValueError):
+                await CategoryRepository(session).rewrite_subtree_paths(
+                    ids["Electronics"], new_path="x" * 480, new_level=1
+                )
+            assert await CategoryRepository(session).rewrite_subtree_paths(uuid.uuid4(), "Nope", 1) is None
+
+        paths = await _paths(engine)
+        assert "Electronics/Computers/Laptops/Gaming" in paths
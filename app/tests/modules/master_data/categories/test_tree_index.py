@@ -0,0 +1,162 @@
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.errors import NotFoundError
+from app.db.base import BaseModel
+from app.modules.inventory.models import Item
+from app.modules.master_data.categories.models import Category
+from app.modules.master_data.categories.repository import CategoryRepository
+from app.modules.master_data.categories.service import CategoryService
+from app.modules.master_data.categories.tree_index import CategoryIndexCache, CategoryTreeIndex, category_index
+
+
+def _node(name, parent=None, display_order=0, is_active=True, item_count=0):
+    path = f"{parent['category_path']}/{name}" if parent else name
+    return {
+        "id": uuid.uuid4(),
+        "name": name,
+        "category_path": path,
+        "category_level": path.count("/") + 1,
+        "parent_category_id": parent["id"] if parent else None,
+        "display_order": display_order,
+        "is_leaf": True,
+        "is_active": is_active,
+        "item_count": item_count,
+    }
+
+
+def _catalogue():
+    """Electronics > (Computers > Laptops, Phones), Furniture (inactive) > Chairs."""
+    electronics = _node("Electronics", display_order=1)
+    computers = _node("Computers", electronics, display_order=2)
+    laptops = _node("Laptops", computers, item_count=3)
+    phones = _node("Phones", electronics, display_order=1)
+    furniture = _node("Furniture", display_order=2, is_active=False)
+    chairs = _node("Chairs", furniture)
+    return {node["name"]: node for node in (electronics, computers, laptops, phones, furniture, chairs)}
+
+
+@pytest.mark.unit
+class TestCategoryTreeIndex:
+    """Euler-tour numbering and tree queries."""
+
+    def test_subtree_is_an_interval(self):
+        nodes = _catalogue()
+        index = CategoryTreeIndex(nodes.values())
+
+        electronics, laptops = nodes["Electronics"]["id"], nodes["Laptops"]["id"]
+        assert index.is_descendant(laptops, electronics)
+        assert not index.is_descendant(electronics, laptops)
+        assert not index.is_descendant(electronics, electronics)
+        assert not index.is_descendant(nodes["Chairs"]["id"], electronics)
+        assert index.tin[electronics] <= index.tin[laptops] <= index.tout[electronics]
+
+    def test_ancestors_descendants_and_siblings(self):
+        nodes = _catalogue()
+        index = CategoryTreeIndex(nodes.values())
+
+        assert [n["name"] for n in index.ancestors(nodes["Laptops"]["id"])] == ["Electronics", "Computers"]
+        assert [n["name"] for n in index.descendants(nodes["Electronics"]["id"])] == ["Phones", "Computers", "Laptops"]
+        assert [n["name"] for n in index.descendants(nodes["Furniture"]["id"])] == ["Chairs"]
+        assert [n["name"] for n in index.siblings(nodes["Phones"]["id"])] == ["Computers"]
+        assert index.get(nodes["Electronics"]["id"])["child_count"] == 2
+
+    def test_tree_orders_children_and_promotes_orphans_of_hidden_parents(self):
+        nodes = _catalogue()
+        index = CategoryTreeIndex(nodes.values())
+
+        tree = index.tree()
+        assert [root["name"] for root in tree] == ["Chairs", "Electronics"]
+        assert [child["name"] for child in tree[1]["children"]] == ["Phones", "Computers"]
+
+        full = index.tree(include_inactive=True)
+        assert [root["name"] for root in full] == ["Electronics", "Furniture"]
+
+        subtree = index.tree(nodes["Computers"]["id"])
+        assert [root["name"] for root in subtree] == ["Computers"]
+        assert subtree[0]["children"][0]["item_count"] == 3
+        assert index.tree(uuid.uuid4()) == []
+
+    def test_tree_json_is_memoised(self):
+        index = CategoryTreeIndex(_catalogue().values())
+
+        first = index.tree_json()
+        assert index.tree_json() is first
+        assert [root["name"] for root in json.loads(first)] == ["Chairs", "Electronics"]
+
+    def test_deep_chain_does_not_recurse(self):
+        parent = None
+        rows = []
+        for depth in range(5000):
+            parent = _node(f"c{depth}", parent)
+            parent["category_path"] = f"c{depth}"
+            rows.append(parent)
+        index = CategoryTreeIndex(rows)
+
+        assert len(index.descendants(rows[0]["id"])) == 4999
+        assert len(index.ancestors(rows[-1]["id"])) == 4999
+
+
+@pytest_asyncio.fixture
+async def category_engine():
+    """In-memory database with the category and item tables."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda sync_conn: BaseModel.metadata.create_all(sync_conn, tables=[Category.__table__, Item.__table__])
+        )
+        now = datetime(2024, 1, 1)
+        for node in _catalogue().values():
+            row = {key: value for key, value in node.items() if key != "item_count"}
+            await conn.execute(Category.__table__.insert().values(**row, created_at=now, updated_at=now))
+    category_index.invalidate()
+    yield engine
+    category_index.invalidate()
+    await engine.dispose()
+
+
+@pytest.mark.unit
+class TestCategoryIndexCache:
+    """Building and invalidating the process-wide index."""
+
+    @pytest.mark.asyncio
+    async def test_built_once_until_invalidated(self, category_engine):
+        statements = []
+        event.listen(category_engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(1))
+        cache = CategoryIndexCache(ttl=3600)
+
+        async with AsyncSession(category_engine) as session:
+            first = await cache.get(session)
+            assert await cache.get(session) is first
+            assert len(statements) == 1
+
+            cache.invalidate()
+            assert await cache.get(session) is not first
+            assert len(statements) == 2
+
+        assert len(first) == 6
+
+    @pytest.mark.asyncio
+    async def test_service_serves_tree_and_breadcrumb_from_index(self, category_engine):
+        async with AsyncSession(category_engine) as session:
+            service = CategoryService(CategoryRepository(session))
+            index = await category_index.get(session)
+            laptops_id = next(node["id"] for node in index.nodes.values() if node["name"] == "Laptops")
+
+            tree = json.loads(await service.get_category_tree_json())
+            breadcrumb = await service.get_category_breadcrumb(laptops_id)
+            hierarchy = await service.get_category_hierarchy(laptops_id)
+
+            with pytest.raises(NotFoundError):
+                await service.get_category_breadcrumb(uuid.uuid4())
+
+        assert [root["name"] for root in tree] == ["Chairs", "Electronics"]
+        assert [summary.name for summary in breadcrumb] == ["Electronics", "Computers", "Laptops"]
+        assert [summary.name for summary in hierarchy.path_to_root] == ["Electronics", "Computers", "Laptops"]
+        assert hierarchy.depth == 3
@@ -0,0 +1,237 @@
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.base import BaseModel
+from app.modules.analytics.rollups import ROLLUPS
+from app.modules.inventory.models import InventoryUnit, Item
+from app.modules.rentals import service as rental_service_module
+from app.modules.rentals.availability import ItemSchedule, RentalAvailabilityIndex
+from app.modules.rentals.schemas import AvailabilityCalendarRequest, AvailabilitySearch
+from app.modules.rentals.service import RentalService
+from app.modules.transactions import service as transaction_service_module
+from app.modules.transactions.models import LineItemType, TransactionHeader, TransactionLine
+from app.modules.transactions.schemas import TransactionLineCreate
+from app.modules.transactions.service import TransactionService
+
+
+HEADERS = TransactionHeader.__table__
+LINES = TransactionLine.__table__
+ITEMS = Item.__table__
+UNITS = InventoryUnit.__table__
+DAILY = ROLLUPS["daily_location"].table
+
+
+def _day(day):
+    return date(2030, 1, day)
+
+
+@pytest.fixture
+def index(monkeypatch):
+    """A fresh availability index shared by the rental and transaction services."""
+    index = RentalAvailabilityIndex(ttl=60, max_items=100)
+    monkeypatch.setattr(rental_service_module, "rental_availability", index)
+    monkeypatch.setattr(transaction_service_module, "rental_availability", index)
+    return index
+
+
+@pytest_asyncio.fixture
+async def rental_engine():
+    """In-memory database with one camera item: two bookable units and one in maintenance."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    ids = {"item": uuid.uuid4(), "units": [uuid.uuid4(), uuid.uuid4()], "broken": uuid.uuid4()}
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda sync_conn: BaseModel.metadata.create_all(sync_conn, tables=[HEADERS, LINES, ITEMS, UNITS, DAILY])
+        )
+        await conn.execute(ITEMS.insert().values(
+            id=ids["item"], item_code="CAM-1", item_name="Camera", item_type="RENTAL"
+        ))
+        for number, (unit_id, unit_status) in enumerate(
+            [(ids["units"][0], "AVAILABLE"), (ids["units"][1], "RENTED"), (ids["broken"], "MAINTENANCE")]
+        ):
+            await conn.execute(UNITS.insert().values(
+                id=unit_id, item_id=ids["item"], location_id=uuid.uuid4(), unit_code=f"CAM-1-{number}",
+                status=unit_status
+            ))
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(1))
+    yield engine, ids, statements
+    await engine.dispose()
+
+
+async def _rental(engine, status="CONFIRMED", start=None, end=None):
+    transaction_id = uuid.uuid4()
+    async with engine.begin() as conn:
+        await conn.execute(HEADERS.insert().values(
+            id=transaction_id, transaction_number=f"TX-{transaction_id.hex[:8]}", transaction_type="RENTAL",
+            transaction_date=datetime(2030, 1, 1), customer_id=uuid.uuid4(), location_id=uuid.uuid4(),
+            status=status, payment_status="PENDING", subtotal=0, discount_amount=0, tax_amount=0,
+            total_amount=0, paid_amount=0, deposit_amount=0, rental_start_date=start, rental_end_date=end,
+            is_active=True
+        ))
+    return transaction_id
+
+
+def _booking(item_id, unit_id=None, start=None, end=None, quantity="1"):
+    return TransactionLineCreate(
+        line_number=1, line_type=LineItemType.PRODUCT, description="Camera rental", item_id=item_id,
+        inventory_unit_id=unit_id, quantity=Decimal(quantity), unit_price=Decimal("20.00"),
+        rental_start_date=start, rental_end_date=end
+    )
+
+
+@pytest.mark.unit
+class TestItemSchedule:
+    """Interval lookups on one item's bookings."""
+
+    def test_unit_periods_are_inclusive(self):
+        unit = uuid.uuid4()
+        schedule = ItemSchedule([unit], {unit: [(_day(10), _day(12)), (_day(13), _day(14))]}, [])
+
+        assert schedule.unit_busy[unit] == ([_day(10)], [_day(14)])
+        assert schedule.unit_is_free(unit, _day(1), _day(9))
+        assert not schedule.unit_is_free(unit, _day(5), _day(10))
+        assert not schedule.unit_is_free(unit, _day(14), _day(20))
+        assert schedule.unit_is_free(unit, _day(15), _day(20))
+
+    def test_peak_demand_over_a_range(self):
+        schedule = ItemSchedule([], {}, [(_day(1), _day(5), 1), (_day(3), _day(8), 2), (_day(7), _day(9), 1)])
+
+        assert schedule.peak_demand(_day(1), _day(2)) == 1
+        assert schedule.peak_demand(_day(4), _day(4)) == 3
+        assert schedule.peak_demand(_day(6), _day(6)) == 2
+        assert schedule.peak_demand(_day(2), _day(9)) == 3
+        assert schedule.peak_demand(_day(10), _day(20)) == 0
+
+    def test_daily_available(self):
+        units = [uuid.uuid4(), uuid.uuid4(), uuid.uuid4()]
+        schedule = ItemSchedule(
+            units, {units[0]: [(_day(2), _day(3))], units[1]: [(_day(1), _day(10))]}, [(_day(3), _day(4), 1)]
+        )
+
+        assert schedule.daily_available(_day(1), _day(5)) == [2, 1, 0, 1, 2]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestRentalAvailability:
+    """Availability search and calendars built from transaction lines."""
+
+    async def test_search_uses_bookings_and_bookable_units(self, rental_engine, index):
+        engine, ids, statements = rental_engine
+        first, second = ids["units"]
+        confirmed = await _rental(engine, start=_day(11), end=_day(15))
+        cancelled = await _rental(engine)
+        async with AsyncSession(engine) as session:
+            transactions = TransactionService(session)
+            await transactions.add_transaction_lines(confirmed, [
+                _booking(ids["item"], first, _day(10), _day(12)),
+                # No unit and no dates of its own: one camera for the header's period
+                _booking(ids["item"]),
+            ])
+            await transactions.add_transaction_lines(cancelled, [_booking(ids["item"], second, _day(1), _day(31))])
+        async with engine.begin() as conn:
+            await conn.execute(HEADERS.update().where(HEADERS.c.id == cancelled).values(status="CANCELLED"))
+
+        async with AsyncSession(engine) as session:
+            service = RentalService(session)
+            statements.clear()
+            busy = await service.search_availability(
+                AvailabilitySearch(item_id=ids["item"], start_date=_day(12), end_date=_day(13))
+            )
+            free = await service.search_availability(
+                AvailabilitySearch(item_id=ids["item"], start_date=_day(16), end_date=_day(20))
+            )
+
+        assert busy.total_units == 2
+        assert busy.available_unit_ids == [second]
+        assert busy.available_count == 0
+        assert sorted(free.available_unit_ids, key=str) == sorted(ids["units"], key=str)
+        assert free.available_count == 2
+        # Both searches were answered from one load of the item
+        assert len(statements) == 2
+
+    async def test_calendar_for_many_items_loads_them_together(self, rental_engine, index):
+        engine, ids, statements = rental_engine
+        transaction_id = await _rental(engine)
+        async with AsyncSession(engine) as session:
+            await TransactionService(session).add_transaction_lines(
+                transaction_id, [_booking(ids["item"], ids["units"][0], _day(2), _day(3))]
+            )
+
+        other_item = uuid.uuid4()
+        async with AsyncSession(engine) as session:
+            statements.clear()
+            calendars = await RentalService(session).get_availability_calendar(AvailabilityCalendarRequest(
+                item_ids=[ids["item"], other_item], start_date=_day(1), end_date=_day(4)
+            ))
+
+        assert len(statements) == 2
+        assert [calendar.item_id for calendar in calendars] == [ids["item"], other_item]
+        assert [day.available for day in calendars[0].days] == [2, 1, 1, 2]
+        assert calendars[1].total_units == 0 and [day.available for day in calendars[1].days] == [0] * 4
+
+    async def test_line_writes_refresh_the_item(self, rental_engine, index):
+        engine, ids, statements = rental_engine
+        transaction_id = await _rental(engine)
+        search = AvailabilitySearch(item_id=ids["item"], start_date=_day(5), end_date=_day(6))
+
+        async with AsyncSession(engine) as session:
+            rentals = RentalService(session)
+            transactions = TransactionService(session)
+            assert (await rentals.search_availability(search)).available_count == 2
+
+            line, = await transactions.add_transaction_lines(
+                transaction_id, [_booking(ids["item"], start=_day(1), end=_day(5), quantity="2")]
+            )
+            assert (await rentals.search_availability(search)).available_count == 0
+
+            await transactions.delete_transaction_line(line.id)
+            assert (await rentals.search_availability(search)).available_count == 2
+
+    async def test_transaction_writes_drop_only_the_items_they_book(self, rental_engine, index):
+        engine, ids, statements = rental_engine
+        transaction_id = await _rental(engine)
+        async with AsyncSession(engine) as session:
+            await TransactionService(session).add_transaction_lines(
+                transaction_id, [_booking(ids["item"], ids["units"][0], _day(2), _day(3))]
+            )
+            other_item = uuid.uuid4()
+            await index.get_many(session, [ids["item"], other_item])
+
+        index.invalidate_transaction(uuid.uuid4())
+        assert index.stats()["size"] == 2
+        index.invalidate_transaction(transaction_id)
+        assert [item_id for item_id, _ in index._schedules.items()] == [other_item]
+
+    async def test_returned_and_overdue_rentals(self, rental_engine, index):
+        engine, ids, statements = rental_engine
+        returned = await _rental(engine)
+        overdue = await _rental(engine)
+        async with AsyncSession(engine) as session:
+            transactions = TransactionService(session)
+            returned_line, = await transactions.add_transaction_lines(
+                returned, [_booking(ids["item"], ids["units"][0], _day(1), _day(31))]
+            )
+            await transactions.add_transaction_lines(
+                overdue, [_booking(ids["item"], ids["units"][1], date(2020, 1, 1), date(2020, 1, 5))]
+            )
+        async with engine.begin() as conn:
+            await conn.execute(LINES.update().where(LINES.c.id == returned_line.id).values(
+                return_date=_day(3), returned_quantity=1
+            ))
+            await conn.execute(HEADERS.update().where(HEADERS.c.id == overdue).values(status="IN_PROGRESS"))
+
+        async with AsyncSession(engine) as session:
+            result = await RentalService(session).search_availability(
+                AvailabilitySearch(item_id=ids["item"], start_date=date.today(), end_date=date.today())
+            )
+
+        # The overdue camera has not come back yet; the returned one is free
+        assert result.available_unit_ids == [ids["units"][0]]
@@ -0,0 +1,66 @@
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.base import BaseModel
+from app.modules.rentals.models import RentalReturn
+from app.modules.rentals.repository import RentalReturnRepository
+
+
+RETURNS = RentalReturn.__table__
+
+
+@pytest_asyncio.fixture
+async def returns_session():
+    """In-memory database with just the rental returns table."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: BaseModel.metadata.create_all(sync_conn, tables=[RETURNS]))
+    async with AsyncSession(engine) as session:
+        yield session
+    await engine.dispose()
+
+
+async def _add(session, status, return_type="FULL", late_fee="0", hours=0, day=date(2024, 1, 1)):
+    created_at = datetime(2024, 1, 1, 8)
+    await session.execute(RETURNS.insert().values(
+        id=uuid.uuid4(),
+        rental_transaction_id=uuid.uuid4(),
+        return_date=day,
+        return_type=return_type,
+        return_status=status,
+        return_location_id=uuid.uuid4(),
+        total_late_fee=Decimal(late_fee),
+        total_damage_fee=Decimal("0"),
+        total_deposit_release=Decimal("0"),
+        total_refund_amount=Decimal("0"),
+        created_at=created_at,
+        updated_at=created_at + timedelta(hours=hours),
+        is_active=True
+    ))
+
+
+@pytest.mark.unit
+class TestReturnSummary:
+    """Test the grouped rental return summary."""
+
+    async def test_grouped_summary(self, returns_session):
+        await _add(returns_session, "COMPLETED", late_fee="10.50", hours=2)
+        await _add(returns_session, "COMPLETED", "PARTIAL", hours=4)
+        await _add(returns_session, "PENDING")
+        await _add(returns_session, "INITIATED", late_fee="5")
+        await _add(returns_session, "CANCELLED", day=date(2024, 3, 1))
+
+        summary = await RentalReturnRepository(returns_session).get_return_summary(date_to=date(2024, 1, 31))
+
+        assert summary["total_returns"] == 4
+        assert summary["completed_returns"] == 2
+        assert summary["pending_returns"] == 2
+        assert summary["cancelled_returns"] == 0
+        assert summary["total_late_fees"] == Decimal("15.50")
+        assert summary["returns_by_type"]["PARTIAL"] == 1
+        assert summary["average_processing_time"] == pytest.approx(3.0)
@@ -0,0 +1,245 @@
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.errors import NotFoundError, ValidationError
+from app.db.base import BaseModel
+from app.modules.analytics.rollups import ROLLUPS, rebuild_rollups
+from app.modules.inventory.models import InventoryUnit, Item
+from app.modules.transactions.models import (
+    LineItemType, TransactionHeader, TransactionLine, compute_line_amounts
+)
+from app.modules.transactions.schemas import TransactionLineCreate, TransactionLinesCreate, TransactionLineUpdate
+from app.modules.transactions.service import TransactionService
+
+
+HEADERS = TransactionHeader.__table__
+LINES = TransactionLine.__table__
+ITEMS = Item.__table__
+UNITS = InventoryUnit.__table__
+DAILY = ROLLUPS["daily_location"].table
+
+
+@pytest_asyncio.fixture
+async def line_engine():
+    """In-memory database with one draft transaction, one item, one inventory unit and the daily rollup."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    ids = {"transaction": uuid.uuid4(), "item": uuid.uuid4(), "unit": uuid.uuid4()}
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda sync_conn: BaseModel.metadata.create_all(sync_conn, tables=[HEADERS, LINES, ITEMS, UNITS, DAILY])
+        )
+        await conn.execute(HEADERS.insert().values(
+            id=ids["transaction"], transaction_number="TX-1", transaction_type="RENTAL",
+            transaction_date=datetime(2024, 1, 1), customer_id=uuid.uuid4(), location_id=uuid.uuid4(),
+            status="DRAFT", payment_status="PENDING", subtotal=0, discount_amount=0, tax_amount=0,
+            total_amount=0, paid_amount=0, deposit_amount=0, is_active=True
+        ))
+        await conn.execute(ITEMS.insert().values(
+            id=ids["item"], item_code="ITEM-1", item_name="Camera", item_type="RENTAL"
+        ))
+        await conn.execute(UNITS.insert().values(
+            id=ids["unit"], item_id=ids["item"], location_id=uuid.uuid4(), unit_code="UNIT-1"
+        ))
+    statements = []
+    event.listen(
+        engine.sync_engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement.split()[0].upper())
+    )
+    yield engine, ids, statements
+    await engine.dispose()
+
+
+def _product(number, item_id, price="10.00", quantity="1", **values):
+    return TransactionLineCreate(
+        line_number=number, line_type=LineItemType.PRODUCT, description=f"Line {number}",
+        item_id=item_id, unit_price=Decimal(price), quantity=Decimal(quantity), **values
+    )
+
+
+def _line(number, line_type, price, **values):
+    return TransactionLineCreate(
+        line_number=number, line_type=line_type, description=f"Line {number}", unit_price=Decimal(price), **values
+    )
+
+
+async def _daily_rollup(engine):
+    async with engine.connect() as conn:
+        result = await conn.execute(select(DAILY).where(DAILY.c.transaction_count != 0))
+        return sorted(
+            (row["fact_date"], str(row["location_id"]), row["status"], row["transaction_count"], row["revenue"])
+            for row in result.mappings()
+        )
+
+
+async def _header(engine, transaction_id):
+    async with engine.connect() as conn:
+        result = await conn.execute(select(HEADERS).where(HEADERS.c.id == transaction_id))
+        return dict(result.mappings().one())
+
+
+@pytest.mark.unit
+class TestLineCalculations:
+    """Line amounts rounded to cents the way they are stored, and bulk input checks."""
+
+    def test_discount_and_tax(self):
+        discount, tax, total = compute_line_amounts(
+            "PRODUCT", Decimal("3"), Decimal("19.99"), Decimal("10"), Decimal("0"), Decimal("8.25"), Decimal("0")
+        )
+        assert (discount, tax, total) == (Decimal("6.00"), Decimal("4.45"), Decimal("58.43"))
+
+    def test_discount_lines_are_negative(self):
+        assert compute_line_amounts(
+            "DISCOUNT", Decimal("1"), Decimal("5"), Decimal("0"), Decimal("0"), Decimal("0"), Decimal("0")
+        )[2] == Decimal("-5.00")
+
+    def test_bulk_schema_rejects_duplicate_line_numbers(self):
+        item_id = uuid.uuid4()
+        with pytest.raises(ValueError):
+            TransactionLinesCreate(lines=[_product(1, item_id), _product(1, item_id)])
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestTransactionLineMutation:
+    """Single-commit line mutations with incremental header totals."""
+
+    async def test_bulk_add_is_one_round_of_statements(self, line_engine):
+        engine, ids, statements = line_engine
+        lines = [_product(i, ids["item"], price="12.50", inventory_unit_id=ids["unit"]) for i in range(1, 201)]
+        lines += [
+            _line(201, LineItemType.DISCOUNT, "25.00"),
+            _line(202, LineItemType.TAX, "100.00"),
+            _line(203, LineItemType.DEPOSIT, "300.00"),
+            _line(204, LineItemType.FEE, "7.00"),
+        ]
+
+        async with AsyncSession(engine) as session:
+            created = await TransactionService(session).add_transaction_lines(ids["transaction"], lines, "clerk")
+        executed = list(statements)
+
+        header = await _header(engine, ids["transaction"])
+        assert len(created) == 204
+        assert created[0].line_total == Decimal("12.50")
+        assert [line.line_number for line in created] == list(range(1, 205))
+        assert header["subtotal"] == Decimal("2500.00")
+        assert header["discount_amount"] == Decimal("25.00")
+        assert header["tax_amount"] == Decimal("100.00")
+        assert header["deposit_amount"] == Decimal("300.00")
+        assert header["total_amount"] == Decimal("2575.00")
+        # Lookups, the lines, the header totals and the daily revenue rollup
+        assert executed == ["SELECT", "INSERT", "UPDATE", "INSERT"]
+
+    async def test_single_add_matches_full_recalculation(self, line_engine):
+        engine, ids, statements = line_engine
+        async with AsyncSession(engine) as session:
+            service = TransactionService(session)
+            for number, price in enumerate(["19.99", "5.01", "0.10"], 1):
+                await service.add_transaction_line(
+                    ids["transaction"], _product(number, ids["item"], price=price, quantity="3", tax_rate=Decimal("8.25"))
+                )
+            incremental = await _header(engine, ids["transaction"])
+
+            await service._recalculate_transaction_totals(ids["transaction"])
+        recalculated = await _header(engine, ids["transaction"])
+
+        for field in ("subtotal", "discount_amount", "tax_amount", "deposit_amount", "total_amount"):
+            assert incremental[field] == recalculated[field]
+        assert incremental["subtotal"] == Decimal("81.51")
+
+    async def test_update_and_delete_shift_totals(self, line_engine):
+        engine, ids, statements = line_engine
+        async with AsyncSession(engine) as session:
+            service = TransactionService(session)
+            first, second = await service.add_transaction_lines(
+                ids["transaction"], [_product(1, ids["item"]), _line(2, LineItemType.DISCOUNT, "4.00")]
+            )
+            statements.clear()
+
+            updated = await service.update_transaction_line(
+                first.id, TransactionLineUpdate(quantity=Decimal("5"), discount_percentage=Decimal("10"))
+            )
+            assert updated.line_total == Decimal("45.00")
+            assert statements.count("UPDATE") == 2 and statements.count("SELECT") == 1
+
+            assert await service.delete_transaction_line(second.id)
+            assert await service.delete_transaction_line(second.id)
+
+        header = await _header(engine, ids["transaction"])
+        assert (header["subtotal"], header["discount_amount"], header["total_amount"]) == (
+            Decimal("45.00"), Decimal("0.00"), Decimal("45.00")
+        )
+
+    async def test_total_changes_keep_the_daily_rollup_current(self, line_engine):
+        engine, ids, statements = line_engine
+        async with engine.begin() as conn:
+            await conn.run_sync(rebuild_rollups, ["daily_location"])
+
+        async with AsyncSession(engine) as session:
+            service = TransactionService(session)
+            first, second, third = await service.add_transaction_lines(ids["transaction"], [
+                _product(1, ids["item"], price="30.00", quantity="2"),
+                _product(2, ids["item"], price="15.00"),
+                _line(3, LineItemType.DISCOUNT, "5.00"),
+            ])
+            await service.update_transaction_line(first.id, TransactionLineUpdate(quantity=Decimal("3")))
+            await service.delete_transaction_line(second.id)
+            await service.add_transaction_line(ids["transaction"], _product(4, ids["item"], price="2.50"))
+            await service._recalculate_transaction_totals(ids["transaction"])
+        maintained = await _daily_rollup(engine)
+
+        async with engine.begin() as conn:
+            await conn.run_sync(rebuild_rollups, ["daily_location"])
+        assert maintained == await _daily_rollup(engine)
+        assert [row[4] for row in maintained] == [Decimal("87.50")]
+
+    async def test_missing_references_write_nothing(self, line_engine):
+        engine, ids, statements = line_engine
+        async with AsyncSession(engine) as session:
+            service = TransactionService(session)
+            with pytest.raises(NotFoundError):
+                await service.add_transaction_lines(
+                    ids["transaction"], [_product(1, ids["item"]), _product(2, uuid.uuid4())]
+                )
+            with pytest.raises(NotFoundError):
+                await service.add_transaction_lines(
+                    ids["transaction"], [_product(1, ids["item"], inventory_unit_id=uuid.uuid4())]
+                )
+            with pytest.raises(NotFoundError):
+                await service.add_transaction_lines(uuid.uuid4(), [_product(1, ids["item"])])
+
+        async with engine.connect() as conn:
+            assert (await conn.execute(select(LINES))).first() is None
+        assert "INSERT" not in statements
+
+    async def test_locked_transaction_rejects_lines(self, line_engine):
+        engine, ids, statements = line_engine
+        async with engine.begin() as conn:
+            await conn.execute(HEADERS.update().values(status="COMPLETED"))
+
+        async with AsyncSession(engine) as session:
+            with pytest.raises(ValidationError):
+                await TransactionService(session).add_transaction_lines(ids["transaction"], [_product(1, ids["item"])])
+
+    async def test_status_change_between_check_and_write_rolls_back(self, line_engine):
+        engine, ids, statements = line_engine
+        async with AsyncSession(engine) as session:
+            service = TransactionService(session)
+            find_references = service.line_repository.find_references
+
+            async def complete_after_check(*args):
+                found = await find_references(*args)
+                await session.execute(HEADERS.update().values(status="CANCELLED"))
+                return found
+
+            service.line_repository.find_references = complete_after_check
+            with pytest.raises(ValidationError):
+                await service.add_transaction_lines(ids["transaction"], [_product(1, ids["item"])])
+
+        async with engine.connect() as conn:
+            assert (await conn.execute(select(LINES))).first() is None
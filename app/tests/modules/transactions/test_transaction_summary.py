@@ -0,0 +1,155 @@
+import asyncio
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.base import BaseModel
+from app.modules.transactions.models import TransactionHeader, transaction_daily_summary_table
+from app.modules.transactions.repository import TransactionHeaderRepository
+
+
+HEADERS = TransactionHeader.__table__
+
+
+@pytest_asyncio.fixture
+async def summary_session():
+    """In-memory database with transaction headers and the daily rollup."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda sync_conn: BaseModel.metadata.create_all(
+                sync_conn, tables=[HEADERS, transaction_daily_summary_table]
+            )
+        )
+    async with AsyncSession(engine) as session:
+        yield session
+    await engine.dispose()
+
+
+async def _add(session, day, transaction_type="SALE", status="COMPLETED", payment_status="PAID",
+               total="100.00", paid="100.00", is_active=True):
+    transaction_id = uuid.uuid4()
+    await session.execute(HEADERS.insert().values(
+        id=transaction_id,
+        transaction_number=f"TX-{transaction_id.hex[:8]}",
+        transaction_type=transaction_type,
+        transaction_date=datetime.combine(day, datetime.min.time()) + timedelta(hours=10),
+        customer_id=uuid.uuid4(),
+        location_id=uuid.uuid4(),
+        status=status,
+        payment_status=payment_status,
+        subtotal=Decimal(total),
+        discount_amount=Decimal("0"),
+        tax_amount=Decimal("0"),
+        total_amount=Decimal(total),
+        paid_amount=Decimal(paid),
+        deposit_amount=Decimal("0"),
+        is_active=is_active
+    ))
+    return transaction_id
+
+
+async def _seed(session):
+    await _add(session, date(2024, 1, 1))
+    await _add(session, date(2024, 1, 1), "RENTAL", "IN_PROGRESS", "PARTIAL", "250.00", "50.00")
+    await _add(session, date(2024, 1, 2), "RENTAL", "PENDING", "PENDING", "80.00", "0.00")
+    await _add(session, date(2024, 1, 3), is_active=False)
+    await _add(session, date(2024, 2, 1), total="10.00", paid="10.00")
+
+
+@pytest.mark.unit
+class TestTransactionSummary:
+    """Test the grouped transaction summary and its daily rollup."""
+
+    async def test_grouped_summary(self, summary_session):
+        await _seed(summary_session)
+        repository = TransactionHeaderRepository(summary_session)
+
+        summary = await repository.get_transaction_summary(date_from=date(2024, 1, 1), date_to=date(2024, 1, 31))
+
+        assert summary["total_transactions"] == 3
+        assert summary["total_amount"] == Decimal("430.00")
+        assert summary["total_paid"] == Decimal("150.00")
+        assert summary["total_outstanding"] == Decimal("280.00")
+        assert summary["transactions_by_type"]["RENTAL"] == 2
+        assert summary["transactions_by_type"]["REFUND"] == 0
+        assert summary["transactions_by_status"]["COMPLETED"] == 1
+        assert summary["transactions_by_payment_status"]["PARTIAL"] == 1
+
+    async def test_rollup_matches_raw_summary(self, summary_session):
+        await _seed(summary_session)
+        repository = TransactionHeaderRepository(summary_session)
+
+        for kwargs in ({}, {"date_from": date(2024, 1, 2)}, {"active_only": False}):
+            raw = await repository.get_transaction_summary(**kwargs)
+            rolled_up = await repository.get_transaction_summary(use_rollup=True, **kwargs)
+            assert rolled_up == raw
+
+    async def test_rollup_picks_up_changed_days(self, summary_session):
+        await _seed(summary_session)
+        repository = TransactionHeaderRepository(summary_session)
+        await repository.get_transaction_summary(use_rollup=True)
+
+        await _add(summary_session, date(2024, 1, 2), total="5.00", paid="0.00")
+        await summary_session.execute(
+            update(HEADERS).where(HEADERS.c.status == "PENDING").values(status="CANCELLED", updated_at=datetime.utcnow())
+        )
+        summary = await repository.get_transaction_summary(use_rollup=True)
+
+        assert summary == await repository.get_transaction_summary()
+        assert summary["transactions_by_status"]["CANCELLED"] == 1
+        assert summary["total_transactions"] == 5
+
+    async def test_moved_transaction_leaves_its_old_day(self, summary_session):
+        moved = await _add(summary_session, date(2024, 1, 1))
+        await _add(summary_session, date(2024, 1, 2))
+        repository = TransactionHeaderRepository(summary_session)
+        await repository.get_transaction_summary(use_rollup=True)
+
+        await summary_session.execute(update(HEADERS).where(HEADERS.c.id == moved).values(
+            transaction_date=datetime(2024, 1, 2, 10), updated_at=datetime.utcnow()
+        ))
+        await repository.refresh_summary_days([date(2024, 1, 1)])
+
+        summary = await repository.get_transaction_summary(use_rollup=True, date_to=date(2024, 1, 1))
+        assert summary["total_transactions"] == 0
+        assert await repository.get_transaction_summary(use_rollup=True) == await repository.get_transaction_summary()
+
+
+@pytest.mark.unit
+class TestConcurrentSummaryRefresh:
+    """Summary requests refreshing the same days at once."""
+
+    async def test_concurrent_refreshes_do_not_conflict(self, tmp_path):
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'summary.db'}", pool_size=20, connect_args={"timeout": 60}
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                lambda sync_conn: BaseModel.metadata.create_all(
+                    sync_conn, tables=[HEADERS, transaction_daily_summary_table]
+                )
+            )
+        async with AsyncSession(engine) as session:
+            await _seed(session)
+            await session.commit()
+
+        async def summarize():
+            async with AsyncSession(engine) as session:
+                summary = await TransactionHeaderRepository(session).get_transaction_summary(use_rollup=True)
+                await session.commit()
+                return summary
+
+        try:
+            summaries = await asyncio.gather(*(summarize() for _ in range(10)))
+            async with AsyncSession(engine) as session:
+                raw = await TransactionHeaderRepository(session).get_transaction_summary()
+        finally:
+            await engine.dispose()
+
+        assert all(summary == raw for summary in summaries)
@@ -0,0 +1,158 @@
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.base import BaseModel
+from app.modules.master_data.categories.models import Category
+from app.shared.filters import SortOrder, SortSpec
+from app.shared.pagination import (
+    CountMode, Page, decode_cursor, encode_cursor, keyset_sort, paginate_keyset
+)
+
+
+categories = Category.__table__
+
+
+@pytest_asyncio.fixture
+async def page_session():
+    """53 categories whose created_at values repeat in groups of five."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: BaseModel.metadata.create_all(sync_conn, tables=[categories]))
+        await conn.execute(categories.insert(), [
+            {
+                "id": uuid.uuid4(), "name": f"c{i:02d}", "category_path": f"c{i:02d}", "category_level": 1,
+                "display_order": i % 7, "is_leaf": True, "is_active": i % 4 != 0,
+                "created_at": datetime(2024, 1, 1) + timedelta(hours=i // 5), "updated_at": datetime(2024, 1, 1),
+            }
+            for i in range(53)
+        ])
+    async with AsyncSession(engine) as session:
+        session.statements = []
+        event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: session.statements.append(1))
+        yield session
+    await engine.dispose()
+
+
+async def _scroll(session, query, sort_specs, limit):
+    """Every row reached by following next_cursor, and the number of pages."""
+    rows, cursor, pages = [], None, 0
+    while True:
+        page = await paginate_keyset(
+            session, query, categories.c, sort_specs, cursor=cursor, limit=limit, scalars=False
+        )
+        rows.extend(page.items)
+        pages += 1
+        if not page.has_next:
+            return rows, pages
+        cursor = page.next_cursor
+
+
+async def _ordered(session, query, sort_specs):
+    order = [
+        categories.c[spec.field].desc() if spec.order == SortOrder.DESC else categories.c[spec.field].asc()
+        for spec in keyset_sort(sort_specs)
+    ]
+    return (await session.execute(query.order_by(*order))).mappings().all()
+
+
+@pytest.mark.unit
+class TestCursorEncoding:
+    """Opaque cursors round-trip typed sort values."""
+
+    def test_round_trip(self):
+        specs = [
+            SortSpec(field="created_at", order=SortOrder.DESC), SortSpec(field="total_amount"), SortSpec(field="id")
+        ]
+        values = [datetime(2024, 5, 1, 12, 30, 15, 250), Decimal("12.50"), uuid.uuid4()]
+
+        assert decode_cursor(encode_cursor(specs, values), specs) == values
+
+    def test_rejects_other_sort_and_garbage(self):
+        specs = [SortSpec(field="name"), SortSpec(field="id")]
+        cursor = encode_cursor(specs, ["a", uuid.uuid4()])
+
+        with pytest.raises(ValueError):
+            decode_cursor(cursor, [SortSpec(field="name", order=SortOrder.DESC), SortSpec(field="id")])
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor", specs)
+
+    def test_tiebreaker_follows_last_direction(self):
+        specs = keyset_sort([SortSpec(field="created_at", order=SortOrder.DESC)])
+        assert [(spec.field, spec.order) for spec in specs] == [
+            ("created_at", SortOrder.DESC), ("id", SortOrder.DESC)
+        ]
+
+
+@pytest.mark.unit
+class TestKeysetPagination:
+    """Scrolling with cursors visits every row once, in order."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("sort_specs", [
+        [SortSpec(field="created_at", order=SortOrder.DESC)],
+        [SortSpec(field="created_at")],
+        [SortSpec(field="display_order"), SortSpec(field="created_at", order=SortOrder.DESC)],
+    ])
+    async def test_scroll_matches_full_ordering(self, page_session, sort_specs):
+        query = select(categories)
+
+        rows, pages = await _scroll(page_session, query, sort_specs, limit=10)
+
+        expected = await _ordered(page_session, query, sort_specs)
+        assert [row["id"] for row in rows] == [row["id"] for row in expected]
+        assert pages == 6
+
+    @pytest.mark.asyncio
+    async def test_filters_apply_to_every_page(self, page_session):
+        query = select(categories).where(categories.c.is_active == True)
+
+        rows, _ = await _scroll(page_session, query, [SortSpec(field="name")], limit=7)
+
+        assert len(rows) == 39
+        assert all(row["is_active"] for row in rows)
+
+    @pytest.mark.asyncio
+    async def test_count_only_when_requested(self, page_session):
+        query = select(categories).where(categories.c.is_active == True)
+        specs = [SortSpec(field="name")]
+
+        page = await paginate_keyset(page_session, query, categories.c, specs, limit=5, scalars=False)
+        assert page.total is None
+        assert len(page_session.statements) == 1
+
+        exact = await paginate_keyset(
+            page_session, query, categories.c, specs, limit=5, count=CountMode.EXACT, scalars=False
+        )
+        estimate = await paginate_keyset(
+            page_session, query, categories.c, specs, limit=5, count=CountMode.ESTIMATE, scalars=False
+        )
+        assert (exact.total, exact.total_is_estimate) == (39, False)
+        # Planner estimates are PostgreSQL only; other databases count exactly
+        assert (estimate.total, estimate.total_is_estimate) == (39, False)
+
+    @pytest.mark.asyncio
+    async def test_last_page_has_no_cursor(self, page_session):
+        page = await paginate_keyset(
+            page_session, select(categories), categories.c, [SortSpec(field="name")], limit=100, scalars=False
+        )
+        assert len(page.items) == 53
+        assert not page.has_next and page.next_cursor is None
+
+
+@pytest.mark.unit
+class TestOffsetPage:
+    """Offset pages without a total."""
+
+    def test_total_is_optional(self):
+        page = Page.create(items=[1, 2], total=None, page=3, page_size=2, has_next=True)
+        assert page.total is None and page.total_pages is None
+        assert page.has_next and page.has_prev
+
+        counted = Page.create(items=[1, 2], total=6, page=3, page_size=2)
+        assert counted.total_pages == 3 and not counted.has_next
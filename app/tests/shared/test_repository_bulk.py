@@ -0,0 +1,147 @@
+import uuid
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.db.base import BaseModel
+from app.modules.master_data.categories.models import Category
+from app.modules.transactions.models import TransactionHeader
+from app.shared.repository import BaseRepository
+
+
+categories = Category.__table__
+
+
+def _row(name, **values):
+    row = {
+        "name": name, "category_path": name, "category_level": 1,
+        "display_order": 0, "is_leaf": True, "is_active": True,
+    }
+    row.update(values)
+    return row
+
+
+@pytest_asyncio.fixture
+async def bulk_engine():
+    """In-memory database with the categories table and a statement log."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: BaseModel.metadata.create_all(sync_conn, tables=[categories]))
+    engine.sync_engine.statements = []
+    event.listen(
+        engine.sync_engine, "before_cursor_execute",
+        lambda conn, cursor, statement, params, context, executemany:
+            engine.sync_engine.statements.append(statement.split()[0].upper())
+    )
+    yield engine
+    await engine.dispose()
+
+
+async def _rows(engine):
+    async with engine.connect() as conn:
+        result = await conn.execute(select(categories).order_by(categories.c.name))
+        return {row["name"]: dict(row) for row in result.mappings()}
+
+
+@pytest.mark.unit
+class TestBulkWrites:
+    """Set-based bulk insert, update and upsert."""
+
+    @pytest.mark.asyncio
+    async def test_bulk_insert_returns_ids_in_chunks(self, bulk_engine):
+        async with AsyncSession(bulk_engine) as session:
+            repository = BaseRepository(Category, session)
+            ids = await repository.bulk_insert([_row(f"c{i:03d}") for i in range(250)], chunk_size=100)
+
+        rows = await _rows(bulk_engine)
+        assert len(ids) == 250 and len(set(ids)) == 250
+        assert {row["id"] for row in rows.values()} == set(ids)
+        assert rows["c000"]["created_at"] is not None
+        assert bulk_engine.sync_engine.statements.count("INSERT") == 3
+
+    @pytest.mark.asyncio
+    async def test_chunks_respect_bind_parameter_limit(self, bulk_engine):
+        async with AsyncSession(bulk_engine) as session:
+            repository = BaseRepository(Category, session)
+            chunks = list(repository._chunks([_row("x")] * 10000, chunk_size=10000))
+
+        assert len(chunks[0]) == 30000 // 6
+        assert sum(len(chunk) for chunk in chunks) == 10000
+
+    @pytest.mark.asyncio
+    async def test_bulk_update_groups_by_changed_columns(self, bulk_engine):
+        async with AsyncSession(bulk_engine) as session:
+            repository = BaseRepository(Category, session)
+            ids = await repository.bulk_insert([_row(f"c{i}") for i in range(6)])
+            bulk_engine.sync_engine.statements.clear()
+
+            updates = [{"id": ids[i], "display_order": i * 10} for i in range(4)]
+            updates += [{"id": ids[4], "is_active": False, "unknown_field": 1}, {"display_order": 99}]
+            count = await repository.bulk_update(updates)
+
+        rows = await _rows(bulk_engine)
+        assert count == 5
+        assert [rows[f"c{i}"]["display_order"] for i in range(6)] == [0, 10, 20, 30, 0, 0]
+        assert rows["c4"]["is_active"] is False
+        assert rows["c5"]["updated_at"] < rows["c1"]["updated_at"]
+        assert bulk_engine.sync_engine.statements.count("UPDATE") == 2
+
+    @pytest.mark.asyncio
+    async def test_bulk_upsert_updates_conflicts_and_keeps_audit_fields(self, bulk_engine):
+        existing = uuid.uuid4()
+        async with AsyncSession(bulk_engine) as session:
+            repository = BaseRepository(Category, session)
+            await repository.bulk_insert([_row("old", id=existing, created_by="seed", created_at=datetime(2024, 1, 1))])
+
+            count = await repository.bulk_upsert([
+                _row("renamed", id=existing, created_by="importer"),
+                _row("fresh", id=uuid.uuid4(), created_by="importer"),
+            ])
+
+        rows = await _rows(bulk_engine)
+        assert count == 2
+        assert set(rows) == {"renamed", "fresh"}
+        assert rows["renamed"]["created_by"] == "seed"
+        assert rows["renamed"]["created_at"] == datetime(2024, 1, 1)
+
+    @pytest.mark.asyncio
+    async def test_bulk_upsert_without_update_columns_ignores_conflicts(self, bulk_engine):
+        existing = uuid.uuid4()
+        async with AsyncSession(bulk_engine) as session:
+            repository = BaseRepository(Category, session)
+            await repository.bulk_insert([_row("old", id=existing)])
+            await repository.bulk_upsert([_row("renamed", id=existing)], update_columns=())
+
+        assert set(await _rows(bulk_engine)) == {"old"}
+
+    @pytest.mark.asyncio
+    async def test_failed_chunk_rolls_back_whole_batch(self, bulk_engine):
+        duplicate = uuid.uuid4()
+        async with AsyncSession(bulk_engine) as session:
+            repository = BaseRepository(Category, session)
+            with pytest.raises(Exception):
+                await repository.bulk_insert(
+                    [_row("a", id=duplicate), _row("b"), _row("c", id=duplicate)], chunk_size=2
+                )
+
+        assert await _rows(bulk_engine) == {}
+
+    @pytest.mark.asyncio
+    async def test_bulk_writes_refuse_rollup_sources(self, bulk_engine, monkeypatch):
+        monkeypatch.setattr(settings, "ROLLUPS_ENABLED", True)
+        async with AsyncSession(bulk_engine) as session:
+            repository = BaseRepository(TransactionHeader, session)
+            with pytest.raises(RuntimeError):
+                await repository.bulk_insert([{"transaction_number": "TX-1"}])
+            with pytest.raises(RuntimeError):
+                await repository.bulk_update([{"id": uuid.uuid4(), "total_amount": 1}])
+            with pytest.raises(RuntimeError):
+                await repository.bulk_delete([uuid.uuid4()])
+            # Empty batches write nothing and stay allowed
+            assert await repository.bulk_upsert([]) == 0
+
+        assert bulk_engine.sync_engine.statements == []
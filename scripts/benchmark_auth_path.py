@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Requests per second on a trivial authenticated endpoint.
+
+The endpoint depends on get_current_active_user and returns the
+caller's email. "uncached" disables the verified-token LRU and the user
+activity snapshot, so every request verifies the JWT signature and reads
+the user's is_active flag from the database, as before. "cached" is the
+default configuration. Requests go through an in-process ASGI transport
+against an in-memory SQLite users table.
+
+Usage:
+    python scripts/benchmark_auth_path.py [--requests 5000] [--users 50] [--concurrency 10]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import app.main  # noqa: F401 (registers every model so foreign keys resolve)
+from app.core import auth_cache, security
+from app.core.config import settings
+from app.db.base import BaseModel
+from app.db.session import get_session
+from app.modules.auth.models import User
+from app.shared.dependencies import get_current_active_user
+
+
+users = User.__table__
+
+
+def build_app(engine) -> FastAPI:
+    app = FastAPI()
+
+    async def session_override():
+        async with AsyncSession(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = session_override
+
+    @app.get("/me")
+    async def me(current_user=Depends(get_current_active_user)):
+        return {"email": current_user.email}
+
+    return app
+
+
+async def seed_users(engine, count: int):
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": uuid.uuid4(), "username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x",
+            "first_name": "Bench", "last_name": str(i), "is_active": True, "created_at": now, "updated_at": now,
+        }
+        for i in range(count)
+    ]
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: BaseModel.metadata.create_all(sync_conn, tables=[users]))
+        await conn.execute(users.insert(), rows)
+    return [
+        security.create_access_token({"sub": row["email"], "user_id": str(row["id"]), "permissions": ["items:read"]})
+        for row in rows
+    ]
+
+
+async def run_scenario(engine, tokens, requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=build_app(engine))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker(offset: int):
+            for i in range(offset, requests, concurrency):
+                token = tokens[i % len(tokens)]
+                response = await client.get("/me", headers={"Authorization": f"Bearer {token}"})
+                assert response.status_code == 200, response.text
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(offset) for offset in range(concurrency)])
+        return requests / (time.perf_counter() - started)
+
+
+def configure(cached: bool, backend: str):
+    settings.JWT_BACKEND = backend
+    size = settings.AUTH_CACHE_SIZE if cached else 0
+    auth_cache.verified_tokens.max_size = size
+    auth_cache.verified_tokens.clear()
+    auth_cache.user_activity.max_size = size
+    auth_cache.user_activity.invalidate()
+
+
+async def run(args):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    tokens = await seed_users(engine, args.users)
+    backends = ["jose", "pyjwt"] if security.PYJWT_AVAILABLE else ["jose"]
+
+    print(f"{args.requests:,} requests, {args.users} users, concurrency {args.concurrency}")
+    print(f"{'scenario':<20}{'requests/s':>12}")
+    for backend in backends:
+        for cached in (False, True):
+            configure(cached, backend)
+            rate = await run_scenario(engine, tokens, args.requests, args.concurrency)
+            label = f"{backend}, {'cached' if cached else 'uncached'}"
+            print(f"{label:<20}{rate:>12,.0f}")
+    if not security.PYJWT_AVAILABLE:
+        print("(PyJWT is not installed; only the python-jose backend was measured)")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the cache payload codec.
+
+Compares encode/decode throughput and payload size of the headered binary
+codec (app/core/cache_codecs.py) against the previous scheme, where values
+were json.dumps'd or pickled via latin-1 and round-tripped as text by a
+decode_responses=True Redis client.
+
+Usage:
+    python scripts/benchmark_cache_codec.py [--iterations 2000]
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import timeit
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import BaseModel
+
+from app.core.cache_codecs import CacheCodec, MSGPACK_AVAILABLE
+
+
+class BenchItem(BaseModel):
+    """Representative list-endpoint row."""
+
+    id: str
+    sku: str
+    name: str
+    category_path: str
+    daily_rate: Decimal
+    available_units: int
+    rented_units: int
+    is_active: bool
+    created_at: datetime
+
+
+def legacy_encode(value: Any) -> bytes:
+    """Previous CacheManager.set serialization plus the client's utf-8 encode."""
+    if isinstance(value, (dict, list, bool, int, float, str)):
+        text = json.dumps(value, default=str)
+    else:
+        text = pickle.dumps(value).decode("latin-1")
+    return text.encode("utf-8")
+
+
+def legacy_decode(payload: bytes) -> Any:
+    """Previous CacheManager.get deserialization after the client's utf-8 decode."""
+    text = payload.decode("utf-8")
+    try:
+        return json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        return pickle.loads(text.encode("latin-1"))
+
+
+def build_payloads() -> Dict[str, Any]:
+    """Build the benchmark payloads."""
+    rows = [
+        {
+            "id": f"item-{i}",
+            "sku": f"SKU-{i:06d}",
+            "name": f"Cordless drill model {i}",
+            "category_path": "Tools/Power Tools/Drills",
+            "daily_rate": "25.00",
+            "available_units": i % 7,
+            "rented_units": i % 3,
+            "is_active": True,
+            "created_at": "2024-01-01T00:00:00",
+        }
+        for i in range(500)
+    ]
+    models = [BenchItem(**{**row, "daily_rate": Decimal(row["daily_rate"])}) for row in rows]
+    return {
+        "small_dict": {"customer_id": "c-1", "tier": "gold", "credit_limit": 5000, "blacklisted": False},
+        "list_500_rows": rows,
+        "pydantic_model": models[0],
+        "pydantic_list_500": models,
+        "response_body_bytes": json.dumps({"items": rows}).encode("utf-8"),
+    }
+
+
+def measure(func: Callable[[], Any], iterations: int) -> float:
+    """Return operations per second for func."""
+    seconds = min(timeit.repeat(func, number=iterations, repeat=3))
+    return iterations / seconds if seconds else float("inf")
+
+
+def run(iterations: int):
+    codecs: Dict[str, Optional[CacheCodec]] = {
+        "legacy": None,
+        "codec": CacheCodec(compression="none"),
+        "codec+zlib": CacheCodec(compression="zlib", compression_threshold=8192),
+    }
+    if MSGPACK_AVAILABLE:
+        codecs["codec(msgpack)"] = CacheCodec(plain_serializer="msgpack", compression="none")
+    try:
+        codecs["codec+auto"] = CacheCodec(compression="auto", compression_threshold=8192)
+    except Exception:
+        pass
+
+    header = f"{'payload':<22}{'scheme':<16}{'bytes':>10}{'encode/s':>14}{'decode/s':>14}"
+    print(header)
+    print("-" * len(header))
+    for name, value in build_payloads().items():
+        count = max(iterations // (50 if "500" in name or "bytes" in name else 1), 20)
+        for scheme, codec in codecs.items():
+            encode = legacy_encode if codec is None else codec.encode
+            decode = legacy_decode if codec is None else codec.decode
+            payload = encode(value)
+            encode_rate = measure(lambda: encode(value), count)
+            decode_rate = measure(lambda: decode(payload), count)
+            print(f"{name:<22}{scheme:<16}{len(payload):>10}{encode_rate:>14,.0f}{decode_rate:>14,.0f}")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark for moving and renaming category subtrees.
+
+Compares the previous approach, which loaded every descendant and issued one
+UPDATE per row with a recomputed path, against
+CategoryRepository.rewrite_subtree_paths, which rewrites the path prefix and
+shifts the level of the whole subtree in a single UPDATE. Runs against an
+in-memory SQLite database.
+
+Usage:
+    python scripts/benchmark_category_subtree.py [--sizes 10000 100000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import app.main  # noqa: F401 (registers every model so foreign keys resolve)
+from app.db.base import BaseModel
+from app.modules.master_data.categories.models import Category
+from app.modules.master_data.categories.repository import CategoryRepository
+
+
+categories = Category.__table__
+
+
+def build_rows(size: int, fanout: int = 10):
+    """A root ("Catalogue") with a breadth-first tree of `size` descendants below it, plus a sibling root."""
+    now = datetime(2024, 1, 1)
+    root = {"id": uuid.uuid4(), "name": "Catalogue", "category_path": "Catalogue", "category_level": 1}
+    rows = [root, {"id": uuid.uuid4(), "name": "Archive", "category_path": "Archive", "category_level": 1}]
+    frontier = [root]
+    while len(rows) < size + 2:
+        parent = frontier.pop(0)
+        for index in range(fanout):
+            if len(rows) >= size + 2:
+                break
+            name = f"C{len(rows)}"
+            child = {
+                "id": uuid.uuid4(), "name": name, "parent_category_id": parent["id"],
+                "category_path": f"{parent['category_path']}/{name}",
+                "category_level": parent["category_level"] + 1,
+            }
+            rows.append(child)
+            frontier.append(child)
+    for row in rows:
+        row.setdefault("parent_category_id", None)
+        row.update(display_order=0, is_leaf=False, is_active=True, created_at=now, updated_at=now)
+    return root, rows
+
+
+async def row_by_row(session, category_id, new_path, new_level):
+    """Previous implementation: fetch descendants, then one UPDATE per row."""
+    old_path, old_level = (await session.execute(
+        select(categories.c.category_path, categories.c.category_level).where(categories.c.id == category_id)
+    )).one()
+    await session.execute(
+        update(categories).where(categories.c.id == category_id)
+        .values(category_path=new_path, category_level=new_level)
+    )
+    descendants = (await session.execute(
+        select(categories.c.id, categories.c.category_path)
+        .where(categories.c.category_path.like(f"{old_path}/%"))
+    )).all()
+    for descendant_id, path in descendants:
+        segments = new_path.split("/") + path.split("/")[len(old_path.split("/")):]
+        await session.execute(
+            update(categories).where(categories.c.id == descendant_id)
+            .values(category_path="/".join(segments), category_level=len(segments))
+        )
+    await session.commit()
+    return len(descendants)
+
+
+async def set_based(session, category_id, new_path, new_level):
+    return await CategoryRepository(session).rewrite_subtree_paths(category_id, new_path, new_level)
+
+
+async def measure(strategy, size: int):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    root, rows = build_rows(size)
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: BaseModel.metadata.create_all(sync_conn, tables=[categories]))
+        for start in range(0, len(rows), 5000):
+            await conn.execute(categories.insert(), rows[start:start + 5000])
+
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(1))
+    async with AsyncSession(engine) as session:
+        started = time.perf_counter()
+        # Rename, then move the renamed subtree one level down
+        rewritten = await strategy(session, root["id"], "Products", 1)
+        await strategy(session, root["id"], "Archive/Products", 2)
+        seconds = time.perf_counter() - started
+
+    async with engine.connect() as conn:
+        moved = (await conn.execute(
+            select(categories.c.id).where(categories.c.category_path.like("Archive/Products/%"))
+        )).all()
+    await engine.dispose()
+    assert rewritten == size and len(moved) == size
+    return seconds, len(statements)
+
+
+async def run(sizes):
+    header = f"{'descendants':>12}{'strategy':>14}{'statements':>12}{'seconds':>10}"
+    print(header)
+    print("-" * len(header))
+    for size in sizes:
+        results = {}
+        for name, strategy in (("row-by-row", row_by_row), ("set-based", set_based)):
+            seconds, statements = await measure(strategy, size)
+            results[name] = seconds
+            print(f"{size:>12,}{name:>14}{statements:>12,}{seconds:>10.3f}")
+        print(f"{'':>12}{'speedup':>14}{'':>12}{results['row-by-row'] / results['set-based']:>9.1f}x")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark for response compression on an inventory-report-shaped payload.
+
+Serves a synthetic /api/v1/inventory/report response (the same shape as
+InventoryService.get_inventory_report, without a database) through the ASGI
+stack with and without CompressionMiddleware, and reports bytes on the wire
+and p50/p99 latency per content coding.
+
+Usage:
+    python scripts/benchmark_compression.py [--items 2000] [--requests 200]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport, AsyncClient
+
+from app.core.middleware import BROTLI_AVAILABLE, CompressionMiddleware
+
+
+def build_report(items: int) -> Dict[str, Any]:
+    """Build a report payload shaped like the inventory report endpoint."""
+    return {
+        "generated_at": "2024-01-01T00:00:00",
+        "summary": {"total_items": items, "total_units": items * 5, "total_value": "125000.00"},
+        "items": [
+            {
+                "item_id": f"item-{i}",
+                "sku": f"SKU-{i:06d}",
+                "item_name": f"Cordless drill model {i}",
+                "category": "Tools/Power Tools/Drills",
+                "brand": "Makita",
+                "total_units": 5,
+                "available_units": i % 5,
+                "rented_units": 5 - i % 5,
+                "maintenance_units": 0,
+                "daily_rate": "25.00",
+                "locations": [{"location_id": f"loc-{i % 4}", "units": 5}],
+            }
+            for i in range(items)
+        ],
+    }
+
+
+def build_app(items: int) -> FastAPI:
+    """Build a minimal app serving the synthetic report, buffered and streamed."""
+    app = FastAPI()
+    report = build_report(items)
+
+    @app.get("/api/v1/inventory/report")
+    async def inventory_report():
+        return report
+
+    @app.get("/api/v1/inventory/report/stream")
+    async def inventory_report_stream():
+        async def rows():
+            for row in report["items"]:
+                yield (str(row) + "\n").encode()
+
+        return StreamingResponse(rows(), media_type="text/plain")
+
+    return app
+
+
+async def measure(app, path: str, encoding: str, requests: int) -> Dict[str, float]:
+    """Issue requests and return bytes on the wire and latency percentiles (ms)."""
+    timings: List[float] = []
+    wire_bytes = 0
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(requests):
+            started = time.perf_counter()
+            async with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+                raw = b"".join([chunk async for chunk in response.aiter_raw()])
+            timings.append((time.perf_counter() - started) * 1000)
+            wire_bytes = len(raw)
+    timings.sort()
+    return {
+        "bytes": wire_bytes,
+        "p50": statistics.median(timings),
+        "p99": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+    }
+
+
+async def run(items: int, requests: int):
+    app = build_app(items)
+    variants: List[tuple] = [("none", app, "identity"), ("gzip", CompressionMiddleware(app), "gzip")]
+    if BROTLI_AVAILABLE:
+        variants.append(("br", CompressionMiddleware(app), "br"))
+
+    header = f"{'endpoint':<34}{'coding':<8}{'bytes':>12}{'p50 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for path in ("/api/v1/inventory/report", "/api/v1/inventory/report/stream"):
+        baseline: Optional[int] = None
+        for name, wrapped, encoding in variants:
+            result = await measure(wrapped, path, encoding, requests)
+            baseline = baseline or result["bytes"]
+            ratio = f"  ({result['bytes'] / baseline:.0%})" if name != "none" else ""
+            print(f"{path:<34}{name:<8}{result['bytes']:>12,}{result['p50']:>10.2f}{result['p99']:>10.2f}{ratio}")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.items, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark for AnalyticsService.calculate_key_metrics data access.
+
+Compares the previous approach (load every active row of the source tables
+and count/sum in Python) with the pushed-down aggregates in
+KeyMetricsRepository, both as a full run and as an incremental run after a
+small batch of new rows. Uses an in-memory SQLite database holding only the
+source tables.
+
+Usage:
+    python scripts/benchmark_key_metrics.py [--transactions 1000000] [--new-rows 1000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import Boolean, Date, DateTime, Integer, Numeric, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import app.main  # noqa: F401  (registers every model so foreign keys resolve)
+from app.db.base import BaseModel, UUIDType
+from app.modules.analytics.repository import KeyMetricsRepository
+
+
+SOURCES = KeyMetricsRepository._sources()
+BATCH = 50000
+
+
+def _template(table, created_at):
+    """Values for every required column of a table (None marks unique text)."""
+    row = {}
+    for column in table.columns:
+        if column.nullable or column.server_default is not None:
+            continue
+        if isinstance(column.type, UUIDType):
+            row[column.name] = uuid.uuid4()
+        elif isinstance(column.type, Boolean):
+            row[column.name] = False
+        elif isinstance(column.type, DateTime):
+            row[column.name] = created_at
+        elif isinstance(column.type, Date):
+            row[column.name] = date(2020, 1, 1)
+        elif isinstance(column.type, (Integer, Numeric)):
+            row[column.name] = 0
+        else:
+            row[column.name] = None
+    row.update(is_active=True, created_at=created_at, updated_at=created_at)
+    return row
+
+
+async def _insert(session, source, count, created_at, **values):
+    table = SOURCES[source][0]
+    template = _template(table, created_at)
+    text_columns = [name for name, value in template.items() if value is None]
+    for start in range(0, count, BATCH):
+        rows = []
+        for i in range(start, min(count, start + BATCH)):
+            row = dict(template, id=uuid.uuid4())
+            for name in text_columns:
+                row[name] = f"{source}-{created_at:%Y%m%d}-{i}"
+            for name, value in values.items():
+                row[name] = value(i) if callable(value) else value
+            rows.append(row)
+        await session.execute(table.insert(), rows)
+
+
+async def python_side(session):
+    """Previous behaviour: fetch the active rows and reduce them in Python."""
+    totals = {}
+    for name, (table, _) in SOURCES.items():
+        result = await session.execute(select(table).where(table.c.is_active == True))
+        rows = result.all()
+        totals[name] = len(rows)
+        if name == "transactions":
+            totals["revenue"] = sum(row.total_amount for row in rows)
+    return totals
+
+
+async def _timed(label, coroutine, baseline=None):
+    start = time.perf_counter()
+    await coroutine
+    elapsed = time.perf_counter() - start
+    speedup = f"{baseline / elapsed:>9.1f}x" if baseline else ""
+    print(f"{label:<34}{elapsed * 1000:>12,.1f} ms{speedup}")
+    return elapsed
+
+
+async def run(transactions: int, new_rows: int):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda sync_conn: BaseModel.metadata.create_all(sync_conn, tables=[table for table, _ in SOURCES.values()])
+        )
+
+    old = datetime(2020, 1, 1)
+    async with AsyncSession(engine) as session:
+        print(f"seeding {transactions:,} transactions ...")
+        await _insert(
+            session, "transactions", transactions, old,
+            total_amount=lambda i: Decimal(i % 500) + Decimal("0.99"),
+            transaction_type=lambda i: "RENTAL" if i % 3 else "SALE"
+        )
+        await _insert(session, "customers", transactions // 20, old)
+        await _insert(session, "inventory_units", transactions // 10, old, status=lambda i: "RENTED" if i % 4 else "AVAILABLE")
+        await _insert(session, "rental_returns", transactions // 2, old)
+        await session.commit()
+
+        repository = KeyMetricsRepository(session)
+        baseline = await _timed("python-side (load all rows)", python_side(session))
+        await _timed("SQL aggregate (full)", repository.aggregate(), baseline)
+
+        state = await repository.aggregate()
+        watermark = old + timedelta(days=1)
+        state = {name: dict(source, watermark=watermark.isoformat()) for name, source in state.items()}
+        await _insert(
+            session, "transactions", new_rows, watermark + timedelta(days=1),
+            total_amount=Decimal("10"), transaction_type="RENTAL"
+        )
+        await session.commit()
+        await _timed(f"SQL aggregate (+{new_rows:,} incremental)", repository.aggregate(state), baseline)
+
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--transactions", type=int, default=1000000)
+    parser.add_argument("--new-rows", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.transactions, args.new_rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark for PermissionChecker: compiled bitmasks vs. per-request sets.
+
+The previous checker built set(current_user.permissions) and
+set(required_permissions) on every request; the current one compares the
+token's precompiled mask with the checker's required mask. Users are given
+hundreds of permissions drawn from app/modules/auth/constants.py.
+
+Usage:
+    python scripts/benchmark_permission_checks.py [--iterations 200000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.security import TokenData
+from app.modules.auth.permission_registry import permission_registry
+from app.shared.dependencies import PermissionChecker
+
+
+def set_based_check(required_permissions, current_user: TokenData) -> bool:
+    """The previous PermissionChecker body, minus the exception."""
+    user_permissions = set(current_user.permissions)
+    required = set(required_permissions)
+    return required.issubset(user_permissions)
+
+
+def mask_based_check(checker: PermissionChecker, current_user: TokenData) -> bool:
+    """The current PermissionChecker body, minus the exception."""
+    user_mask = permission_registry.user_mask(current_user)
+    return user_mask & checker.required_mask == checker.required_mask
+
+
+def run(iterations: int):
+    rng = random.Random(42)
+    all_codes = permission_registry.codes((1 << len(permission_registry)) - 1)
+    print(f"registry: {len(permission_registry)} permission codes, version {permission_registry.version}\n")
+
+    header = f"{'user permissions':<18}{'required':>10}{'set checks/s':>16}{'mask checks/s':>16}{'speedup':>10}"
+    print(header)
+    print("-" * len(header))
+    for user_size in (10, 100, 180):
+        granted = rng.sample(all_codes, min(user_size, len(all_codes)))
+        current_user = TokenData(
+            email="bench@example.com",
+            permissions=granted,
+            permission_mask=permission_registry.mask(granted),
+            permission_mask_version=permission_registry.version
+        )
+        for required_size in (1, 3):
+            required = granted[:required_size]
+            checker = PermissionChecker(required)
+            assert asyncio.run(checker(current_user=current_user)) is current_user
+
+            set_seconds = min(timeit.repeat(lambda: set_based_check(required, current_user), number=iterations, repeat=3))
+            mask_seconds = min(timeit.repeat(lambda: mask_based_check(checker, current_user), number=iterations, repeat=3))
+            print(
+                f"{len(granted):<18}{required_size:>10}{iterations / set_seconds:>16,.0f}"
+                f"{iterations / mask_seconds:>16,.0f}{set_seconds / mask_seconds:>9.1f}x"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+    run(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
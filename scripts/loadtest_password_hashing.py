@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Load test: latency of an unrelated endpoint during a login storm.
+
+Serves a small FastAPI app in-process (httpx ASGI transport, one event
+loop, like one uvicorn worker) with a /login endpoint that verifies a
+bcrypt password and a /ping endpoint that does no work. /ping is polled
+at a steady rate, first alone, then while --logins concurrent clients
+hammer /login with the previous inline verify_password call, and again
+with /login awaiting the bounded password_hasher pool.
+
+Usage:
+    python scripts/loadtest_password_hashing.py [--logins 20] [--seconds 5]
+        [--rounds 12] [--workers 4] [--max-queue 32]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI
+
+from app.core.config import settings
+from app.core.errors import ServiceOverloadedException
+from app.core.password_hashing import AsyncPasswordHasher, hash_password_sync, verify_password_sync
+from app.core.request_metrics import LatencyHistogram
+
+
+PASSWORD = "Storm123!@#"
+
+
+def build_app(mode: str, hashed: str, hasher: AsyncPasswordHasher) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login():
+        if mode == "inline":
+            return {"valid": verify_password_sync(PASSWORD, hashed)}
+        try:
+            return {"valid": await hasher.verify(PASSWORD, hashed)}
+        except ServiceOverloadedException:
+            return {"valid": None}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+async def poll_ping(client, stop: asyncio.Event, interval: float) -> LatencyHistogram:
+    histogram = LatencyHistogram()
+    scheduled = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        await client.get("/ping")
+        # Measured from the intended send time, so waiting on a blocked loop counts
+        histogram.record(time.perf_counter() - scheduled)
+        scheduled += interval
+    return histogram
+
+
+async def storm(client, stop: asyncio.Event, counts: dict):
+    while not stop.is_set():
+        response = await client.post("/login")
+        counts["rejected" if response.json()["valid"] is None else "completed"] += 1
+        # The in-process transport never suspends on its own; yield like a network round trip would
+        await asyncio.sleep(0)
+
+
+async def run_scenario(mode: str, logins: int, seconds: float, hashed: str, hasher: AsyncPasswordHasher):
+    app = build_app(mode, hashed, hasher)
+    counts = {"completed": 0, "rejected": 0}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        stop = asyncio.Event()
+        poller = asyncio.ensure_future(poll_ping(client, stop, interval=0.005))
+        clients = [asyncio.ensure_future(storm(client, stop, counts)) for _ in range(logins if mode else 0)]
+        await asyncio.sleep(seconds)
+        stop.set()
+        histogram = await poller
+        await asyncio.gather(*clients)
+    return histogram.summary(), counts
+
+
+async def run(args):
+    settings.BCRYPT_ROUNDS = args.rounds
+    hashed = hash_password_sync(PASSWORD)
+    hasher = AsyncPasswordHasher(max_workers=args.workers, max_queue=args.max_queue, executor=args.executor)
+
+    print(f"bcrypt cost {args.rounds}, {args.logins} login clients, {args.seconds}s per scenario, "
+          f"{args.workers} {args.executor} workers, queue {args.max_queue}")
+    print(f"{'scenario':<22}{'ping p50 ms':>13}{'p99 ms':>10}{'max ms':>10}{'logins/s':>10}{'rejected':>10}")
+    for label, mode in (("idle", None), ("storm, inline verify", "inline"), ("storm, hasher pool", "pool")):
+        summary, counts = await run_scenario(mode, args.logins, args.seconds, hashed, hasher)
+        print(
+            f"{label:<22}{summary['p50_ms']:>13.2f}{summary['p99_ms']:>10.2f}{summary['max_ms']:>10.2f}"
+            f"{counts['completed'] / args.seconds:>10.1f}{counts['rejected']:>10}"
+        )
+    print()
+    print(f"hasher pool: {hasher.stats()}")
+    hasher.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--logins", type=int, default=20, help="Concurrent login clients")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-queue", type=int, default=32)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Rebuild the dashboard rollup tables.
+
+Recomputes rollup_daily_location, rollup_rental_status, rollup_return_due and
+rollup_category_inventory from the source rows. Run it after bulk loads or
+raw SQL updates that bypass the ORM (which is what keeps the rollups current
+during normal operation).
+
+Usage:
+    python scripts/rebuild_rollups.py [--only daily_location --only return_due]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def rebuild(names):
+    import app.main  # noqa: F401  (registers every model so foreign keys resolve)
+    from app.db.session import engine
+    from app.modules.analytics.rollups import rebuild_rollups
+
+    started = time.perf_counter()
+    async with engine.begin() as connection:
+        await connection.run_sync(rebuild_rollups, names)
+    await engine.dispose()
+    print(f"Rebuilt {', '.join(names) if names else 'all rollups'} in {time.perf_counter() - started:.2f}s")
+
+
+def main():
+    from app.modules.analytics.rollups import ROLLUPS
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--only", action="append", choices=sorted(ROLLUPS), help="rollup to rebuild (repeatable)")
+    args = parser.parse_args()
+    asyncio.run(rebuild(args.only))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Analytics report worker pool.
+
+Starts one or more worker processes that claim queued analytics reports
+(POST /api/v1/analytics/reports/{report_id}/generate) and generate them.
+Each process runs several reports concurrently; per-report-type limits
+(REPORT_TYPE_CONCURRENCY) apply across all processes and hosts.
+
+Usage:
+    python scripts/report_worker.py [--processes 2] [--concurrency 2]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def run_worker(concurrency: int):
+    import app.main  # noqa: F401  (registers every model)
+    from app.db.session import engine
+    from app.modules.analytics.report_queue import create_report_worker
+
+    worker = create_report_worker(concurrency=concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, lambda: asyncio.ensure_future(worker.stop()))
+
+    print(f"Report worker {worker.worker_id} started ({concurrency} slots)")
+    await worker.run()
+    await engine.dispose()
+    print(f"Report worker {worker.worker_id} stopped")
+
+
+def worker_process(concurrency: int):
+    asyncio.run(run_worker(concurrency))
+
+
+def main():
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=settings.REPORT_WORKER_CONCURRENCY)
+    args = parser.parse_args()
+
+    if args.processes == 1:
+        worker_process(args.concurrency)
+        return
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=worker_process, args=(args.concurrency,), name=f"report-worker-{i}")
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+            process.join()
+
+
+if __name__ == "__main__":
+    main()